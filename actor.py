@@ -1,25 +1,66 @@
 """
 Actor Unificado
-Procesa DEVOLUCION, RENOVACION y PRESTAMO (todas síncronas con REP)
+Procesa DEVOLUCION, RENOVACION y PRESTAMO (todas síncronas con REP), y las
+consultas de solo lectura (BUSQUEDA, CONSULTA_USUARIO, RESUMEN) en el Actor de tipo CONSULTA
 Se comunica con el Gestor de Almacenamiento (GA) mediante REQ/REP
 """
 import zmq
 import json
 from datetime import datetime, timedelta
+import argparse
 import time
-import sys
+
+import trazas
+import plazos
+import idempotencia
+from cliente_confiable import ClienteConfiable, SinRespuesta, TIMEOUT_DEFECTO_MS, REINTENTOS_DEFECTO
+from interruptor import Interruptor, UMBRAL_DEFECTO, ENFRIAMIENTO_DEFECTO_S
+from metricas import Metricas, ServidorMetricas
+from perfilador import Perfilador
+from control import ServidorControl, INTERVALO_LOOP_MS, sondear
+from catalogo_compartido import CatalogoCompartido
+
+# El historial de una mutación ya aplicada no se descarta aunque venza el plazo
+OPERACIONES_SIN_PLAZO = ('INSERT_HISTORIAL',)
+# Operaciones del GA que pueden pasar a un GA de respaldo (otra sede) tras un timeout
+OPERACIONES_LECTURA_GA = ('SELECT_DISPONIBILIDAD', 'BUSQUEDA', 'CONSULTA_USUARIO', 'RESUMEN')
+
+# Operaciones del GA que llevan id_peticion (deduplicadas en peticiones_procesadas),
+# con el sufijo que distingue cada escritura de una misma petición
+SUFIJOS_IDEMPOTENCIA = {
+    'UPDATE_DEVOLUCION': '',
+    'UPDATE_RENOVACION': '',
+    'TRANSACCION_PRESTAMO': '',
+    'INSERT_HISTORIAL': ':historial'
+}
 
 class Actor:
-    def __init__(self, tipo, sede, puerto_rep, ga_host="localhost", ga_port=5560):
+    def __init__(self, tipo, sede, puerto_rep, ga_host="localhost", ga_port=5560,
+                 context=None, endpoint=None, ga_endpoint=None, metricas_puerto=None,
+                 control_puerto=None, ga_respaldos=None, timeout_ga_ms=TIMEOUT_DEFECTO_MS,
+                 reintentos_ga=REINTENTOS_DEFECTO, umbral_circuito=UMBRAL_DEFECTO,
+                 enfriamiento_circuito_s=ENFRIAMIENTO_DEFECTO_S, catalogo=None):
         """
         Inicializa el Actor
         
         Args:
-            tipo: Tipo de actor ('DEVOLUCION', 'RENOVACION' o 'PRESTAMO')
+            tipo: Tipo de actor ('DEVOLUCION', 'RENOVACION', 'PRESTAMO' o 'CONSULTA')
             sede: Identificador de la sede
             puerto_rep: Puerto REP para recibir solicitudes del GC
             ga_host: Host del Gestor de Almacenamiento
             ga_port: Puerto del Gestor de Almacenamiento
+            context: Contexto ZeroMQ compartido (modo embebido); None crea uno propio
+            endpoint: Endpoint REP explícito; None usa tcp://*:<puerto_rep>
+            ga_endpoint: Endpoint explícito del GA; None usa tcp://<ga_host>:<ga_port>
+            metricas_puerto: Puerto HTTP de métricas (formato Prometheus); None lo desactiva
+            control_puerto: Puerto del socket de control (perfilado, STATS); None lo desactiva
+            ga_respaldos: Endpoints alternativos del GA para failover, en orden
+            timeout_ga_ms: Espera máxima por intento en cada solicitud al GA
+            reintentos_ga: Reenvíos al GA si no responde (seguros con id_peticion)
+            umbral_circuito: Fallos consecutivos del GA que abren el circuito
+            enfriamiento_circuito_s: Segundos con el circuito abierto antes de probar el GA
+            catalogo: Archivo del catálogo compartido que publica el GA en este host
+                (nombre y totales de los libros sin preguntarle al GA); None lo desactiva
         """
         self.tipo = tipo.upper()
         self.sede = sede
@@ -27,44 +68,146 @@ class Actor:
         self.ga_port = ga_port
         
         # Configurar ZeroMQ
-        self.context = zmq.Context()
+        self.contexto_propio = context is None
+        self.context = context or zmq.Context()
         
         # Socket REP para recibir solicitudes del GC (todos los actores usan REP ahora)
         self.socket = self.context.socket(zmq.REP)
-        self.socket.bind(f"tcp://*:{puerto_rep}")
-        print(f"[Actor-{self.tipo}-Sede{sede}] Iniciado en puerto {puerto_rep} (REP - Síncrono)")
+        self.endpoint = endpoint or f"tcp://*:{puerto_rep}"
+        self.socket.bind(self.endpoint)
+        print(f"[Actor-{self.tipo}-Sede{sede}] Iniciado en {self.endpoint} (REP - Síncrono)")
         
-        # Socket REQ para comunicarse con el Gestor de Almacenamiento
-        self.socket_ga = self.context.socket(zmq.REQ)
-        self.socket_ga.connect(f"tcp://{ga_host}:{ga_port}")
-        print(f"[Actor-{self.tipo}-Sede{sede}] Conectado a GA: {ga_host}:{ga_port}")
+        # Endpoints del Gestor de Almacenamiento (el primero es el principal)
+        self.ga_endpoint = ga_endpoint or f"tcp://{ga_host}:{ga_port}"
+        self.ga_endpoints = [self.ga_endpoint] + list(ga_respaldos or [])
         
         self.contador_operaciones = 0
         self.operaciones_exitosas = 0
         self.operaciones_fallidas = 0
+        self.descartadas_plazo = 0
+        self.falla_ga = False
+        # Una mutación enviada al GA quedó sin respuesta cierta (puede haberse aplicado)
+        self.mutacion_incierta = False
+        
+        self.metricas = Metricas('actor', sede=sede, tipo=self.tipo)
+        if metricas_puerto:
+            ServidorMetricas(self.metricas, metricas_puerto).start()
+            print(f"[Actor-{self.tipo}-Sede{sede}] Métricas en http://*:{metricas_puerto}/metrics")
+        
+        # Cliente REQ confiable hacia el GA (timeouts, reintentos y failover)
+        self.cliente_ga = ClienteConfiable(self.context, self.ga_endpoints, "GA",
+                                           timeout_ga_ms, reintentos_ga, metricas=self.metricas,
+                                           lecturas=OPERACIONES_LECTURA_GA)
+        print(f"[Actor-{self.tipo}-Sede{sede}] Conectado a GA: {', '.join(self.ga_endpoints)}")
+        
+        # Circuito hacia el GA: con el GA o MySQL caídos responde ERROR de inmediato
+        self.circuito_ga = Interruptor("GA", umbral_circuito, enfriamiento_circuito_s,
+                                       metricas=self.metricas)
+        
+        # Catálogo mapeado en memoria: el préstamo se ahorra el SELECT de disponibilidad
+        self.catalogo = None
+        if catalogo:
+            self.catalogo = CatalogoCompartido(catalogo)
+            if self.catalogo.abrir():
+                print(f"[Actor-{self.tipo}-Sede{sede}] Catálogo compartido {catalogo} "
+                      f"(versión {self.catalogo.version})")
+            else:
+                print(f"[Actor-{self.tipo}-Sede{sede}] ⚠ Catálogo {catalogo} todavía no publicado; "
+                      f"se consulta al GA hasta que aparezca")
+        
+        # Perfilado bajo demanda y socket de control (hilo aparte)
+        self.perfilador = Perfilador(f"actor_{self.tipo.lower()}_sede{sede}")
+        self.control = None
+        if control_puerto:
+            self.control = ServidorControl(f"actor_{self.tipo.lower()}_sede{sede}", control_puerto, self.context)
+            self.control.registrar_perfilador(self.perfilador)
+            self.control.registrar_metricas(self.metricas)
+            self.control.registrar('CIRCUITO', lambda s: {'estado': 'OK', **self.circuito_ga.resumen()})
+            self.control.registrar_listo(self.chequear_listo)
+            self.control.start()
+    
+    def chequear_listo(self):
+        """Chequeos de LISTO: socket enlazado y algún GA alcanzable con su BD disponible"""
+        respuesta_ga = sondear(self.ga_endpoints, self.context)
+        return {
+            'socket': True,
+            'ga': respuesta_ga is not None,
+            'bd': bool(respuesta_ga and respuesta_ga.get('bd'))
+        }
     
-    def solicitar_ga(self, operacion, **parametros):
+    def solicitar_ga(self, operacion, mensaje=None, **parametros):
         """
         Envía una solicitud al Gestor de Almacenamiento y espera respuesta
         
         Args:
             operacion: Tipo de operación para el GA
+            mensaje: Mensaje del GC que origina la solicitud (propaga su traza)
             **parametros: Parámetros adicionales de la operación
             
         Returns:
             dict: Respuesta del GA
+            
+        Raises:
+            plazos.PlazoVencido: Si el plazo del mensaje venció aquí o en el GA
         """
         solicitud = {
             'operacion': operacion,
             **parametros
         }
+        if mensaje is not None:
+            trazas.propagar(mensaje, solicitud)
+            id_peticion = mensaje.get(idempotencia.CAMPO)
+            if id_peticion and operacion in SUFIJOS_IDEMPOTENCIA:
+                solicitud[idempotencia.CAMPO] = id_peticion + SUFIJOS_IDEMPOTENCIA[operacion]
+            if operacion not in OPERACIONES_SIN_PLAZO:
+                if plazos.expirado(mensaje):
+                    self.descartadas_plazo += 1
+                    self.metricas.incrementar('descartadas_plazo_total', operacion=operacion)
+                    raise plazos.PlazoVencido(
+                        plazos.respuesta_expirada(f"Actor-{self.tipo}", mensaje)['mensaje'])
+                plazos.propagar(mensaje, solicitud, plazos.MARGEN_SALTO_MS)
+        
+        if not self.circuito_ga.permitir():
+            self.falla_ga = True
+            self.metricas.incrementar('solicitudes_ga_total', operacion=operacion, estado='CIRCUITO_ABIERTO')
+            return {
+                'estado': 'ERROR',
+                'mensaje': f'GA no disponible (circuito abierto, próxima prueba en '
+                           f'{self.circuito_ga.reintentar_en_s():.1f}s)',
+                'circuito': self.circuito_ga.estado,
+                'no_aplicada': True
+            }
+        
+        # Enviar solicitud y esperar respuesta (con timeout y reintentos)
+        t_inicio = time.perf_counter()
+        try:
+            respuesta = self.cliente_ga.solicitar(solicitud)
+        except SinRespuesta as e:
+            respuesta = {'estado': 'ERROR', 'mensaje': str(e), 'falla_bd': True}
+        except plazos.PlazoVencido:
+            # El plazo venció esperando al GA: no dice nada sobre su salud
+            self.circuito_ga.liberar()
+            raise
+        
+        # Sin respuesta del GA o falla de MySQL cuentan para abrir el circuito;
+        # un rechazo de negocio (libro inexistente, sin ejemplares) no
+        if respuesta.get('falla_bd'):
+            self.falla_ga = True
+            self.circuito_ga.registrar_fallo()
+            # Timeout o error a mitad de la transacción: el GA pudo haber hecho el commit
+            if operacion in SUFIJOS_IDEMPOTENCIA and not respuesta.get('no_aplicada'):
+                self.mutacion_incierta = True
+        else:
+            self.circuito_ga.registrar_exito()
+        
+        self.metricas.observar('ga_latencia_segundos', time.perf_counter() - t_inicio, operacion=operacion)
+        self.metricas.incrementar('solicitudes_ga_total', operacion=operacion, estado=respuesta.get('estado'))
         
-        # Enviar solicitud
-        self.socket_ga.send_string(json.dumps(solicitud))
+        if mensaje is not None:
+            trazas.acumular(mensaje, respuesta)
         
-        # Esperar respuesta
-        respuesta_str = self.socket_ga.recv_string()
-        respuesta = json.loads(respuesta_str)
+        if respuesta.get('estado') == 'EXPIRADO':
+            raise plazos.PlazoVencido(respuesta['mensaje'])
         
         return respuesta
     
@@ -87,6 +230,7 @@ class Actor:
         print(f"[Actor-{self.tipo}-Sede{self.sede}] → Solicitando UPDATE a GA...")
         respuesta_update = self.solicitar_ga(
             'UPDATE_DEVOLUCION',
+            mensaje=mensaje,
             codigo_libro=codigo_libro,
             usuario_id=usuario_id
         )
@@ -109,6 +253,7 @@ class Actor:
         print(f"[Actor-{self.tipo}-Sede{self.sede}] → Registrando en historial...")
         respuesta_historial = self.solicitar_ga(
             'INSERT_HISTORIAL',
+            mensaje=mensaje,
             codigo_libro=codigo_libro,
             usuario_id=usuario_id,
             tipo_operacion='DEVOLUCION',
@@ -158,6 +303,7 @@ class Actor:
         print(f"[Actor-{self.tipo}-Sede{self.sede}] → Solicitando UPDATE a GA...")
         respuesta_update = self.solicitar_ga(
             'UPDATE_RENOVACION',
+            mensaje=mensaje,
             codigo_libro=codigo_libro,
             usuario_id=usuario_id,
             nueva_fecha=nueva_fecha
@@ -180,6 +326,7 @@ class Actor:
         datos_adicionales = json.dumps({'nueva_fecha_entrega': nueva_fecha})
         respuesta_historial = self.solicitar_ga(
             'INSERT_HISTORIAL',
+            mensaje=mensaje,
             codigo_libro=codigo_libro,
             usuario_id=usuario_id,
             tipo_operacion='RENOVACION',
@@ -224,39 +371,51 @@ class Actor:
         print(f"  → Usuario: {usuario_id}")
         
         # PASO 1: Verificar disponibilidad
-        print(f"[Actor-{self.tipo}-Sede{self.sede}] → Solicitando SELECT disponibilidad a GA...")
-        respuesta_select = self.solicitar_ga(
-            'SELECT_DISPONIBILIDAD',
-            codigo_libro=codigo_libro
-        )
-        
-        if respuesta_select['estado'] != 'OK':
-            print(f"[Actor-{self.tipo}-Sede{self.sede}] ✗ Libro no encontrado")
-            self.operaciones_fallidas += 1
-            return {
-                'estado': 'RECHAZADO',
-                'mensaje': 'Libro no encontrado en la biblioteca',
-                'codigo_libro': codigo_libro,
-                'timestamp': datetime.now().isoformat()
-            }
-        
-        disponibles = respuesta_select['ejemplares_disponibles']
-        totales = respuesta_select['ejemplares_totales']
-        nombre = respuesta_select['nombre']
-        
-        if disponibles <= 0:
-            print(f"[Actor-{self.tipo}-Sede{self.sede}] ✗ Sin ejemplares disponibles (0/{totales})")
-            self.operaciones_fallidas += 1
-            return {
-                'estado': 'RECHAZADO',
-                'mensaje': f'No hay ejemplares disponibles. Total: {totales}, Disponibles: 0',
-                'codigo_libro': codigo_libro,
-                'nombre_libro': nombre,
-                'timestamp': datetime.now().isoformat()
-            }
-        
-        print(f"[Actor-{self.tipo}-Sede{self.sede}] ✓ Libro disponible: {nombre}")
-        print(f"[Actor-{self.tipo}-Sede{self.sede}]   Ejemplares: {disponibles}/{totales}")
+        libro = self.catalogo.buscar(codigo_libro) if self.catalogo else None
+        if libro:
+            # Nombre y totales del catálogo compartido; la transacción decide si hay ejemplar
+            totales = libro['ejemplares_totales']
+            nombre = libro['nombre']
+            self.metricas.incrementar('catalogo_consultas_total', resultado='acierto')
+            print(f"[Actor-{self.tipo}-Sede{self.sede}] ✓ Libro en el catálogo compartido "
+                  f"(versión {self.catalogo.version}): {nombre}")
+        else:
+            if self.catalogo:
+                self.metricas.incrementar('catalogo_consultas_total', resultado='fallo')
+            print(f"[Actor-{self.tipo}-Sede{self.sede}] → Solicitando SELECT disponibilidad a GA...")
+            respuesta_select = self.solicitar_ga(
+                'SELECT_DISPONIBILIDAD',
+                mensaje=mensaje,
+                codigo_libro=codigo_libro
+            )
+            
+            if respuesta_select['estado'] != 'OK':
+                print(f"[Actor-{self.tipo}-Sede{self.sede}] ✗ Libro no encontrado")
+                self.operaciones_fallidas += 1
+                return {
+                    'estado': 'RECHAZADO',
+                    'mensaje': 'Libro no encontrado en la biblioteca',
+                    'codigo_libro': codigo_libro,
+                    'timestamp': datetime.now().isoformat()
+                }
+            
+            disponibles = respuesta_select['ejemplares_disponibles']
+            totales = respuesta_select['ejemplares_totales']
+            nombre = respuesta_select['nombre']
+            
+            if disponibles <= 0:
+                print(f"[Actor-{self.tipo}-Sede{self.sede}] ✗ Sin ejemplares disponibles (0/{totales})")
+                self.operaciones_fallidas += 1
+                return {
+                    'estado': 'RECHAZADO',
+                    'mensaje': f'No hay ejemplares disponibles. Total: {totales}, Disponibles: 0',
+                    'codigo_libro': codigo_libro,
+                    'nombre_libro': nombre,
+                    'timestamp': datetime.now().isoformat()
+                }
+            
+            print(f"[Actor-{self.tipo}-Sede{self.sede}] ✓ Libro disponible: {nombre}")
+            print(f"[Actor-{self.tipo}-Sede{self.sede}]   Ejemplares: {disponibles}/{totales}")
         
         # PASO 2: Calcular fechas
         fecha_prestamo = datetime.now()
@@ -266,12 +425,25 @@ class Actor:
         print(f"[Actor-{self.tipo}-Sede{self.sede}] → Solicitando TRANSACCION_PRESTAMO a GA...")
         respuesta_transaccion = self.solicitar_ga(
             'TRANSACCION_PRESTAMO',
+            mensaje=mensaje,
             codigo_libro=codigo_libro,
             usuario_id=usuario_id,
             fecha_prestamo=fecha_prestamo.isoformat(),
             fecha_entrega=fecha_entrega.isoformat()
         )
         
+        if respuesta_transaccion['estado'] == 'RECHAZADO':
+            # Sin ejemplar al momento de la transacción
+            print(f"[Actor-{self.tipo}-Sede{self.sede}] ✗ Sin ejemplares disponibles (0/{totales})")
+            self.operaciones_fallidas += 1
+            return {
+                'estado': 'RECHAZADO',
+                'mensaje': f'No hay ejemplares disponibles. Total: {totales}, Disponibles: 0',
+                'codigo_libro': codigo_libro,
+                'nombre_libro': nombre,
+                'timestamp': datetime.now().isoformat()
+            }
+        
         if respuesta_transaccion['estado'] != 'OK':
             print(f"[Actor-{self.tipo}-Sede{self.sede}] ✗ Error en transacción: {respuesta_transaccion['mensaje']}")
             self.operaciones_fallidas += 1
@@ -298,21 +470,144 @@ class Actor:
             'timestamp': datetime.now().isoformat()
         }
     
+    def procesar_busqueda(self, mensaje):
+        """
+        Busca en el catálogo con el índice en memoria del GA (solo lectura)
+        
+        Returns:
+            dict: Página de resultados
+        """
+        consulta = mensaje.get('consulta', '')
+        print(f"\n[Actor-{self.tipo}-Sede{self.sede}] Procesando búsqueda: {consulta!r}")
+        
+        respuesta = self.solicitar_ga(
+            'BUSQUEDA',
+            mensaje=mensaje,
+            consulta=consulta,
+            pagina=mensaje.get('pagina', 1),
+            por_pagina=mensaje.get('por_pagina')
+        )
+        
+        if respuesta['estado'] != 'OK':
+            print(f"[Actor-{self.tipo}-Sede{self.sede}] ✗ Error en búsqueda: {respuesta['mensaje']}")
+            self.operaciones_fallidas += 1
+            return {
+                'estado': 'ERROR',
+                'mensaje': respuesta['mensaje'],
+                'timestamp': datetime.now().isoformat()
+            }
+        
+        print(f"[Actor-{self.tipo}-Sede{self.sede}] ✓ {respuesta['total']} libros "
+              f"({len(respuesta['resultados'])} en la página {respuesta['pagina']})")
+        self.operaciones_exitosas += 1
+        return {
+            'estado': 'OK',
+            'mensaje': 'Búsqueda completada',
+            'total': respuesta['total'],
+            'total_exacto': respuesta['total_exacto'],
+            'pagina': respuesta['pagina'],
+            'por_pagina': respuesta['por_pagina'],
+            'resultados': respuesta['resultados'],
+            'timestamp': datetime.now().isoformat()
+        }
+    
+    def procesar_consulta_usuario(self, mensaje):
+        """
+        Préstamos abiertos de un usuario (modelo de lectura del GA)
+        
+        Returns:
+            dict: Préstamos con fecha de entrega y renovaciones
+        """
+        usuario_id = mensaje['usuario_id']
+        print(f"\n[Actor-{self.tipo}-Sede{self.sede}] Procesando consulta de préstamos de {usuario_id}")
+        
+        respuesta = self.solicitar_ga('CONSULTA_USUARIO', mensaje=mensaje, usuario_id=usuario_id)
+        
+        if respuesta['estado'] != 'OK':
+            print(f"[Actor-{self.tipo}-Sede{self.sede}] ✗ Error en consulta: {respuesta['mensaje']}")
+            self.operaciones_fallidas += 1
+            return {
+                'estado': 'ERROR',
+                'mensaje': respuesta['mensaje'],
+                'timestamp': datetime.now().isoformat()
+            }
+        
+        print(f"[Actor-{self.tipo}-Sede{self.sede}] ✓ {respuesta['total']} préstamos abiertos "
+              f"(desde {respuesta['origen']})")
+        self.operaciones_exitosas += 1
+        return {
+            'estado': 'OK',
+            'mensaje': 'Consulta completada',
+            'usuario_id': usuario_id,
+            'total': respuesta['total'],
+            'prestamos': respuesta['prestamos'],
+            'timestamp': datetime.now().isoformat()
+        }
+    
+    def procesar_resumen(self, mensaje):
+        """
+        Resumen operacional de la sede (agregados en memoria del GA)
+        
+        Returns:
+            dict: Libros, préstamos por estado y operaciones por hora
+        """
+        print(f"\n[Actor-{self.tipo}-Sede{self.sede}] Procesando resumen operacional")
+        
+        respuesta = self.solicitar_ga('RESUMEN', mensaje=mensaje)
+        
+        if respuesta['estado'] != 'OK':
+            print(f"[Actor-{self.tipo}-Sede{self.sede}] ✗ Error en resumen: {respuesta['mensaje']}")
+            self.operaciones_fallidas += 1
+            return {
+                'estado': 'ERROR',
+                'mensaje': respuesta['mensaje'],
+                'timestamp': datetime.now().isoformat()
+            }
+        
+        print(f"[Actor-{self.tipo}-Sede{self.sede}] ✓ Resumen calculado {respuesta['calculado']}")
+        self.operaciones_exitosas += 1
+        return {
+            'estado': 'OK',
+            'mensaje': 'Resumen completado',
+            'sede': respuesta['sede'],
+            'calculado': respuesta['calculado'],
+            'libros': respuesta['libros'],
+            'prestamos': respuesta['prestamos'],
+            'operaciones_por_hora': respuesta['operaciones_por_hora'],
+            'timestamp': datetime.now().isoformat()
+        }
+    
+    def procesar_consulta(self, mensaje):
+        """Actor de consultas: atiende cada operación de solo lectura según el mensaje"""
+        operacion = mensaje.get('operacion')
+        if operacion == 'BUSQUEDA':
+            return self.procesar_busqueda(mensaje)
+        if operacion == 'CONSULTA_USUARIO':
+            return self.procesar_consulta_usuario(mensaje)
+        if operacion == 'RESUMEN':
+            return self.procesar_resumen(mensaje)
+        return {
+            'estado': 'ERROR',
+            'mensaje': f'Consulta desconocida: {operacion}',
+            'timestamp': datetime.now().isoformat()
+        }
+    
     def ejecutar(self):
         """
         Loop principal del Actor (todos son síncronos ahora)
         """
         print(f"\n[Actor-{self.tipo}-Sede{self.sede}] ¡Esperando solicitudes (REQ/REP)!\n")
         
+        self.perfilador.registrar_hilo()
+        
         try:
             while True:
                 # Esperar solicitud del GC (bloqueante)
+                self.perfilador.punto_de_control()
+                if not self.socket.poll(INTERVALO_LOOP_MS):
+                    continue
                 mensaje_str = self.socket.recv_string()
-                
-                self.contador_operaciones += 1
-                
-                print(f"\n{'='*70}")
-                print(f"[Actor-{self.tipo}-Sede{self.sede}] Solicitud #{self.contador_operaciones} recibida")
+                inicio = trazas.ahora()
                 
                 # Parsear mensaje
                 try:
@@ -326,46 +621,94 @@ class Actor:
                     self.socket.send_string(json.dumps(respuesta))
                     continue
                 
+                # Chequeo de salud del GC: no cuenta como operación
+                if mensaje.get('operacion') == 'PING':
+                    self.socket.send_string(json.dumps({
+                        'estado': 'OK',
+                        'tipo': self.tipo,
+                        'circuito': self.circuito_ga.estado
+                    }))
+                    continue
+                
+                self.contador_operaciones += 1
+                
+                print(f"\n{'='*70}")
+                print(f"[Actor-{self.tipo}-Sede{self.sede}] Solicitud #{self.contador_operaciones} recibida")
+                
                 # Procesar según tipo de actor
                 tiempo_inicio = time.time()
+                self.metricas.sumar('solicitudes_en_curso', 1)
+                self.falla_ga = False
+                self.mutacion_incierta = False
                 
-                if self.tipo == 'DEVOLUCION':
-                    respuesta = self.procesar_devolucion(mensaje)
-                elif self.tipo == 'RENOVACION':
-                    respuesta = self.procesar_renovacion(mensaje)
-                elif self.tipo == 'PRESTAMO':
-                    respuesta = self.procesar_prestamo(mensaje)
-                else:
+                try:
+                    if self.tipo == 'DEVOLUCION':
+                        respuesta = self.procesar_devolucion(mensaje)
+                    elif self.tipo == 'RENOVACION':
+                        respuesta = self.procesar_renovacion(mensaje)
+                    elif self.tipo == 'PRESTAMO':
+                        respuesta = self.procesar_prestamo(mensaje)
+                    elif self.tipo == 'CONSULTA':
+                        respuesta = self.procesar_consulta(mensaje)
+                    else:
+                        respuesta = {
+                            'estado': 'ERROR',
+                            'mensaje': f'Tipo de actor desconocido: {self.tipo}',
+                            'timestamp': datetime.now().isoformat()
+                        }
+                except plazos.PlazoVencido as e:
+                    # Vencido antes de tocar la BD: respuesta rápida, sin más trabajo
+                    print(f"[Actor-{self.tipo}-Sede{self.sede}] ✗ {e}")
                     respuesta = {
-                        'estado': 'ERROR',
-                        'mensaje': f'Tipo de actor desconocido: {self.tipo}',
+                        'estado': 'EXPIRADO',
+                        'mensaje': str(e),
                         'timestamp': datetime.now().isoformat()
                     }
                 
+                # El GC redirige a la otra sede solo si la mutación seguro no se aplicó aquí
+                if self.falla_ga and respuesta['estado'] != 'OK':
+                    respuesta['falla_bd'] = True
+                    if not self.mutacion_incierta:
+                        respuesta['no_aplicada'] = True
+                
                 tiempo_proceso = (time.time() - tiempo_inicio) * 1000
+                trazas.cerrar_salto(mensaje, respuesta, f"Actor-{self.tipo}", inicio)
                 
                 # Enviar respuesta al GC
                 self.socket.send_string(json.dumps(respuesta))
+                self.metricas.sumar('solicitudes_en_curso', -1)
+                self.metricas.incrementar('operaciones_total', estado=respuesta['estado'])
+                self.metricas.observar('latencia_segundos', tiempo_proceso / 1000)
                 
                 print(f"[Actor-{self.tipo}-Sede{self.sede}] → Respuesta enviada ({tiempo_proceso:.2f}ms)")
                 print(f"{'='*70}")
         
         except KeyboardInterrupt:
             print(f"\n[Actor-{self.tipo}-Sede{self.sede}] Interrumpido por el usuario")
+        except zmq.ContextTerminated:
+            # Modo embebido: el contexto compartido se terminó para detener el sistema
+            print(f"\n[Actor-{self.tipo}-Sede{self.sede}] Contexto terminado, deteniendo")
         finally:
             self.cerrar()
     
     def cerrar(self):
         """Cierra la conexión ZeroMQ y muestra estadísticas"""
+        if self.control:
+            self.control.detener()
         self.socket.close()
-        self.socket_ga.close()
-        self.context.term()
+        self.cliente_ga.cerrar()
+        if self.contexto_propio:
+            self.context.term()
         
         print(f"\n{'='*70}")
         print(f"[Actor-{self.tipo}-Sede{self.sede}] Estadísticas Finales:")
         print(f"  Total operaciones: {self.contador_operaciones}")
         print(f"  Exitosas: {self.operaciones_exitosas}")
         print(f"  Fallidas: {self.operaciones_fallidas}")
+        print(f"  Descartadas por plazo vencido: {self.descartadas_plazo}")
+        circuito = self.circuito_ga.resumen()
+        print(f"  Circuito GA: {circuito['circuito']} ({circuito['aperturas']} aperturas, "
+              f"{circuito['rechazadas']} rechazadas)")
         if self.contador_operaciones > 0:
             tasa = (self.operaciones_exitosas / self.contador_operaciones) * 100
             print(f"  Tasa de éxito: {tasa:.1f}%")
@@ -373,25 +716,52 @@ class Actor:
 
 
 def main():
-    if len(sys.argv) < 4:
-        print("Uso: python actor.py <tipo> <sede> <puerto_rep> [ga_host] [ga_port]")
-        print("\nTipo: DEVOLUCION, RENOVACION o PRESTAMO")
-        print("\nEjemplos:")
-        print("  # Actor Devolución (síncrono - REP)")
-        print("  python actor.py DEVOLUCION 1 5556 localhost 5560")
-        print("\n  # Actor Renovación (síncrono - REP)")
-        print("  python actor.py RENOVACION 1 5557 localhost 5560")
-        print("\n  # Actor Préstamo (síncrono - REP)")
-        print("  python actor.py PRESTAMO 1 5559 localhost 5560")
-        sys.exit(1)
+    parser = argparse.ArgumentParser(
+        description="Actor de una sede (DEVOLUCION, RENOVACION, PRESTAMO o CONSULTA)",
+        epilog="Ejemplos:\n"
+               "  # Actor Devolución (síncrono - REP)\n"
+               "  python actor.py DEVOLUCION 1 5556 localhost 5560\n"
+               "  # Actor Renovación (síncrono - REP)\n"
+               "  python actor.py RENOVACION 1 5557 localhost 5560\n"
+               "  # Actor Préstamo (síncrono - REP) con métricas en el puerto 9204\n"
+               "  python actor.py PRESTAMO 1 5559 localhost 5560 --metricas 9204 --control 7104\n"
+               "  # Actor Consulta (búsquedas en el catálogo)\n"
+               "  python actor.py CONSULTA 1 5558 localhost 5560",
+        formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument("tipo", help="DEVOLUCION, RENOVACION, PRESTAMO o CONSULTA")
+    parser.add_argument("sede", type=int, help="Sede (1 o 2)")
+    parser.add_argument("puerto_rep", type=int, help="Puerto REP para el GC")
+    parser.add_argument("ga_host", nargs="?", default="localhost", help="Host del GA")
+    parser.add_argument("ga_port", nargs="?", type=int, default=None,
+                        help="Puerto del GA (defecto 5560 en sede 1, 5561 en sede 2)")
+    parser.add_argument("--metricas", type=int, default=None, help="Puerto HTTP de métricas")
+    parser.add_argument("--control", type=int, default=None,
+                        help="Puerto del socket de control (perfilado bajo demanda, STATS)")
+    parser.add_argument("--ga-respaldo", nargs="*", default=[], metavar="HOST:PUERTO",
+                        help="GAs alternativos para las consultas, en orden; las mutaciones solo "
+                             "se reintentan en el GA principal")
+    parser.add_argument("--timeout-ga", type=int, default=TIMEOUT_DEFECTO_MS,
+                        help="Espera máxima (ms) por intento en cada solicitud al GA")
+    parser.add_argument("--reintentos", type=int, default=REINTENTOS_DEFECTO,
+                        help="Reenvíos al GA si no responde")
+    parser.add_argument("--umbral-circuito", type=int, default=UMBRAL_DEFECTO,
+                        help="Fallos consecutivos del GA que abren el circuito")
+    parser.add_argument("--enfriamiento", type=float, default=ENFRIAMIENTO_DEFECTO_S,
+                        help="Segundos con el circuito abierto antes de probar de nuevo el GA")
+    parser.add_argument("--catalogo", default=None, metavar="ARCHIVO",
+                        help="Catálogo compartido que publica el GA en este host (gestor_almacenamiento.py --catalogo)")
+    args = parser.parse_args()
     
-    tipo = sys.argv[1]
-    sede = int(sys.argv[2])
-    puerto_rep = int(sys.argv[3])
-    ga_host = sys.argv[4] if len(sys.argv) > 4 else "localhost"
-    ga_port = int(sys.argv[5]) if len(sys.argv) > 5 else (5560 if sede == 1 else 5561)
+    sede = args.sede
+    ga_port = args.ga_port or (5560 if sede == 1 else 5561)
     
-    actor = Actor(tipo, sede, puerto_rep, ga_host, ga_port)
+    actor = Actor(args.tipo, sede, args.puerto_rep, args.ga_host, ga_port,
+                  metricas_puerto=args.metricas, control_puerto=args.control,
+                  ga_respaldos=[f"tcp://{destino}" for destino in args.ga_respaldo],
+                  timeout_ga_ms=args.timeout_ga, reintentos_ga=args.reintentos,
+                  umbral_circuito=args.umbral_circuito, enfriamiento_circuito_s=args.enfriamiento,
+                  catalogo=args.catalogo)
     actor.ejecutar()
 
 
@@ -0,0 +1,186 @@
+"""
+Control de admisión del Gestor de Carga
+Un carril por tipo de operación con cola acotada y límites por concurrencia
+y/o por tasa. Cuando un límite se alcanza la petición se rechaza de inmediato
+con OCUPADO y una pista de reintento ('reintentar_en_ms'), en lugar de
+acumularse sin límite en los buffers de ZeroMQ:
+
+- concurrencia: peticiones del carril atendidas a la vez por los trabajadores
+- profundidad:  peticiones que pueden esperar en la cola del carril
+- tasa:         peticiones admitidas por segundo (cubeta de fichas, ráfaga de 1 s)
+
+Entre carriles, el Planificador reparte la capacidad de trabajadores del GC
+con cola justa ponderada (start-time fair queuing): cada despacho avanza el
+tiempo virtual del carril en servicio_estimado / peso, así un carril caro
+(PRESTAMO) consume su parte en tiempo de trabajador y no en cantidad de
+peticiones. Además cada carril puede reservar una fracción mínima de la
+capacidad que los demás no pueden ocupar.
+
+Carriles y planificador solo los usa el hilo principal del GC, así que no
+llevan locks.
+"""
+import collections
+import math
+import time
+
+CONCURRENCIA_DEFECTO = 2
+PROFUNDIDAD_DEFECTO = 64
+PESO_DEFECTO = 1.0
+MINIMO_DEFECTO = 0.0
+
+# Servicio supuesto (s) mientras un carril no tiene mediciones propias
+SERVICIO_INICIAL = 0.01
+# Peso de la última medición en el promedio móvil del tiempo de servicio
+ALFA_SERVICIO = 0.2
+
+
+class Carril:
+    def __init__(self, operacion, concurrencia=CONCURRENCIA_DEFECTO,
+                 profundidad=PROFUNDIDAD_DEFECTO, tasa=None,
+                 peso=PESO_DEFECTO, minimo=MINIMO_DEFECTO):
+        """
+        Args:
+            operacion: Operación que atiende el carril (DEVOLUCION, RENOVACION, PRESTAMO)
+            concurrencia: Máximo de peticiones en curso a la vez
+            profundidad: Máximo de peticiones esperando en cola
+            tasa: Máximo de peticiones admitidas por segundo; None sin límite
+            peso: Peso en el reparto justo entre carriles
+            minimo: Fracción de la capacidad del GC reservada al carril (0-1)
+        """
+        self.operacion = operacion
+        self.concurrencia = max(1, int(concurrencia))
+        self.profundidad = max(0, int(profundidad))
+        self.tasa = float(tasa) if tasa else None
+        self.peso = float(peso)
+        if self.peso <= 0:
+            raise ValueError(f"El peso del carril {operacion} debe ser positivo")
+        self.minimo = min(1.0, max(0.0, float(minimo)))
+        # Lugares reservados y etiqueta de fin virtual: los fija el Planificador
+        self.reservado = 0
+        self.fin_virtual = 0.0
+
+        self.cola = collections.deque()
+        self.en_curso = 0
+        self.servicio = SERVICIO_INICIAL
+
+        # Cubeta de fichas: capacidad de un segundo de tasa (al menos 1)
+        self.capacidad_fichas = max(1.0, self.tasa or 0.0)
+        self.fichas = self.capacidad_fichas
+        self.ultima_recarga = time.monotonic()
+
+    def recargar(self):
+        ahora = time.monotonic()
+        self.fichas = min(self.capacidad_fichas,
+                          self.fichas + (ahora - self.ultima_recarga) * self.tasa)
+        self.ultima_recarga = ahora
+
+    def admitir(self, trabajo):
+        """
+        Encola el trabajo si los límites lo permiten
+
+        Returns:
+            None si se admitió; (motivo, reintentar_en_ms) si se rechaza
+        """
+        if self.tasa:
+            self.recargar()
+            if self.fichas < 1.0:
+                return 'tasa', max(1, math.ceil((1.0 - self.fichas) / self.tasa * 1000))
+
+        # Los lugares libres de concurrencia no cuentan como espera en cola
+        libres = max(0, self.concurrencia - self.en_curso)
+        if len(self.cola) >= self.profundidad + libres:
+            return 'cola', self.espera_estimada_ms()
+
+        if self.tasa:
+            self.fichas -= 1.0
+        self.cola.append(trabajo)
+        return None
+
+    def espera_estimada_ms(self):
+        """Tiempo estimado para vaciar la cola con la concurrencia configurada"""
+        tandas = (len(self.cola) + 1) / self.concurrencia
+        return max(1, math.ceil(tandas * self.servicio * 1000))
+
+    def puede_despachar(self):
+        return bool(self.cola) and self.en_curso < self.concurrencia
+
+    def tomar(self):
+        """Saca el siguiente trabajo de la cola y lo cuenta como en curso"""
+        self.en_curso += 1
+        return self.cola.popleft()
+
+    def terminar(self, duracion):
+        """Libera un lugar de concurrencia y actualiza el tiempo de servicio"""
+        self.en_curso -= 1
+        self.servicio += ALFA_SERVICIO * (duracion - self.servicio)
+
+
+class Planificador:
+    def __init__(self, carriles, capacidad=None):
+        """
+        Args:
+            carriles: dict {operación: Carril}
+            capacidad: Trabajadores del GC; None usa la suma de las concurrencias
+        """
+        self.carriles = list(carriles.values())
+        self.capacidad = int(capacidad or sum(c.concurrencia for c in self.carriles))
+        self.tiempo_virtual = 0.0
+
+        for carril in self.carriles:
+            carril.reservado = min(carril.concurrencia, math.ceil(carril.minimo * self.capacidad))
+        if sum(c.reservado for c in self.carriles) > self.capacidad:
+            raise ValueError(f"Las reservas mínimas suman más que la capacidad ({self.capacidad})")
+
+    def en_curso(self):
+        return sum(c.en_curso for c in self.carriles)
+
+    def siguiente(self):
+        """
+        Carril cuyo próximo trabajo se debe despachar, o None si no hay
+        capacidad libre o ningún carril con trabajo puede usarla
+        """
+        libres = self.capacidad - self.en_curso()
+        if libres <= 0:
+            return None
+
+        elegido = None
+        for carril in self.carriles:
+            if not carril.puede_despachar():
+                continue
+            # Lugares reservados por otros carriles que aún no los usan
+            reservas_ajenas = sum(max(0, otro.reservado - otro.en_curso)
+                                  for otro in self.carriles if otro is not carril)
+            if carril.en_curso >= carril.reservado and libres <= reservas_ajenas:
+                continue
+            if elegido is None or self.inicio_virtual(carril) < self.inicio_virtual(elegido):
+                elegido = carril
+        return elegido
+
+    def inicio_virtual(self, carril):
+        # Un carril que estuvo inactivo no acumula crédito: arranca en el tiempo virtual actual
+        return max(carril.fin_virtual, self.tiempo_virtual)
+
+    def tomar(self, carril):
+        """Saca el siguiente trabajo del carril y avanza su tiempo virtual"""
+        inicio = self.inicio_virtual(carril)
+        carril.fin_virtual = inicio + carril.servicio / carril.peso
+        self.tiempo_virtual = inicio
+        return carril.tomar()
+
+
+def parsear_por_operacion(pares, conversion=int):
+    """
+    Convierte ["PRESTAMO=4", "DEVOLUCION=2"] en {'PRESTAMO': 4, 'DEVOLUCION': 2}
+
+    Un valor sin operación ("4") se aplica como '*' (todas las operaciones).
+    """
+    valores = {}
+    for par in pares or []:
+        operacion, _, valor = par.rpartition('=')
+        valores[operacion.upper() or '*'] = conversion(valor)
+    return valores
+
+
+def valor_para(valores, operacion, defecto):
+    """Valor configurado para la operación, el general ('*') o el defecto"""
+    return valores.get(operacion, valores.get('*', defecto))
@@ -0,0 +1,148 @@
+"""
+Analizador de trazas
+Lee el archivo JSONL de trazas que escribe el Proceso Solicitante (--trazas)
+y construye tablas de percentiles por salto:
+
+- espera:   inicio - encolado  (red + cola ZeroMQ antes de ser atendido)
+- servicio: fin - inicio       (tiempo total dentro del componente)
+- propio:   servicio menos la espera+servicio de sus saltos hijos
+            (PS → GC → Actor → GA; en el GA, servicio menos proceso)
+- proceso:  tiempo resolviendo la operación (solo GA): MySQL, el diario
+            o los índices en memoria, sin parseo ni serialización
+- sql:      parte de proceso esperando a MySQL (solo GA): execute(), lectura
+            de filas y commit()
+"""
+import argparse
+import json
+import sys
+
+from trazas import percentil
+
+# Jerarquía de saltos: cada nivel llama a los del siguiente
+NIVELES = ['PS', 'GC', 'Actor', 'GA']
+PERCENTILES = [50, 90, 99]
+METRICAS = ['espera', 'servicio', 'propio', 'proceso', 'sql']
+
+
+def nivel(salto):
+    """Nivel jerárquico de un salto según el nombre de su componente"""
+    return NIVELES.index(salto['componente'].split('-')[0])
+
+
+def desglosar(traza):
+    """
+    Calcula las métricas (ms) de cada salto de una traza
+
+    Returns:
+        list: (nombre_salto, {métrica: valor_ms}) por salto
+    """
+    saltos = traza.get('saltos', [])
+    costo_por_nivel = {}
+    for salto in saltos:
+        costo = salto['fin'] - salto['encolado']
+        costo_por_nivel[nivel(salto)] = costo_por_nivel.get(nivel(salto), 0.0) + costo
+
+    resultado = []
+    for salto in saltos:
+        servicio = (salto['fin'] - salto['inicio']) * 1000
+        metricas = {
+            'espera': (salto['inicio'] - salto['encolado']) * 1000,
+            'servicio': servicio
+        }
+
+        if 'proceso_ms' in salto:
+            metricas['proceso'] = salto['proceso_ms']
+            metricas['propio'] = servicio - salto['proceso_ms']
+            if 'sql_ms' in salto:
+                metricas['sql'] = salto['sql_ms']
+        else:
+            hijos = costo_por_nivel.get(nivel(salto) + 1)
+            if hijos is not None:
+                metricas['propio'] = servicio - hijos * 1000
+
+        nombre = salto['componente']
+        if salto.get('operacion') and nombre == 'GA':
+            nombre = f"GA:{salto['operacion']}"
+        resultado.append((nombre, metricas))
+
+    return resultado
+
+
+def agregar(archivo, por_operacion=False):
+    """
+    Agrupa las métricas de todas las trazas por salto
+
+    Returns:
+        dict: {grupo: {salto: {métrica: [valores]}}}
+    """
+    grupos = {}
+    with open(archivo, 'r', encoding='utf-8') as f:
+        for linea in f:
+            linea = linea.strip()
+            if not linea:
+                continue
+            traza = json.loads(linea)
+            grupo = traza.get('operacion', '?') if por_operacion else 'TODAS'
+
+            for nombre, metricas in desglosar(traza):
+                destino = grupos.setdefault(grupo, {}).setdefault(nombre, {})
+                for metrica, valor in metricas.items():
+                    destino.setdefault(metrica, []).append(valor)
+
+    return grupos
+
+
+def orden_salto(nombre):
+    """Ordena los saltos según la jerarquía y luego por nombre"""
+    return (NIVELES.index(nombre.split('-')[0].split(':')[0]), nombre)
+
+
+def imprimir_tablas(grupos):
+    """Imprime una tabla de percentiles por grupo"""
+    columnas = [f"p{p}" for p in PERCENTILES] + ['max']
+
+    for grupo, saltos in sorted(grupos.items()):
+        print("=" * 96)
+        print(f"OPERACIÓN: {grupo}")
+        print("=" * 96)
+        print(f"{'Salto':<26}{'Métrica':<10}{'n':>8}" + "".join(f"{c + ' ms':>13}" for c in columnas))
+        print("-" * 96)
+
+        for nombre in sorted(saltos, key=orden_salto):
+            for metrica in METRICAS:
+                valores = sorted(saltos[nombre].get(metrica, []))
+                if not valores:
+                    continue
+                celdas = [percentil(valores, p) for p in PERCENTILES] + [valores[-1]]
+                print(f"{nombre:<26}{metrica:<10}{len(valores):>8}" +
+                      "".join(f"{c:>13.3f}" for c in celdas))
+            print()
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Tablas de percentiles por salto a partir de las trazas del PS",
+        epilog="Ejemplo:\n"
+               "  python analizar_trazas.py trazas.jsonl --por-operacion",
+        formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument("archivo", help="Archivo JSONL de trazas")
+    parser.add_argument("--por-operacion", action="store_true",
+                        help="Una tabla por operación (PRESTAMO, DEVOLUCION, ...)")
+    args = parser.parse_args()
+
+    try:
+        grupos = agregar(args.archivo, args.por_operacion)
+    except FileNotFoundError:
+        print(f"Archivo no encontrado: {args.archivo}")
+        sys.exit(1)
+
+    if not grupos:
+        print("⚠️ El archivo no contiene trazas")
+        return
+
+    imprimir_tablas(grupos)
+
+
+if __name__ == "__main__":
+    main()
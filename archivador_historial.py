@@ -0,0 +1,464 @@
+"""
+Archivo del historial de operaciones
+historial_operaciones está particionada por mes (RANGE COLUMNS sobre fecha,
+ver la migración 3): cada inserción toca solo la partición del mes en curso,
+con índices del tamaño de un mes, y retirar un mes completo es un DROP
+PARTITION en lugar de un DELETE de millones de filas.
+
+El archivador mantiene ese esquema en el tiempo:
+
+- asegurar:  crea por adelantado las particiones de los próximos meses
+             (la partición pfuturo, MAXVALUE, queda siempre vacía)
+- archivar:  cada mes más antiguo que la retención se intercambia (EXCHANGE
+             PARTITION) con una tabla de paso, se exporta a
+             <directorio>/sede<N>/historial_AAAAMM.jsonl.gz, se verifica el
+             número de filas y recién entonces se elimina la partición
+- compactar: los meses archivados de un año cerrado se reúnen en
+             historial_AAAA.jsonl.gz
+
+consultar() lee un rango de fechas combinando los archivos y la tabla viva.
+
+    python archivador_historial.py particiones
+    python archivador_historial.py archivar --retencion 12
+    python archivador_historial.py consultar --desde 2025-01-01 --hasta 2025-04-01 --libro LIB00042
+"""
+import mysql.connector
+from generar_datos_inic import GeneradorDatos
+from datetime import date, datetime, time
+import argparse
+import threading
+import gzip
+import json
+import glob
+import os
+import re
+import sys
+
+TABLA = 'historial_operaciones'
+# Tabla de paso del intercambio; si existe al arrancar, quedó un archivado a medias
+TABLA_PASO = 'historial_archivando'
+PARTICION_FUTURO = 'pfuturo'
+
+COLUMNAS = ('id', 'codigo_libro', 'usuario_id', 'operacion', 'fecha', 'sede', 'datos_adicionales')
+
+DIRECTORIO_DEFECTO = 'archivo_historial'
+RETENCION_MESES_DEFECTO = 12
+MESES_ADELANTE_DEFECTO = 3
+INTERVALO_DEFECTO_S = 6 * 3600
+LOTE_EXPORTACION = 10000
+
+RE_ARCHIVO = re.compile(r"historial_(\d{4})(\d{2})?\.jsonl\.gz$")
+
+
+def inicio_mes(fecha):
+    return date(fecha.year, fecha.month, 1)
+
+
+def sumar_meses(mes, meses):
+    indice = mes.year * 12 + mes.month - 1 + meses
+    return date(indice // 12, indice % 12 + 1, 1)
+
+
+def nombre_particion(mes):
+    return f"p{mes:%Y%m}"
+
+
+def sincronizar(ruta):
+    """Fuerza a disco un archivo ya cerrado (antes de renombrarlo o borrar su origen)"""
+    with open(ruta, 'rb') as archivo:
+        os.fsync(archivo.fileno())
+
+
+def definicion_particiones(desde, hasta):
+    """Cláusulas PARTITION de los meses [desde, hasta] seguidas de pfuturo"""
+    particiones = []
+    mes = desde
+    while mes <= hasta:
+        particiones.append(f"PARTITION {nombre_particion(mes)} VALUES LESS THAN ('{sumar_meses(mes, 1)}')")
+        mes = sumar_meses(mes, 1)
+    particiones.append(f"PARTITION {PARTICION_FUTURO} VALUES LESS THAN (MAXVALUE)")
+    return ",\n    ".join(particiones)
+
+
+def particiones(cursor, tabla=TABLA):
+    """
+    Particiones de la tabla en orden
+
+    Returns:
+        list: [(nombre, mes, filas_estimadas)] con mes=None para pfuturo; vacía si no está particionada
+    """
+    cursor.execute("""
+        SELECT PARTITION_NAME, TABLE_ROWS FROM information_schema.PARTITIONS
+        WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = %s AND PARTITION_NAME IS NOT NULL
+        ORDER BY PARTITION_ORDINAL_POSITION
+    """, (tabla,))
+    resultado = []
+    for nombre, filas in cursor.fetchall():
+        mes = None if nombre == PARTICION_FUTURO else datetime.strptime(nombre[1:], "%Y%m").date()
+        resultado.append((nombre, mes, filas))
+    return resultado
+
+
+def particionar(cursor, tabla=TABLA, meses_adelante=MESES_ADELANTE_DEFECTO):
+    """
+    Particiona la tabla por mes desde su fila más antigua (migración 3)
+
+    La clave de partición debe estar en todas las claves únicas: la clave
+    primaria pasa a ser (id, fecha). Copia la tabla una vez.
+
+    Returns:
+        str: Descripción de lo realizado
+    """
+    if particiones(cursor, tabla):
+        return f"{tabla} ya está particionada"
+    cursor.execute(f"SELECT MIN(fecha) FROM {tabla}")
+    minima = cursor.fetchone()[0]
+    actual = inicio_mes(date.today())
+    desde = inicio_mes(minima) if minima else actual
+    hasta = sumar_meses(actual, meses_adelante)
+    cursor.execute(f"""
+        ALTER TABLE {tabla} DROP PRIMARY KEY, ADD PRIMARY KEY (id, fecha)
+        PARTITION BY RANGE COLUMNS(fecha) (
+            {definicion_particiones(desde, hasta)}
+        )
+    """)
+    return f"{tabla} particionada por mes ({nombre_particion(desde)} .. {nombre_particion(hasta)} + {PARTICION_FUTURO})"
+
+
+def quitar_particiones(cursor, tabla=TABLA):
+    """Deshace particionar(): vuelve a una sola tabla con clave primaria (id)"""
+    if not particiones(cursor, tabla):
+        return f"{tabla} no está particionada"
+    cursor.execute(f"ALTER TABLE {tabla} REMOVE PARTITIONING")
+    cursor.execute(f"ALTER TABLE {tabla} DROP PRIMARY KEY, ADD PRIMARY KEY (id)")
+    return f"{tabla} sin particiones"
+
+
+class ArchivadorHistorial:
+    def __init__(self, sede, conectar, directorio=DIRECTORIO_DEFECTO,
+                 retencion_meses=RETENCION_MESES_DEFECTO, meses_adelante=MESES_ADELANTE_DEFECTO,
+                 metricas=None):
+        """
+        Args:
+            sede: Sede cuya BD se archiva
+            conectar: Función sin argumentos que devuelve una conexión a la BD de la sede
+            directorio: Carpeta raíz de los archivos (se usa <directorio>/sede<N>)
+            retencion_meses: Meses completos que se conservan en la BD además del actual; 0 no archiva
+            meses_adelante: Meses futuros con partición ya creada
+            metricas: Registro Metricas donde contar particiones y filas archivadas (opcional)
+        """
+        self.sede = sede
+        self.conectar = conectar
+        self.directorio = os.path.join(directorio, f"sede{sede}")
+        self.retencion_meses = retencion_meses
+        self.meses_adelante = meses_adelante
+        self.metricas = metricas
+        self.detenido = threading.Event()
+
+    def ruta(self, etiqueta):
+        return os.path.join(self.directorio, f"historial_{etiqueta}.jsonl.gz")
+
+    def asegurar(self, cursor):
+        """Divide pfuturo para que existan las particiones de los próximos meses"""
+        actuales = particiones(cursor)
+        meses = [mes for _, mes, _ in actuales if mes]
+        if not meses:
+            return 0
+        objetivo = sumar_meses(inicio_mes(date.today()), self.meses_adelante)
+        if meses[-1] >= objetivo:
+            return 0
+        cursor.execute(f"""
+            ALTER TABLE {TABLA} REORGANIZE PARTITION {PARTICION_FUTURO} INTO (
+                {definicion_particiones(sumar_meses(meses[-1], 1), objetivo)}
+            )
+        """)
+        nuevas = (objetivo.year - meses[-1].year) * 12 + objetivo.month - meses[-1].month
+        print(f"[Archivo-Sede{self.sede}] ✓ {nuevas} particiones nuevas hasta {nombre_particion(objetivo)}")
+        return nuevas
+
+    def exportar(self, conexion, etiqueta):
+        """
+        Copia la tabla de paso a un archivo gzip (escritura atómica) y verifica las filas
+
+        Returns:
+            int: Filas exportadas
+        """
+        os.makedirs(self.directorio, exist_ok=True)
+        destino = self.ruta(etiqueta)
+        temporal = f"{destino}.tmp"
+        cursor = conexion.cursor()
+        exportadas = 0
+        ultimo_id = 0
+        with gzip.open(temporal, 'wt', encoding='utf-8') as archivo:
+            while True:
+                cursor.execute(
+                    f"SELECT {', '.join(COLUMNAS)} FROM {TABLA_PASO} WHERE id > %s ORDER BY id LIMIT %s",
+                    (ultimo_id, LOTE_EXPORTACION)
+                )
+                filas = cursor.fetchall()
+                if not filas:
+                    break
+                for fila in filas:
+                    registro = dict(zip(COLUMNAS, fila))
+                    registro['fecha'] = registro['fecha'].isoformat()
+                    archivo.write(json.dumps(registro, ensure_ascii=False) + "\n")
+                exportadas += len(filas)
+                ultimo_id = filas[-1][0]
+        sincronizar(temporal)
+        cursor.execute(f"SELECT COUNT(*) FROM {TABLA_PASO}")
+        esperadas = cursor.fetchone()[0]
+        cursor.close()
+        if exportadas != esperadas:
+            os.remove(temporal)
+            raise RuntimeError(f"Exportación incompleta de {etiqueta}: {exportadas} de {esperadas} filas")
+        os.replace(temporal, destino)
+        return exportadas
+
+    def recuperar(self, conexion):
+        """Termina un archivado interrumpido: exporta lo que haya quedado en la tabla de paso"""
+        cursor = conexion.cursor()
+        cursor.execute("SHOW TABLES LIKE %s", (TABLA_PASO,))
+        if cursor.fetchone() is None:
+            cursor.close()
+            return
+        cursor.execute(f"SELECT MIN(fecha) FROM {TABLA_PASO}")
+        minima = cursor.fetchone()[0]
+        if minima is not None:
+            etiqueta = f"{minima:%Y%m}"
+            filas = self.exportar(conexion, etiqueta)
+            print(f"[Archivo-Sede{self.sede}] ↺ Archivado interrumpido de {etiqueta} completado ({filas} filas)")
+        cursor.execute(f"DROP TABLE {TABLA_PASO}")
+        cursor.close()
+
+    def archivar_particion(self, conexion, nombre, mes):
+        """Saca un mes de la tabla viva y lo deja en su archivo comprimido"""
+        cursor = conexion.cursor()
+        cursor.execute(f"CREATE TABLE {TABLA_PASO} LIKE {TABLA}")
+        cursor.execute(f"ALTER TABLE {TABLA_PASO} REMOVE PARTITIONING")
+        # Intercambio atómico: desde aquí las filas del mes ya no están en la tabla viva
+        cursor.execute(f"ALTER TABLE {TABLA} EXCHANGE PARTITION {nombre} WITH TABLE {TABLA_PASO}")
+        cursor.execute(f"SELECT COUNT(*) FROM {TABLA_PASO}")
+        filas = cursor.fetchone()[0]
+        # Vacía si un archivado anterior se cortó antes del DROP PARTITION: el archivo ya existe
+        if filas:
+            self.exportar(conexion, f"{mes:%Y%m}")
+        cursor.execute(f"ALTER TABLE {TABLA} DROP PARTITION {nombre}")
+        cursor.execute(f"DROP TABLE {TABLA_PASO}")
+        cursor.close()
+        print(f"[Archivo-Sede{self.sede}] ✓ {nombre} archivada ({filas} filas) en {self.ruta(f'{mes:%Y%m}')}")
+        if self.metricas:
+            self.metricas.incrementar('historial_particiones_archivadas_total')
+            self.metricas.incrementar('historial_filas_archivadas_total', filas)
+        return filas
+
+    def limite(self):
+        """Primer mes que se conserva en la BD"""
+        return sumar_meses(inicio_mes(date.today()), -self.retencion_meses)
+
+    def archivar(self, conexion):
+        """
+        Archiva las particiones anteriores a la retención (nunca la última partición mensual)
+
+        Returns:
+            int: Particiones archivadas
+        """
+        if self.retencion_meses <= 0:
+            return 0
+        self.recuperar(conexion)
+        cursor = conexion.cursor()
+        mensuales = [(nombre, mes) for nombre, mes, _ in particiones(cursor) if mes]
+        cursor.close()
+        archivadas = 0
+        limite = self.limite()
+        for nombre, mes in mensuales[:-1]:
+            if mes >= limite:
+                break
+            self.archivar_particion(conexion, nombre, mes)
+            archivadas += 1
+        return archivadas
+
+    def compactar(self):
+        """
+        Reúne los archivos mensuales de cada año ya fuera de la retención en uno anual
+
+        Returns:
+            int: Años compactados
+        """
+        por_anio = {}
+        for ruta in glob.glob(os.path.join(self.directorio, "historial_??????.jsonl.gz")):
+            anio = int(RE_ARCHIVO.search(ruta).group(1))
+            por_anio.setdefault(anio, []).append(ruta)
+
+        compactados = 0
+        for anio, mensuales in sorted(por_anio.items()):
+            if date(anio + 1, 1, 1) > self.limite():
+                continue
+            destino = self.ruta(str(anio))
+            temporal = f"{destino}.tmp"
+            fuentes = ([destino] if os.path.exists(destino) else []) + sorted(mensuales)
+            with gzip.open(temporal, 'wt', encoding='utf-8') as salida:
+                for fuente in fuentes:
+                    with gzip.open(fuente, 'rt', encoding='utf-8') as entrada:
+                        for linea in entrada:
+                            salida.write(linea)
+            sincronizar(temporal)
+            os.replace(temporal, destino)
+            for ruta in mensuales:
+                os.remove(ruta)
+            compactados += 1
+            print(f"[Archivo-Sede{self.sede}] ✓ {len(mensuales)} meses de {anio} compactados en {destino}")
+        return compactados
+
+    def mantener(self):
+        """Una ronda completa: particiones futuras, archivado y compactación"""
+        conexion = self.conectar()
+        try:
+            cursor = conexion.cursor()
+            if not particiones(cursor):
+                print(f"[Archivo-Sede{self.sede}] ⚠ {TABLA} no está particionada "
+                      f"(aplicar migraciones.py migrar); no se archiva")
+                return
+            self.asegurar(cursor)
+            cursor.close()
+            self.archivar(conexion)
+        finally:
+            conexion.close()
+        self.compactar()
+
+    def iniciar(self, intervalo_s=INTERVALO_DEFECTO_S):
+        """Ejecuta mantener() ahora y cada intervalo_s en un hilo en segundo plano"""
+        def ciclo():
+            while True:
+                try:
+                    self.mantener()
+                except (mysql.connector.Error, OSError, RuntimeError) as e:
+                    print(f"[Archivo-Sede{self.sede}] ⚠ No se pudo archivar el historial: {e}")
+                if self.detenido.wait(intervalo_s):
+                    return
+        hilo = threading.Thread(target=ciclo, name=f"archivo-sede{self.sede}", daemon=True)
+        hilo.start()
+        return hilo
+
+    def detener(self):
+        self.detenido.set()
+
+    def archivos(self, desde, hasta):
+        """Archivos (anuales y mensuales) que pueden tener filas en [desde, hasta) (datetime)"""
+        rutas = []
+        for ruta in sorted(glob.glob(os.path.join(self.directorio, "historial_*.jsonl.gz"))):
+            coincidencia = RE_ARCHIVO.search(ruta)
+            if not coincidencia:
+                continue
+            anio = int(coincidencia.group(1))
+            if coincidencia.group(2):
+                inicio = date(anio, int(coincidencia.group(2)), 1)
+                fin = sumar_meses(inicio, 1)
+            else:
+                inicio, fin = date(anio, 1, 1), date(anio + 1, 1, 1)
+            if datetime.combine(inicio, time()) < hasta and datetime.combine(fin, time()) > desde:
+                rutas.append(ruta)
+        return rutas
+
+    def consultar(self, desde, hasta, codigo_libro=None, usuario_id=None, operacion=None):
+        """
+        Operaciones con fecha en [desde, hasta), primero las archivadas y luego las de la BD
+
+        Yields:
+            dict: Fila con las columnas de historial_operaciones (fecha como datetime)
+        """
+        if not isinstance(desde, datetime):
+            desde = datetime.combine(desde, time())
+        if not isinstance(hasta, datetime):
+            hasta = datetime.combine(hasta, time())
+        filtros = {'codigo_libro': codigo_libro, 'usuario_id': usuario_id, 'operacion': operacion}
+        filtros = {campo: valor for campo, valor in filtros.items() if valor is not None}
+
+        for ruta in self.archivos(desde, hasta):
+            with gzip.open(ruta, 'rt', encoding='utf-8') as archivo:
+                for linea in archivo:
+                    registro = json.loads(linea)
+                    registro['fecha'] = datetime.fromisoformat(registro['fecha'])
+                    if not desde <= registro['fecha'] < hasta:
+                        continue
+                    if all(registro[campo] == valor for campo, valor in filtros.items()):
+                        yield registro
+
+        # En la BD el rango de fechas limita la lectura a las particiones del rango
+        condiciones = ''.join(f" AND {campo} = %s" for campo in filtros)
+        conexion = self.conectar()
+        try:
+            cursor = conexion.cursor()
+            cursor.execute(
+                f"SELECT {', '.join(COLUMNAS)} FROM {TABLA} "
+                f"WHERE fecha >= %s AND fecha < %s{condiciones} ORDER BY fecha, id",
+                (desde, hasta, *filtros.values())
+            )
+            while True:
+                filas = cursor.fetchmany(LOTE_EXPORTACION)
+                if not filas:
+                    break
+                for fila in filas:
+                    yield dict(zip(COLUMNAS, fila))
+            cursor.close()
+        finally:
+            conexion.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Particiones, archivo y consulta del historial de operaciones",
+        epilog="Ejemplos:\n"
+               "  python archivador_historial.py particiones\n"
+               "  python archivador_historial.py archivar --retencion 12 --directorio /datos/historial\n"
+               "  python archivador_historial.py consultar --sedes 1 --desde 2025-01-01 --hasta 2025-02-01",
+        formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument("accion", choices=['particiones', 'archivar', 'compactar', 'consultar'])
+    parser.add_argument("--host", default="localhost", help="Host de MySQL")
+    parser.add_argument("--port", type=int, default=3306, help="Puerto de MySQL")
+    parser.add_argument("--sedes", type=int, nargs="+", default=[1, 2], help="Sedes (defecto: 1 2)")
+    parser.add_argument("--directorio", default=DIRECTORIO_DEFECTO, help="Carpeta de los archivos")
+    parser.add_argument("--retencion", type=int, default=RETENCION_MESES_DEFECTO,
+                        help="Meses completos que se conservan en la BD")
+    parser.add_argument("--desde", type=date.fromisoformat, help="Fecha inicial (consultar)")
+    parser.add_argument("--hasta", type=date.fromisoformat, help="Fecha final, excluida (consultar)")
+    parser.add_argument("--libro", default=None, help="Filtrar por código de libro (consultar)")
+    parser.add_argument("--usuario", default=None, help="Filtrar por usuario (consultar)")
+    parser.add_argument("--operacion", default=None, help="Filtrar por operación (consultar)")
+    args = parser.parse_args()
+
+    generador = GeneradorDatos(args.host, args.port)
+
+    try:
+        for sede in args.sedes:
+            archivador = ArchivadorHistorial(
+                sede, lambda sede=sede: generador.conectar(f"biblioteca_sede{sede}"),
+                args.directorio, args.retencion
+            )
+            if args.accion == 'particiones':
+                conexion = archivador.conectar()
+                lista = particiones(conexion.cursor())
+                conexion.close()
+                print(f"[Archivo-Sede{sede}] {len(lista)} particiones")
+                for nombre, mes, filas in lista:
+                    print(f"  {nombre:<10} ~{filas} filas")
+                for ruta in archivador.archivos(datetime.min, datetime.max):
+                    print(f"  {ruta} ({os.path.getsize(ruta)} bytes)")
+            elif args.accion == 'archivar':
+                archivador.mantener()
+            elif args.accion == 'compactar':
+                archivador.compactar()
+            elif args.accion == 'consultar':
+                if not args.desde or not args.hasta:
+                    parser.error("consultar requiere --desde y --hasta")
+                for registro in archivador.consultar(args.desde, args.hasta, args.libro,
+                                                     args.usuario, args.operacion):
+                    print(json.dumps(registro, default=str, ensure_ascii=False))
+
+    except (mysql.connector.Error, RuntimeError) as e:
+        print(f"\n[ERROR] {e}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
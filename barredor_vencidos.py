@@ -0,0 +1,220 @@
+"""
+Barredor de préstamos vencidos
+Pasa a VENCIDO los préstamos ACTIVO cuya fecha de entrega ya pasó y deja
+la transición en historial_operaciones (operación VENCIMIENTO).
+
+- Cada barrido es un rango del índice idx_estado_entrega
+  (estado = 'ACTIVO', fecha_entrega < NOW()) en lotes de LOTE_DEFECTO
+  préstamos, cada lote en su propia transacción corta. SKIP LOCKED salta los
+  préstamos que el GA tiene bloqueados (una devolución en curso); quedan para
+  el barrido siguiente.
+- Entre barridos el hilo duerme hasta el próximo vencimiento: un montículo
+  (heapq) con las fechas de entrega de las próximas HORIZONTE_S, cargado de
+  la BD con el mismo índice. Los préstamos y renovaciones que confirma el GA
+  agregan su fecha al montículo (aplicar). Como mucho duerme ESPERA_MAXIMA_S,
+  así recoge también los préstamos creados fuera del GA.
+
+Una fecha vieja en el montículo (préstamo ya devuelto o renovado) solo
+produce un barrido que no encuentra nada.
+
+    barredor = BarredorVencidos(1, conectar)
+    barredor.start()
+    barredor.aplicar(solicitud, respuesta)    # después de cada mutación del GA
+"""
+import mysql.connector
+import threading
+import heapq
+import json
+import time
+from datetime import datetime, timedelta
+
+from modelo_prestamos import a_fecha
+
+LOTE_DEFECTO = 500              # préstamos por transacción
+HORIZONTE_S = 24 * 3600.0       # vencimientos que se cargan en el montículo
+MAX_MONTICULO = 100000
+ESPERA_MAXIMA_S = 300.0
+ESPERA_REINTENTO_S = 5.0
+# fecha_entrega es DATETIME (segundos): se despierta un poco después del vencimiento
+MARGEN_S = 1.0
+
+# Mutaciones del GA que fijan una fecha de entrega (campo de la solicitud)
+FECHAS_ENTREGA = {
+    'TRANSACCION_PRESTAMO': 'fecha_entrega',
+    'UPDATE_RENOVACION': 'nueva_fecha'
+}
+
+
+class BarredorVencidos(threading.Thread):
+    def __init__(self, sede, conectar, lote=LOTE_DEFECTO, resumen=None, modelo_usuarios=None, metricas=None):
+        """
+        Args:
+            sede: Sede del GA
+            conectar: Función sin argumentos que devuelve una conexión a la BD de la sede
+            lote: Préstamos por transacción
+            resumen: ResumenOperacional que cuenta los vencimientos (opcional)
+            modelo_usuarios: ModeloPrestamosUsuario cuyos usuarios se invalidan (opcional)
+            metricas: Registro Metricas (opcional)
+        """
+        super().__init__(name=f"vencidos-sede{sede}", daemon=True)
+        self.sede = sede
+        self.conectar = conectar
+        self.lote = lote
+        self.resumen = resumen
+        self.modelo_usuarios = modelo_usuarios
+        self.metricas = metricas
+        # Próximas fechas de entrega; están todas las de los préstamos ACTIVO hasta cargado_hasta
+        self.monticulo = []
+        self.cargado_hasta = None
+        self.lock = threading.Lock()
+        self.despertar = threading.Event()
+        self.detenido = threading.Event()
+        self.vencidos = 0
+        self.inicio_barrido = None
+        if self.metricas:
+            self.metricas.registrar_gauge('vencidos_monticulo', lambda: len(self.monticulo))
+
+    def aplicar(self, solicitud, respuesta):
+        """Agrega la fecha de entrega de un préstamo o renovación confirmada por el GA"""
+        campo = FECHAS_ENTREGA.get(solicitud.get('operacion'))
+        if campo is None or respuesta.get('estado') != 'OK' or respuesta.get('duplicada'):
+            return
+        fecha = a_fecha(solicitud[campo])
+        with self.lock:
+            # Más allá del horizonte la trae la próxima carga
+            if self.cargado_hasta is None or fecha > self.cargado_hasta:
+                return
+            heapq.heappush(self.monticulo, fecha)
+            if self.monticulo[0] == fecha:
+                self.despertar.set()
+
+    def cargar(self, conexion):
+        """Fechas de entrega de los préstamos ACTIVO que vencen dentro del horizonte"""
+        cursor = conexion.cursor()
+        cursor.execute("SELECT NOW()")
+        ahora = cursor.fetchone()[0]
+        hasta = ahora + timedelta(seconds=HORIZONTE_S)
+        cursor.execute("""
+            SELECT fecha_entrega FROM prestamos
+            WHERE estado = 'ACTIVO' AND fecha_entrega >= %s AND fecha_entrega <= %s
+            ORDER BY fecha_entrega
+            LIMIT %s
+        """, (ahora, hasta, MAX_MONTICULO))
+        fechas = [fila[0] for fila in cursor.fetchall()]
+        cursor.close()
+        conexion.commit()
+        if len(fechas) == MAX_MONTICULO:
+            # Horizonte acotado por la memoria: se recarga al llegar a la última fecha
+            hasta = fechas[-1]
+        with self.lock:
+            # Ordenada por fecha: ya es un montículo válido
+            self.monticulo = fechas
+            self.cargado_hasta = hasta
+
+    def vencer_lote(self, conexion):
+        """
+        Un lote de préstamos vencidos en una transacción corta
+
+        Returns:
+            int: Préstamos que pasaron a VENCIDO
+        """
+        cursor = conexion.cursor()
+        cursor.execute("""
+            SELECT id, codigo_libro, usuario_id, fecha_entrega FROM prestamos
+            WHERE estado = 'ACTIVO' AND fecha_entrega < NOW()
+            ORDER BY fecha_entrega, id
+            LIMIT %s
+            FOR UPDATE SKIP LOCKED
+        """, (self.lote,))
+        filas = cursor.fetchall()
+        if not filas:
+            cursor.close()
+            conexion.rollback()
+            return 0
+        marcadores = ', '.join(['%s'] * len(filas))
+        cursor.execute(f"""
+            UPDATE prestamos SET estado = 'VENCIDO'
+            WHERE id IN ({marcadores})
+        """, [fila[0] for fila in filas])
+        cursor.executemany("""
+            INSERT INTO historial_operaciones
+            (codigo_libro, usuario_id, operacion, fecha, sede, datos_adicionales)
+            VALUES (%s, %s, 'VENCIMIENTO', NOW(), %s, %s)
+        """, [(codigo_libro, usuario_id, self.sede,
+               json.dumps({'prestamo_id': prestamo_id, 'fecha_entrega': str(fecha_entrega)}))
+              for prestamo_id, codigo_libro, usuario_id, fecha_entrega in filas])
+        cursor.close()
+
+        def confirmar():
+            conexion.commit()
+            return len(filas)
+        if self.resumen:
+            self.resumen.vencer(confirmar)
+        else:
+            confirmar()
+        if self.modelo_usuarios:
+            # La próxima consulta del usuario relee sus préstamos con el estado nuevo
+            for usuario_id in {fila[2] for fila in filas}:
+                self.modelo_usuarios.invalidar(usuario_id)
+        return len(filas)
+
+    def barrer(self, conexion):
+        """Vence lote por lote hasta que no queden préstamos vencidos"""
+        self.inicio_barrido = datetime.now()
+        t_inicio = time.perf_counter()
+        total = 0
+        while not self.detenido.is_set():
+            vencidos = self.vencer_lote(conexion)
+            total += vencidos
+            if self.metricas and vencidos:
+                self.metricas.incrementar('vencidos_total', vencidos)
+            if vencidos < self.lote:
+                break
+        if total:
+            self.vencidos += total
+            print(f"[Vencidos-Sede{self.sede}] ✓ {total} préstamos pasaron a VENCIDO "
+                  f"({time.perf_counter() - t_inicio:.1f}s)")
+
+    def espera(self):
+        """Segundos hasta el próximo vencimiento (descarta los que cubrió el último barrido)"""
+        ahora = datetime.now()
+        barridos = self.inicio_barrido - timedelta(seconds=MARGEN_S)
+        with self.lock:
+            while self.monticulo and self.monticulo[0] < barridos:
+                heapq.heappop(self.monticulo)
+            proximo = self.monticulo[0] if self.monticulo else self.cargado_hasta
+        return min(ESPERA_MAXIMA_S, max(0.0, (proximo - ahora).total_seconds()) + MARGEN_S)
+
+    def run(self):
+        conexion = None
+        en_falla = False
+        while not self.detenido.is_set():
+            try:
+                if conexion is None:
+                    conexion = self.conectar()
+                self.barrer(conexion)
+                if self.cargado_hasta is None or datetime.now() >= self.cargado_hasta:
+                    self.cargar(conexion)
+                if en_falla:
+                    print(f"[Vencidos-Sede{self.sede}] ✓ Conexión a MySQL restablecida")
+                    en_falla = False
+                self.despertar.wait(self.espera())
+                self.despertar.clear()
+            except mysql.connector.Error as e:
+                if not en_falla:
+                    print(f"[Vencidos-Sede{self.sede}] ⚠ No se pudo barrer los vencidos: {e} "
+                          f"(reintentos cada {ESPERA_REINTENTO_S}s)")
+                    en_falla = True
+                if conexion is not None:
+                    try:
+                        conexion.close()
+                    except mysql.connector.Error:
+                        pass
+                    conexion = None
+                self.detenido.wait(ESPERA_REINTENTO_S)
+        if conexion is not None:
+            conexion.close()
+
+    def detener(self):
+        self.detenido.set()
+        self.despertar.set()
@@ -0,0 +1,284 @@
+"""
+Catálogo compartido en un archivo mapeado en memoria (mmap)
+El GA publica los datos de solo lectura de cada libro (nombre, autor,
+ejemplares totales) en un archivo local; los Actores del mismo host los
+resuelven sin pedirlos al GA ni a MySQL: búsqueda binaria sobre el archivo
+mapeado, sin cargarlo en memoria.
+
+Formato (little-endian):
+
+    cabecera   CABECERA: magia, formato, versión, sede, libros, fecha de publicación
+    índice     ENTRADA por libro, de ancho fijo y ordenado por código:
+               código (20 bytes, relleno con ceros) -> offset del registro
+    registros  REGISTRO (ejemplares totales, largo del nombre, largo del
+               autor) seguido del nombre y el autor en UTF-8
+
+Cada publicación escribe un archivo nuevo con la versión siguiente y lo
+reemplaza con os.replace (atómico): un lector nunca ve un archivo a medias y
+el que tiene mapeada la versión anterior la sigue leyendo hasta reabrir.
+Los lectores revisan cada REVISION_S si el archivo cambió.
+
+Los ejemplares disponibles no se publican: cambian con cada préstamo y los
+decide la transacción del GA.
+
+    # GA
+    PublicadorCatalogo(1, conectar, 'catalogo_sede1.bin').start()
+    # Actor
+    catalogo = CatalogoCompartido('catalogo_sede1.bin')
+    catalogo.buscar('LIB00001')   # {'codigo', 'nombre', 'autor', 'ejemplares_totales'} o None
+"""
+import mysql.connector
+import threading
+import hashlib
+import struct
+import mmap
+import time
+import os
+
+MAGIA = b'CATL'
+FORMATO = 1
+CABECERA = struct.Struct('<4sIQIId')
+ENTRADA = struct.Struct('<20sI')
+REGISTRO = struct.Struct('<IHH')
+LARGO_CODIGO = 20               # libros.codigo VARCHAR(20)
+
+LOTE_CARGA = 10000
+INTERVALO_REFRESCO_S = 30.0     # lectura de los libros modificados
+INTERVALO_COMPLETO_S = 3600.0   # relectura completa (libros borrados)
+ESPERA_REINTENTO_S = 5.0
+REVISION_S = 1.0                # cada cuánto un lector mira si hay versión nueva
+
+
+def clave(codigo):
+    # El relleno con ceros conserva el orden de los códigos
+    return codigo.encode('utf-8')[:LARGO_CODIGO].ljust(LARGO_CODIGO, b'\0')
+
+
+def serializar(libros, version, sede):
+    """
+    Contenido del archivo para libros [(codigo, nombre, autor, ejemplares_totales)]
+
+    Returns:
+        bytes: Archivo completo
+    """
+    libros = sorted(libros, key=lambda libro: clave(libro[0]))
+    inicio_registros = CABECERA.size + ENTRADA.size * len(libros)
+    indice = bytearray()
+    registros = bytearray()
+    for codigo, nombre, autor, totales in libros:
+        nombre = (nombre or '').encode('utf-8')[:0xFFFF]
+        autor = (autor or '').encode('utf-8')[:0xFFFF]
+        indice += ENTRADA.pack(clave(codigo), inicio_registros + len(registros))
+        registros += REGISTRO.pack(totales, len(nombre), len(autor)) + nombre + autor
+    if inicio_registros + len(registros) > 0xFFFFFFFF:
+        raise ValueError("El catálogo no cabe en offsets de 32 bits")
+    return CABECERA.pack(MAGIA, FORMATO, version, sede, len(libros), time.time()) + indice + registros
+
+
+def escribir(ruta, contenido):
+    """Reemplaza el archivo de forma atómica (nunca queda a medias)"""
+    temporal = f"{ruta}.{os.getpid()}.tmp"
+    with open(temporal, 'wb') as f:
+        f.write(contenido)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(temporal, ruta)
+
+
+class CatalogoCompartido:
+    def __init__(self, ruta, revision_s=REVISION_S):
+        """
+        Lector del catálogo publicado por el GA
+
+        Args:
+            ruta: Archivo del catálogo
+            revision_s: Segundos entre revisiones del archivo (versión nueva)
+        """
+        self.ruta = ruta
+        self.revision_s = revision_s
+        # (mmap, libros, versión): se reemplaza entero al reabrir
+        self.mapa = None
+        self.identidad = None
+        self.proxima_revision = 0.0
+
+    @property
+    def version(self):
+        return self.mapa[2] if self.mapa else 0
+
+    def abrir(self):
+        """Mapea el archivo actual; False si no existe o no es un catálogo válido"""
+        try:
+            with open(self.ruta, 'rb') as f:
+                estado = os.fstat(f.fileno())
+                mapa = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        except (OSError, ValueError):
+            # ValueError: archivo vacío
+            return False
+        magia, formato, version, _, libros, _ = CABECERA.unpack_from(mapa, 0)
+        if magia != MAGIA or formato != FORMATO:
+            mapa.close()
+            return False
+        # El mmap anterior se libera cuando ya nadie lo usa
+        self.mapa = (mapa, libros, version)
+        self.identidad = (estado.st_ino, estado.st_mtime_ns)
+        return True
+
+    def revisar(self):
+        """Reabre el archivo si el GA publicó una versión nueva (como mucho cada revision_s)"""
+        ahora = time.monotonic()
+        if ahora < self.proxima_revision:
+            return
+        self.proxima_revision = ahora + self.revision_s
+        try:
+            estado = os.stat(self.ruta)
+        except OSError:
+            return
+        if (estado.st_ino, estado.st_mtime_ns) != self.identidad:
+            self.abrir()
+
+    def buscar(self, codigo):
+        """Datos del libro, o None si no está publicado (hay que preguntarle al GA)"""
+        self.revisar()
+        if self.mapa is None:
+            return None
+        mapa, libros, _ = self.mapa
+        objetivo = clave(codigo)
+        lo, hi = 0, libros
+        while lo < hi:
+            medio = (lo + hi) // 2
+            posicion = CABECERA.size + medio * ENTRADA.size
+            if mapa[posicion:posicion + LARGO_CODIGO] < objetivo:
+                lo = medio + 1
+            else:
+                hi = medio
+        posicion = CABECERA.size + lo * ENTRADA.size
+        if lo == libros or mapa[posicion:posicion + LARGO_CODIGO] != objetivo:
+            return None
+        offset = ENTRADA.unpack_from(mapa, posicion)[1]
+        totales, largo_nombre, largo_autor = REGISTRO.unpack_from(mapa, offset)
+        inicio = offset + REGISTRO.size
+        return {
+            'codigo': codigo,
+            'nombre': mapa[inicio:inicio + largo_nombre].decode('utf-8', 'replace'),
+            'autor': mapa[inicio + largo_nombre:inicio + largo_nombre + largo_autor].decode('utf-8', 'replace'),
+            'ejemplares_totales': totales
+        }
+
+
+class PublicadorCatalogo(threading.Thread):
+    def __init__(self, sede, conectar, ruta, intervalo_s=INTERVALO_REFRESCO_S, metricas=None):
+        """
+        Args:
+            sede: Sede del GA
+            conectar: Función sin argumentos que devuelve una conexión a la BD de la sede
+            ruta: Archivo del catálogo
+            intervalo_s: Segundos entre lecturas de los libros modificados
+            metricas: Registro Metricas (opcional)
+        """
+        super().__init__(name=f"catalogo-sede{sede}", daemon=True)
+        self.sede = sede
+        self.conectar = conectar
+        self.ruta = ruta
+        self.intervalo_s = intervalo_s
+        self.metricas = metricas
+        self.detenido = threading.Event()
+        # Lo publicado, para comparar los libros modificados sin guardar otra copia
+        self.lector = CatalogoCompartido(ruta, revision_s=0)
+        self.resumen = None
+        if self.lector.abrir():
+            # Al reiniciar, un catálogo igual al publicado no cambia de versión
+            self.resumen = hashlib.sha1(memoryview(self.lector.mapa[0])[CABECERA.size:]).digest()
+        self.marca = None
+        self.ultima_completa = 0.0
+        if self.metricas:
+            self.metricas.registrar_gauge('catalogo_version', lambda: self.lector.version)
+
+    def publicar(self, conexion):
+        """Relee todos los libros; escribe una versión nueva solo si algo cambió"""
+        t_inicio = time.perf_counter()
+        cursor = conexion.cursor()
+        cursor.execute("SELECT NOW()")
+        marca = cursor.fetchone()[0]
+        libros = []
+        ultimo_id = 0
+        while True:
+            cursor.execute("""
+                SELECT id, codigo, nombre, autor, ejemplares_totales FROM libros
+                WHERE id > %s ORDER BY id LIMIT %s
+            """, (ultimo_id, LOTE_CARGA))
+            filas = cursor.fetchall()
+            if not filas:
+                break
+            libros.extend(fila[1:] for fila in filas)
+            ultimo_id = filas[-1][0]
+        cursor.close()
+        conexion.commit()
+        self.marca = marca
+        self.ultima_completa = time.monotonic()
+
+        version = self.lector.version + 1
+        contenido = serializar(libros, version, self.sede)
+        resumen = hashlib.sha1(memoryview(contenido)[CABECERA.size:]).digest()
+        if resumen == self.resumen:
+            return
+        escribir(self.ruta, contenido)
+        self.lector.abrir()
+        self.resumen = resumen
+        if self.metricas:
+            self.metricas.incrementar('catalogo_publicaciones_total')
+        print(f"[Catálogo-Sede{self.sede}] ✓ Versión {version}: {len(libros)} libros en {self.ruta} "
+              f"({time.perf_counter() - t_inicio:.1f}s)")
+
+    def refrescar(self, conexion):
+        """Vuelve a publicar si algún libro modificado cambió nombre, autor o totales"""
+        cursor = conexion.cursor()
+        cursor.execute("SELECT NOW()")
+        marca = cursor.fetchone()[0]
+        cursor.execute("""
+            SELECT codigo, nombre, autor, ejemplares_totales FROM libros
+            WHERE fecha_ultima_actualizacion >= %s
+        """, (self.marca,))
+        filas = cursor.fetchall()
+        cursor.close()
+        conexion.commit()
+        for codigo, nombre, autor, totales in filas:
+            publicado = self.lector.buscar(codigo)
+            if publicado is None or (publicado['nombre'], publicado['autor'],
+                                     publicado['ejemplares_totales']) != (nombre or '', autor or '', totales):
+                self.publicar(conexion)
+                return
+        # Solo cambió el inventario (préstamos, devoluciones)
+        self.marca = marca
+
+    def run(self):
+        conexion = None
+        en_falla = False
+        while not self.detenido.is_set():
+            try:
+                if conexion is None:
+                    conexion = self.conectar()
+                if self.marca is None or time.monotonic() - self.ultima_completa >= INTERVALO_COMPLETO_S:
+                    self.publicar(conexion)
+                else:
+                    self.refrescar(conexion)
+                if en_falla:
+                    print(f"[Catálogo-Sede{self.sede}] ✓ Conexión a MySQL restablecida")
+                    en_falla = False
+                self.detenido.wait(self.intervalo_s)
+            except (mysql.connector.Error, OSError) as e:
+                if not en_falla:
+                    print(f"[Catálogo-Sede{self.sede}] ⚠ No se pudo publicar el catálogo: {e} "
+                          f"(reintentos cada {ESPERA_REINTENTO_S}s)")
+                    en_falla = True
+                if conexion is not None:
+                    try:
+                        conexion.close()
+                    except mysql.connector.Error:
+                        pass
+                    conexion = None
+                self.detenido.wait(ESPERA_REINTENTO_S)
+        if conexion is not None:
+            conexion.close()
+
+    def detener(self):
+        self.detenido.set()
@@ -0,0 +1,157 @@
+"""
+Cliente REQ confiable (patrón Lazy Pirate)
+Un recv() sin timeout en un socket REQ cuelga para siempre si se pierde un
+mensaje o muere el par, y con él toda la cadena PS → GC → Actor → GA. Este
+cliente envuelve el socket REQ con:
+
+- timeout por intento con poll() (acotado por el plazo del mensaje, si trae)
+- con esperar_plazo, un intento espera todo el plazo restante: el destino
+  reintenta por su cuenta hacia el siguiente salto y reenviarle antes solo
+  duplica trabajo (el plazo que recibe ya viene recortado, plazos.propagar)
+- reintentos acotados con backoff exponencial y jitter
+- cierre y reapertura del socket tras cada fallo (un REQ sin respuesta queda
+  inutilizable)
+- failover en orden circular sobre una lista de endpoints
+
+Reenviar al mismo endpoint es seguro porque las mutaciones llevan id_peticion
+(idempotencia.py), pero ese id solo deduplica dentro de una sede (caché del GC
+y peticiones_procesadas de su BD). Si los endpoints de respaldo son de otra
+sede, se pasa 'lecturas': solo esas operaciones cambian de endpoint; una
+mutación va siempre al principal y se reintenta ahí, porque pudo haberse
+aplicado antes del timeout.
+
+    cliente = ClienteConfiable(context, ["tcp://ga1:5560", "tcp://ga1b:5560"], "GA")
+    respuesta = cliente.solicitar({'operacion': 'SELECT_DISPONIBILIDAD', ...})
+"""
+import zmq
+import json
+import random
+import time
+
+import plazos
+
+TIMEOUT_DEFECTO_MS = 2500
+REINTENTOS_DEFECTO = 3
+BACKOFF_DEFECTO_MS = 50
+BACKOFF_MAXIMO_MS = 2000
+
+
+class SinRespuesta(Exception):
+    """Se agotaron los intentos sin respuesta de ningún endpoint"""
+
+
+class ClienteConfiable:
+    def __init__(self, context, endpoints, nombre, timeout_ms=TIMEOUT_DEFECTO_MS,
+                 reintentos=REINTENTOS_DEFECTO, backoff_ms=BACKOFF_DEFECTO_MS, metricas=None,
+                 lecturas=None, esperar_plazo=False):
+        """
+        Args:
+            context: Contexto ZeroMQ
+            endpoints: Endpoint o lista de endpoints (el primero es el principal)
+            nombre: Nombre del destino (logs y etiqueta de métricas)
+            timeout_ms: Tiempo máximo de espera por intento
+            reintentos: Reenvíos tras el primer intento
+            backoff_ms: Espera base antes del primer reenvío (se duplica en cada uno)
+            metricas: Registro Metricas donde contar timeouts y reintentos (opcional)
+            lecturas: Operaciones que pueden pasar a un endpoint de respaldo; None las
+                deja pasar a todas (respaldos que comparten la BD del principal)
+            esperar_plazo: Si el mensaje trae plazo, cada intento espera todo lo que
+                le queda en vez de timeout_ms (saltos con reintentos propios detrás)
+        """
+        self.context = context
+        self.endpoints = [endpoints] if isinstance(endpoints, str) else list(endpoints)
+        self.nombre = nombre
+        self.timeout_ms = timeout_ms
+        self.reintentos = reintentos
+        self.backoff_ms = backoff_ms
+        self.metricas = metricas
+        self.lecturas = None if lecturas is None else frozenset(lecturas)
+        self.esperar_plazo = esperar_plazo
+
+        self.indice = 0
+        self.socket = None
+        self.contadores = {'timeouts': 0, 'reintentos': 0, 'failovers': 0, 'fallos': 0}
+        self.abrir()
+
+    @property
+    def endpoint(self):
+        return self.endpoints[self.indice]
+
+    def abrir(self):
+        """Crea el socket REQ y lo conecta al endpoint actual"""
+        self.socket = self.context.socket(zmq.REQ)
+        self.socket.connect(self.endpoint)
+
+    def reabrir(self, rotar=True):
+        """Descarta el socket bloqueado y conecta al siguiente endpoint (o al mismo, sin rotar)"""
+        self.socket.close(linger=0)
+        if rotar and len(self.endpoints) > 1:
+            self.indice = (self.indice + 1) % len(self.endpoints)
+            self.contar('failovers')
+            print(f"[Cliente-{self.nombre}] ↪ Failover a {self.endpoint}")
+        self.abrir()
+
+    def contar(self, contador):
+        self.contadores[contador] += 1
+        if self.metricas:
+            self.metricas.incrementar(f'cliente_{contador}_total', destino=self.nombre)
+
+    def solicitar(self, mensaje):
+        """
+        Envía el mensaje y espera la respuesta con timeouts y reintentos
+
+        Args:
+            mensaje: dict a enviar (si trae 'deadline', ningún intento lo excede)
+
+        Returns:
+            dict: Respuesta decodificada
+
+        Raises:
+            SinRespuesta: Si ningún intento obtuvo respuesta
+            plazos.PlazoVencido: Si el plazo del mensaje venció antes de obtenerla
+        """
+        datos = json.dumps(mensaje)
+        # Una mutación no sale de la sede principal (su id_peticion no se conoce en otra)
+        fijo = self.lecturas is not None and mensaje.get('operacion') not in self.lecturas
+        if fijo and self.indice != 0:
+            self.socket.close(linger=0)
+            self.indice = 0
+            self.abrir()
+
+        for intento in range(self.reintentos + 1):
+            timeout_ms = self.timeout_ms
+            restante = plazos.restante_ms(mensaje)
+            if restante is not None:
+                if restante <= 0:
+                    raise plazos.PlazoVencido(
+                        f"Plazo vencido esperando a {self.nombre} ({intento} intentos)")
+                timeout_ms = restante if self.esperar_plazo else min(timeout_ms, restante)
+
+            self.socket.send_string(datos)
+            if self.socket.poll(int(timeout_ms)):
+                return json.loads(self.socket.recv_string())
+
+            # Lazy Pirate: el REQ quedó esperando una respuesta que no llega
+            self.contar('timeouts')
+            print(f"[Cliente-{self.nombre}] ⚠ Sin respuesta de {self.endpoint} en {timeout_ms:.0f}ms "
+                  f"(intento {intento + 1}/{self.reintentos + 1})")
+            self.reabrir(rotar=not fijo)
+
+            if intento < self.reintentos:
+                self.contar('reintentos')
+                espera_ms = min(BACKOFF_MAXIMO_MS, self.backoff_ms * 2 ** intento)
+                espera_ms *= random.uniform(0.5, 1.0)
+                restante = plazos.restante_ms(mensaje)
+                if restante is not None:
+                    espera_ms = min(espera_ms, max(0.0, restante))
+                time.sleep(espera_ms / 1000.0)
+
+        self.contar('fallos')
+        if plazos.expirado(mensaje):
+            raise plazos.PlazoVencido(f"Plazo vencido esperando a {self.nombre}")
+        raise SinRespuesta(f"{self.nombre} sin respuesta tras {self.reintentos + 1} intentos")
+
+    def cerrar(self):
+        if self.socket is not None:
+            self.socket.close(linger=0)
+            self.socket = None
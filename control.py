@@ -0,0 +1,191 @@
+"""
+Socket de control de los componentes
+Un socket REP opcional, atendido en su propio hilo, que recibe comandos JSON
+sin interrumpir el procesamiento de peticiones:
+
+    {"comando": "PERFIL_INICIAR", "modo": "muestreo", "segundos": 30}
+    {"comando": "PERFIL_ESTADO"}
+    {"comando": "PERFIL_TOP", "n": 15}
+    {"comando": "PERFIL_DETENER"}
+    {"comando": "STATS"}
+    {"comando": "LISTO"}
+    {"comando": "PING"}
+
+Cada componente registra sus comandos con registrar(). Uso como cliente:
+
+    python control.py localhost:7101 PERFIL_INICIAR --modo cprofile --segundos 20
+"""
+import zmq
+import json
+import threading
+import argparse
+import sys
+
+# Cada cuánto revisa el hilo de control si debe detenerse
+INTERVALO_POLL_MS = 250
+
+# Timeout del poll en los loops principales: acota cuánto tarda un componente
+# sin tráfico en atender su punto de control (p. ej. cerrar una sesión cProfile)
+INTERVALO_LOOP_MS = 200
+
+# Espera máxima de cada PING de los chequeos de LISTO a un destino
+TIMEOUT_SONDEO_MS = 1000
+
+
+class ServidorControl(threading.Thread):
+    def __init__(self, nombre, puerto=None, context=None, endpoint=None):
+        """
+        Args:
+            nombre: Nombre del componente (para los logs)
+            puerto: Puerto TCP del socket de control
+            context: Contexto ZeroMQ del componente (los sockets se crean en el hilo)
+            endpoint: Endpoint explícito; None usa tcp://*:<puerto>
+        """
+        super().__init__(name=f"control-{nombre}", daemon=True)
+        self.nombre = nombre
+        self.context = context or zmq.Context.instance()
+        self.endpoint = endpoint or f"tcp://*:{puerto}"
+        self.manejadores = {}
+        self.detenido = threading.Event()
+
+        self.registrar('PING', lambda solicitud: {'estado': 'OK', 'componente': self.nombre})
+        self.registrar('AYUDA', lambda solicitud: {'estado': 'OK', 'comandos': sorted(self.manejadores)})
+
+    def registrar(self, comando, funcion):
+        """Registra funcion(solicitud) -> dict como manejador de comando"""
+        self.manejadores[comando.upper()] = funcion
+
+    def registrar_perfilador(self, perfilador):
+        """Registra los comandos de perfilado bajo demanda"""
+        self.registrar('PERFIL_INICIAR', lambda s: perfilador.iniciar(
+            s.get('modo', 'muestreo'), s.get('segundos', 10), s.get('archivo'),
+            s.get('intervalo_ms', 5)
+        ))
+        self.registrar('PERFIL_DETENER', lambda s: perfilador.detener())
+        self.registrar('PERFIL_ESTADO', lambda s: perfilador.estado())
+        self.registrar('PERFIL_TOP', lambda s: perfilador.top(int(s.get('n', 20))))
+
+    def registrar_metricas(self, metricas):
+        """Registra STATS: instantánea de las métricas del componente"""
+        self.registrar('STATS', lambda s: {'estado': 'OK', **metricas.instantanea()})
+
+    def registrar_listo(self, chequeos):
+        """
+        Registra LISTO (sonda de disponibilidad): chequeos() devuelve
+        {nombre: bool}; el componente está listo si todos son True
+        """
+        def listo(solicitud):
+            resultado = chequeos()
+            ok = all(resultado.values())
+            return {'estado': 'OK' if ok else 'NO_LISTO', 'listo': ok,
+                    'componente': self.nombre, 'chequeos': resultado}
+        self.registrar('LISTO', listo)
+
+    def atender(self, mensaje):
+        try:
+            solicitud = json.loads(mensaje)
+        except json.JSONDecodeError:
+            return {'estado': 'ERROR', 'mensaje': 'Formato de comando inválido'}
+
+        comando = str(solicitud.get('comando', '')).upper()
+        manejador = self.manejadores.get(comando)
+        if manejador is None:
+            return {'estado': 'ERROR', 'mensaje': f'Comando desconocido: {comando}',
+                    'comandos': sorted(self.manejadores)}
+        try:
+            return manejador(solicitud)
+        except Exception as e:
+            return {'estado': 'ERROR', 'mensaje': f'Error en {comando}: {e}'}
+
+    def run(self):
+        socket = self.context.socket(zmq.REP)
+        socket.linger = 0
+        try:
+            socket.bind(self.endpoint)
+            print(f"[Control-{self.nombre}] Socket de control en {self.endpoint}")
+            while not self.detenido.is_set():
+                if not socket.poll(INTERVALO_POLL_MS):
+                    continue
+                respuesta = self.atender(socket.recv_string())
+                socket.send_string(json.dumps(respuesta, default=str))
+        except zmq.ContextTerminated:
+            pass
+        finally:
+            socket.close()
+
+    def detener(self):
+        self.detenido.set()
+
+
+def enviar_comando(destino, solicitud, timeout_ms=5000, context=None):
+    """
+    Envía un comando a un socket de control y devuelve la respuesta
+
+    Args:
+        destino: "host:puerto" o endpoint ZeroMQ completo
+        solicitud: dict con al menos 'comando'
+        timeout_ms: Tiempo máximo de espera
+        context: Contexto ZeroMQ (necesario para endpoints inproc://); None usa el global
+
+    Returns:
+        dict: Respuesta, o estado ERROR si no hubo respuesta a tiempo
+    """
+    endpoint = destino if "://" in destino else f"tcp://{destino}"
+    context = context or zmq.Context.instance()
+    socket = context.socket(zmq.REQ)
+    socket.linger = 0
+    try:
+        socket.connect(endpoint)
+        socket.send_string(json.dumps(solicitud))
+        if not socket.poll(timeout_ms):
+            return {'estado': 'ERROR', 'mensaje': f'Sin respuesta de {endpoint} en {timeout_ms}ms'}
+        return json.loads(socket.recv_string())
+    finally:
+        socket.close()
+
+
+def sondear(endpoints, context=None, timeout_ms=TIMEOUT_SONDEO_MS):
+    """
+    PING de aplicación ({'operacion': 'PING'}) a un destino y sus respaldos
+
+    Returns:
+        dict: Primera respuesta OK, o None si ningún endpoint respondió
+    """
+    for endpoint in [endpoints] if isinstance(endpoints, str) else endpoints:
+        respuesta = enviar_comando(endpoint, {'operacion': 'PING'}, timeout_ms, context)
+        if respuesta.get('estado') == 'OK':
+            return respuesta
+    return None
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Cliente del socket de control de GC, Actores y GA",
+        epilog="Ejemplos:\n"
+               "  python control.py localhost:7101 PERFIL_INICIAR --modo muestreo --segundos 30\n"
+               "  python control.py localhost:7101 PERFIL_TOP --n 15\n"
+               "  python control.py localhost:7105 STATS\n"
+               "  python control.py localhost:7101 LISTO   # código de salida 0 si está listo",
+        formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument("destino", help="host:puerto del socket de control")
+    parser.add_argument("comando", help="PING, AYUDA, STATS, LISTO, PERFIL_INICIAR, PERFIL_ESTADO, PERFIL_TOP, ...")
+    parser.add_argument("--modo", default=None, help="muestreo o cprofile (PERFIL_INICIAR)")
+    parser.add_argument("--segundos", type=float, default=None, help="Duración de la sesión")
+    parser.add_argument("--archivo", default=None, help="Archivo de resultados")
+    parser.add_argument("--n", type=int, default=None, help="Cantidad de funciones (PERFIL_TOP)")
+    parser.add_argument("--timeout", type=int, default=5000, help="Timeout en ms")
+    args = parser.parse_args()
+
+    solicitud = {'comando': args.comando.upper()}
+    for campo in ('modo', 'segundos', 'archivo', 'n'):
+        if getattr(args, campo) is not None:
+            solicitud[campo] = getattr(args, campo)
+
+    respuesta = enviar_comando(args.destino, solicitud, args.timeout)
+    print(json.dumps(respuesta, indent=2, ensure_ascii=False))
+    sys.exit(0 if respuesta.get('estado') == 'OK' else 1)
+
+
+if __name__ == "__main__":
+    main()
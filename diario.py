@@ -0,0 +1,600 @@
+"""
+Diario de operaciones del GA (write-ahead log)
+En modo diario el GA no espera el commit de MySQL: cada mutación se agrega a
+un diario local, se confirma al Actor cuando el registro está en disco
+(fsync) y un hilo aplicador la lleva después a MySQL por lotes.
+
+- Diario:           segmentos segmento_<primer lsn>.log de tamaño acotado;
+                    cada registro lleva longitud, CRC32 y número de secuencia
+                    (lsn). Quien llega mientras otro sincroniza espera ese
+                    mismo fsync; el GA atiende de a una solicitud (REP), así
+                    que en la práctica cada mutación paga su propio fsync.
+                    Al arrancar se releen los segmentos con mmap y se
+                    descarta una cola escrita a medias.
+- InventarioDiario: ejemplares disponibles por libro y préstamos abiertos por
+                    (libro, usuario) en memoria. Es la autoridad para aceptar
+                    préstamos y devoluciones: el valor se carga de MySQL junto
+                    con el lsn aplicado (misma instantánea) y se le suman los
+                    efectos de los registros del diario posteriores a ese lsn.
+- AplicadorDiario:  aplica los registros en orden, en transacciones de hasta
+                    LOTE_APLICACION registros que también guardan el último lsn
+                    aplicado (tabla diario_aplicado, migración 4). Así cada
+                    registro se aplica exactamente una vez, aun tras una caída.
+
+    diario = Diario("diario/sede1")
+    pendientes = diario.abrir()         # registros para reaplicar
+    lsn = diario.agregar({'operacion': 'INSERT_HISTORIAL', ...})
+"""
+import mysql.connector
+from datetime import datetime
+import threading
+import struct
+import mmap
+import glob
+import json
+import zlib
+import time
+import os
+
+# Longitud del contenido, CRC32 (lsn + contenido) y lsn
+CABECERA = struct.Struct('>IIQ')
+LSN = struct.Struct('>Q')
+
+DIRECTORIO_DEFECTO = 'diario'
+TAM_SEGMENTO_DEFECTO = 64 * 1024 * 1024
+LOTE_APLICACION = 500
+ESPERA_REINTENTO_S = 1.0
+# Entradas en caché del inventario antes de vaciarlo (se recargan de MySQL)
+LIMITE_CACHE = 200000
+# Segundos que se recuerdan las respuestas ya aplicadas para reintentos idempotentes
+VENTANA_RESPUESTAS_S = 600
+
+OPERACIONES = ('TRANSACCION_PRESTAMO', 'UPDATE_DEVOLUCION', 'INSERT_HISTORIAL')
+
+
+class DiarioCorrupto(Exception):
+    """Un segmento intermedio tiene un registro inválido (solo la cola del último puede estarlo)"""
+
+
+def efectos(registro):
+    """
+    Cambios de un registro sobre el inventario
+
+    Returns:
+        list: [(('libro', codigo), delta), (('par', (codigo, usuario)), delta)]
+    """
+    operacion = registro['operacion']
+    codigo_libro = registro.get('codigo_libro')
+    par = (codigo_libro, registro.get('usuario_id'))
+    if operacion == 'TRANSACCION_PRESTAMO':
+        return [(('libro', codigo_libro), -1), (('par', par), 1)]
+    if operacion == 'UPDATE_DEVOLUCION':
+        return [(('libro', codigo_libro), 1), (('par', par), -1)]
+    return []
+
+
+class Diario:
+    def __init__(self, directorio, tam_segmento=TAM_SEGMENTO_DEFECTO):
+        """
+        Args:
+            directorio: Carpeta de los segmentos (una por sede)
+            tam_segmento: Bytes a partir de los cuales se abre un segmento nuevo
+        """
+        self.directorio = directorio
+        self.tam_segmento = tam_segmento
+        self.segmentos = []
+        self.fd = None
+        self.tam_actual = 0
+        self.siguiente_lsn = 1
+        self.escrito = 0
+        self.durable = 0
+        self.sincronizando = False
+        self.lock = threading.Lock()
+        self.condicion = threading.Condition(self.lock)
+
+    def ruta_segmento(self, primer_lsn):
+        return os.path.join(self.directorio, f"segmento_{primer_lsn:016d}.log")
+
+    def leer_segmento(self, ruta):
+        """
+        Registros válidos de un segmento (lectura con mmap)
+
+        Returns:
+            tuple: (registros, bytes válidos)
+        """
+        registros = []
+        tam = os.path.getsize(ruta)
+        if tam == 0:
+            return registros, 0
+        posicion = 0
+        with open(ruta, 'rb') as archivo, mmap.mmap(archivo.fileno(), 0, access=mmap.ACCESS_READ) as datos:
+            while posicion + CABECERA.size <= tam:
+                longitud, crc, lsn = CABECERA.unpack_from(datos, posicion)
+                fin = posicion + CABECERA.size + longitud
+                if fin > tam:
+                    break
+                contenido = datos[posicion + CABECERA.size:fin]
+                if zlib.crc32(LSN.pack(lsn) + contenido) != crc:
+                    break
+                registro = json.loads(contenido)
+                registro['lsn'] = lsn
+                registros.append(registro)
+                posicion = fin
+        return registros, posicion
+
+    def abrir(self):
+        """
+        Relee los segmentos existentes y deja el último abierto para agregar
+
+        Returns:
+            list: Todos los registros del diario, en orden de lsn
+        """
+        os.makedirs(self.directorio, exist_ok=True)
+        rutas = sorted(glob.glob(os.path.join(self.directorio, "segmento_*.log")))
+        registros = []
+        for indice, ruta in enumerate(rutas):
+            primer_lsn = int(os.path.basename(ruta)[9:-4])
+            leidos, validos = self.leer_segmento(ruta)
+            if validos < os.path.getsize(ruta):
+                if indice < len(rutas) - 1:
+                    raise DiarioCorrupto(f"Registro inválido en {ruta} (byte {validos})")
+                # Escritura interrumpida por una caída: nunca se confirmó al Actor
+                os.truncate(ruta, validos)
+                print(f"[Diario] ⚠ Cola incompleta descartada en {ruta} (byte {validos})")
+            self.segmentos.append((primer_lsn, ruta))
+            registros.extend(leidos)
+            self.siguiente_lsn = max(self.siguiente_lsn, primer_lsn)
+
+        if registros:
+            self.siguiente_lsn = registros[-1]['lsn'] + 1
+        self.escrito = self.durable = self.siguiente_lsn - 1
+        if self.segmentos:
+            ruta = self.segmentos[-1][1]
+            self.fd = os.open(ruta, os.O_WRONLY | os.O_APPEND)
+            self.tam_actual = os.path.getsize(ruta)
+        else:
+            self.nuevo_segmento(self.siguiente_lsn)
+        return registros
+
+    def nuevo_segmento(self, primer_lsn):
+        ruta = self.ruta_segmento(primer_lsn)
+        self.fd = os.open(ruta, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+        self.tam_actual = 0
+        self.segmentos.append((primer_lsn, ruta))
+        # La entrada del directorio también debe sobrevivir a una caída
+        fd_directorio = os.open(self.directorio, os.O_RDONLY)
+        try:
+            os.fsync(fd_directorio)
+        finally:
+            os.close(fd_directorio)
+
+    def esperar_sincronizacion(self):
+        """Con el lock tomado, espera a que nadie esté sincronizando el fd actual"""
+        while self.sincronizando:
+            self.condicion.wait()
+
+    def rotar(self, primer_lsn):
+        """
+        Cierra el segmento actual (ya sincronizado) y abre uno nuevo; se llama con
+        el lock tomado y sin un fsync en curso
+        """
+        os.fsync(self.fd)
+        os.close(self.fd)
+        self.durable = self.escrito
+        self.condicion.notify_all()
+        self.nuevo_segmento(primer_lsn)
+
+    def continuar_desde(self, lsn):
+        """Numera los próximos registros desde lsn (si MySQL ya aplicó más que lo que hay en disco)"""
+        with self.lock:
+            self.esperar_sincronizacion()
+            if lsn > self.siguiente_lsn:
+                self.rotar(lsn)
+                self.siguiente_lsn = lsn
+                self.escrito = self.durable = lsn - 1
+
+    def agregar(self, registro, sincronizar=True):
+        """
+        Agrega un registro; con sincronizar=True vuelve cuando está en disco
+        (si no, el llamador debe llamar a sincronizar(lsn) antes de confirmar)
+
+        Returns:
+            int: lsn asignado
+        """
+        contenido = json.dumps(registro, default=str, ensure_ascii=False).encode('utf-8')
+        with self.lock:
+            if self.tam_actual >= self.tam_segmento:
+                self.esperar_sincronizacion()
+                if self.tam_actual >= self.tam_segmento:
+                    self.rotar(self.siguiente_lsn)
+            lsn = self.siguiente_lsn
+            datos = CABECERA.pack(len(contenido), zlib.crc32(LSN.pack(lsn) + contenido), lsn) + contenido
+            os.write(self.fd, datos)
+            self.siguiente_lsn += 1
+            self.tam_actual += len(datos)
+            self.escrito = lsn
+        if sincronizar:
+            self.sincronizar(lsn)
+        return lsn
+
+    def sincronizar(self, lsn):
+        """
+        Vuelve cuando lsn está en disco. Un solo hilo hace fsync de todo lo
+        escrito y despierta a los que esperan; con el loop REP del GA no hay
+        otro que espere, así que no agrupa registros de distintas solicitudes.
+        """
+        with self.condicion:
+            while self.durable < lsn:
+                if self.sincronizando:
+                    self.condicion.wait()
+                    continue
+                self.sincronizando = True
+                objetivo, fd = self.escrito, self.fd
+                self.condicion.release()
+                try:
+                    os.fsync(fd)
+                finally:
+                    self.condicion.acquire()
+                    self.sincronizando = False
+                    self.condicion.notify_all()
+                self.durable = max(self.durable, objetivo)
+
+    def liberar_hasta(self, lsn):
+        """Borra los segmentos cuyos registros ya están todos aplicados (nunca el actual)"""
+        with self.lock:
+            while len(self.segmentos) > 1 and self.segmentos[1][0] - 1 <= lsn:
+                _, ruta = self.segmentos.pop(0)
+                os.remove(ruta)
+
+    def cerrar(self):
+        with self.lock:
+            if self.fd is not None:
+                os.fsync(self.fd)
+                os.close(self.fd)
+                self.fd = None
+
+
+class InventarioDiario:
+    def __init__(self, sede, conectar):
+        """
+        Args:
+            sede: Sede del GA
+            conectar: Función sin argumentos que devuelve una conexión a la BD de la sede
+        """
+        self.sede = sede
+        self.conectar = conectar
+        self.disponibles = {}
+        self.nombres = {}
+        self.abiertos = {}
+        # Efectos aún no aplicados en MySQL: {('libro', codigo) | ('par', par): {lsn: delta}}
+        self.pendientes = {}
+        # Respuestas por id_peticion: {id: (respuesta, aplicada_en o None)}
+        self.respuestas = {}
+        # Reentrante: reservar() llama a registrar() y nombre() con el lock tomado
+        self.lock = threading.RLock()
+
+    def registrar(self, registro):
+        """Suma los efectos de un registro del diario (nuevo o releído al arrancar)"""
+        with self.lock:
+            for clave, delta in efectos(registro):
+                self.pendientes.setdefault(clave, {})[registro['lsn']] = delta
+                cache = self.disponibles if clave[0] == 'libro' else self.abiertos
+                if clave[1] in cache:
+                    cache[clave[1]] += delta
+            if registro.get('id_peticion'):
+                self.respuestas[registro['id_peticion']] = (registro['respuesta'], None)
+
+    def aplicados(self, registros):
+        """Quita los efectos pendientes de registros ya confirmados en MySQL"""
+        ahora = time.monotonic()
+        with self.lock:
+            for registro in registros:
+                for clave, _ in efectos(registro):
+                    deltas = self.pendientes.get(clave)
+                    if deltas is not None:
+                        deltas.pop(registro['lsn'], None)
+                        if not deltas:
+                            del self.pendientes[clave]
+                if registro.get('id_peticion') in self.respuestas:
+                    self.respuestas[registro['id_peticion']] = (registro['respuesta'], ahora)
+            vencidas = [id_peticion for id_peticion, (_, aplicada) in self.respuestas.items()
+                        if aplicada is not None and ahora - aplicada > VENTANA_RESPUESTAS_S]
+            for id_peticion in vencidas:
+                del self.respuestas[id_peticion]
+
+    def respuesta(self, id_peticion):
+        """Respuesta ya confirmada para este id_peticion (en el diario o aplicada hace poco), o None"""
+        with self.lock:
+            registrada = self.respuestas.get(id_peticion)
+        return registrada[0] if registrada else None
+
+    def pendiente(self, clave, lsn_aplicado):
+        return sum(delta for lsn, delta in self.pendientes.get(clave, {}).items() if lsn > lsn_aplicado)
+
+    def en_cache(self, codigo_libro, usuario_id=None):
+        """True si el libro (y el par, si se da usuario_id) ya están en memoria"""
+        with self.lock:
+            return codigo_libro in self.disponibles and (
+                usuario_id is None or (codigo_libro, usuario_id) in self.abiertos)
+
+    def cargar(self, codigo_libro, usuario_id=None):
+        """
+        Lee de MySQL el libro (y los préstamos abiertos del par) junto con el lsn
+        aplicado, en la misma instantánea, y le suma lo pendiente del diario.
+        Si ya están en memoria no toca MySQL.
+        Se llama con el lock tomado: el aplicador no puede quitar pendientes a la vez.
+        """
+        if self.en_cache(codigo_libro, usuario_id):
+            return
+        if len(self.disponibles) > LIMITE_CACHE:
+            self.disponibles.clear()
+            self.nombres.clear()
+            self.abiertos.clear()
+        conexion = self.conectar()
+        try:
+            cursor = conexion.cursor()
+            cursor.execute("START TRANSACTION WITH CONSISTENT SNAPSHOT, READ ONLY")
+            cursor.execute("SELECT lsn FROM diario_aplicado WHERE sede = %s", (self.sede,))
+            fila = cursor.fetchone()
+            lsn_aplicado = fila[0] if fila else 0
+            if codigo_libro not in self.disponibles:
+                cursor.execute("SELECT nombre, ejemplares_disponibles FROM libros WHERE codigo = %s",
+                               (codigo_libro,))
+                fila = cursor.fetchone()
+                if fila is None:
+                    conexion.rollback()
+                    return
+                self.nombres[codigo_libro] = fila[0]
+                self.disponibles[codigo_libro] = fila[1] + self.pendiente(('libro', codigo_libro), lsn_aplicado)
+            par = (codigo_libro, usuario_id)
+            if usuario_id is not None and par not in self.abiertos:
+                cursor.execute("""
+                    SELECT COUNT(*) FROM prestamos
+                    WHERE codigo_libro = %s AND usuario_id = %s AND estado IN ('ACTIVO', 'VENCIDO')
+                """, par)
+                self.abiertos[par] = cursor.fetchone()[0] + self.pendiente(('par', par), lsn_aplicado)
+            conexion.rollback()
+            cursor.close()
+        finally:
+            conexion.close()
+
+    def reservar(self, codigo_libro, usuario_id, operacion, registrar):
+        """
+        Valida la operación contra el inventario y, si procede, la registra en el
+        diario con registrar(); validación y registro son atómicos
+
+        Returns:
+            dict | None: Respuesta de rechazo, o None si se registró
+        """
+        with self.lock:
+            self.cargar(codigo_libro, usuario_id)
+            if codigo_libro not in self.disponibles:
+                return {'estado': 'ERROR', 'mensaje': f'Libro {codigo_libro} no encontrado'}
+            if operacion == 'TRANSACCION_PRESTAMO' and self.disponibles[codigo_libro] <= 0:
+                return {'estado': 'RECHAZADO', 'mensaje': 'Libro no disponible'}
+            if operacion == 'UPDATE_DEVOLUCION' and self.abiertos[(codigo_libro, usuario_id)] <= 0:
+                return {
+                    'estado': 'ERROR',
+                    'mensaje': f'No hay préstamo activo del libro {codigo_libro} para el usuario {usuario_id}'
+                }
+            registrar()
+        return None
+
+    def disponibles_de(self, codigo_libro):
+        """Ejemplares disponibles según el inventario (None si el libro no existe)"""
+        with self.lock:
+            self.cargar(codigo_libro)
+            return self.disponibles.get(codigo_libro)
+
+    def nombre(self, codigo_libro):
+        with self.lock:
+            return self.nombres.get(codigo_libro, 'Desconocido')
+
+
+class AplicadorDiario(threading.Thread):
+    def __init__(self, sede, diario, inventario, conectar, pendientes=(), lote=LOTE_APLICACION,
+                 metricas=None):
+        """
+        Args:
+            sede: Sede del GA
+            diario: Diario ya abierto
+            inventario: InventarioDiario del GA
+            conectar: Función sin argumentos que devuelve una conexión a la BD de la sede
+            pendientes: Registros releídos del diario al arrancar
+            lote: Registros por transacción
+            metricas: Registro Metricas (opcional)
+        """
+        super().__init__(name=f"diario-sede{sede}", daemon=True)
+        self.sede = sede
+        self.diario = diario
+        self.inventario = inventario
+        self.conectar = conectar
+        self.lote = lote
+        self.metricas = metricas
+        self.cola = list(pendientes)
+        self.aplicado = 0
+        self.conflictos = 0
+        self.detenido = False
+        self.condicion = threading.Condition()
+        if self.metricas:
+            self.metricas.registrar_gauge('diario_pendientes', lambda: len(self.cola))
+
+    def encolar(self, registro):
+        with self.condicion:
+            self.cola.append(registro)
+            self.condicion.notify_all()
+
+    def esperar(self, lsn, timeout_s):
+        """Espera a que MySQL tenga aplicado hasta lsn; False si vence el timeout"""
+        with self.condicion:
+            return self.condicion.wait_for(lambda: self.aplicado >= lsn, timeout_s)
+
+    def conflicto(self, registro, motivo):
+        """MySQL no coincide con el inventario (p. ej. cambios hechos por fuera del GA)"""
+        self.conflictos += 1
+        print(f"[Diario-Sede{self.sede}] ⚠ Registro {registro['lsn']} ({registro['operacion']}) "
+              f"no aplicable: {motivo}")
+        if self.metricas:
+            self.metricas.incrementar('diario_conflictos_total', operacion=registro['operacion'])
+
+    def aplicar_registro(self, cursor, registro):
+        """
+        Mismas sentencias que el modo síncrono, con la fecha del registro
+
+        Returns:
+            bool: False si el registro es un conflicto (hay que volver al savepoint)
+        """
+        operacion = registro['operacion']
+        fecha = registro['fecha']
+        if operacion == 'TRANSACCION_PRESTAMO':
+            cursor.execute("""
+                UPDATE libros
+                SET ejemplares_disponibles = ejemplares_disponibles - 1, fecha_ultima_actualizacion = NOW()
+                WHERE codigo = %s AND ejemplares_disponibles > 0
+            """, (registro['codigo_libro'],))
+            if cursor.rowcount == 0:
+                self.conflicto(registro, 'libro sin ejemplares disponibles en BD')
+                return False
+            cursor.execute("""
+                INSERT INTO prestamos
+                (codigo_libro, usuario_id, fecha_prestamo, fecha_entrega, renovaciones, estado, sede)
+                VALUES (%s, %s, %s, %s, 0, 'ACTIVO', %s)
+            """, (registro['codigo_libro'], registro['usuario_id'], registro['fecha_prestamo'],
+                  registro['fecha_entrega'], self.sede))
+            datos_adicionales = json.dumps({'prestamo_id': cursor.lastrowid,
+                                            'fecha_entrega': registro['fecha_entrega']})
+            cursor.execute("""
+                INSERT INTO historial_operaciones
+                (codigo_libro, usuario_id, operacion, fecha, sede, datos_adicionales)
+                VALUES (%s, %s, 'PRESTAMO', %s, %s, %s)
+            """, (registro['codigo_libro'], registro['usuario_id'], fecha, self.sede, datos_adicionales))
+        elif operacion == 'UPDATE_DEVOLUCION':
+            cursor.execute("""
+                UPDATE libros
+                SET ejemplares_disponibles = ejemplares_disponibles + 1, fecha_ultima_actualizacion = NOW()
+                WHERE codigo = %s
+            """, (registro['codigo_libro'],))
+            cursor.execute("""
+                SELECT id FROM prestamos
+                WHERE codigo_libro = %s AND usuario_id = %s AND estado IN ('ACTIVO', 'VENCIDO')
+                ORDER BY fecha_prestamo, id
+                LIMIT 1
+                FOR UPDATE
+            """, (registro['codigo_libro'], registro['usuario_id']))
+            prestamo = cursor.fetchone()
+            if prestamo is None:
+                # El +1 de libros ya se ejecutó: aplicar_lote lo deshace con el savepoint
+                self.conflicto(registro, 'sin préstamo abierto en BD')
+                return False
+            cursor.execute("""
+                UPDATE prestamos SET estado = 'DEVUELTO', fecha_devolucion_real = %s WHERE id = %s
+            """, (fecha, prestamo[0]))
+        elif operacion == 'INSERT_HISTORIAL':
+            cursor.execute("""
+                INSERT INTO historial_operaciones
+                (codigo_libro, usuario_id, operacion, fecha, sede, datos_adicionales)
+                VALUES (%s, %s, %s, %s, %s, %s)
+            """, (registro['codigo_libro'], registro['usuario_id'], registro['tipo_operacion'],
+                  fecha, self.sede, registro.get('datos_adicionales')))
+        if registro.get('id_peticion'):
+            cursor.execute(
+                "INSERT IGNORE INTO peticiones_procesadas (id_peticion, operacion, respuesta) VALUES (%s, %s, %s)",
+                (registro['id_peticion'], operacion, json.dumps(registro['respuesta'], default=str))
+            )
+        return True
+
+    def aplicar_lote(self, conexion, lote):
+        cursor = conexion.cursor()
+        conexion.start_transaction()
+        for registro in lote:
+            cursor.execute("SAVEPOINT registro")
+            try:
+                if not self.aplicar_registro(cursor, registro):
+                    # Conflicto: nada del registro queda en el lote
+                    cursor.execute("ROLLBACK TO SAVEPOINT registro")
+            except (mysql.connector.DataError, mysql.connector.IntegrityError) as e:
+                # Un registro que MySQL nunca aceptará no debe frenar al resto
+                cursor.execute("ROLLBACK TO SAVEPOINT registro")
+                self.conflicto(registro, e)
+        cursor.execute("""
+            INSERT INTO diario_aplicado (sede, lsn) VALUES (%s, %s)
+            ON DUPLICATE KEY UPDATE lsn = VALUES(lsn)
+        """, (self.sede, lote[-1]['lsn']))
+        conexion.commit()
+        cursor.close()
+
+    def leer_aplicado(self, conexion):
+        cursor = conexion.cursor()
+        cursor.execute("SELECT lsn FROM diario_aplicado WHERE sede = %s", (self.sede,))
+        fila = cursor.fetchone()
+        cursor.close()
+        conexion.rollback()
+        return fila[0] if fila else 0
+
+    def confirmar(self, registros, lsn):
+        """Registros ya en MySQL: fuera de la cola, del inventario pendiente y del disco"""
+        self.inventario.aplicados(registros)
+        with self.condicion:
+            self.cola = self.cola[len(registros):]
+            self.aplicado = lsn
+            self.condicion.notify_all()
+        self.diario.liberar_hasta(lsn)
+        if self.metricas and registros:
+            self.metricas.incrementar('diario_aplicados_total', len(registros))
+
+    def run(self):
+        conexion = None
+        inicial = True
+        en_falla = False
+        while not self.detenido:
+            try:
+                if conexion is None:
+                    conexion = self.conectar()
+                if inicial:
+                    # Lo que ya está en MySQL no se vuelve a aplicar
+                    aplicado = self.leer_aplicado(conexion)
+                    self.diario.continuar_desde(aplicado + 1)
+                    with self.condicion:
+                        ya_aplicados = [r for r in self.cola if r['lsn'] <= aplicado]
+                    self.confirmar(ya_aplicados, max(aplicado, self.aplicado))
+                    if self.cola:
+                        print(f"[Diario-Sede{self.sede}] {len(self.cola)} registros pendientes desde el lsn {aplicado}")
+                    inicial = False
+                with self.condicion:
+                    self.condicion.wait_for(lambda: self.cola or self.detenido)
+                    lote = self.cola[:self.lote]
+                if not lote:
+                    continue
+                self.aplicar_lote(conexion, lote)
+                self.confirmar(lote, lote[-1]['lsn'])
+                if en_falla:
+                    print(f"[Diario-Sede{self.sede}] ✓ Aplicación a MySQL restablecida")
+                    en_falla = False
+            except mysql.connector.Error as e:
+                if not en_falla:
+                    print(f"[Diario-Sede{self.sede}] ⚠ No se pudo aplicar a MySQL: {e} "
+                          f"(reintentos cada {ESPERA_REINTENTO_S}s)")
+                    en_falla = True
+                if conexion is not None:
+                    try:
+                        conexion.close()
+                    except mysql.connector.Error:
+                        pass
+                    conexion = None
+                time.sleep(ESPERA_REINTENTO_S)
+        if conexion is not None:
+            conexion.close()
+
+    def detener(self):
+        with self.condicion:
+            self.detenido = True
+            self.condicion.notify_all()
+
+
+def nuevo_registro(operacion, respuesta, id_peticion=None, **datos):
+    """Registro del diario con la fecha de aceptación (la que se guarda en MySQL)"""
+    registro = {'operacion': operacion, 'fecha': datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+                'respuesta': respuesta, **datos}
+    if id_peticion:
+        registro['id_peticion'] = id_peticion
+    return registro
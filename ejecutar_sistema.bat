@@ -52,18 +52,38 @@ REM Iniciar contenedor MySQL
 echo [SETUP] Iniciando contenedor MySQL...
 docker-compose up -d
 
-echo [SETUP] Esperando a que MySQL este listo (30 segundos)...
-timeout /t 30 /nobreak >nul
+echo [SETUP] Esperando a que MySQL este listo...
+set INTENTOS=0
+:esperar_mysql
+python -c "import mysql.connector; mysql.connector.connect(host='localhost', port=3306, user='biblioteca_user', password='biblioteca_pass').close()" >nul 2>&1
+if not errorlevel 1 goto mysql_listo
+set /a INTENTOS+=1
+if %INTENTOS% geq 90 (
+    echo [ERROR] MySQL no respondio en 90 segundos
+    goto fin
+)
+timeout /t 1 /nobreak >nul
+goto esperar_mysql
+:mysql_listo
 
 REM Generar datos iniciales
 echo [SETUP] Generando datos iniciales...
-python generar_datos_iniciales.py localhost 3306
+python generar_datos_inic.py localhost 3306
 
 if errorlevel 1 (
     echo [ERROR] Fallo la generacion de datos
     goto fin
 )
 
+REM Aplicar migraciones de esquema (indices compuestos)
+echo [SETUP] Aplicando migraciones de esquema...
+python migraciones.py migrar
+
+if errorlevel 1 (
+    echo [ERROR] Fallaron las migraciones
+    goto fin
+)
+
 echo.
 echo [SETUP] Sistema configurado correctamente
 echo.
@@ -73,75 +93,35 @@ echo   2. En computadora 2: ejecutar_sistema.bat ps
 goto fin
 
 :sede1
-echo [SEDE1] Iniciando Gestor de Carga y Actores...
+echo [SEDE1] Iniciando GA, Actores y Gestor de Carga...
 echo.
 
 set /p MYSQL_HOST="Host de MySQL [localhost]: "
 if "%MYSQL_HOST%"=="" set MYSQL_HOST=localhost
 
 echo.
-echo [SEDE1] Iniciando componentes...
+echo [SEDE1] Iniciando componentes (config_sede1.json)...
 echo Presiona Ctrl+C para detener
 echo.
 
-REM Iniciar Gestor de Carga
-echo [SEDE1] Gestor de Carga (puerto 5555/5556)
-start "GC-Sede1" python gestor_carga.py 1 5555 5556
-
-timeout /t 2 /nobreak >nul
-
-REM Iniciar Actores
-echo [SEDE1] Actor DEVOLUCION
-start "Actor-Dev-Sede1" python actor.py DEVOLUCION 1 localhost 5556 %MYSQL_HOST% 3306
-
-timeout /t 1 /nobreak >nul
-
-echo [SEDE1] Actor RENOVACION
-start "Actor-Ren-Sede1" python actor.py RENOVACION 1 localhost 5556 %MYSQL_HOST% 3306
-
-echo.
-echo [SEDE1] Todos los componentes iniciados
-echo.
-echo Ventanas abiertas:
-echo   - Gestor de Carga Sede 1
-echo   - Actor Devolucion Sede 1
-echo   - Actor Renovacion Sede 1
+REM El lanzador arranca todo en paralelo y espera la sonda LISTO de cada componente
+python lanzador.py config_sede1.json --mysql-host %MYSQL_HOST%
 goto fin
 
 :sede2
-echo [SEDE2] Iniciando Gestor de Carga y Actores...
+echo [SEDE2] Iniciando GA, Actores y Gestor de Carga...
 echo.
 
 set /p MYSQL_HOST="Host de MySQL [localhost]: "
 if "%MYSQL_HOST%"=="" set MYSQL_HOST=localhost
 
 echo.
-echo [SEDE2] Iniciando componentes...
+echo [SEDE2] Iniciando componentes (config_sede2.json)...
 echo Presiona Ctrl+C para detener
 echo.
 
-REM Iniciar Gestor de Carga
-echo [SEDE2] Gestor de Carga (puerto 5557/5558)
-start "GC-Sede2" python gestor_carga.py 2 5557 5558
-
-timeout /t 2 /nobreak >nul
-
-REM Iniciar Actores
-echo [SEDE2] Actor DEVOLUCION
-start "Actor-Dev-Sede2" python actor.py DEVOLUCION 2 localhost 5558 %MYSQL_HOST% 3306
-
-timeout /t 1 /nobreak >nul
-
-echo [SEDE2] Actor RENOVACION
-start "Actor-Ren-Sede2" python actor.py RENOVACION 2 localhost 5558 %MYSQL_HOST% 3306
-
-echo.
-echo [SEDE2] Todos los componentes iniciados
-echo.
-echo Ventanas abiertas:
-echo   - Gestor de Carga Sede 2
-echo   - Actor Devolucion Sede 2
-echo   - Actor Renovacion Sede 2
+REM El lanzador arranca todo en paralelo y espera la sonda LISTO de cada componente
+python lanzador.py config_sede2.json --mysql-host %MYSQL_HOST%
 goto fin
 
 :ps
@@ -157,7 +137,7 @@ if "%GC_HOST%"=="" set GC_HOST=localhost
 if "%SEDE%"=="1" (
     set GC_PORT=5555
 ) else (
-    set GC_PORT=5557
+    set GC_PORT=5565
 )
 
 set /p ARCHIVO="Archivo de peticiones [peticiones.txt]: "
@@ -48,23 +48,30 @@ setup() {
     echo -e "${BLUE}[SETUP]${NC} Iniciando contenedor MySQL..."
     docker-compose up -d
     
-    echo -e "${YELLOW}[SETUP]${NC} Esperando a que MySQL esté listo (30 segundos)..."
-    sleep 30
-    
-    # Verificar conexión
-    echo -e "${BLUE}[SETUP]${NC} Verificando conexión a BD..."
-    python3 test_sistema.py localhost 3306 > /dev/null 2>&1
-    
-    if [ $? -eq 0 ]; then
+    # Esperar a que MySQL acepte conexiones del usuario de la aplicación
+    # (consulta cada segundo, máximo 90 s; no una espera fija)
+    echo -e "${YELLOW}[SETUP]${NC} Esperando a que MySQL esté listo..."
+    MYSQL_LISTO=0
+    for intento in $(seq 1 90); do
+        if python3 -c "import mysql.connector; mysql.connector.connect(host='localhost', port=3306, user='biblioteca_user', password='biblioteca_pass').close()" > /dev/null 2>&1; then
+            MYSQL_LISTO=1
+            break
+        fi
+        sleep 1
+    done
+    
+    if [ $MYSQL_LISTO -eq 1 ]; then
         echo -e "${GREEN}[SETUP]${NC} ✓ MySQL está listo"
     else
-        echo -e "${YELLOW}[SETUP]${NC} Esperando 15 segundos más..."
-        sleep 15
+        echo -e "${RED}[ERROR]${NC} MySQL no respondió en 90 segundos"
+        exit 1
     fi
     
     # Generar datos iniciales
     echo -e "${BLUE}[SETUP]${NC} Generando datos iniciales..."
-    python3 generar_datos_iniciales.py localhost 3306
+    python3 generar_datos_inic.py localhost 3306 && \
+        echo -e "${BLUE}[SETUP]${NC} Aplicando migraciones de esquema..." && \
+        python3 migraciones.py migrar
     
     if [ $? -eq 0 ]; then
         echo -e "${GREEN}[SETUP]${NC} ✓ Sistema configurado correctamente"
@@ -79,83 +86,37 @@ setup() {
 }
 
 # Función para iniciar Sede 1
+# El lanzador arranca GA, Actores y GC en paralelo y espera la sonda LISTO de cada uno
 sede1() {
-    echo -e "${BLUE}[SEDE1]${NC} Iniciando Gestor de Carga y Actores..."
+    echo -e "${BLUE}[SEDE1]${NC} Iniciando GA, Actores y Gestor de Carga..."
     
     # Verificar host de MySQL
     read -p "Host de MySQL [localhost]: " MYSQL_HOST
     MYSQL_HOST=${MYSQL_HOST:-localhost}
     
     echo ""
-    echo -e "${GREEN}[SEDE1]${NC} Iniciando componentes..."
+    echo -e "${GREEN}[SEDE1]${NC} Iniciando componentes (config_sede1.json)..."
     echo "Presiona Ctrl+C para detener todos los procesos"
     echo ""
     
-    # Función para manejar Ctrl+C
-    trap 'echo -e "\n${YELLOW}[SEDE1]${NC} Deteniendo todos los procesos..."; kill 0' SIGINT
-    
-    # Iniciar Gestor de Carga
-    echo -e "${BLUE}[SEDE1]${NC} → Gestor de Carga (puerto 5555/5556)"
-    python3 gestor_carga.py 1 5555 5556 &
-    
-    sleep 2
-    
-    # Iniciar Actor Devolución
-    echo -e "${BLUE}[SEDE1]${NC} → Actor DEVOLUCIÓN"
-    python3 actor.py DEVOLUCION 1 localhost 5556 $MYSQL_HOST 3306 &
-    
-    sleep 1
-    
-    # Iniciar Actor Renovación
-    echo -e "${BLUE}[SEDE1]${NC} → Actor RENOVACIÓN"
-    python3 actor.py RENOVACION 1 localhost 5556 $MYSQL_HOST 3306 &
-    
-    echo ""
-    echo -e "${GREEN}[SEDE1]${NC} ✓ Todos los componentes iniciados"
-    echo ""
-    
-    # Esperar
-    wait
+    python3 lanzador.py config_sede1.json --mysql-host $MYSQL_HOST
 }
 
 # Función para iniciar Sede 2
+# El lanzador arranca GA, Actores y GC en paralelo y espera la sonda LISTO de cada uno
 sede2() {
-    echo -e "${BLUE}[SEDE2]${NC} Iniciando Gestor de Carga y Actores..."
+    echo -e "${BLUE}[SEDE2]${NC} Iniciando GA, Actores y Gestor de Carga..."
     
     # Verificar host de MySQL
     read -p "Host de MySQL [localhost]: " MYSQL_HOST
     MYSQL_HOST=${MYSQL_HOST:-localhost}
     
     echo ""
-    echo -e "${GREEN}[SEDE2]${NC} Iniciando componentes..."
+    echo -e "${GREEN}[SEDE2]${NC} Iniciando componentes (config_sede2.json)..."
     echo "Presiona Ctrl+C para detener todos los procesos"
     echo ""
     
-    # Función para manejar Ctrl+C
-    trap 'echo -e "\n${YELLOW}[SEDE2]${NC} Deteniendo todos los procesos..."; kill 0' SIGINT
-    
-    # Iniciar Gestor de Carga
-    echo -e "${BLUE}[SEDE2]${NC} → Gestor de Carga (puerto 5557/5558)"
-    python3 gestor_carga.py 2 5557 5558 &
-    
-    sleep 2
-    
-    # Iniciar Actor Devolución
-    echo -e "${BLUE}[SEDE2]${NC} → Actor DEVOLUCIÓN"
-    python3 actor.py DEVOLUCION 2 localhost 5558 $MYSQL_HOST 3306 &
-    
-    sleep 1
-    
-    # Iniciar Actor Renovación
-    echo -e "${BLUE}[SEDE2]${NC} → Actor RENOVACIÓN"
-    python3 actor.py RENOVACION 2 localhost 5558 $MYSQL_HOST 3306 &
-    
-    echo ""
-    echo -e "${GREEN}[SEDE2]${NC} ✓ Todos los componentes iniciados"
-    echo ""
-    
-    # Esperar
-    wait
+    python3 lanzador.py config_sede2.json --mysql-host $MYSQL_HOST
 }
 
 # Función para iniciar Proceso Solicitante
@@ -175,7 +136,7 @@ ps() {
     if [ "$SEDE" = "1" ]; then
         GC_PORT=5555
     else
-        GC_PORT=5557
+        GC_PORT=5565
     fi
     
     # Archivo de peticiones
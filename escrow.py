@@ -0,0 +1,284 @@
+"""
+Escrow de inventario para los libros más pedidos
+Un título con pocos ejemplares y cientos de pedidos simultáneos convierte su
+fila de libros en un punto de contención: cada préstamo la bloquea con
+UPDATE ... WHERE ejemplares_disponibles > 0. Con el escrow el GA:
+
+- detecta los libros calientes por ventana de tiempo con memoria acotada
+  (contadores Space-Saving, como mucho MAX_CANDIDATOS libros observados)
+- adopta cada libro caliente: en una transacción pasa sus ejemplares
+  disponibles de libros a escrow_libros, y desde ahí el saldo en memoria es
+  el que manda
+- concede o rechaza los préstamos de esos libros contra el saldo en memoria;
+  la transacción del préstamo no toca la fila de libros, solo agrega un
+  movimiento (-1) en escrow_consumos (la devolución agrega +1)
+- cada INTERVALO_VOLCADO_S vuelca los movimientos en escrow_libros en una
+  transacción por lote y libera los libros que se enfriaron (sus ejemplares
+  vuelven a libros)
+
+En todo momento, por libro:
+
+    ejemplares_totales - ejemplares_disponibles - (escrow_libros.ejemplares
+        + SUM(escrow_consumos.delta)) = préstamos no devueltos
+
+que es el invariante que comprueba verificar_consistencia.py. Las tablas se
+crean con la migración v5 de migraciones.py.
+"""
+import mysql.connector
+import threading
+import time
+
+UMBRAL_DEFECTO = 20            # pedidos de préstamo por ventana para adoptar un libro
+VENTANA_DEFECTO_S = 10.0
+MAX_CALIENTES_DEFECTO = 32     # libros en escrow a la vez
+MAX_CANDIDATOS = 1024          # contadores del detector
+INTERVALO_VOLCADO_S = 1.0
+ESPERA_REINTENTO_S = 1.0
+
+
+class DetectorCalientes:
+    """Libros más pedidos de la ventana con memoria acotada (algoritmo Space-Saving)"""
+
+    def __init__(self, capacidad=MAX_CANDIDATOS):
+        self.capacidad = capacidad
+        self.conteos = {}
+
+    def observar(self, codigo):
+        if codigo in self.conteos:
+            self.conteos[codigo] += 1
+        elif len(self.conteos) < self.capacidad:
+            self.conteos[codigo] = 1
+        else:
+            # Reemplaza al menos pedido y hereda su cuenta (cota superior del error)
+            minimo = min(self.conteos, key=self.conteos.get)
+            self.conteos[codigo] = self.conteos.pop(minimo) + 1
+
+    def cerrar_ventana(self):
+        """Devuelve los conteos de la ventana y empieza una nueva"""
+        conteos, self.conteos = self.conteos, {}
+        return conteos
+
+
+class EscrowInventario(threading.Thread):
+    def __init__(self, sede, conectar, umbral=UMBRAL_DEFECTO, ventana_s=VENTANA_DEFECTO_S,
+                 max_calientes=MAX_CALIENTES_DEFECTO, intervalo_s=INTERVALO_VOLCADO_S, metricas=None):
+        """
+        Args:
+            sede: Sede del GA
+            conectar: Función sin argumentos que devuelve una conexión a la BD de la sede
+            umbral: Pedidos de préstamo por ventana a partir de los cuales un libro se adopta
+            ventana_s: Duración de la ventana de detección
+            max_calientes: Libros en escrow a la vez
+            intervalo_s: Segundos entre volcados de movimientos
+            metricas: Registro Metricas (opcional)
+        """
+        super().__init__(name=f"escrow-sede{sede}", daemon=True)
+        self.sede = sede
+        self.conectar = conectar
+        self.umbral = max(1, int(umbral))
+        self.ventana_s = ventana_s
+        self.max_calientes = max_calientes
+        self.intervalo_s = intervalo_s
+        self.metricas = metricas
+        self.detector = DetectorCalientes()
+        self.bloqueo_detector = threading.Lock()
+        self.inicio_ventana = time.monotonic()
+        # codigo -> ejemplares disponibles en escrow (autoritativo mientras el libro está adoptado)
+        self.saldos = {}
+        # El GA lo toma durante toda la transacción de un libro en escrow: adoptar,
+        # volcar y liberar nunca se intercalan con un préstamo a medio confirmar
+        self.bloqueo = threading.RLock()
+        self.detenido = threading.Event()
+        if self.metricas:
+            self.metricas.registrar_gauge('escrow_libros', lambda: len(self.saldos))
+
+    def observar(self, codigo):
+        """Cuenta un pedido de préstamo para la detección de libros calientes"""
+        with self.bloqueo_detector:
+            self.detector.observar(codigo)
+
+    def contiene(self, codigo):
+        return codigo in self.saldos
+
+    def saldo(self, codigo):
+        """Ejemplares del libro en escrow (0 si no está adoptado)"""
+        return self.saldos.get(codigo, 0)
+
+    def consumir(self, cursor, codigo, delta):
+        """
+        Registra un movimiento del saldo dentro de la transacción del GA
+        (llamar con el bloqueo tomado; el saldo en memoria se ajusta con ajustar()
+        después del commit)
+        """
+        cursor.execute(
+            "INSERT INTO escrow_consumos (codigo_libro, delta) VALUES (%s, %s)",
+            (codigo, delta)
+        )
+
+    def ajustar(self, codigo, delta):
+        self.saldos[codigo] += delta
+
+    def reanudar(self, conexion):
+        """Al arrancar, retoma los libros que quedaron en escrow (saldo = escrow + movimientos)"""
+        cursor = conexion.cursor()
+        cursor.execute("""
+            SELECT e.codigo, e.ejemplares + COALESCE(SUM(c.delta), 0)
+            FROM escrow_libros e
+            LEFT JOIN escrow_consumos c ON c.codigo_libro = e.codigo
+            WHERE e.sede = %s
+            GROUP BY e.codigo, e.ejemplares
+        """, (self.sede,))
+        filas = cursor.fetchall()
+        cursor.close()
+        conexion.commit()
+        with self.bloqueo:
+            self.saldos = {codigo: int(saldo) for codigo, saldo in filas}
+        if filas:
+            print(f"[Escrow-Sede{self.sede}] {len(filas)} libros retomados en escrow")
+
+    def adoptar(self, conexion, codigo):
+        """Pasa los ejemplares disponibles del libro de libros a escrow_libros"""
+        cursor = conexion.cursor()
+        try:
+            conexion.start_transaction()
+            cursor.execute("SELECT ejemplares_disponibles FROM libros WHERE codigo = %s FOR UPDATE", (codigo,))
+            fila = cursor.fetchone()
+            if fila is None:
+                conexion.rollback()
+                return
+            cursor.execute("""
+                UPDATE libros
+                SET ejemplares_disponibles = 0, fecha_ultima_actualizacion = NOW()
+                WHERE codigo = %s
+            """, (codigo,))
+            cursor.execute(
+                "INSERT INTO escrow_libros (codigo, sede, ejemplares) VALUES (%s, %s, %s)",
+                (codigo, self.sede, fila[0])
+            )
+            conexion.commit()
+        except mysql.connector.Error:
+            conexion.rollback()
+            raise
+        finally:
+            cursor.close()
+        self.saldos[codigo] = int(fila[0])
+        if self.metricas:
+            self.metricas.incrementar('escrow_adopciones_total')
+        print(f"[Escrow-Sede{self.sede}] Libro {codigo} adoptado ({fila[0]} ejemplares en memoria)")
+
+    def volcar_libro(self, cursor, codigo):
+        """Suma los movimientos pendientes del libro en escrow_libros y los borra"""
+        cursor.execute(
+            "SELECT COALESCE(SUM(delta), 0), MAX(id) FROM escrow_consumos WHERE codigo_libro = %s",
+            (codigo,)
+        )
+        suma, ultimo_id = cursor.fetchone()
+        if ultimo_id is None:
+            return 0
+        cursor.execute("UPDATE escrow_libros SET ejemplares = ejemplares + %s WHERE codigo = %s",
+                       (int(suma), codigo))
+        cursor.execute("DELETE FROM escrow_consumos WHERE codigo_libro = %s AND id <= %s",
+                       (codigo, ultimo_id))
+        return cursor.rowcount
+
+    def volcar(self, conexion):
+        """Vuelca los movimientos de todos los libros en escrow en una transacción"""
+        with self.bloqueo:
+            if not self.saldos:
+                return 0
+            cursor = conexion.cursor()
+            try:
+                volcados = sum(self.volcar_libro(cursor, codigo) for codigo in list(self.saldos))
+                conexion.commit()
+            except mysql.connector.Error:
+                conexion.rollback()
+                raise
+            finally:
+                cursor.close()
+        if volcados and self.metricas:
+            self.metricas.incrementar('escrow_movimientos_volcados_total', volcados)
+        return volcados
+
+    def liberar(self, conexion, codigo):
+        """Devuelve a libros los ejemplares en escrow del libro y lo saca del escrow"""
+        with self.bloqueo:
+            cursor = conexion.cursor()
+            try:
+                conexion.start_transaction()
+                self.volcar_libro(cursor, codigo)
+                cursor.execute("SELECT ejemplares FROM escrow_libros WHERE codigo = %s FOR UPDATE", (codigo,))
+                fila = cursor.fetchone()
+                if fila is not None:
+                    cursor.execute("""
+                        UPDATE libros
+                        SET ejemplares_disponibles = ejemplares_disponibles + %s,
+                            fecha_ultima_actualizacion = NOW()
+                        WHERE codigo = %s
+                    """, (fila[0], codigo))
+                    cursor.execute("DELETE FROM escrow_libros WHERE codigo = %s", (codigo,))
+                conexion.commit()
+            except mysql.connector.Error:
+                conexion.rollback()
+                raise
+            finally:
+                cursor.close()
+            del self.saldos[codigo]
+        if self.metricas:
+            self.metricas.incrementar('escrow_liberaciones_total')
+        print(f"[Escrow-Sede{self.sede}] Libro {codigo} liberado ({fila[0] if fila else 0} ejemplares a libros)")
+
+    def revisar(self, conexion):
+        """Fin de ventana: adopta los libros calientes y libera los que se enfriaron"""
+        with self.bloqueo_detector:
+            conteos = self.detector.cerrar_ventana()
+        self.inicio_ventana = time.monotonic()
+        with self.bloqueo:
+            enfriados = [c for c in self.saldos if conteos.get(c, 0) < self.umbral // 2]
+        for codigo in enfriados:
+            self.liberar(conexion, codigo)
+
+        calientes = sorted((c for c, n in conteos.items() if n >= self.umbral and c not in self.saldos),
+                           key=conteos.get, reverse=True)
+        for codigo in calientes[:max(0, self.max_calientes - len(self.saldos))]:
+            with self.bloqueo:
+                self.adoptar(conexion, codigo)
+
+    def run(self):
+        conexion = None
+        inicial = True
+        en_falla = False
+        while not self.detenido.is_set():
+            try:
+                if conexion is None:
+                    conexion = self.conectar()
+                if inicial:
+                    self.reanudar(conexion)
+                    inicial = False
+                self.volcar(conexion)
+                if time.monotonic() - self.inicio_ventana >= self.ventana_s:
+                    self.revisar(conexion)
+                if en_falla:
+                    print(f"[Escrow-Sede{self.sede}] ✓ Conexión a MySQL restablecida")
+                    en_falla = False
+                self.detenido.wait(self.intervalo_s)
+            except mysql.connector.Error as e:
+                if not en_falla:
+                    print(f"[Escrow-Sede{self.sede}] ⚠ No se pudo volcar el escrow: {e} "
+                          f"(reintentos cada {ESPERA_REINTENTO_S}s)")
+                    en_falla = True
+                if conexion is not None:
+                    try:
+                        conexion.close()
+                    except mysql.connector.Error:
+                        pass
+                    conexion = None
+                self.detenido.wait(ESPERA_REINTENTO_S)
+        if conexion is not None:
+            try:
+                self.volcar(conexion)
+            except mysql.connector.Error:
+                pass
+            conexion.close()
+
+    def detener(self):
+        self.detenido.set()
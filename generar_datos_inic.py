@@ -1,10 +1,21 @@
 """
 Script para generar datos iniciales en la Base de Datos
-Carga 1000 libros (50 prestados en sede 1, 150 en sede 2)
+Carga 1000 libros (50 prestados en sede 1, 150 en sede 2) por defecto.
+
+Para pruebas de volumen acepta --libros N y --prestamos N (millones de filas):
+- Inserción por lotes multi-fila (executemany) o CSV + LOAD DATA LOCAL INFILE
+- Índices secundarios eliminados durante la carga y reconstruidos al final
+- Ambas sedes se cargan en paralelo (un proceso por sede)
 """
 import mysql.connector
 from datetime import datetime, timedelta
+import multiprocessing
+import argparse
 import random
+import time
+import csv
+import os
+import tempfile
 
 # Datos de ejemplo para generar libros
 AUTORES = [
@@ -26,10 +37,43 @@ CATEGORIAS = [
     "Ciencia Ficción", "Historia", "Biografía", "Filosofía", "Arte"
 ]
 
+# Préstamos por defecto de cada sede (enunciado del proyecto)
+PRESTAMOS_POR_SEDE = {1: 50, 2: 150}
+
+# Tablas que se cargan (en orden) y que se vacían con --vaciar (en orden inverso)
+TABLAS_CARGA = ['libros', 'prestamos']
+TABLAS_VACIAR = ['peticiones_procesadas', 'historial_operaciones', 'prestamos', 'libros']
+
+QUERY_LIBROS = """
+    INSERT INTO libros
+    (codigo, nombre, autor, editorial, isbn, ejemplares_totales, ejemplares_disponibles)
+    VALUES (%s, %s, %s, %s, %s, %s, %s)
+"""
+
+QUERY_PRESTAMOS = """
+    INSERT INTO prestamos
+    (codigo_libro, usuario_id, fecha_prestamo, fecha_entrega,
+     renovaciones, estado, sede)
+    VALUES (%s, %s, %s, %s, %s, 'ACTIVO', %s)
+"""
+
 class GeneradorDatos:
-    def __init__(self, host="localhost", port=3306):
+    def __init__(self, host="localhost", port=3306, semilla=2025, tam_lote=5000, modo='lotes'):
+        """
+        Inicializa el generador
+
+        Args:
+            host: Host de MySQL
+            port: Puerto de MySQL
+            semilla: Semilla base; los libros son idénticos en ambas sedes
+            tam_lote: Filas por lote (executemany / commit)
+            modo: 'lotes' (INSERT multi-fila) o 'archivo' (CSV + LOAD DATA LOCAL INFILE)
+        """
         self.host = host
         self.port = port
+        self.semilla = semilla
+        self.tam_lote = tam_lote
+        self.modo = modo
         
     def conectar(self, database):
         """Conecta a la base de datos especificada"""
@@ -38,31 +82,33 @@ class GeneradorDatos:
             port=self.port,
             user="biblioteca_user",
             password="biblioteca_pass",
-            database=database
+            database=database,
+            allow_local_infile=(self.modo == 'archivo')
         )
     
-    def generar_libros(self, cantidad=1000):
+    def generar_libros(self, cantidad=1000, inicio=1, rng=None):
         """Genera una lista de libros con datos aleatorios"""
+        rng = rng or random
         libros = []
         
-        for i in range(1, cantidad + 1):
+        for i in range(inicio, inicio + cantidad):
             # Generar código único
             codigo = f"LIB{i:05d}"
             
             # Generar título
-            categoria = random.choice(CATEGORIAS)
-            numero = random.randint(1, 999)
+            categoria = rng.choice(CATEGORIAS)
+            numero = rng.randint(1, 999)
             nombre = f"{categoria} {numero}: Historia de la Literatura"
             
             # Seleccionar autor y editorial
-            autor = random.choice(AUTORES)
-            editorial = random.choice(EDITORIALES)
+            autor = rng.choice(AUTORES)
+            editorial = rng.choice(EDITORIALES)
             
             # Generar ISBN
-            isbn = f"978-{random.randint(0, 9)}-{random.randint(1000, 9999)}-{random.randint(1000, 9999)}-{random.randint(0, 9)}"
+            isbn = f"978-{rng.randint(0, 9)}-{rng.randint(1000, 9999)}-{rng.randint(1000, 9999)}-{rng.randint(0, 9)}"
             
             # Número de ejemplares (algunos tienen 1, otros más)
-            ejemplares = random.choices([1, 2, 3, 4, 5], weights=[40, 30, 15, 10, 5])[0]
+            ejemplares = rng.choices([1, 2, 3, 4, 5], weights=[40, 30, 15, 10, 5])[0]
             
             libros.append({
                 'codigo': codigo,
@@ -76,22 +122,58 @@ class GeneradorDatos:
         
         return libros
     
-    def insertar_libros(self, sede, libros):
-        """Inserta libros en la base de datos de una sede"""
-        database = f"biblioteca_sede{sede}"
-        conexion = self.conectar(database)
-        cursor = conexion.cursor()
+    def generar_bloques(self, sede, total_libros, total_prestamos):
+        """
+        Genera libros y préstamos por bloques de tam_lote libros
         
-        query = """
-            INSERT INTO libros 
-            (codigo, nombre, autor, editorial, isbn, ejemplares_totales, ejemplares_disponibles)
-            VALUES (%s, %s, %s, %s, %s, %s, %s)
+        Los libros de cada bloque usan una semilla que no depende de la sede,
+        así cada proceso regenera el mismo catálogo sin compartir memoria.
+        Los préstamos se reparten proporcionalmente entre bloques y nunca
+        superan los ejemplares de un libro, de modo que ejemplares_disponibles
+        ya se inserta con su valor final (sin UPDATE por préstamo).
+
+        Yields:
+            tuple: (filas_libros, filas_prestamos) de cada bloque
         """
+        ahora = datetime.now()
+        asignados = 0
         
-        print(f"\n[BD] Insertando {len(libros)} libros en {database}...")
+        for inicio in range(1, total_libros + 1, self.tam_lote):
+            cantidad = min(self.tam_lote, total_libros - inicio + 1)
+            rng_libros = random.Random(f"{self.semilla}-libros-{inicio}")
+            rng_prestamos = random.Random(f"{self.semilla}-prestamos-{sede}-{inicio}")
         
-        for libro in libros:
-            cursor.execute(query, (
+            libros = self.generar_libros(cantidad, inicio, rng_libros)
+
+            # Cuota de préstamos de este bloque (acumulada para no perder redondeos)
+            objetivo = (total_prestamos * (inicio - 1 + cantidad)) // total_libros
+            cuota = objetivo - asignados
+
+            # Cada ejemplar es un "hueco" que puede ocupar un préstamo
+            huecos = [indice for indice, libro in enumerate(libros)
+                      for _ in range(libro['ejemplares_totales'])]
+            elegidos = rng_prestamos.sample(huecos, min(cuota, len(huecos)))
+            asignados += len(elegidos)
+
+            filas_prestamos = []
+            for indice in elegidos:
+                libro = libros[indice]
+                libro['ejemplares_disponibles'] -= 1
+
+                # Fecha de préstamo (entre 1 y 14 días atrás)
+                fecha_prestamo = ahora - timedelta(days=rng_prestamos.randint(1, 14))
+                fecha_entrega = fecha_prestamo + timedelta(weeks=2)
+
+                filas_prestamos.append((
+                    libro['codigo'],
+                    f"USR{rng_prestamos.randint(1000, 9999)}",
+                    fecha_prestamo.strftime('%Y-%m-%d %H:%M:%S'),
+                    fecha_entrega.strftime('%Y-%m-%d %H:%M:%S'),
+                    rng_prestamos.choice([0, 0, 0, 1, 1, 2]),
+                    sede
+                ))
+
+            filas_libros = [(
                 libro['codigo'],
                 libro['nombre'],
                 libro['autor'],
@@ -99,66 +181,171 @@ class GeneradorDatos:
                 libro['isbn'],
                 libro['ejemplares_totales'],
                 libro['ejemplares_disponibles']
-            ))
+            ) for libro in libros]
         
-        conexion.commit()
-        print(f"[BD] ✓ {len(libros)} libros insertados en {database}")
+            yield filas_libros, filas_prestamos
         
-        cursor.close()
-        conexion.close()
+    def preparar_sesion(self, cursor):
+        """Desactiva verificaciones por fila mientras dura la carga masiva"""
+        cursor.execute("SET SESSION foreign_key_checks = 0")
+        cursor.execute("SET SESSION unique_checks = 0")
     
-    def generar_prestamos(self, sede, libros, cantidad_prestamos):
-        """Genera préstamos activos para algunos libros"""
+    def vaciar_tablas(self, cursor):
+        """Vacía las tablas de datos de la sede (TRUNCATE, sin registro por fila)"""
+        for tabla in TABLAS_VACIAR:
+            cursor.execute(f"TRUNCATE TABLE {tabla}")
+
+    def eliminar_indices_secundarios(self, cursor, database, tablas=TABLAS_CARGA):
+        """
+        Elimina los índices secundarios no únicos de las tablas indicadas
+
+        Los índices requeridos por una FOREIGN KEY no se pueden eliminar y se
+        conservan. Se consultan desde information_schema para que la carga
+        siga funcionando cuando el esquema gane índices nuevos.
+
+        Returns:
+            list: (tabla, nombre, columnas) de los índices eliminados
+        """
+        cursor.execute(f"""
+            SELECT TABLE_NAME, INDEX_NAME, COLUMN_NAME, SUB_PART
+            FROM information_schema.STATISTICS
+            WHERE TABLE_SCHEMA = %s
+              AND TABLE_NAME IN ({', '.join(['%s'] * len(tablas))})
+              AND NON_UNIQUE = 1
+              AND INDEX_NAME <> 'PRIMARY'
+            ORDER BY TABLE_NAME, INDEX_NAME, SEQ_IN_INDEX
+        """, (database, *tablas))
+
+        indices = {}
+        for tabla, nombre, columna, sub_parte in cursor.fetchall():
+            definicion = f"`{columna}`({sub_parte})" if sub_parte else f"`{columna}`"
+            indices.setdefault((tabla, nombre), []).append(definicion)
+
+        eliminados = []
+        for (tabla, nombre), columnas in indices.items():
+            try:
+                cursor.execute(f"ALTER TABLE {tabla} DROP INDEX `{nombre}`")
+                eliminados.append((tabla, nombre, ', '.join(columnas)))
+            except mysql.connector.Error:
+                # Índice usado por una FOREIGN KEY: se mantiene durante la carga
+                pass
+
+        return eliminados
+
+    def reconstruir_indices(self, cursor, indices):
+        """Reconstruye los índices eliminados (un ALTER por tabla)"""
+        por_tabla = {}
+        for tabla, nombre, columnas in indices:
+            por_tabla.setdefault(tabla, []).append(f"ADD INDEX `{nombre}` ({columnas})")
+
+        for tabla, clausulas in por_tabla.items():
+            cursor.execute(f"ALTER TABLE {tabla} {', '.join(clausulas)}")
+
+    def insertar_lotes(self, conexion, cursor, bloques):
+        """Inserta los bloques con executemany (INSERT multi-fila) y commit por lote"""
+        total_libros = 0
+        total_prestamos = 0
+
+        for filas_libros, filas_prestamos in bloques:
+            cursor.executemany(QUERY_LIBROS, filas_libros)
+            if filas_prestamos:
+                cursor.executemany(QUERY_PRESTAMOS, filas_prestamos)
+            conexion.commit()
+
+            total_libros += len(filas_libros)
+            total_prestamos += len(filas_prestamos)
+
+        return total_libros, total_prestamos
+
+    def insertar_archivo(self, conexion, cursor, bloques):
+        """Escribe los bloques a CSV temporales y los carga con LOAD DATA LOCAL INFILE"""
+        total_libros = 0
+        total_prestamos = 0
+
+        directorio = tempfile.mkdtemp(prefix="biblioteca_carga_")
+        ruta_libros = os.path.join(directorio, "libros.csv")
+        ruta_prestamos = os.path.join(directorio, "prestamos.csv")
+
+        try:
+            with open(ruta_libros, 'w', newline='', encoding='utf-8') as f_libros, \
+                 open(ruta_prestamos, 'w', newline='', encoding='utf-8') as f_prestamos:
+                escritor_libros = csv.writer(f_libros)
+                escritor_prestamos = csv.writer(f_prestamos)
+
+                for filas_libros, filas_prestamos in bloques:
+                    escritor_libros.writerows(filas_libros)
+                    escritor_prestamos.writerows(filas_prestamos)
+                    total_libros += len(filas_libros)
+                    total_prestamos += len(filas_prestamos)
+
+            cursor.execute(f"""
+                LOAD DATA LOCAL INFILE '{ruta_libros}' INTO TABLE libros
+                CHARACTER SET utf8mb4
+                FIELDS TERMINATED BY ',' OPTIONALLY ENCLOSED BY '"'
+                LINES TERMINATED BY '\\r\\n'
+                (codigo, nombre, autor, editorial, isbn, ejemplares_totales, ejemplares_disponibles)
+            """)
+            cursor.execute(f"""
+                LOAD DATA LOCAL INFILE '{ruta_prestamos}' INTO TABLE prestamos
+                CHARACTER SET utf8mb4
+                FIELDS TERMINATED BY ',' OPTIONALLY ENCLOSED BY '"'
+                LINES TERMINATED BY '\\r\\n'
+                (codigo_libro, usuario_id, fecha_prestamo, fecha_entrega, renovaciones, sede)
+                SET estado = 'ACTIVO'
+            """)
+            conexion.commit()
+        finally:
+            for ruta in (ruta_libros, ruta_prestamos):
+                if os.path.exists(ruta):
+                    os.remove(ruta)
+            os.rmdir(directorio)
+
+        return total_libros, total_prestamos
+
+    def cargar_sede(self, sede, total_libros, total_prestamos, vaciar=False):
+        """
+        Carga masiva completa de una sede: índices diferidos, inserción y reconstrucción
+        """
         database = f"biblioteca_sede{sede}"
         conexion = self.conectar(database)
         cursor = conexion.cursor()
+        t_inicio = time.perf_counter()
         
-        print(f"\n[BD] Generando {cantidad_prestamos} préstamos en {database}...")
+        try:
+            self.preparar_sesion(cursor)
         
-        # Seleccionar libros al azar para prestar
-        libros_prestados = random.sample(libros, min(cantidad_prestamos, len(libros)))
+            if vaciar:
+                print(f"[BD] Vaciando tablas de {database}...")
+                self.vaciar_tablas(cursor)
         
-        for libro in libros_prestados:
-            # Generar usuario aleatorio
-            usuario_id = f"USR{random.randint(1000, 9999)}"
+            indices = self.eliminar_indices_secundarios(cursor, database)
+            print(f"[BD] {database}: {len(indices)} índices secundarios diferidos")
             
-            # Fecha de préstamo (entre 1 y 14 días atrás)
-            dias_atras = random.randint(1, 14)
-            fecha_prestamo = datetime.now() - timedelta(days=dias_atras)
-            fecha_entrega = fecha_prestamo + timedelta(weeks=2)
+            try:
+                print(f"[BD] Insertando {total_libros} libros y {total_prestamos} préstamos en {database} "
+                      f"(modo {self.modo}, lotes de {self.tam_lote})...")
+                bloques = self.generar_bloques(sede, total_libros, total_prestamos)
             
-            # Número de renovaciones (0, 1 o 2)
-            renovaciones = random.choice([0, 0, 0, 1, 1, 2])
+                if self.modo == 'archivo':
+                    libros, prestamos = self.insertar_archivo(conexion, cursor, bloques)
+                else:
+                    libros, prestamos = self.insertar_lotes(conexion, cursor, bloques)
+                t_carga = time.perf_counter()
+            except Exception:
+                # El ALTER de los índices confirmaría el lote a medias
+                conexion.rollback()
+                raise
+            finally:
+                # También si la carga falla: sin ellos el GA recorre las tablas completas
+                print(f"[BD] {database}: reconstruyendo índices...")
+                self.reconstruir_indices(cursor, indices)
+            t_fin = time.perf_counter()
             
-            # Insertar préstamo
-            query_prestamo = """
-                INSERT INTO prestamos 
-                (codigo_libro, usuario_id, fecha_prestamo, fecha_entrega, 
-                 renovaciones, estado, sede)
-                VALUES (%s, %s, %s, %s, %s, 'ACTIVO', %s)
-            """
-            cursor.execute(query_prestamo, (
-                libro['codigo'],
-                usuario_id,
-                fecha_prestamo,
-                fecha_entrega,
-                renovaciones,
-                sede
-            ))
-            
-            # Actualizar ejemplares disponibles
-            query_update = """
-                UPDATE libros 
-                SET ejemplares_disponibles = ejemplares_disponibles - 1
-                WHERE codigo = %s AND ejemplares_disponibles > 0
-            """
-            cursor.execute(query_update, (libro['codigo'],))
-        
-        conexion.commit()
-        print(f"[BD] ✓ {cantidad_prestamos} préstamos generados en {database}")
-        
-        cursor.close()
-        conexion.close()
+            print(f"[BD] ✓ {database}: {libros} libros y {prestamos} préstamos "
+                  f"(carga {t_carga - t_inicio:.1f}s, índices {t_fin - t_carga:.1f}s)")
+        finally:
+            cursor.close()
+            conexion.close()
     
     def verificar_datos(self, sede):
         """Verifica los datos insertados en una sede"""
@@ -186,32 +373,53 @@ class GeneradorDatos:
         cursor.close()
         conexion.close()
     
-    def ejecutar(self):
-        """Ejecuta la generación completa de datos"""
+    def ejecutar(self, libros=1000, prestamos=None, paralelo=True, vaciar=False):
+        """
+        Ejecuta la generación completa de datos
+
+        Args:
+            libros: Cantidad de libros (idénticos en ambas sedes)
+            prestamos: Préstamos activos por sede (None = 50 en sede 1, 150 en sede 2)
+            paralelo: Cargar ambas sedes simultáneamente (un proceso por sede)
+            vaciar: Vaciar las tablas antes de cargar
+        """
         print("="*60)
         print("GENERADOR DE DATOS INICIALES")
         print("Sistema de Préstamo de Libros - Universidad Ada Lovelace")
         print("="*60)
         
-        # Generar 1000 libros
-        print("\n[1] Generando 1000 libros...")
-        libros = self.generar_libros(1000)
-        print(f"✓ 1000 libros generados")
+        cuotas = {sede: (prestamos if prestamos is not None else cantidad)
+                  for sede, cantidad in PRESTAMOS_POR_SEDE.items()}
         
-        # Insertar en ambas sedes (datos idénticos inicialmente)
-        print("\n[2] Insertando libros en ambas sedes...")
-        self.insertar_libros(1, libros)
-        self.insertar_libros(2, libros)
+        print(f"\n[1] Cargando {libros} libros por sede "
+              f"({', '.join(f'sede {s}: {c} préstamos' for s, c in cuotas.items())})...")
+        t_inicio = time.perf_counter()
         
-        # Generar préstamos: 50 en sede 1, 150 en sede 2
-        print("\n[3] Generando préstamos...")
-        self.generar_prestamos(1, libros, 50)
-        self.generar_prestamos(2, libros, 150)
+        if paralelo:
+            procesos = [
+                multiprocessing.Process(
+                    target=self.cargar_sede,
+                    args=(sede, libros, cuota, vaciar)
+                )
+                for sede, cuota in cuotas.items()
+            ]
+            for p in procesos:
+                p.start()
+            for p in procesos:
+                p.join()
+
+            if any(p.exitcode != 0 for p in procesos):
+                raise RuntimeError("La carga de al menos una sede falló")
+        else:
+            for sede, cuota in cuotas.items():
+                self.cargar_sede(sede, libros, cuota, vaciar)
+
+        print(f"✓ Carga completada en {time.perf_counter() - t_inicio:.1f}s")
         
         # Verificar datos
-        print("\n[4] Verificando datos insertados...")
-        self.verificar_datos(1)
-        self.verificar_datos(2)
+        print("\n[2] Verificando datos insertados...")
+        for sede in cuotas:
+            self.verificar_datos(sede)
         
         print("\n" + "="*60)
         print("✓ DATOS INICIALES GENERADOS EXITOSAMENTE")
@@ -221,13 +429,30 @@ class GeneradorDatos:
 def main():
     import sys
     
-    host = sys.argv[1] if len(sys.argv) > 1 else "localhost"
-    port = int(sys.argv[2]) if len(sys.argv) > 2 else 3306
+    parser = argparse.ArgumentParser(
+        description="Genera los datos iniciales de ambas sedes",
+        epilog="Ejemplos:\n"
+               "  python generar_datos_inic.py localhost 3306\n"
+               "  python generar_datos_inic.py localhost 3306 --libros 10000000 --prestamos 2000000 --vaciar",
+        formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument("host", nargs="?", default="localhost", help="Host de MySQL")
+    parser.add_argument("port", nargs="?", type=int, default=3306, help="Puerto de MySQL")
+    parser.add_argument("--libros", type=int, default=1000, help="Libros por sede (defecto 1000)")
+    parser.add_argument("--prestamos", type=int, default=None,
+                        help="Préstamos activos por sede (defecto 50 en sede 1 y 150 en sede 2)")
+    parser.add_argument("--lote", type=int, default=5000, help="Filas por lote (defecto 5000)")
+    parser.add_argument("--modo", choices=['lotes', 'archivo'], default='lotes',
+                        help="lotes: INSERT multi-fila; archivo: CSV + LOAD DATA LOCAL INFILE")
+    parser.add_argument("--semilla", type=int, default=2025, help="Semilla aleatoria")
+    parser.add_argument("--secuencial", action="store_true", help="Cargar las sedes una tras otra")
+    parser.add_argument("--vaciar", action="store_true", help="Vaciar las tablas antes de cargar")
+    args = parser.parse_args()
     
-    generador = GeneradorDatos(host, port)
+    generador = GeneradorDatos(args.host, args.port, args.semilla, args.lote, args.modo)
     
     try:
-        generador.ejecutar()
+        generador.ejecutar(args.libros, args.prestamos, not args.secuencial, args.vaciar)
     except mysql.connector.Error as e:
         print(f"\n[ERROR] Error de base de datos: {e}")
         sys.exit(1)
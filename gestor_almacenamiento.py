@@ -6,11 +6,49 @@ Proporciona una interfaz REQ/REP para que los Actores soliciten operaciones
 import zmq
 import json
 import mysql.connector
+from mysql.connector import pooling
 from datetime import datetime
-import sys
+import argparse
+import threading
+import time
+import os
+
+import trazas
+import plazos
+import idempotencia
+from metricas import Metricas, ServidorMetricas
+from perfilador import Perfilador
+from medicion_sql import MedidorSQL
+from control import ServidorControl, INTERVALO_LOOP_MS
+from archivador_historial import ArchivadorHistorial, DIRECTORIO_DEFECTO, RETENCION_MESES_DEFECTO
+import diario
+from diario import Diario, InventarioDiario, AplicadorDiario
+import escrow
+from escrow import EscrowInventario
+import indice_catalogo
+from indice_catalogo import IndiceCatalogo
+import modelo_prestamos
+from modelo_prestamos import ModeloPrestamosUsuario
+from catalogo_compartido import PublicadorCatalogo, CatalogoCompartido
+import resumen_operacional
+from resumen_operacional import ResumenOperacional
+from barredor_vencidos import BarredorVencidos
+
+# Días que se conservan las peticiones ya aplicadas (más que cualquier reintento)
+RETENCION_PETICIONES_DIAS = 7
+# Modo diario: espera máxima para que MySQL alcance al diario antes de una renovación
+ESPERA_DIARIO_S = 5.0
 
 class GestorAlmacenamiento:
-    def __init__(self, sede, puerto=5560, db_host="localhost", db_port=3306):
+    def __init__(self, sede, puerto=5560, db_host="localhost", db_port=3306,
+                 context=None, endpoint=None, tam_pool=4, metricas_puerto=None,
+                 control_puerto=None, archivo_historial=DIRECTORIO_DEFECTO,
+                 retencion_historial_meses=RETENCION_MESES_DEFECTO, directorio_diario=None,
+                 tam_segmento=diario.TAM_SEGMENTO_DEFECTO, escrow_calientes=False,
+                 escrow_umbral=escrow.UMBRAL_DEFECTO, escrow_ventana_s=escrow.VENTANA_DEFECTO_S,
+                 indice_busqueda=True, capacidad_modelo_usuarios=modelo_prestamos.CAPACIDAD_DEFECTO,
+                 archivo_catalogo=None, intervalo_resumen_s=resumen_operacional.INTERVALO_RECALCULO_S,
+                 barrido_vencidos=False):
         """
         Inicializa el Gestor de Almacenamiento
         
@@ -19,54 +57,255 @@ class GestorAlmacenamiento:
             puerto: Puerto REP para recibir solicitudes de Actores
             db_host: Host de MySQL
             db_port: Puerto de MySQL
+            context: Contexto ZeroMQ compartido (modo embebido); None crea uno propio
+            endpoint: Endpoint REP explícito (p. ej. inproc://...); None usa tcp://*:<puerto>
+            tam_pool: Conexiones del pool de MySQL
+            metricas_puerto: Puerto HTTP de métricas (formato Prometheus); None lo desactiva
+            control_puerto: Puerto del socket de control (perfilado, STATS); None lo desactiva
+            archivo_historial: Carpeta donde se archivan los meses viejos del historial; None no archiva
+            retencion_historial_meses: Meses completos de historial que se conservan en la BD
+            directorio_diario: Carpeta del diario de operaciones; None confirma cada mutación
+                con el commit de MySQL (modo síncrono)
+            tam_segmento: Bytes por segmento del diario
+            escrow_calientes: Llevar en memoria (escrow) el inventario de los libros más pedidos
+            escrow_umbral: Pedidos de préstamo por ventana para adoptar un libro
+            escrow_ventana_s: Duración de la ventana de detección de libros calientes
+            indice_busqueda: Construir el índice en memoria del catálogo para BUSQUEDA
+            capacidad_modelo_usuarios: Usuarios con sus préstamos en memoria para
+                CONSULTA_USUARIO; 0 la responde siempre desde MySQL
+            archivo_catalogo: Archivo donde se publica el catálogo compartido (mmap) para
+                los Actores de este host; None no lo publica
+            intervalo_resumen_s: Segundos entre recálculos de la base del resumen
+                operacional (RESUMEN); 0 solo la calcula al arrancar
+            barrido_vencidos: Pasar a VENCIDO los préstamos cuya fecha de entrega ya pasó
         """
         self.sede = sede
         self.db_host = db_host
         self.db_port = db_port
+        self.tam_pool = tam_pool
+        self.metricas = Metricas('ga', sede=sede)
         
         # Configurar ZeroMQ - Socket REP
-        self.context = zmq.Context()
+        self.contexto_propio = context is None
+        self.context = context or zmq.Context()
         self.socket = self.context.socket(zmq.REP)
-        self.socket.bind(f"tcp://*:{puerto}")
+        self.endpoint = endpoint or f"tcp://*:{puerto}"
+        self.socket.bind(self.endpoint)
         
-        print(f"[GA-Sede{sede}] Iniciado en puerto {puerto} (REP)")
+        print(f"[GA-Sede{sede}] Iniciado en {self.endpoint} (REP)")
         print(f"[GA-Sede{sede}] BD: {db_host}:{db_port}")
         print(f"[GA-Sede{sede}] Base de datos: biblioteca_sede{sede}")
         
-        # Pool de conexiones (simulado con una conexión reutilizable)
+        # Pool de conexiones (mysql.connector.pooling); close() devuelve la conexión al pool
         self.conexion_pool = None
+        # Tiempo en MySQL de la solicitud en curso (sql_ms de la traza)
+        self.medidor_sql = MedidorSQL()
         self.inicializar_pool()
+        # La purga no retrasa el arranque: corre en segundo plano con su propia conexión
+        threading.Thread(target=self.purgar_peticiones_procesadas, name=f"ga-sede{sede}-purga",
+                         daemon=True).start()
+        # Particiones del historial y archivo de los meses viejos, también en segundo plano
+        self.archivador = None
+        if archivo_historial:
+            self.archivador = ArchivadorHistorial(
+                sede, lambda: mysql.connector.connect(**self.config_bd()), archivo_historial,
+                retencion_historial_meses, metricas=self.metricas
+            )
+            self.archivador.iniciar()
+        
+        # Modo diario: las mutaciones se confirman al quedar en el diario local
+        self.diario = None
+        if directorio_diario:
+            self.diario = Diario(os.path.join(directorio_diario, f"sede{sede}"), tam_segmento)
+            releidos = self.diario.abrir()
+            self.inventario = InventarioDiario(sede, self.conexion_diario)
+            for registro in releidos:
+                self.inventario.registrar(registro)
+            self.aplicador = AplicadorDiario(
+                sede, self.diario, self.inventario, lambda: mysql.connector.connect(**self.config_bd()),
+                releidos, metricas=self.metricas
+            )
+            self.aplicador.start()
+            print(f"[GA-Sede{sede}] Modo diario en {self.diario.directorio} "
+                  f"({len(releidos)} registros releídos)")
+        
+        # Escrow de libros calientes: sus préstamos no bloquean la fila de libros
+        self.escrow = None
+        if escrow_calientes and self.diario:
+            print(f"[GA-Sede{sede}] ⚠ Escrow ignorado: el modo diario ya lleva el inventario en memoria")
+        elif escrow_calientes:
+            self.escrow = EscrowInventario(
+                sede, lambda: mysql.connector.connect(**self.config_bd()), escrow_umbral,
+                escrow_ventana_s, metricas=self.metricas
+            )
+            self.escrow.start()
+            print(f"[GA-Sede{sede}] Escrow de libros calientes (umbral {escrow_umbral} pedidos "
+                  f"cada {escrow_ventana_s:g}s)")
+        
+        # Índice invertido de nombre/autor para BUSQUEDA (se construye en segundo plano)
+        self.indice = None
+        if indice_busqueda:
+            self.indice = IndiceCatalogo(sede, lambda: mysql.connector.connect(**self.config_bd()),
+                                         metricas=self.metricas)
+            self.indice.start()
+        
+        # Préstamos abiertos por usuario para CONSULTA_USUARIO (al día con las mutaciones del GA)
+        self.modelo_usuarios = None
+        if capacidad_modelo_usuarios > 0:
+            self.modelo_usuarios = ModeloPrestamosUsuario(capacidad_modelo_usuarios, metricas=self.metricas,
+                                                          nombre_libro=self.nombre_libro)
+        
+        # Nombre, autor y totales de cada libro en un archivo mapeado por los Actores
+        self.publicador = None
+        self.catalogo = None
+        if archivo_catalogo:
+            self.publicador = PublicadorCatalogo(sede, lambda: mysql.connector.connect(**self.config_bd()),
+                                                 archivo_catalogo, metricas=self.metricas)
+            # Lector propio (el del publicador es de su hilo) para nombrar los préstamos nuevos
+            self.catalogo = CatalogoCompartido(archivo_catalogo)
+            self.publicador.start()
+            print(f"[GA-Sede{sede}] Catálogo compartido en {archivo_catalogo}")
+        
+        # Agregados para RESUMEN (al día con las mutaciones del GA, sin recorrer tablas)
+        self.resumen = ResumenOperacional(sede, lambda: mysql.connector.connect(**self.config_bd()),
+                                          intervalo_resumen_s, metricas=self.metricas)
+        self.resumen.start()
+        
+        # Préstamos ACTIVO con la fecha de entrega vencida -> VENCIDO (hilo aparte)
+        self.barredor = None
+        if barrido_vencidos:
+            self.barredor = BarredorVencidos(sede, lambda: mysql.connector.connect(**self.config_bd()),
+                                             resumen=self.resumen, modelo_usuarios=self.modelo_usuarios,
+                                             metricas=self.metricas)
+            self.barredor.start()
+            print(f"[GA-Sede{sede}] Barrido de préstamos vencidos activo")
         
         self.contador_operaciones = 0
         self.operaciones_exitosas = 0
         self.operaciones_fallidas = 0
+        self.descartadas_plazo = 0
+        
+        self.metricas.registrar_gauge('pool_conexiones', lambda: self.tam_pool if self.conexion_pool else 0)
+        self.metricas.registrar_gauge('pool_conexiones_en_uso', self.conexiones_en_uso)
+        if metricas_puerto:
+            ServidorMetricas(self.metricas, metricas_puerto).start()
+            print(f"[GA-Sede{sede}] Métricas en http://*:{metricas_puerto}/metrics")
+        
+        # Perfilado bajo demanda y socket de control (hilo aparte)
+        self.perfilador = Perfilador(f"ga_sede{sede}")
+        self.control = None
+        if control_puerto:
+            self.control = ServidorControl(f"ga_sede{sede}", control_puerto, self.context)
+            self.control.registrar_perfilador(self.perfilador)
+            self.control.registrar_metricas(self.metricas)
+            self.control.registrar_listo(self.chequear_listo)
+            self.control.registrar('RESUMEN', lambda solicitud: self.resumen.respuesta())
+            self.control.start()
+    
+    def chequear_listo(self):
+        """Chequeos de la sonda LISTO"""
+        chequeos = {
+            'socket': True,
+            'pool': self.conexion_pool is not None,
+            'bd': self.health_check()
+        }
+        if self.diario:
+            chequeos['diario'] = self.aplicador.is_alive()
+        if self.escrow:
+            chequeos['escrow'] = self.escrow.is_alive()
+        return chequeos
+    
+    def config_bd(self):
+        """Parámetros de conexión a la base de datos de la sede"""
+        return {
+            'host': self.db_host,
+            'port': self.db_port,
+            'user': "biblioteca_user",
+            'password': "biblioteca_pass",
+            'database': f"biblioteca_sede{self.sede}",
+            'autocommit': False
+        }
     
     def inicializar_pool(self):
         """Inicializa el pool de conexiones a la BD"""
         try:
             print(f"[GA-Sede{self.sede}] Inicializando pool de conexiones...")
-            # En producción, usar un pool real como mysql.connector.pooling
-            self.health_check()
-            print(f"[GA-Sede{self.sede}] ✓ Pool de conexiones inicializado")
+            self.conexion_pool = pooling.MySQLConnectionPool(
+                pool_name=f"ga_sede{self.sede}",
+                pool_size=self.tam_pool,
+                **self.config_bd()
+            )
+            self.calentar_pool()
+            print(f"[GA-Sede{self.sede}] ✓ Pool de conexiones inicializado ({self.tam_pool} conexiones)")
         except Exception as e:
-            print(f"[GA-Sede{self.sede}] ⚠ Error al inicializar pool: {e}")
+            self.conexion_pool = None
+            print(f"[GA-Sede{self.sede}] ⚠ Error al inicializar pool: {e} (se usarán conexiones directas)")
+    
+    def calentar_pool(self):
+        """Toma todas las conexiones del pool y las valida con SELECT 1 antes de atender"""
+        conexiones = [self.conexion_pool.get_connection() for _ in range(self.tam_pool)]
+        for conexion in conexiones:
+            cursor = conexion.cursor()
+            cursor.execute("SELECT 1")
+            cursor.fetchall()
+            cursor.close()
+            conexion.close()
+    
+    def purgar_peticiones_procesadas(self, dias=RETENCION_PETICIONES_DIAS, lote=10000):
+        """Borra por lotes los registros de idempotencia más antiguos que la retención"""
+        conexion = self.conectar_bd()
+        if not conexion:
+            return
+        try:
+            cursor = conexion.cursor()
+            borradas = 0
+            while True:
+                cursor.execute(
+                    "DELETE FROM peticiones_procesadas "
+                    "WHERE fecha_registro < NOW() - INTERVAL %s DAY LIMIT %s",
+                    (dias, lote)
+                )
+                conexion.commit()
+                borradas += cursor.rowcount
+                if cursor.rowcount < lote:
+                    break
+            cursor.close()
+            if borradas:
+                print(f"[GA-Sede{self.sede}] ✓ {borradas} peticiones procesadas de más de {dias} días purgadas")
+        except mysql.connector.Error as e:
+            print(f"[GA-Sede{self.sede}] ⚠ No se pudo purgar peticiones_procesadas: {e}")
+        finally:
+            conexion.close()
+    
+    def conexiones_en_uso(self):
+        """Conexiones del pool prestadas en este momento"""
+        if not self.conexion_pool:
+            return 0
+        return self.tam_pool - self.conexion_pool._cnx_queue.qsize()
     
     def conectar_bd(self):
-        """Establece conexión con la base de datos MySQL"""
+        """Obtiene una conexión del pool (o una directa si el pool no está disponible)"""
         try:
-            conexion = mysql.connector.connect(
-                host=self.db_host,
-                port=self.db_port,
-                user="biblioteca_user",
-                password="biblioteca_pass",
-                database=f"biblioteca_sede{self.sede}",
-                autocommit=False
-            )
-            return conexion
+            if self.conexion_pool:
+                try:
+                    return self.medidor_sql.envolver(self.conexion_pool.get_connection())
+                except mysql.connector.errors.PoolError:
+                    # Pool agotado: conexión directa en lugar de fallar la operación
+                    self.metricas.incrementar('pool_agotado_total')
+            conexion = mysql.connector.connect(**self.config_bd())
+            return self.medidor_sql.envolver(conexion)
         except mysql.connector.Error as e:
             print(f"[GA-Sede{self.sede}] ERROR BD: {e}")
+            self.metricas.incrementar('errores_conexion_bd_total')
             return None
     
+    def conexion_diario(self):
+        """Conexión para el inventario del modo diario (error en lugar de None)"""
+        conexion = self.conectar_bd()
+        if not conexion:
+            raise mysql.connector.InterfaceError('No se pudo conectar a la base de datos')
+        return conexion
+    
     def health_check(self):
         """Verifica el estado de la conexión a la BD"""
         conexion = self.conectar_bd()
@@ -75,9 +314,41 @@ class GestorAlmacenamiento:
             return True
         return False
     
-    def ejecutar_update_devolucion(self, codigo_libro, usuario_id):
+    def respuesta_registrada(self, cursor, id_peticion, operacion):
+        """
+        Respuesta de una mutación ya aplicada con este id_peticion, o None
+        
+        Se consulta dentro de la misma transacción que aplicaría la mutación:
+        un reintento devuelve la respuesta original sin volver a escribir.
+        """
+        if not id_peticion:
+            return None
+        cursor.execute(
+            "SELECT respuesta FROM peticiones_procesadas WHERE id_peticion = %s",
+            (id_peticion,)
+        )
+        fila = cursor.fetchone()
+        if fila is None:
+            return None
+        self.metricas.incrementar('duplicadas_total', operacion=operacion)
+        print(f"[GA-Sede{self.sede}] ↺ {operacion} {id_peticion} ya aplicada, se devuelve la respuesta registrada")
+        return idempotencia.marcar_duplicada(json.loads(fila[0]))
+    
+    def registrar_peticion(self, cursor, id_peticion, operacion, respuesta):
+        """Registra la mutación en peticiones_procesadas (en la transacción que la aplica)"""
+        if id_peticion:
+            cursor.execute(
+                "INSERT INTO peticiones_procesadas (id_peticion, operacion, respuesta) VALUES (%s, %s, %s)",
+                (id_peticion, operacion, json.dumps(respuesta, default=str))
+            )
+    
+    def ejecutar_update_devolucion(self, codigo_libro, usuario_id, id_peticion=None):
         """
-        Ejecuta UPDATE para incrementar ejemplares disponibles (devolución)
+        Ejecuta la devolución: cierra el préstamo abierto más antiguo del usuario
+        para ese libro e incrementa los ejemplares disponibles
+        
+        El libro se bloquea antes que el préstamo, en el mismo orden que la
+        transacción de préstamo, para no provocar deadlocks entre ambas.
         
         Returns:
             dict: Resultado de la operación
@@ -86,12 +357,19 @@ class GestorAlmacenamiento:
         if not conexion:
             return {
                 'estado': 'ERROR',
-                'mensaje': 'No se pudo conectar a la base de datos'
+                'mensaje': 'No se pudo conectar a la base de datos',
+                'falla_bd': True,
+                'no_aplicada': True
             }
         
         try:
             cursor = conexion.cursor()
             
+            duplicada = self.respuesta_registrada(cursor, id_peticion, 'UPDATE_DEVOLUCION')
+            if duplicada:
+                conexion.rollback()
+                return duplicada
+            
             # Incrementar ejemplares disponibles
             query = """
                 UPDATE libros 
@@ -109,6 +387,31 @@ class GestorAlmacenamiento:
                     'mensaje': f'Libro {codigo_libro} no encontrado'
                 }
             
+            # Préstamo abierto más antiguo (índice idx_libro_usuario_prestamo)
+            cursor.execute("""
+                SELECT id, estado FROM prestamos
+                WHERE codigo_libro = %s
+                  AND usuario_id = %s
+                  AND estado IN ('ACTIVO', 'VENCIDO')
+                ORDER BY fecha_prestamo, id
+                LIMIT 1
+                FOR UPDATE
+            """, (codigo_libro, usuario_id))
+            prestamo = cursor.fetchone()
+            if prestamo is None:
+                conexion.rollback()
+                return {
+                    'estado': 'ERROR',
+                    'mensaje': f'No hay préstamo activo del libro {codigo_libro} para el usuario {usuario_id}'
+                }
+            
+            cursor.execute("""
+                UPDATE prestamos
+                SET estado = 'DEVUELTO',
+                    fecha_devolucion_real = NOW()
+                WHERE id = %s
+            """, (prestamo[0],))
+            
             # Obtener información actualizada
             cursor.execute(
                 "SELECT nombre, ejemplares_disponibles FROM libros WHERE codigo = %s",
@@ -116,26 +419,32 @@ class GestorAlmacenamiento:
             )
             resultado = cursor.fetchone()
             
-            conexion.commit()
-            cursor.close()
-            
-            return {
+            respuesta = {
                 'estado': 'OK',
                 'mensaje': 'Devolución registrada en BD',
+                'prestamo_id': prestamo[0],
+                'estado_prestamo': prestamo[1],
                 'libro': resultado[0] if resultado else 'Desconocido',
                 'ejemplares_disponibles': resultado[1] if resultado else 0
             }
+            self.registrar_peticion(cursor, id_peticion, 'UPDATE_DEVOLUCION', respuesta)
+            
+            conexion.commit()
+            cursor.close()
+            
+            return respuesta
             
         except mysql.connector.Error as e:
             conexion.rollback()
             return {
                 'estado': 'ERROR',
-                'mensaje': f'Error en BD: {str(e)}'
+                'mensaje': f'Error en BD: {str(e)}',
+                'falla_bd': True
             }
         finally:
             conexion.close()
     
-    def ejecutar_update_renovacion(self, codigo_libro, usuario_id, nueva_fecha):
+    def ejecutar_update_renovacion(self, codigo_libro, usuario_id, nueva_fecha, id_peticion=None):
         """
         Ejecuta UPDATE para renovar préstamo
         
@@ -146,12 +455,19 @@ class GestorAlmacenamiento:
         if not conexion:
             return {
                 'estado': 'ERROR',
-                'mensaje': 'No se pudo conectar a la base de datos'
+                'mensaje': 'No se pudo conectar a la base de datos',
+                'falla_bd': True,
+                'no_aplicada': True
             }
         
         try:
             cursor = conexion.cursor()
             
+            duplicada = self.respuesta_registrada(cursor, id_peticion, 'UPDATE_RENOVACION')
+            if duplicada:
+                conexion.rollback()
+                return duplicada
+            
             # Actualizar fecha de entrega
             query = """
                 UPDATE prestamos 
@@ -172,25 +488,30 @@ class GestorAlmacenamiento:
                     'mensaje': 'No se encontró préstamo activo o ya tiene 2 renovaciones'
                 }
             
-            conexion.commit()
-            cursor.close()
-            
-            return {
+            respuesta = {
                 'estado': 'OK',
                 'mensaje': 'Renovación registrada en BD',
                 'nueva_fecha_entrega': nueva_fecha
             }
+            self.registrar_peticion(cursor, id_peticion, 'UPDATE_RENOVACION', respuesta)
+            
+            conexion.commit()
+            cursor.close()
+            
+            return respuesta
             
         except mysql.connector.Error as e:
             conexion.rollback()
             return {
                 'estado': 'ERROR',
-                'mensaje': f'Error en BD: {str(e)}'
+                'mensaje': f'Error en BD: {str(e)}',
+                'falla_bd': True
             }
         finally:
             conexion.close()
     
-    def ejecutar_insert_historial(self, codigo_libro, usuario_id, operacion, datos_adicionales=None):
+    def ejecutar_insert_historial(self, codigo_libro, usuario_id, operacion, datos_adicionales=None,
+                                  id_peticion=None):
         """
         Inserta registro en historial de operaciones
         
@@ -201,12 +522,19 @@ class GestorAlmacenamiento:
         if not conexion:
             return {
                 'estado': 'ERROR',
-                'mensaje': 'No se pudo conectar a la base de datos'
+                'mensaje': 'No se pudo conectar a la base de datos',
+                'falla_bd': True,
+                'no_aplicada': True
             }
         
         try:
             cursor = conexion.cursor()
             
+            duplicada = self.respuesta_registrada(cursor, id_peticion, 'INSERT_HISTORIAL')
+            if duplicada:
+                conexion.rollback()
+                return duplicada
+            
             query = """
                 INSERT INTO historial_operaciones 
                 (codigo_libro, usuario_id, operacion, fecha, sede, datos_adicionales)
@@ -220,21 +548,25 @@ class GestorAlmacenamiento:
                 datos_adicionales
             ))
             
-            conexion.commit()
             historial_id = cursor.lastrowid
-            cursor.close()
-            
-            return {
+            respuesta = {
                 'estado': 'OK',
                 'mensaje': 'Operación registrada en historial',
                 'historial_id': historial_id
             }
+            self.registrar_peticion(cursor, id_peticion, 'INSERT_HISTORIAL', respuesta)
+            
+            conexion.commit()
+            cursor.close()
+            
+            return respuesta
             
         except mysql.connector.Error as e:
             conexion.rollback()
             return {
                 'estado': 'ERROR',
-                'mensaje': f'Error en BD: {str(e)}'
+                'mensaje': f'Error en BD: {str(e)}',
+                'falla_bd': True
             }
         finally:
             conexion.close()
@@ -250,7 +582,9 @@ class GestorAlmacenamiento:
         if not conexion:
             return {
                 'estado': 'ERROR',
-                'mensaje': 'No se pudo conectar a la base de datos'
+                'mensaje': 'No se pudo conectar a la base de datos',
+                'falla_bd': True,
+                'no_aplicada': True
             }
         
         try:
@@ -284,12 +618,14 @@ class GestorAlmacenamiento:
         except mysql.connector.Error as e:
             return {
                 'estado': 'ERROR',
-                'mensaje': f'Error en BD: {str(e)}'
+                'mensaje': f'Error en BD: {str(e)}',
+                'falla_bd': True
             }
         finally:
             conexion.close()
     
-    def ejecutar_transaccion_prestamo(self, codigo_libro, usuario_id, fecha_prestamo, fecha_entrega):
+    def ejecutar_transaccion_prestamo(self, codigo_libro, usuario_id, fecha_prestamo, fecha_entrega,
+                                      id_peticion=None):
         """
         Ejecuta transacción ACID completa para préstamo
         
@@ -300,7 +636,9 @@ class GestorAlmacenamiento:
         if not conexion:
             return {
                 'estado': 'ERROR',
-                'mensaje': 'No se pudo conectar a la base de datos'
+                'mensaje': 'No se pudo conectar a la base de datos',
+                'falla_bd': True,
+                'no_aplicada': True
             }
         
         try:
@@ -309,6 +647,11 @@ class GestorAlmacenamiento:
             # Iniciar transacción
             conexion.start_transaction()
             
+            duplicada = self.respuesta_registrada(cursor, id_peticion, 'TRANSACCION_PRESTAMO')
+            if duplicada:
+                conexion.rollback()
+                return duplicada
+            
             # 1. Verificar y reducir ejemplares
             query_update = """
                 UPDATE libros 
@@ -359,28 +702,359 @@ class GestorAlmacenamiento:
                 datos_adicionales
             ))
             
+            respuesta = {
+                'estado': 'OK',
+                'mensaje': 'Transacción completada exitosamente',
+                'prestamo_id': prestamo_id,
+                'fecha_prestamo': str(fecha_prestamo),
+                'fecha_entrega': str(fecha_entrega)
+            }
+            # 4. Registrar la petición (reintentos idempotentes)
+            self.registrar_peticion(cursor, id_peticion, 'TRANSACCION_PRESTAMO', respuesta)
+            
             # Commit transacción
             conexion.commit()
             cursor.close()
             
             print(f"[GA-Sede{self.sede}] → Replicación asíncrona a BD secundaria iniciada")
             
+            return respuesta
+            
+        except mysql.connector.Error as e:
+            conexion.rollback()
             return {
-                'estado': 'OK',
-                'mensaje': 'Transacción completada exitosamente',
-                'prestamo_id': prestamo_id,
-                'fecha_prestamo': str(fecha_prestamo),
-                'fecha_entrega': str(fecha_entrega)
+                'estado': 'ERROR',
+                'mensaje': f'Error en transacción: {str(e)}',
+                'falla_bd': True
             }
+        finally:
+            conexion.close()
+    
+    def ejecutar_prestamo_escrow(self, codigo_libro, usuario_id, fecha_prestamo, fecha_entrega,
+                                 id_peticion=None):
+        """
+        Préstamo de un libro en escrow: el ejemplar se descuenta del saldo en
+        memoria y la transacción solo inserta (préstamo, historial y movimiento)
+        
+        Returns:
+            dict: Resultado de la transacción, o None si el libro ya no está en escrow
+        """
+        with self.escrow.bloqueo:
+            if not self.escrow.contiene(codigo_libro):
+                return None
+            conexion = self.conectar_bd()
+            if not conexion:
+                return {
+                    'estado': 'ERROR',
+                    'mensaje': 'No se pudo conectar a la base de datos',
+                    'falla_bd': True,
+                    'no_aplicada': True
+                }
+            
+            try:
+                cursor = conexion.cursor()
+                conexion.start_transaction()
+                
+                duplicada = self.respuesta_registrada(cursor, id_peticion, 'TRANSACCION_PRESTAMO')
+                if duplicada:
+                    conexion.rollback()
+                    return duplicada
+                
+                if self.escrow.saldo(codigo_libro) <= 0:
+                    conexion.rollback()
+                    self.metricas.incrementar('escrow_prestamos_total', estado='RECHAZADO')
+                    return {
+                        'estado': 'RECHAZADO',
+                        'mensaje': 'Libro no disponible'
+                    }
+                
+                cursor.execute("""
+                    INSERT INTO prestamos
+                    (codigo_libro, usuario_id, fecha_prestamo, fecha_entrega,
+                     renovaciones, estado, sede)
+                    VALUES (%s, %s, %s, %s, 0, 'ACTIVO', %s)
+                """, (codigo_libro, usuario_id, fecha_prestamo, fecha_entrega, self.sede))
+                prestamo_id = cursor.lastrowid
+                
+                datos_adicionales = json.dumps({
+                    'prestamo_id': prestamo_id,
+                    'fecha_entrega': fecha_entrega.isoformat() if hasattr(fecha_entrega, 'isoformat') else str(fecha_entrega)
+                })
+                cursor.execute("""
+                    INSERT INTO historial_operaciones
+                    (codigo_libro, usuario_id, operacion, fecha, sede, datos_adicionales)
+                    VALUES (%s, %s, 'PRESTAMO', NOW(), %s, %s)
+                """, (codigo_libro, usuario_id, self.sede, datos_adicionales))
+                self.escrow.consumir(cursor, codigo_libro, -1)
+                
+                respuesta = {
+                    'estado': 'OK',
+                    'mensaje': 'Transacción completada exitosamente',
+                    'prestamo_id': prestamo_id,
+                    'fecha_prestamo': str(fecha_prestamo),
+                    'fecha_entrega': str(fecha_entrega)
+                }
+                self.registrar_peticion(cursor, id_peticion, 'TRANSACCION_PRESTAMO', respuesta)
+                
+                conexion.commit()
+                cursor.close()
+                self.escrow.ajustar(codigo_libro, -1)
+                self.metricas.incrementar('escrow_prestamos_total', estado='OK')
+                
+                return respuesta
+                
+            except mysql.connector.Error as e:
+                conexion.rollback()
+                return {
+                    'estado': 'ERROR',
+                    'mensaje': f'Error en transacción: {str(e)}',
+                    'falla_bd': True
+                }
+            finally:
+                conexion.close()
+    
+    def ejecutar_devolucion_escrow(self, codigo_libro, usuario_id, id_peticion=None):
+        """
+        Devolución de un libro en escrow: cierra el préstamo abierto más antiguo
+        y suma el ejemplar al saldo en memoria (movimiento +1)
+        
+        Returns:
+            dict: Resultado de la operación, o None si el libro ya no está en escrow
+        """
+        with self.escrow.bloqueo:
+            if not self.escrow.contiene(codigo_libro):
+                return None
+            conexion = self.conectar_bd()
+            if not conexion:
+                return {
+                    'estado': 'ERROR',
+                    'mensaje': 'No se pudo conectar a la base de datos',
+                    'falla_bd': True,
+                    'no_aplicada': True
+                }
+            
+            try:
+                cursor = conexion.cursor()
+                
+                duplicada = self.respuesta_registrada(cursor, id_peticion, 'UPDATE_DEVOLUCION')
+                if duplicada:
+                    conexion.rollback()
+                    return duplicada
+                
+                cursor.execute("""
+                    SELECT id, estado FROM prestamos
+                    WHERE codigo_libro = %s
+                      AND usuario_id = %s
+                      AND estado IN ('ACTIVO', 'VENCIDO')
+                    ORDER BY fecha_prestamo, id
+                    LIMIT 1
+                    FOR UPDATE
+                """, (codigo_libro, usuario_id))
+                prestamo = cursor.fetchone()
+                if prestamo is None:
+                    conexion.rollback()
+                    return {
+                        'estado': 'ERROR',
+                        'mensaje': f'No hay préstamo activo del libro {codigo_libro} para el usuario {usuario_id}'
+                    }
+                
+                cursor.execute("""
+                    UPDATE prestamos
+                    SET estado = 'DEVUELTO',
+                        fecha_devolucion_real = NOW()
+                    WHERE id = %s
+                """, (prestamo[0],))
+                self.escrow.consumir(cursor, codigo_libro, 1)
+                
+                cursor.execute(
+                    "SELECT nombre, ejemplares_disponibles FROM libros WHERE codigo = %s",
+                    (codigo_libro,)
+                )
+                resultado = cursor.fetchone()
+                
+                respuesta = {
+                    'estado': 'OK',
+                    'mensaje': 'Devolución registrada en BD',
+                    'prestamo_id': prestamo[0],
+                    'estado_prestamo': prestamo[1],
+                    'libro': resultado[0] if resultado else 'Desconocido',
+                    'ejemplares_disponibles': (resultado[1] if resultado else 0) + self.escrow.saldo(codigo_libro) + 1
+                }
+                self.registrar_peticion(cursor, id_peticion, 'UPDATE_DEVOLUCION', respuesta)
+                
+                conexion.commit()
+                cursor.close()
+                self.escrow.ajustar(codigo_libro, 1)
+                
+                return respuesta
+                
+            except mysql.connector.Error as e:
+                conexion.rollback()
+                return {
+                    'estado': 'ERROR',
+                    'mensaje': f'Error en BD: {str(e)}',
+                    'falla_bd': True
+                }
+            finally:
+                conexion.close()
+    
+    def ejecutar_consulta_usuario(self, usuario_id):
+        """
+        Préstamos abiertos del usuario con fecha de entrega y renovaciones:
+        desde el modelo en memoria, o desde MySQL si el usuario no está
+        
+        Returns:
+            dict: Préstamos del usuario
+        """
+        if self.modelo_usuarios:
+            prestamos = self.modelo_usuarios.obtener(usuario_id)
+            if prestamos is not None:
+                return modelo_prestamos.respuesta(usuario_id, prestamos, 'memoria')
+        
+        if self.diario and not self.aplicador.esperar(self.diario.escrito, ESPERA_DIARIO_S):
+            # Los préstamos se leen de MySQL: primero debe estar aplicado el diario
+            return {
+                'estado': 'ERROR',
+                'mensaje': 'El diario aún no se aplicó a la base de datos',
+                'falla_bd': True
+            }
+        
+        conexion = self.conectar_bd()
+        if not conexion:
+            return {
+                'estado': 'ERROR',
+                'mensaje': 'No se pudo conectar a la base de datos',
+                'falla_bd': True,
+                'no_aplicada': True
+            }
+        
+        try:
+            cursor = conexion.cursor()
+            cursor.execute(modelo_prestamos.CONSULTA_PRESTAMOS, (usuario_id,))
+            filas = cursor.fetchall()
+            cursor.close()
             
         except mysql.connector.Error as e:
-            conexion.rollback()
             return {
                 'estado': 'ERROR',
-                'mensaje': f'Error en transacción: {str(e)}'
+                'mensaje': f'Error en BD: {str(e)}',
+                'falla_bd': True
             }
         finally:
             conexion.close()
+        
+        prestamos = modelo_prestamos.desde_filas(filas)
+        if self.modelo_usuarios:
+            self.modelo_usuarios.cargar(usuario_id, prestamos)
+        return modelo_prestamos.respuesta(usuario_id, prestamos, 'bd')
+    
+    def ejecutar_en_diario(self, operacion, solicitud):
+        """
+        Modo diario: valida contra el inventario en memoria, agrega la mutación
+        al diario y responde cuando está en disco; el aplicador la lleva a MySQL
+        
+        Returns:
+            dict: Resultado de la operación (el mismo que se guarda para reintentos)
+        """
+        codigo_libro = solicitud['codigo_libro']
+        usuario_id = solicitud['usuario_id']
+        id_peticion = solicitud.get(idempotencia.CAMPO)
+        if id_peticion:
+            duplicada = self.inventario.respuesta(id_peticion)
+            if duplicada:
+                self.metricas.incrementar('duplicadas_total', operacion=operacion)
+                return idempotencia.marcar_duplicada(duplicada)
+            # Aplicada hace más de la ventana en memoria (o antes de un reinicio): la
+            # BD todavía la recuerda. Que el libro esté en memoria no lo descarta
+            conexion = self.conectar_bd()
+            if conexion:
+                try:
+                    duplicada = self.respuesta_registrada(conexion.cursor(), id_peticion, operacion)
+                    conexion.rollback()
+                    if duplicada:
+                        return duplicada
+                except mysql.connector.Error:
+                    pass
+                finally:
+                    conexion.close()
+        
+        registro = {}
+        
+        def registrar():
+            if operacion == 'TRANSACCION_PRESTAMO':
+                datos = {'fecha_prestamo': solicitud['fecha_prestamo'], 'fecha_entrega': solicitud['fecha_entrega']}
+                respuesta = {
+                    'estado': 'OK',
+                    'mensaje': 'Transacción registrada en el diario',
+                    'prestamo_id': None,
+                    'fecha_prestamo': str(solicitud['fecha_prestamo']),
+                    'fecha_entrega': str(solicitud['fecha_entrega'])
+                }
+            elif operacion == 'UPDATE_DEVOLUCION':
+                datos = {}
+                respuesta = {
+                    'estado': 'OK',
+                    'mensaje': 'Devolución registrada en el diario',
+                    'prestamo_id': None,
+                    'libro': self.inventario.nombre(codigo_libro),
+                    'ejemplares_disponibles': self.inventario.disponibles[codigo_libro] + 1
+                }
+            else:
+                datos = {'tipo_operacion': solicitud['tipo_operacion'],
+                         'datos_adicionales': solicitud.get('datos_adicionales')}
+                respuesta = {
+                    'estado': 'OK',
+                    'mensaje': 'Operación registrada en el diario',
+                    'historial_id': None
+                }
+            registro.update(diario.nuevo_registro(operacion, respuesta, id_peticion, codigo_libro=codigo_libro,
+                                                  usuario_id=usuario_id, **datos))
+            registro['lsn'] = self.diario.agregar(registro, sincronizar=False)
+            self.inventario.registrar(registro)
+        
+        try:
+            if operacion == 'INSERT_HISTORIAL':
+                registrar()
+            else:
+                rechazo = self.inventario.reservar(codigo_libro, usuario_id, operacion, registrar)
+                if rechazo:
+                    return rechazo
+            self.aplicador.encolar(registro)
+            # Se confirma solo con el registro en disco (un fsync por mutación)
+            self.diario.sincronizar(registro['lsn'])
+        except mysql.connector.Error as e:
+            return {
+                'estado': 'ERROR',
+                'mensaje': f'Error en BD: {str(e)}',
+                'falla_bd': True
+            }
+        except OSError as e:
+            return {
+                'estado': 'ERROR',
+                'mensaje': f'Error en el diario: {str(e)}',
+                'falla_bd': True
+            }
+        return registro['respuesta']
+    
+    def nombre_libro(self, codigo_libro):
+        """Nombre de un libro sin consultar MySQL (inventario del diario o catálogo publicado), o None"""
+        if self.diario:
+            with self.inventario.lock:
+                nombre = self.inventario.nombres.get(codigo_libro)
+            if nombre is not None:
+                return nombre
+        if self.catalogo:
+            libro = self.catalogo.buscar(codigo_libro)
+            if libro is not None:
+                return libro['nombre']
+        return None
+    
+    def pendientes_diario(self):
+        """Registros del diario todavía en la cola del aplicador (copia)"""
+        if not self.diario:
+            return []
+        with self.aplicador.condicion:
+            return list(self.aplicador.cola)
     
     def procesar_solicitud(self, solicitud):
         """
@@ -394,17 +1068,39 @@ class GestorAlmacenamiento:
         """
         operacion = solicitud.get('operacion')
         
+        if self.diario:
+            if operacion in diario.OPERACIONES:
+                return self.ejecutar_en_diario(operacion, solicitud)
+            if operacion == 'UPDATE_RENOVACION' and not self.aplicador.esperar(self.diario.escrito,
+                                                                              ESPERA_DIARIO_S):
+                # La renovación lee préstamos de MySQL: primero debe estar aplicado el diario
+                return {
+                    'estado': 'ERROR',
+                    'mensaje': 'El diario aún no se aplicó a la base de datos',
+                    'falla_bd': True
+                }
+        
         if operacion == 'UPDATE_DEVOLUCION':
+            if self.escrow and self.escrow.contiene(solicitud['codigo_libro']):
+                respuesta = self.ejecutar_devolucion_escrow(
+                    solicitud['codigo_libro'],
+                    solicitud['usuario_id'],
+                    id_peticion=solicitud.get(idempotencia.CAMPO)
+                )
+                if respuesta is not None:
+                    return respuesta
             return self.ejecutar_update_devolucion(
                 solicitud['codigo_libro'],
-                solicitud['usuario_id']
+                solicitud['usuario_id'],
+                id_peticion=solicitud.get(idempotencia.CAMPO)
             )
         
         elif operacion == 'UPDATE_RENOVACION':
             return self.ejecutar_update_renovacion(
                 solicitud['codigo_libro'],
                 solicitud['usuario_id'],
-                solicitud['nueva_fecha']
+                solicitud['nueva_fecha'],
+                id_peticion=solicitud.get(idempotencia.CAMPO)
             )
         
         elif operacion == 'INSERT_HISTORIAL':
@@ -412,21 +1108,66 @@ class GestorAlmacenamiento:
                 solicitud['codigo_libro'],
                 solicitud['usuario_id'],
                 solicitud['tipo_operacion'],
-                solicitud.get('datos_adicionales')
+                solicitud.get('datos_adicionales'),
+                id_peticion=solicitud.get(idempotencia.CAMPO)
+            )
+        
+        elif operacion == 'BUSQUEDA':
+            if not self.indice:
+                return {
+                    'estado': 'ERROR',
+                    'mensaje': 'Este GA no tiene índice de búsqueda (--sin-busqueda)'
+                }
+            return self.indice.buscar(
+                solicitud.get('consulta', ''),
+                solicitud.get('pagina', 1),
+                solicitud.get('por_pagina', indice_catalogo.POR_PAGINA_DEFECTO)
             )
         
+        elif operacion == 'CONSULTA_USUARIO':
+            return self.ejecutar_consulta_usuario(solicitud['usuario_id'])
+        
+        elif operacion == 'RESUMEN':
+            return self.resumen.respuesta()
+        
+        elif operacion == 'PING':
+            # Chequeo de disponibilidad de Actores y lanzador
+            return {'estado': 'OK', 'sede': self.sede, 'bd': self.health_check()}
+        
         elif operacion == 'SELECT_DISPONIBILIDAD':
-            return self.ejecutar_select_disponibilidad(
+            respuesta = self.ejecutar_select_disponibilidad(
                 solicitud['codigo_libro']
             )
+            if self.diario and respuesta['estado'] == 'OK':
+                # MySQL puede ir detrás del diario: el inventario en memoria manda
+                try:
+                    respuesta['ejemplares_disponibles'] = self.inventario.disponibles_de(solicitud['codigo_libro'])
+                except mysql.connector.Error:
+                    pass
+            if self.escrow and respuesta['estado'] == 'OK':
+                # Los ejemplares de un libro en escrow están en memoria, no en libros
+                respuesta['ejemplares_disponibles'] += self.escrow.saldo(solicitud['codigo_libro'])
+            return respuesta
         
         elif operacion == 'TRANSACCION_PRESTAMO':
-            return self.ejecutar_transaccion_prestamo(
+            argumentos = (
                 solicitud['codigo_libro'],
                 solicitud['usuario_id'],
                 solicitud['fecha_prestamo'],
                 solicitud['fecha_entrega']
             )
+            id_peticion = solicitud.get(idempotencia.CAMPO)
+            if self.escrow:
+                self.escrow.observar(solicitud['codigo_libro'])
+                if self.escrow.contiene(solicitud['codigo_libro']):
+                    respuesta = self.ejecutar_prestamo_escrow(*argumentos, id_peticion=id_peticion)
+                    if respuesta is not None:
+                        return respuesta
+            respuesta = self.ejecutar_transaccion_prestamo(*argumentos, id_peticion=id_peticion)
+            if self.escrow and respuesta['estado'] == 'RECHAZADO' and self.escrow.contiene(solicitud['codigo_libro']):
+                # Adoptado mientras la transacción esperaba la fila: los ejemplares están en el escrow
+                respuesta = self.ejecutar_prestamo_escrow(*argumentos, id_peticion=id_peticion) or respuesta
+            return respuesta
         
         else:
             return {
@@ -440,10 +1181,21 @@ class GestorAlmacenamiento:
         """
         print(f"\n[GA-Sede{self.sede}] ¡Esperando solicitudes de Actores!\n")
         
+        self.perfilador.registrar_hilo()
+        
         try:
             while True:
                 # Esperar solicitud (bloqueante)
+                self.perfilador.punto_de_control()
+                # Entre dos solicitudes: foto consistente para el recálculo del resumen
+                self.resumen.fijar_foto(self.pendientes_diario)
+                if not self.socket.poll(INTERVALO_LOOP_MS):
+                    continue
                 solicitud_str = self.socket.recv_string()
+                inicio = trazas.ahora()
+                t_inicio = time.perf_counter()
+                operacion = 'DESCONOCIDA'
+                self.metricas.sumar('solicitudes_en_curso', 1)
                 
                 self.contador_operaciones += 1
                 
@@ -453,15 +1205,40 @@ class GestorAlmacenamiento:
                 # Parsear solicitud
                 try:
                     solicitud = json.loads(solicitud_str)
-                    print(f"[GA-Sede{self.sede}] Operación: {solicitud.get('operacion')}")
-                    
-                    # Procesar solicitud
-                    respuesta = self.procesar_solicitud(solicitud)
+                    operacion = str(solicitud.get('operacion'))
+                    print(f"[GA-Sede{self.sede}] Operación: {operacion}")
                     
-                    if respuesta['estado'] in ['OK', 'RECHAZADO']:
-                        self.operaciones_exitosas += 1
+                    if plazos.expirado(solicitud):
+                        # El cliente ya se rindió: no se toca MySQL
+                        self.descartadas_plazo += 1
+                        self.metricas.incrementar('descartadas_plazo_total', operacion=operacion)
+                        respuesta = plazos.respuesta_expirada('GA', solicitud)
+                        trazas.cerrar_salto(solicitud, respuesta, 'GA', inicio,
+                                            operacion=solicitud.get('operacion'),
+                                            proceso_ms=0.0, sql_ms=0.0)
                     else:
-                        self.operaciones_fallidas += 1
+                        # Procesar solicitud (BD, diario o índices en memoria; tiempo para la traza,
+                        # y dentro de él el de MySQL). Los modelos en memoria se actualizan fuera
+                        t_proceso = time.perf_counter()
+                        self.medidor_sql.iniciar()
+                        respuesta = self.procesar_solicitud(solicitud)
+                        sql_ms = self.medidor_sql.terminar()
+                        proceso_ms = (time.perf_counter() - t_proceso) * 1000
+                        if self.modelo_usuarios:
+                            self.modelo_usuarios.aplicar(solicitud, respuesta)
+                        self.resumen.aplicar(solicitud, respuesta)
+                        if self.barredor:
+                            self.barredor.aplicar(solicitud, respuesta)
+                        self.metricas.observar('proceso_segundos', proceso_ms / 1000, operacion=operacion)
+                        self.metricas.observar('sql_segundos', sql_ms / 1000, operacion=operacion)
+                        trazas.cerrar_salto(solicitud, respuesta, 'GA', inicio,
+                                            operacion=solicitud.get('operacion'),
+                                            proceso_ms=round(proceso_ms, 3), sql_ms=round(sql_ms, 3))
+                        
+                        if respuesta['estado'] in ['OK', 'RECHAZADO']:
+                            self.operaciones_exitosas += 1
+                        else:
+                            self.operaciones_fallidas += 1
                     
                 except json.JSONDecodeError:
                     respuesta = {
@@ -472,24 +1249,57 @@ class GestorAlmacenamiento:
                 
                 # Enviar respuesta
                 self.socket.send_string(json.dumps(respuesta))
+                self.metricas.sumar('solicitudes_en_curso', -1)
+                self.metricas.incrementar('operaciones_total', operacion=operacion, estado=respuesta['estado'])
+                self.metricas.observar('latencia_segundos', time.perf_counter() - t_inicio, operacion=operacion)
                 print(f"[GA-Sede{self.sede}] → Respuesta enviada: {respuesta['estado']}")
                 print(f"{'='*70}")
         
         except KeyboardInterrupt:
             print(f"\n[GA-Sede{self.sede}] Interrumpido por el usuario")
+        except zmq.ContextTerminated:
+            # Modo embebido: el contexto compartido se terminó para detener el sistema
+            print(f"\n[GA-Sede{self.sede}] Contexto terminado, deteniendo")
         finally:
             self.cerrar()
     
     def cerrar(self):
         """Cierra conexiones y muestra estadísticas"""
+        if self.control:
+            self.control.detener()
+        if self.archivador:
+            self.archivador.detener()
+        if self.diario:
+            self.aplicador.detener()
+            self.aplicador.join(timeout=ESPERA_DIARIO_S)
+            self.diario.cerrar()
+        if self.escrow:
+            self.escrow.detener()
+            self.escrow.join(timeout=ESPERA_DIARIO_S)
+        if self.indice:
+            self.indice.detener()
+        if self.publicador:
+            self.publicador.detener()
+        self.resumen.detener()
+        if self.barredor:
+            self.barredor.detener()
         self.socket.close()
-        self.context.term()
+        if self.contexto_propio:
+            self.context.term()
         
         print(f"\n{'='*70}")
         print(f"[GA-Sede{self.sede}] Estadísticas Finales:")
         print(f"  Total operaciones: {self.contador_operaciones}")
         print(f"  Exitosas: {self.operaciones_exitosas}")
         print(f"  Fallidas: {self.operaciones_fallidas}")
+        print(f"  Descartadas por plazo vencido: {self.descartadas_plazo}")
+        if self.diario:
+            print(f"  Diario: {len(self.aplicador.cola)} registros pendientes de aplicar, "
+                  f"{self.aplicador.conflictos} conflictos")
+        if self.escrow:
+            print(f"  Escrow: {len(self.escrow.saldos)} libros calientes en memoria")
+        if self.barredor:
+            print(f"  Préstamos pasados a VENCIDO: {self.barredor.vencidos}")
         if self.contador_operaciones > 0:
             tasa = (self.operaciones_exitosas / self.contador_operaciones) * 100
             print(f"  Tasa de éxito: {tasa:.1f}%")
@@ -497,19 +1307,67 @@ class GestorAlmacenamiento:
 
 
 def main():
-    if len(sys.argv) < 2:
-        print("Uso: python gestor_almacenamiento.py <sede> [puerto] [db_host] [db_port]")
-        print("\nEjemplos:")
-        print("  python gestor_almacenamiento.py 1 5560 localhost 3306")
-        print("  python gestor_almacenamiento.py 2 5561 localhost 3306")
-        sys.exit(1)
+    parser = argparse.ArgumentParser(
+        description="Gestor de Almacenamiento (GA) de una sede",
+        epilog="Ejemplos:\n"
+               "  python gestor_almacenamiento.py 1 5560 localhost 3306\n"
+               "  python gestor_almacenamiento.py 2 5561 localhost 3306 --metricas 9205 --control 7205",
+        formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument("sede", type=int, help="Sede (1 o 2)")
+    parser.add_argument("puerto", nargs="?", type=int, default=None,
+                        help="Puerto REP (defecto 5560 en sede 1, 5561 en sede 2)")
+    parser.add_argument("db_host", nargs="?", default="localhost", help="Host de MySQL")
+    parser.add_argument("db_port", nargs="?", type=int, default=3306, help="Puerto de MySQL")
+    parser.add_argument("--pool", type=int, default=4, help="Conexiones del pool de MySQL")
+    parser.add_argument("--metricas", type=int, default=None, help="Puerto HTTP de métricas")
+    parser.add_argument("--control", type=int, default=None,
+                        help="Puerto del socket de control (perfilado bajo demanda, STATS)")
+    parser.add_argument("--archivo-historial", default=DIRECTORIO_DEFECTO,
+                        help="Carpeta de los meses archivados del historial")
+    parser.add_argument("--retencion-historial", type=int, default=RETENCION_MESES_DEFECTO,
+                        help="Meses completos de historial en la BD; 0 no archiva")
+    parser.add_argument("--diario", default=None, metavar="DIRECTORIO",
+                        help="Modo diario: confirmar mutaciones al quedar en el diario local")
+    parser.add_argument("--segmento-mb", type=int, default=diario.TAM_SEGMENTO_DEFECTO // (1024 * 1024),
+                        help="Tamaño de cada segmento del diario en MB")
+    parser.add_argument("--escrow", action="store_true",
+                        help="Inventario en memoria (escrow) para los libros más pedidos")
+    parser.add_argument("--escrow-umbral", type=int, default=escrow.UMBRAL_DEFECTO,
+                        help="Pedidos de préstamo por ventana para adoptar un libro")
+    parser.add_argument("--escrow-ventana", type=float, default=escrow.VENTANA_DEFECTO_S,
+                        help="Segundos de la ventana de detección de libros calientes")
+    parser.add_argument("--sin-busqueda", action="store_true",
+                        help="No construir el índice en memoria del catálogo (BUSQUEDA desactivada)")
+    parser.add_argument("--modelo-usuarios", type=int, default=modelo_prestamos.CAPACIDAD_DEFECTO,
+                        help="Usuarios con sus préstamos en memoria para CONSULTA_USUARIO; "
+                             "0 consulta siempre MySQL")
+    parser.add_argument("--catalogo", default=None, metavar="ARCHIVO",
+                        help="Publicar el catálogo compartido (mmap) para los Actores de este host")
+    parser.add_argument("--resumen-horas", type=float,
+                        default=resumen_operacional.INTERVALO_RECALCULO_S / 3600,
+                        help="Horas entre recálculos completos del resumen operacional; 0 solo al arrancar")
+    parser.add_argument("--barrido-vencidos", action="store_true",
+                        help="Pasar a VENCIDO los préstamos con la fecha de entrega vencida (migración 6)")
+    args = parser.parse_args()
     
-    sede = int(sys.argv[1])
-    puerto = int(sys.argv[2]) if len(sys.argv) > 2 else (5560 if sede == 1 else 5561)
-    db_host = sys.argv[3] if len(sys.argv) > 3 else "localhost"
-    db_port = int(sys.argv[4]) if len(sys.argv) > 4 else 3306
+    sede = args.sede
+    puerto = args.puerto or (5560 if sede == 1 else 5561)
     
-    gestor = GestorAlmacenamiento(sede, puerto, db_host, db_port)
+    gestor = GestorAlmacenamiento(sede, puerto, args.db_host, args.db_port,
+                                  tam_pool=args.pool, metricas_puerto=args.metricas,
+                                  control_puerto=args.control,
+                                  archivo_historial=args.archivo_historial,
+                                  retencion_historial_meses=args.retencion_historial,
+                                  directorio_diario=args.diario,
+                                  tam_segmento=args.segmento_mb * 1024 * 1024,
+                                  escrow_calientes=args.escrow, escrow_umbral=args.escrow_umbral,
+                                  escrow_ventana_s=args.escrow_ventana,
+                                  indice_busqueda=not args.sin_busqueda,
+                                  capacidad_modelo_usuarios=args.modelo_usuarios,
+                                  archivo_catalogo=args.catalogo,
+                                  intervalo_resumen_s=args.resumen_horas * 3600,
+                                  barrido_vencidos=args.barrido_vencidos)
     gestor.ejecutar()
 
 
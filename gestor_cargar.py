@@ -4,15 +4,52 @@ Recibe peticiones de PS y las distribuye a los Actores usando REQ/REP:
 - DEVOLUCION: Síncrona (REQ/REP con Actor de Devolución)
 - RENOVACION: Síncrona (REQ/REP con Actor de Renovación)
 - PRESTAMO: Síncrona (REQ/REP con Actor de Préstamo)
+- BUSQUEDA: Síncrona, solo lectura (REQ/REP con Actor de Consulta)
+- CONSULTA_USUARIO: Síncrona, solo lectura (REQ/REP con Actor de Consulta)
+- RESUMEN: Síncrona, solo lectura (REQ/REP con Actor de Consulta)
+
+Cada operación tiene su carril con cola acotada y límites de concurrencia y
+tasa (admision.py). El hilo principal recibe por un ROUTER, admite o rechaza
+con OCUPADO y reparte el trabajo a un grupo de hilos trabajadores con cola
+justa ponderada entre carriles, así una ráfaga de préstamos no deja esperando
+a las devoluciones. Los trabajadores devuelven las respuestas por un socket inproc.
+
+Con un GC par configurado (la otra sede), las operaciones autorizadas se
+redirigen a esa sede cuando el Actor local no está sano (salud.py).
 """
 import zmq
 import json
+import threading
+import queue
 from datetime import datetime, timedelta
-import sys
+import argparse
+import time
+
+import trazas
+import plazos
+import admision
+import idempotencia
+import salud
+from cliente_confiable import ClienteConfiable, SinRespuesta, TIMEOUT_DEFECTO_MS, REINTENTOS_DEFECTO
+from metricas import Metricas, ServidorMetricas
+from perfilador import Perfilador
+from control import ServidorControl, INTERVALO_LOOP_MS, sondear
+
+# Operaciones de solo lectura que atiende el Actor de Consulta (un carril cada una)
+OPERACIONES_CONSULTA = ('BUSQUEDA', 'CONSULTA_USUARIO', 'RESUMEN')
 
 class GestorCarga:
     def __init__(self, sede, ps_port=5555, 
-                 actor_dev_port=5556, actor_ren_port=5557, actor_prest_port=5559):
+                 actor_dev_port=5556, actor_ren_port=5557, actor_prest_port=5559,
+                 actor_cons_port=5558, context=None, ps_endpoint=None, actor_endpoints=None, metricas_puerto=None,
+                 control_puerto=None, plazo_defecto_ms=plazos.PLAZO_DEFECTO_MS,
+                 concurrencia=None, profundidad=None, tasa=None,
+                 pesos=None, minimos=None, capacidad=None,
+                 cache_capacidad=idempotencia.CAPACIDAD_DEFECTO, cache_ttl_s=idempotencia.TTL_DEFECTO_S,
+                 timeout_actor_ms=TIMEOUT_DEFECTO_MS, reintentos_actor=REINTENTOS_DEFECTO,
+                 par_endpoint=None, operaciones_failover=salud.OPERACIONES_FAILOVER_DEFECTO,
+                 umbral_salud=salud.UMBRAL_FALLOS_DEFECTO, latencia_maxima_ms=None,
+                 intervalo_salud_s=salud.INTERVALO_DEFECTO_S):
         """
         Inicializa el Gestor de Carga
         
@@ -22,34 +59,285 @@ class GestorCarga:
             actor_dev_port: Puerto del Actor de Devolución (REQ)
             actor_ren_port: Puerto del Actor de Renovación (REQ)
             actor_prest_port: Puerto del Actor de Préstamo (REQ)
+            actor_cons_port: Puerto del Actor de Consulta (REQ); None no atiende consultas
+            context: Contexto ZeroMQ compartido (modo embebido); None crea uno propio
+            ps_endpoint: Endpoint del frontend (ROUTER) explícito; None usa tcp://*:<ps_port>
+            actor_endpoints: dict {operación: endpoint o lista de endpoints para failover};
+                None usa tcp://localhost:<puerto>
+            metricas_puerto: Puerto HTTP de métricas (formato Prometheus); None lo desactiva
+            control_puerto: Puerto del socket de control (perfilado, STATS); None lo desactiva
+            plazo_defecto_ms: Plazo para peticiones que llegan sin 'deadline'; 0 no fija ninguno
+            concurrencia: dict {operación o '*': peticiones en curso a la vez}
+            profundidad: dict {operación o '*': peticiones en cola antes de responder OCUPADO}
+            tasa: dict {operación o '*': peticiones admitidas por segundo}
+            pesos: dict {operación o '*': peso en el reparto justo entre carriles}
+            minimos: dict {operación o '*': fracción de la capacidad reservada (0-1)}
+            capacidad: Trabajadores del GC; None usa la suma de las concurrencias
+            cache_capacidad: Respuestas guardadas para responder reintentos (id_peticion)
+            cache_ttl_s: Segundos que una respuesta guardada sigue siendo válida
+            timeout_actor_ms: Espera máxima por intento en cada solicitud a un Actor
+            reintentos_actor: Reenvíos a un Actor que no respondió
+            par_endpoint: Endpoint del GC de la otra sede para failover; None lo desactiva
+            operaciones_failover: Operaciones que pueden redirigirse a la otra sede
+            umbral_salud: Fallos consecutivos tras los que un destino deja de estar sano
+            latencia_maxima_ms: Latencia promedio a partir de la cual un Actor no está sano
+            intervalo_salud_s: Segundos entre chequeos activos (PING) de Actores y GC par
         """
         self.sede = sede
-        self.context = zmq.Context()
+        self.plazo_defecto_ms = plazo_defecto_ms
+        self.timeout_actor_ms = timeout_actor_ms
+        self.reintentos_actor = reintentos_actor
+        self.contexto_propio = context is None
+        self.context = context or zmq.Context()
         
-        # Socket REP para recibir peticiones de PS
-        self.socket_ps = self.context.socket(zmq.REP)
-        self.socket_ps.bind(f"tcp://*:{ps_port}")
+        self.actor_endpoints = actor_endpoints or {
+            'DEVOLUCION': f"tcp://localhost:{actor_dev_port}",
+            'RENOVACION': f"tcp://localhost:{actor_ren_port}",
+            'PRESTAMO': f"tcp://localhost:{actor_prest_port}",
+            **{operacion: f"tcp://localhost:{actor_cons_port}"
+               for operacion in (OPERACIONES_CONSULTA if actor_cons_port else ())}
+        }
         
-        # Socket REQ para Actor de Devolución (síncrono)
-        self.socket_devolucion = self.context.socket(zmq.REQ)
-        self.socket_devolucion.connect(f"tcp://localhost:{actor_dev_port}")
+        # Socket ROUTER para recibir peticiones de PS (compatible con sus REQ):
+        # permite responder fuera de orden cuando termina cada trabajador
+        self.socket_ps = self.context.socket(zmq.ROUTER)
+        self.ps_endpoint = ps_endpoint or f"tcp://*:{ps_port}"
+        self.socket_ps.bind(self.ps_endpoint)
         
-        # Socket REQ para Actor de Renovación (síncrono)
-        self.socket_renovacion = self.context.socket(zmq.REQ)
-        self.socket_renovacion.connect(f"tcp://localhost:{actor_ren_port}")
+        # Respuestas de los trabajadores hacia el hilo principal
+        self.endpoint_respuestas = f"inproc://gc-sede{sede}-respuestas-{id(self)}"
+        self.socket_respuestas = self.context.socket(zmq.PULL)
+        self.socket_respuestas.bind(self.endpoint_respuestas)
         
-        # Socket REQ para Actor de Préstamo (síncrono)
-        self.socket_prestamo = self.context.socket(zmq.REQ)
-        self.socket_prestamo.connect(f"tcp://localhost:{actor_prest_port}")
+        # Un carril con cola acotada por operación; los sockets REQ hacia los
+        # Actores son por hilo trabajador (los sockets ZeroMQ no se comparten)
+        concurrencia, profundidad, tasa = concurrencia or {}, profundidad or {}, tasa or {}
+        pesos, minimos = pesos or {}, minimos or {}
+        self.carriles = {
+            operacion: admision.Carril(
+                operacion,
+                admision.valor_para(concurrencia, operacion, admision.CONCURRENCIA_DEFECTO),
+                admision.valor_para(profundidad, operacion, admision.PROFUNDIDAD_DEFECTO),
+                admision.valor_para(tasa, operacion, None),
+                admision.valor_para(pesos, operacion, admision.PESO_DEFECTO),
+                admision.valor_para(minimos, operacion, admision.MINIMO_DEFECTO)
+            )
+            for operacion in self.actor_endpoints
+        }
+        self.planificador = admision.Planificador(self.carriles, capacidad)
+        
+        # Reintentos (mismo id_peticion): respuestas completadas y peticiones en
+        # curso, con los PS que esperan la misma respuesta (solo hilo principal)
+        self.cache_respuestas = idempotencia.CacheRespuestas(cache_capacidad, cache_ttl_s)
+        self.en_vuelo = {}
+        self.trabajos = queue.Queue()
+        self.locales = threading.local()
+        self.detenido = threading.Event()
+        self.trabajadores = [
+            threading.Thread(target=self.trabajador, name=f"gc-sede{sede}-trabajador-{i}", daemon=True)
+            for i in range(self.planificador.capacidad)
+        ]
         
         print(f"[GC-Sede{sede}] Iniciado (MODO SÍNCRONO):")
-        print(f"  → Puerto PS (REP): {ps_port}")
-        print(f"  → Actor Devolución (REQ): localhost:{actor_dev_port}")
-        print(f"  → Actor Renovación (REQ): localhost:{actor_ren_port}")
-        print(f"  → Actor Préstamo (REQ): localhost:{actor_prest_port}")
+        print(f"  → PS (ROUTER): {self.ps_endpoint}")
+        print(f"  → Actor Devolución (REQ): {self.actor_endpoints['DEVOLUCION']}")
+        print(f"  → Actor Renovación (REQ): {self.actor_endpoints['RENOVACION']}")
+        print(f"  → Actor Préstamo (REQ): {self.actor_endpoints['PRESTAMO']}")
+        for operacion in OPERACIONES_CONSULTA:
+            if operacion in self.actor_endpoints:
+                print(f"  → Actor Consulta {operacion} (REQ): {self.actor_endpoints[operacion]}")
+        print(f"  → Capacidad: {self.planificador.capacidad} trabajadores")
+        for carril in self.carriles.values():
+            print(f"  → Carril {carril.operacion}: concurrencia={carril.concurrencia}, "
+                  f"cola={carril.profundidad}, tasa={carril.tasa or 'sin límite'}, "
+                  f"peso={carril.peso:g}, reservados={carril.reservado}")
+        
+        # Salud de los Actores locales y del GC par (failover entre sedes)
+        latencia_maxima_s = latencia_maxima_ms / 1000.0 if latencia_maxima_ms else None
+        self.salud = {
+            operacion: salud.SaludDestino(f"Actor-{operacion}", umbral_salud, latencia_maxima_s)
+            for operacion in self.actor_endpoints
+        }
+        self.par_endpoint = par_endpoint
+        self.operaciones_failover = {op.upper() for op in operaciones_failover or ()}
+        self.salud_par = salud.SaludDestino("GC-par", umbral_salud)
+        self.operaciones_sanas_par = set()
+        self.vigia = None
+        if par_endpoint:
+            destinos = [
+                (self.salud[operacion], endpoint, lambda r: r.get('circuito') != 'ABIERTO', True)
+                for operacion, endpoint in self.actor_endpoints.items()
+            ]
+            destinos.append((self.salud_par, par_endpoint, self.evaluar_par, False))
+            self.vigia = salud.VigiaSalud(f"gc_sede{sede}", self.context, destinos, intervalo_salud_s)
+            print(f"  → GC par (failover de {', '.join(sorted(self.operaciones_failover)) or 'ninguna'}): "
+                  f"{par_endpoint}")
         print(f"[GC-Sede{sede}] Esperando peticiones...")
         
         self.contador_peticiones = 0
+        self.descartadas_plazo = 0
+        self.rechazadas = 0
+        self.duplicadas = 0
+        self.redirigidas = 0
+        self.lock_contadores = threading.Lock()
+        
+        self.metricas = Metricas('gc', sede=sede)
+        for carril in self.carriles.values():
+            self.metricas.registrar_gauge('cola_profundidad', lambda c=carril: len(c.cola),
+                                          operacion=carril.operacion)
+            self.metricas.registrar_gauge('carril_en_curso', lambda c=carril: c.en_curso,
+                                          operacion=carril.operacion)
+        self.metricas.registrar_gauge('cache_respuestas_entradas', lambda: len(self.cache_respuestas))
+        for operacion, registro in self.salud.items():
+            self.metricas.registrar_gauge('destino_sano', lambda r=registro: int(r.sano()),
+                                          destino=registro.nombre)
+        if par_endpoint:
+            self.metricas.registrar_gauge('destino_sano', lambda: int(self.salud_par.sano()),
+                                          destino=self.salud_par.nombre)
+        if metricas_puerto:
+            ServidorMetricas(self.metricas, metricas_puerto).start()
+            print(f"[GC-Sede{sede}] Métricas en http://*:{metricas_puerto}/metrics")
+        
+        # Perfilado bajo demanda y socket de control (hilo aparte)
+        self.perfilador = Perfilador(f"gc_sede{sede}")
+        self.control = None
+        if control_puerto:
+            self.control = ServidorControl(f"gc_sede{sede}", control_puerto, self.context)
+            self.control.registrar_perfilador(self.perfilador)
+            self.control.registrar_metricas(self.metricas)
+            self.control.registrar_listo(self.chequear_listo)
+            self.control.registrar('SALUD', lambda s: {
+                'estado': 'OK',
+                'actores': {op: registro.resumen() for op, registro in self.salud.items()},
+                'par': self.salud_par.resumen() if self.par_endpoint else None
+            })
+            self.control.start()
+    
+    def chequear_listo(self):
+        """Chequeos de LISTO: socket enlazado, trabajadores activos y cada Actor alcanzable"""
+        chequeos = {
+            'socket': True,
+            'trabajadores': all(hilo.is_alive() for hilo in self.trabajadores)
+        }
+        for operacion, endpoints in self.actor_endpoints.items():
+            chequeos[f'actor_{operacion.lower()}'] = sondear(endpoints, self.context) is not None
+        return chequeos
+    
+    def cliente_actor(self, operacion):
+        """Cliente REQ confiable del hilo actual hacia el Actor de la operación (se crea al primer uso)"""
+        clientes = getattr(self.locales, 'clientes', None)
+        if clientes is None:
+            clientes = self.locales.clientes = {}
+        cliente = clientes.get(operacion)
+        if cliente is None:
+            cliente = clientes[operacion] = ClienteConfiable(
+                self.context, self.actor_endpoints[operacion], f"Actor-{operacion}",
+                self.timeout_actor_ms, self.reintentos_actor, metricas=self.metricas,
+                esperar_plazo=True
+            )
+        return cliente
+    
+    def cliente_par(self):
+        """Cliente REQ confiable del hilo actual hacia el GC de la otra sede"""
+        clientes = getattr(self.locales, 'clientes', None)
+        if clientes is None:
+            clientes = self.locales.clientes = {}
+        cliente = clientes.get('PAR')
+        if cliente is None:
+            cliente = clientes['PAR'] = ClienteConfiable(
+                self.context, self.par_endpoint, "GC-par",
+                self.timeout_actor_ms, self.reintentos_actor, metricas=self.metricas,
+                esperar_plazo=True
+            )
+        return cliente
+    
+    def evaluar_par(self, respuesta):
+        """PING al GC par: guarda qué operaciones puede atender su sede"""
+        self.operaciones_sanas_par = set(respuesta.get('operaciones_sanas', []))
+        return respuesta.get('estado') == 'OK'
+    
+    def puede_redirigir(self, operacion, peticion):
+        """True si la petición se puede atender en la otra sede"""
+        return (self.par_endpoint is not None
+                and operacion in self.operaciones_failover
+                # Una petición ya redirigida no vuelve a salir de esta sede
+                and not peticion.get(salud.CAMPO)
+                and self.salud_par.sano()
+                and operacion in self.operaciones_sanas_par
+                and not plazos.expirado(peticion))
+    
+    def redirigir(self, operacion, peticion, motivo):
+        """
+        Reenvía la petición completa al GC de la otra sede y devuelve su respuesta
+        
+        El GC par la procesa como propia (admisión, caché por id_peticion, plazo)
+        y, al venir marcada como redirigida, no la vuelve a redirigir.
+        """
+        reenvio = {campo: valor for campo, valor in peticion.items() if campo != 'traza'}
+        reenvio[salud.CAMPO] = self.sede
+        trazas.propagar(peticion, reenvio)
+        plazos.propagar(peticion, reenvio, plazos.MARGEN_SALTO_MS)
+        
+        print(f"[GC-Sede{self.sede}] ↪ {operacion} redirigida a la otra sede ({motivo})")
+        with self.lock_contadores:
+            self.redirigidas += 1
+        self.metricas.incrementar('redirigidas_total', operacion=operacion, motivo=motivo)
+        peticion[salud.CAMPO] = self.sede
+        
+        t_inicio = time.perf_counter()
+        try:
+            respuesta = self.cliente_par().solicitar(reenvio)
+        except SinRespuesta as e:
+            self.salud_par.registrar_fallo()
+            return {'estado': 'ERROR', 'mensaje': f'Sin respuesta del Actor local ni de la otra sede: {e}'}
+        except plazos.PlazoVencido as e:
+            return {'estado': 'EXPIRADO', 'mensaje': str(e)}
+        self.salud_par.registrar_exito(time.perf_counter() - t_inicio)
+        trazas.acumular(peticion, respuesta)
+        return respuesta
+    
+    def solicitar_actor(self, operacion, mensaje_actor, peticion):
+        """
+        Envía un mensaje al Actor de la operación y espera su respuesta
+        (timeout por intento, reintentos y failover en ClienteConfiable)
+        
+        Propaga la traza de la petición y acumula los saltos que devuelve el Actor.
+        Si la operación lo permite, la petición se atiende en la otra sede cuando
+        el Actor local no está sano (no se le envía) o cuando reporta que la
+        mutación no se aplicó ('no_aplicada': sin conexión a MySQL o circuito
+        abierto). Tras un timeout no se redirige: el préstamo pudo haberse
+        aplicado aquí y id_peticion solo deduplica dentro de cada sede.
+        """
+        salud_local = self.salud[operacion]
+        if not salud_local.sano() and self.puede_redirigir(operacion, peticion):
+            return self.redirigir(operacion, peticion, 'local_no_sano')
+        
+        cliente = self.cliente_actor(operacion)
+        trazas.propagar(peticion, mensaje_actor)
+        plazos.propagar(peticion, mensaje_actor, plazos.MARGEN_SALTO_MS)
+        if peticion.get(idempotencia.CAMPO):
+            mensaje_actor[idempotencia.CAMPO] = peticion[idempotencia.CAMPO]
+        t_inicio = time.perf_counter()
+        try:
+            respuesta_actor = cliente.solicitar(mensaje_actor)
+        except SinRespuesta as e:
+            salud_local.registrar_fallo()
+            return {'estado': 'ERROR', 'mensaje': str(e)}
+        except plazos.PlazoVencido as e:
+            return {'estado': 'EXPIRADO', 'mensaje': str(e)}
+        duracion = time.perf_counter() - t_inicio
+        self.metricas.observar('actor_latencia_segundos', duracion,
+                               operacion=str(peticion.get('operacion', '')).upper())
+        trazas.acumular(peticion, respuesta_actor)
+        
+        # GA o MySQL caídos detrás del Actor
+        if respuesta_actor.get('falla_bd'):
+            salud_local.registrar_fallo()
+            if respuesta_actor.get('no_aplicada') and self.puede_redirigir(operacion, peticion):
+                return self.redirigir(operacion, peticion, 'no_aplicada')
+        else:
+            salud_local.registrar_exito(duracion)
+        return respuesta_actor
     
     def procesar_devolucion(self, peticion):
         """
@@ -66,11 +354,8 @@ class GestorCarga:
             'timestamp': peticion['timestamp']
         }
         
-        self.socket_devolucion.send_string(json.dumps(mensaje_actor))
-        
         # Esperar respuesta del Actor (operación síncrona)
-        respuesta_str = self.socket_devolucion.recv_string()
-        respuesta_actor = json.loads(respuesta_str)
+        respuesta_actor = self.solicitar_actor('DEVOLUCION', mensaje_actor, peticion)
         
         # Preparar respuesta para PS
         if respuesta_actor['estado'] == 'OK':
@@ -114,11 +399,8 @@ class GestorCarga:
             'timestamp': peticion['timestamp']
         }
         
-        self.socket_renovacion.send_string(json.dumps(mensaje_actor))
-        
         # Esperar respuesta del Actor (operación síncrona)
-        respuesta_str = self.socket_renovacion.recv_string()
-        respuesta_actor = json.loads(respuesta_str)
+        respuesta_actor = self.solicitar_actor('RENOVACION', mensaje_actor, peticion)
         
         # Preparar respuesta para PS
         if respuesta_actor['estado'] == 'OK':
@@ -156,11 +438,8 @@ class GestorCarga:
             'timestamp': peticion['timestamp']
         }
         
-        self.socket_prestamo.send_string(json.dumps(mensaje_actor))
-        
         # Esperar respuesta del Actor (operación síncrona)
-        respuesta_str = self.socket_prestamo.recv_string()
-        respuesta_actor = json.loads(respuesta_str)
+        respuesta_actor = self.solicitar_actor('PRESTAMO', mensaje_actor, peticion)
         
         # Preparar respuesta para PS
         if respuesta_actor['estado'] == 'OK':
@@ -185,12 +464,337 @@ class GestorCarga:
         
         return respuesta
     
-    def procesar_peticion(self, peticion_str):
+    def procesar_busqueda(self, peticion):
+        """
+        Procesa una búsqueda en el catálogo (síncrona, solo lectura)
+        Envía la consulta al Actor de Consulta, que la resuelve con el índice del GA
+        """
+        consulta = str(peticion.get('consulta', ''))
+        print(f"[GC-Sede{self.sede}] Procesando BÚSQUEDA - {consulta!r}")
+        if 'BUSQUEDA' not in self.actor_endpoints:
+            return {
+                'estado': 'ERROR',
+                'mensaje': 'Este GC no tiene Actor de Consulta configurado',
+                'operacion': 'BUSQUEDA',
+                'timestamp': datetime.now().isoformat()
+            }
+        
+        mensaje_actor = {
+            'operacion': 'BUSQUEDA',
+            'consulta': consulta,
+            'pagina': peticion.get('pagina', 1),
+            'por_pagina': peticion.get('por_pagina'),
+            'timestamp': peticion['timestamp']
+        }
+        respuesta_actor = self.solicitar_actor('BUSQUEDA', mensaje_actor, peticion)
+        
+        if respuesta_actor['estado'] == 'OK':
+            aproximado = '' if respuesta_actor.get('total_exacto', True) else '~'
+            respuesta = {
+                'estado': 'OK',
+                'mensaje': f'{aproximado}{respuesta_actor["total"]} libros para "{consulta}" '
+                           f'(página {respuesta_actor["pagina"]})',
+                'operacion': 'BUSQUEDA',
+                'total': respuesta_actor['total'],
+                'total_exacto': respuesta_actor.get('total_exacto', True),
+                'pagina': respuesta_actor['pagina'],
+                'por_pagina': respuesta_actor['por_pagina'],
+                'resultados': respuesta_actor['resultados'],
+                'timestamp': datetime.now().isoformat()
+            }
+            print(f"[GC-Sede{self.sede}] ✓ Búsqueda procesada ({respuesta_actor['total']} libros)")
+        else:
+            respuesta = {
+                'estado': respuesta_actor['estado'],
+                'mensaje': respuesta_actor['mensaje'],
+                'operacion': 'BUSQUEDA',
+                'timestamp': datetime.now().isoformat()
+            }
+            print(f"[GC-Sede{self.sede}] ✗ Error en búsqueda: {respuesta_actor['mensaje']}")
+        
+        return respuesta
+    
+    def procesar_consulta_usuario(self, peticion):
+        """
+        Procesa una consulta de los préstamos de un usuario (síncrona, solo lectura)
+        Envía la consulta al Actor de Consulta, que la resuelve con el modelo de lectura del GA
+        """
+        usuario_id = peticion['usuario_id']
+        print(f"[GC-Sede{self.sede}] Procesando CONSULTA_USUARIO - Usuario: {usuario_id}")
+        if 'CONSULTA_USUARIO' not in self.actor_endpoints:
+            return {
+                'estado': 'ERROR',
+                'mensaje': 'Este GC no tiene Actor de Consulta configurado',
+                'operacion': 'CONSULTA_USUARIO',
+                'timestamp': datetime.now().isoformat()
+            }
+        
+        mensaje_actor = {
+            'operacion': 'CONSULTA_USUARIO',
+            'usuario_id': usuario_id,
+            'timestamp': peticion['timestamp']
+        }
+        respuesta_actor = self.solicitar_actor('CONSULTA_USUARIO', mensaje_actor, peticion)
+        
+        if respuesta_actor['estado'] == 'OK':
+            vencidos = sum(1 for p in respuesta_actor['prestamos'] if p['vencido'])
+            respuesta = {
+                'estado': 'OK',
+                'mensaje': f'{respuesta_actor["total"]} préstamos abiertos de {usuario_id} '
+                           f'({vencidos} vencidos)',
+                'operacion': 'CONSULTA_USUARIO',
+                'usuario_id': usuario_id,
+                'total': respuesta_actor['total'],
+                'prestamos': respuesta_actor['prestamos'],
+                'timestamp': datetime.now().isoformat()
+            }
+            print(f"[GC-Sede{self.sede}] ✓ Consulta procesada ({respuesta_actor['total']} préstamos)")
+        else:
+            respuesta = {
+                'estado': respuesta_actor['estado'],
+                'mensaje': respuesta_actor['mensaje'],
+                'operacion': 'CONSULTA_USUARIO',
+                'timestamp': datetime.now().isoformat()
+            }
+            print(f"[GC-Sede{self.sede}] ✗ Error en consulta: {respuesta_actor['mensaje']}")
+        
+        return respuesta
+    
+    def procesar_resumen(self, peticion):
+        """
+        Procesa una consulta del resumen operacional de la sede (síncrona, solo lectura)
+        El GA responde con sus agregados en memoria, sin recorrer tablas
+        """
+        print(f"[GC-Sede{self.sede}] Procesando RESUMEN")
+        if 'RESUMEN' not in self.actor_endpoints:
+            return {
+                'estado': 'ERROR',
+                'mensaje': 'Este GC no tiene Actor de Consulta configurado',
+                'operacion': 'RESUMEN',
+                'timestamp': datetime.now().isoformat()
+            }
+        
+        mensaje_actor = {
+            'operacion': 'RESUMEN',
+            'timestamp': peticion['timestamp']
+        }
+        respuesta_actor = self.solicitar_actor('RESUMEN', mensaje_actor, peticion)
+        
+        if respuesta_actor['estado'] == 'OK':
+            prestamos = respuesta_actor['prestamos']
+            respuesta = {
+                'estado': 'OK',
+                'mensaje': f'{respuesta_actor["libros"]["ejemplares_disponibles"]} ejemplares disponibles, '
+                           f'{prestamos["ACTIVO"]} préstamos activos y {prestamos["VENCIDO"]} vencidos',
+                'operacion': 'RESUMEN',
+                'sede': respuesta_actor['sede'],
+                'calculado': respuesta_actor['calculado'],
+                'libros': respuesta_actor['libros'],
+                'prestamos': prestamos,
+                'operaciones_por_hora': respuesta_actor['operaciones_por_hora'],
+                'timestamp': datetime.now().isoformat()
+            }
+            print(f"[GC-Sede{self.sede}] ✓ Resumen procesado")
+        else:
+            respuesta = {
+                'estado': respuesta_actor['estado'],
+                'mensaje': respuesta_actor['mensaje'],
+                'operacion': 'RESUMEN',
+                'timestamp': datetime.now().isoformat()
+            }
+            print(f"[GC-Sede{self.sede}] ✗ Error en resumen: {respuesta_actor['mensaje']}")
+        
+        return respuesta
+    
+    def recibir(self, identidad, peticion_str):
         """
-        Procesa una petición recibida del PS
+        Admite una petición del PS en el carril de su operación (hilo principal)
+        
+        Las peticiones inválidas, vencidas o que no caben en su carril se
+        responden de inmediato; las admitidas esperan en la cola del carril.
         """
+        inicio = trazas.ahora()
         try:
             peticion = json.loads(peticion_str)
+        except json.JSONDecodeError:
+            self.responder(identidad, '', {
+                'estado': 'ERROR',
+                'mensaje': 'Formato de petición inválido',
+                'timestamp': datetime.now().isoformat()
+            })
+            return
+        
+        operacion = str(peticion.get('operacion', '')).upper()
+        carril = self.carriles.get(operacion)
+        
+        # Chequeo de salud del GC par: qué operaciones puede atender esta sede
+        if operacion == 'PING':
+            self.responder(identidad, operacion, {
+                'estado': 'OK',
+                'sede': self.sede,
+                'operaciones_sanas': [op for op, registro in self.salud.items() if registro.sano()]
+            })
+            return
+        
+        # Reintento de una petición ya completada o todavía en curso: no se repite el trabajo
+        id_peticion = peticion.get(idempotencia.CAMPO)
+        if id_peticion and self.atender_duplicada(identidad, operacion, id_peticion):
+            return
+        
+        # Petición vencida (el PS ya se rindió): se descarta sin llegar al Actor
+        plazos.asegurar(peticion, self.plazo_defecto_ms)
+        if carril is None:
+            respuesta = self.despachar(peticion)
+        elif plazos.expirado(peticion):
+            respuesta = self.descartar_expirada(peticion, operacion)
+        else:
+            trabajo = {
+                'identidad': identidad,
+                'peticion': peticion,
+                'operacion': operacion,
+                'inicio': inicio,
+                't_recibido': time.perf_counter()
+            }
+            rechazo = carril.admitir(trabajo)
+            if rechazo is None:
+                if id_peticion:
+                    self.en_vuelo[id_peticion] = []
+                return
+            
+            motivo, reintentar_en_ms = rechazo
+            with self.lock_contadores:
+                self.rechazadas += 1
+            self.metricas.incrementar('rechazadas_total', operacion=operacion, motivo=motivo)
+            respuesta = {
+                'estado': 'OCUPADO',
+                'mensaje': f'GC ocupado ({motivo}) para {operacion}, reintentar en {reintentar_en_ms}ms',
+                'operacion': operacion,
+                'reintentar_en_ms': reintentar_en_ms,
+                'timestamp': datetime.now().isoformat()
+            }
+            print(f"[GC-Sede{self.sede}] ✗ {respuesta['mensaje']}")
+        
+        trazas.cerrar_salto(peticion, respuesta, 'GC', inicio, operacion=operacion)
+        self.responder(identidad, operacion, respuesta)
+    
+    def atender_duplicada(self, identidad, operacion, id_peticion):
+        """
+        Responde un duplicado desde la caché o lo suma a la petición en curso
+        
+        Returns:
+            bool: True si el duplicado quedó atendido
+        """
+        respuesta = self.cache_respuestas.obtener(id_peticion)
+        if respuesta is not None:
+            origen = 'cache'
+            self.responder(identidad, operacion, respuesta)
+        elif id_peticion in self.en_vuelo:
+            origen = 'en_vuelo'
+            self.en_vuelo[id_peticion].append(identidad)
+        else:
+            return False
+        
+        self.duplicadas += 1
+        self.metricas.incrementar('duplicadas_total', operacion=operacion, origen=origen)
+        print(f"[GC-Sede{self.sede}] ↺ Petición {id_peticion} duplicada ({origen}), sin repetir el trabajo")
+        return True
+    
+    def completar(self, identidad, operacion, duracion, id_peticion, respuesta_bytes):
+        """Entrega la respuesta de un trabajador al PS y a los duplicados que la esperaban"""
+        self.carriles[operacion].terminar(duracion)
+        respuesta = json.loads(respuesta_bytes)
+        self.metricas.incrementar('peticiones_total', operacion=operacion, estado=respuesta['estado'])
+        self.socket_ps.send_multipart([identidad, b'', respuesta_bytes])
+        
+        if id_peticion:
+            self.cache_respuestas.guardar(id_peticion, respuesta)
+            for otra in self.en_vuelo.pop(id_peticion, []):
+                self.responder(otra, operacion, idempotencia.marcar_duplicada(respuesta))
+    
+    def descartar_expirada(self, peticion, operacion):
+        with self.lock_contadores:
+            self.descartadas_plazo += 1
+        self.metricas.incrementar('descartadas_plazo_total', operacion=operacion)
+        respuesta = plazos.respuesta_expirada('GC', peticion)
+        print(f"[GC-Sede{self.sede}] ✗ {respuesta['mensaje']}")
+        return respuesta
+    
+    def responder(self, identidad, operacion, respuesta):
+        """Envía la respuesta al PS por el ROUTER (hilo principal)"""
+        self.metricas.incrementar('peticiones_total', operacion=operacion, estado=respuesta['estado'])
+        self.socket_ps.send_multipart([identidad, b'', json.dumps(respuesta).encode('utf-8')])
+    
+    def repartir(self):
+        """Pasa a los trabajadores los trabajos que elige el planificador mientras haya capacidad"""
+        while True:
+            carril = self.planificador.siguiente()
+            if carril is None:
+                break
+            trabajo = self.planificador.tomar(carril)
+            self.metricas.observar('espera_cola_segundos', time.perf_counter() - trabajo['t_recibido'],
+                                   operacion=carril.operacion)
+            self.trabajos.put(trabajo)
+    
+    def procesar_peticion(self, trabajo):
+        """
+        Procesa una petición admitida (en un hilo trabajador)
+        """
+        peticion = trabajo['peticion']
+        operacion = trabajo['operacion']
+        
+        # Pudo vencer mientras esperaba en la cola del carril
+        if plazos.expirado(peticion):
+            respuesta = self.descartar_expirada(peticion, operacion)
+        else:
+            self.metricas.sumar('peticiones_en_curso', 1, operacion=operacion)
+            respuesta = self.despachar(peticion)
+            self.metricas.sumar('peticiones_en_curso', -1, operacion=operacion)
+        
+        if peticion.get(salud.CAMPO):
+            respuesta[salud.CAMPO] = True
+        self.metricas.observar('latencia_segundos', time.perf_counter() - trabajo['t_recibido'],
+                               operacion=operacion)
+        trazas.cerrar_salto(peticion, respuesta, 'GC', trabajo['inicio'], operacion=operacion)
+        return respuesta
+    
+    def trabajador(self):
+        """
+        Hilo trabajador: atiende trabajos de cualquier carril y devuelve la
+        respuesta al hilo principal por el socket inproc
+        """
+        salida = self.context.socket(zmq.PUSH)
+        salida.linger = 0
+        try:
+            salida.connect(self.endpoint_respuestas)
+            while not self.detenido.is_set():
+                try:
+                    trabajo = self.trabajos.get(timeout=INTERVALO_LOOP_MS / 1000)
+                except queue.Empty:
+                    continue
+                if trabajo is None:
+                    break
+                
+                t_inicio = time.perf_counter()
+                respuesta = self.procesar_peticion(trabajo)
+                salida.send_multipart([
+                    trabajo['identidad'],
+                    trabajo['operacion'].encode('utf-8'),
+                    repr(time.perf_counter() - t_inicio).encode('utf-8'),
+                    (trabajo['peticion'].get(idempotencia.CAMPO) or '').encode('utf-8'),
+                    json.dumps(respuesta).encode('utf-8')
+                ])
+        except zmq.ContextTerminated:
+            pass
+        finally:
+            salida.close()
+            for cliente in getattr(self.locales, 'clientes', {}).values():
+                cliente.cerrar()
+    
+    def despachar(self, peticion):
+        """
+        Envía la petición al procesador de su operación
+        """
+        try:
             operacion = peticion.get('operacion', '').upper()
             
             if operacion == 'DEVOLUCION':
@@ -199,6 +803,12 @@ class GestorCarga:
                 return self.procesar_renovacion(peticion)
             elif operacion == 'PRESTAMO':
                 return self.procesar_prestamo(peticion)
+            elif operacion == 'BUSQUEDA':
+                return self.procesar_busqueda(peticion)
+            elif operacion == 'CONSULTA_USUARIO':
+                return self.procesar_consulta_usuario(peticion)
+            elif operacion == 'RESUMEN':
+                return self.procesar_resumen(peticion)
             else:
                 return {
                     'estado': 'ERROR',
@@ -206,12 +816,6 @@ class GestorCarga:
                     'timestamp': datetime.now().isoformat()
                 }
         
-        except json.JSONDecodeError:
-            return {
-                'estado': 'ERROR',
-                'mensaje': 'Formato de petición inválido',
-                'timestamp': datetime.now().isoformat()
-            }
         except Exception as e:
             return {
                 'estado': 'ERROR',
@@ -225,60 +829,165 @@ class GestorCarga:
         """
         print(f"\n[GC-Sede{self.sede}] ¡Listo para recibir peticiones!\n")
         
+        self.perfilador.registrar_hilo()
+        for hilo in self.trabajadores:
+            hilo.start()
+        if self.vigia:
+            self.vigia.start()
+        
+        poller = zmq.Poller()
+        poller.register(self.socket_ps, zmq.POLLIN)
+        poller.register(self.socket_respuestas, zmq.POLLIN)
+        
         try:
             while True:
-                # Esperar petición de PS
-                peticion_str = self.socket_ps.recv_string()
-                self.contador_peticiones += 1
+                # Esperar peticiones de PS o respuestas de los trabajadores
+                self.perfilador.punto_de_control()
+                eventos = dict(poller.poll(INTERVALO_LOOP_MS))
                 
-                print(f"\n{'='*70}")
-                print(f"[GC-Sede{self.sede}] Petición #{self.contador_peticiones} recibida")
+                if self.socket_respuestas in eventos:
+                    while True:
+                        try:
+                            identidad, operacion, duracion, id_peticion, respuesta = \
+                                self.socket_respuestas.recv_multipart(zmq.NOBLOCK)
+                        except zmq.Again:
+                            break
+                        operacion = operacion.decode('utf-8')
+                        self.completar(identidad, operacion, float(duracion),
+                                       id_peticion.decode('utf-8'), respuesta)
+                        print(f"[GC-Sede{self.sede}] ✓ Respuesta de {operacion} enviada al PS")
                 
-                # Procesar petición
-                respuesta = self.procesar_peticion(peticion_str)
+                if self.socket_ps in eventos:
+                    while True:
+                        try:
+                            identidad, _, peticion_str = self.socket_ps.recv_multipart(zmq.NOBLOCK)
+                        except zmq.Again:
+                            break
+                        self.contador_peticiones += 1
+                        print(f"\n[GC-Sede{self.sede}] Petición #{self.contador_peticiones} recibida")
+                        self.recibir(identidad, peticion_str.decode('utf-8'))
                 
-                # Enviar respuesta al PS
-                self.socket_ps.send_string(json.dumps(respuesta))
-                print(f"[GC-Sede{self.sede}] ✓ Respuesta enviada al PS")
-                print(f"{'='*70}")
+                self.repartir()
         
         except KeyboardInterrupt:
             print(f"\n[GC-Sede{self.sede}] Interrumpido por el usuario")
+        except zmq.ContextTerminated:
+            # Modo embebido: el contexto compartido se terminó para detener el sistema
+            print(f"\n[GC-Sede{self.sede}] Contexto terminado, deteniendo")
         finally:
             self.cerrar()
     
     def cerrar(self):
-        """Cierra los sockets y el contexto"""
+        """Detiene los trabajadores y cierra los sockets y el contexto"""
+        if self.control:
+            self.control.detener()
+        if self.vigia:
+            self.vigia.detener()
+        self.detenido.set()
+        for _ in self.trabajadores:
+            self.trabajos.put(None)
         self.socket_ps.close()
-        self.socket_devolucion.close()
-        self.socket_renovacion.close()
-        self.socket_prestamo.close()
-        self.context.term()
+        self.socket_respuestas.close(linger=0)
+        # term() despierta a los trabajadores bloqueados esperando a un Actor
+        if self.contexto_propio:
+            self.context.term()
+        for hilo in self.trabajadores:
+            if hilo.is_alive():
+                hilo.join(timeout=5)
         
         print(f"\n{'='*70}")
         print(f"[GC-Sede{self.sede}] Estadísticas:")
         print(f"  Total peticiones procesadas: {self.contador_peticiones}")
+        print(f"  Rechazadas por admisión (OCUPADO): {self.rechazadas}")
+        print(f"  Duplicadas respondidas sin repetir trabajo: {self.duplicadas}")
+        print(f"  Descartadas por plazo vencido: {self.descartadas_plazo}")
+        if self.par_endpoint:
+            print(f"  Redirigidas a la otra sede: {self.redirigidas}")
         print(f"[GC-Sede{self.sede}] Conexiones cerradas")
         print(f"{'='*70}")
 
 
 def main():
-    if len(sys.argv) < 2:
-        print("Uso: python gestor_carga.py <sede> [ps_port] [actor_dev_port] [actor_ren_port] [actor_prest_port]")
-        print("\nEjemplos:")
-        print("  # Sede 1 - puertos: PS=5555, Dev=5556, Ren=5557, Prest=5559")
-        print("  python gestor_carga.py 1 5555 5556 5557 5559")
-        print("\n  # Sede 2 - puertos: PS=5565, Dev=5566, Ren=5567, Prest=5569")
-        print("  python gestor_carga.py 2 5565 5566 5567 5569")
-        sys.exit(1)
+    parser = argparse.ArgumentParser(
+        description="Gestor de Carga (GC) de una sede",
+        epilog="Ejemplos:\n"
+               "  # Sede 1 - puertos: PS=5555, Dev=5556, Ren=5557, Prest=5559, Consulta=5558\n"
+               "  python gestor_carga.py 1 5555 5556 5557 5559 5558\n"
+               "  # Sede 2 - puertos: PS=5565, Dev=5566, Ren=5567, Prest=5569, Consulta=5568 (métricas en 9201)\n"
+               "  python gestor_carga.py 2 5565 5566 5567 5569 5568 --metricas 9201 --control 7201\n"
+               "  # Admisión: préstamo con 4 en curso, 100 en cola y máximo 200 por segundo\n"
+               "  python gestor_carga.py 1 --concurrencia PRESTAMO=4 --cola PRESTAMO=100 --tasa PRESTAMO=200\n"
+               "  # 6 trabajadores compartidos; devoluciones con el doble de peso y 1/3 reservado\n"
+               "  python gestor_carga.py 1 --capacidad 6 --concurrencia 6 --peso DEVOLUCION=2 --minimo DEVOLUCION=0.33\n"
+               "  # Préstamos a la sede 2 si el Actor de Préstamo local no está sano\n"
+               "  python gestor_carga.py 1 --par 10.43.102.12:5565 --failover PRESTAMO --latencia-max-ms 800",
+        formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument("sede", type=int, help="Sede (1 o 2)")
+    parser.add_argument("ps_port", nargs="?", type=int, default=None, help="Puerto REP para el PS")
+    parser.add_argument("actor_dev_port", nargs="?", type=int, default=None, help="Puerto del Actor de Devolución")
+    parser.add_argument("actor_ren_port", nargs="?", type=int, default=None, help="Puerto del Actor de Renovación")
+    parser.add_argument("actor_prest_port", nargs="?", type=int, default=None, help="Puerto del Actor de Préstamo")
+    parser.add_argument("actor_cons_port", nargs="?", type=int, default=None,
+                        help="Puerto del Actor de Consulta (búsquedas)")
+    parser.add_argument("--metricas", type=int, default=None, help="Puerto HTTP de métricas")
+    parser.add_argument("--control", type=int, default=None,
+                        help="Puerto del socket de control (perfilado bajo demanda, STATS)")
+    parser.add_argument("--plazo-ms", type=int, default=plazos.PLAZO_DEFECTO_MS,
+                        help="Plazo por defecto de las peticiones sin deadline (0 = sin plazo)")
+    parser.add_argument("--concurrencia", nargs="*", default=[], metavar="OP=N",
+                        help=f"Peticiones en curso por operación (defecto {admision.CONCURRENCIA_DEFECTO})")
+    parser.add_argument("--cola", nargs="*", default=[], metavar="OP=N",
+                        help=f"Peticiones en cola por operación antes de OCUPADO (defecto {admision.PROFUNDIDAD_DEFECTO})")
+    parser.add_argument("--tasa", nargs="*", default=[], metavar="OP=N",
+                        help="Peticiones admitidas por segundo por operación (defecto sin límite)")
+    parser.add_argument("--peso", nargs="*", default=[], metavar="OP=W",
+                        help="Peso de cada operación en el reparto justo (defecto 1)")
+    parser.add_argument("--minimo", nargs="*", default=[], metavar="OP=F",
+                        help="Fracción de la capacidad reservada a cada operación (0-1, defecto 0)")
+    parser.add_argument("--capacidad", type=int, default=None,
+                        help="Trabajadores del GC (defecto: suma de las concurrencias)")
+    parser.add_argument("--timeout-actor", type=int, default=TIMEOUT_DEFECTO_MS,
+                        help="Espera máxima (ms) por intento a un Actor si la petición no lleva plazo")
+    parser.add_argument("--reintentos", type=int, default=REINTENTOS_DEFECTO,
+                        help="Reenvíos a un Actor que no respondió")
+    parser.add_argument("--cache-tam", type=int, default=idempotencia.CAPACIDAD_DEFECTO,
+                        help="Respuestas guardadas para responder reintentos por id_peticion")
+    parser.add_argument("--cache-ttl", type=float, default=idempotencia.TTL_DEFECTO_S,
+                        help="Segundos que una respuesta guardada sigue siendo válida")
+    parser.add_argument("--par", default=None, metavar="HOST:PUERTO",
+                        help="GC de la otra sede para failover (defecto desactivado)")
+    parser.add_argument("--failover", nargs="*", default=list(salud.OPERACIONES_FAILOVER_DEFECTO),
+                        metavar="OP", help="Operaciones que pueden redirigirse a la otra sede (defecto PRESTAMO)")
+    parser.add_argument("--umbral-salud", type=int, default=salud.UMBRAL_FALLOS_DEFECTO,
+                        help="Fallos consecutivos tras los que un Actor o el GC par dejan de estar sanos")
+    parser.add_argument("--latencia-max-ms", type=float, default=None,
+                        help="Latencia promedio de un Actor a partir de la cual se redirige")
+    parser.add_argument("--intervalo-salud", type=float, default=salud.INTERVALO_DEFECTO_S,
+                        help="Segundos entre chequeos de salud (PING)")
+    args = parser.parse_args()
     
-    sede = int(sys.argv[1])
-    ps_port = int(sys.argv[2]) if len(sys.argv) > 2 else (5555 if sede == 1 else 5565)
-    actor_dev_port = int(sys.argv[3]) if len(sys.argv) > 3 else (5556 if sede == 1 else 5566)
-    actor_ren_port = int(sys.argv[4]) if len(sys.argv) > 4 else (5557 if sede == 1 else 5567)
-    actor_prest_port = int(sys.argv[5]) if len(sys.argv) > 5 else (5559 if sede == 1 else 5569)
+    sede = args.sede
+    ps_port = args.ps_port or (5555 if sede == 1 else 5565)
+    actor_dev_port = args.actor_dev_port or (5556 if sede == 1 else 5566)
+    actor_ren_port = args.actor_ren_port or (5557 if sede == 1 else 5567)
+    actor_prest_port = args.actor_prest_port or (5559 if sede == 1 else 5569)
+    actor_cons_port = args.actor_cons_port or (5558 if sede == 1 else 5568)
     
-    gestor = GestorCarga(sede, ps_port, actor_dev_port, actor_ren_port, actor_prest_port)
+    gestor = GestorCarga(sede, ps_port, actor_dev_port, actor_ren_port, actor_prest_port, actor_cons_port,
+                         metricas_puerto=args.metricas, control_puerto=args.control,
+                         plazo_defecto_ms=args.plazo_ms,
+                         concurrencia=admision.parsear_por_operacion(args.concurrencia),
+                         profundidad=admision.parsear_por_operacion(args.cola),
+                         tasa=admision.parsear_por_operacion(args.tasa, float),
+                         pesos=admision.parsear_por_operacion(args.peso, float),
+                         minimos=admision.parsear_por_operacion(args.minimo, float),
+                         capacidad=args.capacidad,
+                         cache_capacidad=args.cache_tam, cache_ttl_s=args.cache_ttl,
+                         timeout_actor_ms=args.timeout_actor, reintentos_actor=args.reintentos,
+                         par_endpoint=f"tcp://{args.par}" if args.par else None,
+                         operaciones_failover=args.failover, umbral_salud=args.umbral_salud,
+                         latencia_maxima_ms=args.latencia_max_ms, intervalo_salud_s=args.intervalo_salud)
     gestor.ejecutar()
 
 
@@ -0,0 +1,78 @@
+"""
+Idempotencia de peticiones
+El PS manda un 'id_peticion' único por petición lógica (el mismo en cada
+reintento). El GC guarda las respuestas completadas en una caché acotada con
+TTL y responde los duplicados sin volver a tocar la BD; el GA además registra
+las mutaciones aplicadas en la tabla peticiones_procesadas, que sobrevive a
+reinicios.
+
+    cache = CacheRespuestas(capacidad=10000, ttl_s=300)
+    cache.guardar('ab12...', respuesta)
+    cache.obtener('ab12...')      # copia con 'duplicada': True, o None
+"""
+import collections
+import threading
+import time
+import uuid
+
+CAMPO = 'id_peticion'
+
+CAPACIDAD_DEFECTO = 10000
+TTL_DEFECTO_S = 300
+
+# Solo se guardan resultados definitivos: un ERROR transitorio (BD caída,
+# plazo vencido, GC ocupado) debe poder reintentarse de verdad
+ESTADOS_CACHEABLES = ('OK', 'RECHAZADO')
+
+
+def nuevo_id():
+    """Id de petición nuevo (lo genera el PS)"""
+    return uuid.uuid4().hex
+
+
+def marcar_duplicada(respuesta):
+    """Copia de una respuesta guardada, marcada como respuesta a un duplicado"""
+    copia = dict(respuesta)
+    copia['duplicada'] = True
+    return copia
+
+
+class CacheRespuestas:
+    def __init__(self, capacidad=CAPACIDAD_DEFECTO, ttl_s=TTL_DEFECTO_S):
+        """
+        Caché LRU de respuestas con vencimiento
+
+        Args:
+            capacidad: Máximo de respuestas guardadas (se descartan las menos usadas)
+            ttl_s: Segundos que una respuesta sigue siendo válida
+        """
+        self.capacidad = capacidad
+        self.ttl_s = ttl_s
+        self.entradas = collections.OrderedDict()
+        self.lock = threading.Lock()
+
+    def obtener(self, id_peticion):
+        """Respuesta guardada para el id (marcada como duplicada) o None"""
+        with self.lock:
+            entrada = self.entradas.get(id_peticion)
+            if entrada is None:
+                return None
+            vence, respuesta = entrada
+            if vence < time.monotonic():
+                del self.entradas[id_peticion]
+                return None
+            self.entradas.move_to_end(id_peticion)
+        return marcar_duplicada(respuesta)
+
+    def guardar(self, id_peticion, respuesta):
+        """Guarda la respuesta si es definitiva; descarta la más antigua si se llena"""
+        if respuesta.get('estado') not in ESTADOS_CACHEABLES:
+            return
+        with self.lock:
+            self.entradas[id_peticion] = (time.monotonic() + self.ttl_s, respuesta)
+            self.entradas.move_to_end(id_peticion)
+            while len(self.entradas) > self.capacidad:
+                self.entradas.popitem(last=False)
+
+    def __len__(self):
+        return len(self.entradas)
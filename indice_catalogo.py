@@ -0,0 +1,371 @@
+"""
+Índice invertido del catálogo para la operación BUSQUEDA
+El GA lo construye al arrancar (en segundo plano) leyendo libros por páginas
+de la clave primaria y lo mantiene al día con los libros cuya
+fecha_ultima_actualizacion cambió (índice idx_actualizacion). Las búsquedas
+no tocan MySQL: ni LIKE ni FULLTEXT.
+
+- Tokens: nombre y autor en minúsculas, sin tildes, separados por todo lo que
+  no sea letra o dígito. Cada término de la consulta se busca como prefijo;
+  todos deben aparecer (AND). La expansión junta los tokens del vocabulario
+  hasta cubrir LIMITE_CANDIDATOS libros o MAX_EXPANSIONES tokens; si corta
+  antes de agotar el prefijo, el total no es exacto.
+- Postings: por campo, token -> array de ids de libros ordenado, así una
+  pertenencia es un bisect y un millón de libros ocupa unos pocos MB en postings.
+- Ranking: por término, el mejor de nombre (2) o autor (1), +1 si el token es
+  exacto y no solo prefijo; empate por id (orden de alta).
+- Intersección por ventanas de ids: en cada ventana los tramos de postings se
+  cruzan como conjuntos (en C); un término muy frecuente se verifica id por id.
+- Top-k: durante todo el recorrido se conservan en un montículo (heapq) solo
+  los LIMITE_COINCIDENCIAS mejores (los que alcanzan a la página pedida), así
+  el ranking no depende de qué ids aparecieron primero.
+- Costo acotado: se para al revisar LIMITE_CANDIDATOS del término más
+  selectivo; en ese caso total y ranking son de la parte revisada, el total
+  es una estimación ('total_exacto': False) y conviene afinar la consulta.
+"""
+import mysql.connector
+import unicodedata
+import threading
+import bisect
+import heapq
+import array
+import time
+import re
+
+LIMITE_COINCIDENCIAS = 200      # mejores libros que se conservan para paginar
+LIMITE_CANDIDATOS = 10000       # libros del término más selectivo revisados como máximo
+BLOQUE = 256                    # libros del término más selectivo por ventana de ids
+FACTOR_BISECT = 16              # tramo/intersección a partir del cual se verifica id por id
+MAX_EXPANSIONES = 256           # tokens del vocabulario por término (prefijo)
+MAX_TERMINOS = 8
+POR_PAGINA_DEFECTO = 10
+MAX_POR_PAGINA = 50
+LOTE_CARGA = 10000
+INTERVALO_REFRESCO_S = 30.0
+ESPERA_REINTENTO_S = 5.0
+
+# Campos indexados y su peso en el ranking
+CAMPOS = (('nombre', 2), ('autor', 1))
+BONO_EXACTO = 1
+
+SEPARADORES = re.compile(r"[^0-9a-z]+")
+
+
+def tokenizar(texto):
+    """Tokens en minúsculas y sin tildes (ñ -> n)"""
+    plano = unicodedata.normalize('NFKD', (texto or '').lower()).encode('ascii', 'ignore').decode('ascii')
+    return [token for token in SEPARADORES.split(plano) if token]
+
+
+def contiene(posting, id_libro):
+    i = bisect.bisect_left(posting, id_libro)
+    return i < len(posting) and posting[i] == id_libro
+
+
+class IndiceCatalogo(threading.Thread):
+    def __init__(self, sede, conectar, intervalo_s=INTERVALO_REFRESCO_S, metricas=None):
+        """
+        Args:
+            sede: Sede del GA
+            conectar: Función sin argumentos que devuelve una conexión a la BD de la sede
+            intervalo_s: Segundos entre lecturas de los libros modificados
+            metricas: Registro Metricas (opcional)
+        """
+        super().__init__(name=f"indice-sede{sede}", daemon=True)
+        self.sede = sede
+        self.conectar = conectar
+        self.intervalo_s = intervalo_s
+        self.metricas = metricas
+        self.lock = threading.Lock()
+        self.detenido = threading.Event()
+        self.listo = False
+        self.marca = None
+        self.vaciar()
+        if self.metricas:
+            self.metricas.registrar_gauge('indice_libros', lambda: self.total)
+
+    def vaciar(self):
+        # Documentos indexados por libros.id (los ids de AUTO_INCREMENT son casi densos)
+        self.codigos = []
+        self.textos = []
+        self.postings = {campo: {} for campo, _ in CAMPOS}
+        self.vocabulario = []
+        self.total = 0
+
+    def agregar_documento(self, id_libro, codigo, nombre, autor, vocabulario=True):
+        """
+        Alta de un libro (en la carga los ids llegan en orden: solo se agrega al final)
+
+        Con vocabulario=False no se mantiene el vocabulario ordenado (la carga
+        completa lo ordena una sola vez al final)
+        """
+        if id_libro >= len(self.codigos):
+            relleno = id_libro + 1 - len(self.codigos)
+            self.codigos.extend([None] * relleno)
+            self.textos.extend([None] * relleno)
+        self.codigos[id_libro] = codigo
+        self.textos[id_libro] = (nombre, autor)
+        self.total += 1
+        for (campo, _), texto in zip(CAMPOS, (nombre, autor)):
+            postings = self.postings[campo]
+            for token in set(tokenizar(texto)):
+                posting = postings.get(token)
+                if posting is None:
+                    postings[token] = array.array('i', [id_libro])
+                    if vocabulario and token not in self.postings['nombre' if campo == 'autor' else 'autor']:
+                        bisect.insort(self.vocabulario, token)
+                elif posting[-1] < id_libro:
+                    posting.append(id_libro)
+                else:
+                    posting.insert(bisect.bisect_left(posting, id_libro), id_libro)
+
+    def quitar_documento(self, id_libro):
+        nombre, autor = self.textos[id_libro]
+        for (campo, _), texto in zip(CAMPOS, (nombre, autor)):
+            postings = self.postings[campo]
+            for token in set(tokenizar(texto)):
+                posting = postings[token]
+                posting.pop(bisect.bisect_left(posting, id_libro))
+                if not posting:
+                    del postings[token]
+                    if not any(token in p for p in self.postings.values()):
+                        self.vocabulario.pop(bisect.bisect_left(self.vocabulario, token))
+        self.codigos[id_libro] = None
+        self.textos[id_libro] = None
+        self.total -= 1
+
+    def cargar(self, conexion):
+        """Construcción completa, por páginas de la clave primaria"""
+        t_inicio = time.perf_counter()
+        cursor = conexion.cursor()
+        cursor.execute("SELECT NOW()")
+        marca = cursor.fetchone()[0]
+        ultimo_id = 0
+        with self.lock:
+            self.vaciar()
+        while True:
+            cursor.execute("""
+                SELECT id, codigo, nombre, autor FROM libros
+                WHERE id > %s ORDER BY id LIMIT %s
+            """, (ultimo_id, LOTE_CARGA))
+            filas = cursor.fetchall()
+            if not filas:
+                break
+            with self.lock:
+                for fila in filas:
+                    self.agregar_documento(*fila, vocabulario=False)
+            ultimo_id = filas[-1][0]
+        cursor.close()
+        conexion.commit()
+        with self.lock:
+            self.vocabulario = sorted(set().union(*self.postings.values()))
+        self.marca = marca
+        self.listo = True
+        print(f"[Índice-Sede{self.sede}] ✓ {self.total} libros, {len(self.vocabulario)} tokens "
+              f"({time.perf_counter() - t_inicio:.1f}s)")
+
+    def refrescar(self, conexion):
+        """Reindexa los libros nuevos o con nombre/autor distintos desde la última lectura"""
+        cursor = conexion.cursor()
+        cursor.execute("SELECT NOW()")
+        marca = cursor.fetchone()[0]
+        cursor.execute("""
+            SELECT id, codigo, nombre, autor FROM libros
+            WHERE fecha_ultima_actualizacion >= %s
+        """, (self.marca,))
+        filas = cursor.fetchall()
+        cursor.close()
+        conexion.commit()
+        cambios = 0
+        with self.lock:
+            for id_libro, codigo, nombre, autor in filas:
+                existente = self.textos[id_libro] if id_libro < len(self.textos) else None
+                if existente == (nombre, autor) and self.codigos[id_libro] == codigo:
+                    # Solo cambió el inventario (préstamos, devoluciones)
+                    continue
+                if existente is not None:
+                    self.quitar_documento(id_libro)
+                self.agregar_documento(id_libro, codigo, nombre, autor)
+                cambios += 1
+        self.marca = marca
+        if cambios:
+            print(f"[Índice-Sede{self.sede}] {cambios} libros reindexados")
+
+    def expandir(self, termino):
+        """
+        Tokens del vocabulario que empiezan con el término
+
+        Returns:
+            tuple: ([(token, exacto)], completa); completa es False si quedaron
+                tokens del prefijo afuera (por cantidad de tokens o de libros)
+        """
+        i = bisect.bisect_left(self.vocabulario, termino)
+        expansion = []
+        libros = 0
+        while i < len(self.vocabulario) and self.vocabulario[i].startswith(termino):
+            if len(expansion) >= MAX_EXPANSIONES or libros >= LIMITE_CANDIDATOS:
+                return expansion, False
+            token = self.vocabulario[i]
+            expansion.append((token, token == termino))
+            libros += sum(len(self.postings[campo].get(token, ())) for campo, _ in CAMPOS)
+            i += 1
+        return expansion, True
+
+    def puntajes(self, ids, expansiones, lo, hi):
+        """Puntaje de cada libro de la ventana: por término, el mejor campo y si es exacto"""
+        totales = dict.fromkeys(ids, 0)
+        for expansion in expansiones:
+            mejores = dict.fromkeys(ids, 0)
+            for token, exacto in expansion:
+                for campo, peso in CAMPOS:
+                    posting = self.postings[campo].get(token)
+                    if posting is None:
+                        continue
+                    valor = peso + (BONO_EXACTO if exacto else 0)
+                    tramo = posting[bisect.bisect_left(posting, lo):bisect.bisect_left(posting, hi)]
+                    if len(tramo) > FACTOR_BISECT * len(ids):
+                        presentes = [i for i in ids if contiene(tramo, i)]
+                    else:
+                        presentes = ids.intersection(tramo)
+                    for id_libro in presentes:
+                        if mejores[id_libro] < valor:
+                            mejores[id_libro] = valor
+            for id_libro, valor in mejores.items():
+                totales[id_libro] += valor
+        return totales
+
+    def en_ventana(self, listas, lo, hi, actuales=None):
+        """
+        Ids de un término dentro de [lo, hi); con actuales, solo los que ya
+        cumplieron los términos anteriores (intersección)
+        """
+        tramos = [posting[bisect.bisect_left(posting, lo):bisect.bisect_left(posting, hi)] for posting in listas]
+        if actuales is not None and sum(map(len, tramos)) > FACTOR_BISECT * len(actuales):
+            # Término mucho más frecuente que la intersección: se verifica cada id
+            return {i for i in actuales if any(contiene(tramo, i) for tramo in tramos)}
+        ids = set()
+        for tramo in tramos:
+            ids.update(tramo)
+        return ids if actuales is None else actuales & ids
+
+    def buscar(self, consulta, pagina=1, por_pagina=POR_PAGINA_DEFECTO):
+        """
+        Búsqueda por prefijos y palabras clave sobre nombre y autor
+
+        Returns:
+            dict: Resultados de la página con el total (exacto o estimado)
+        """
+        if not self.listo:
+            return {
+                'estado': 'ERROR',
+                'mensaje': 'El índice de búsqueda todavía se está construyendo'
+            }
+        terminos = list(dict.fromkeys(tokenizar(consulta)))[:MAX_TERMINOS]
+        if not terminos:
+            return {
+                'estado': 'ERROR',
+                'mensaje': 'La búsqueda no tiene palabras'
+            }
+        pagina = max(1, int(pagina or 1))
+        por_pagina = min(MAX_POR_PAGINA, max(1, int(por_pagina or POR_PAGINA_DEFECTO)))
+
+        # Montículo de mínimos con los k mejores: (puntaje, -id), el peor arriba
+        k = min(LIMITE_COINCIDENCIAS, pagina * por_pagina)
+        mejores = []
+        coincidencias = 0
+        revisados = 0
+        fin = lo = 0
+        with self.lock:
+            expandidos = [self.expandir(termino) for termino in terminos]
+            expansiones = [expansion for expansion, _ in expandidos]
+            completas = all(completa for _, completa in expandidos)
+            if all(expansiones):
+                listas = [
+                    [self.postings[campo][token] for token, _ in expansion
+                     for campo, _ in CAMPOS if token in self.postings[campo]]
+                    for expansion in expansiones
+                ]
+                tamanos = [sum(map(len, lista)) for lista in listas]
+                orden = sorted(range(len(listas)), key=tamanos.__getitem__)
+                # Ventanas de ids con ~BLOQUE libros del término más selectivo
+                fin = len(self.codigos)
+                ancho = max(BLOQUE, BLOQUE * fin // max(1, tamanos[orden[0]]))
+                while lo < fin and revisados < LIMITE_CANDIDATOS:
+                    hi = lo + ancho
+                    ids = None
+                    for indice in orden:
+                        ids = self.en_ventana(listas[indice], lo, hi, ids)
+                        if indice == orden[0]:
+                            revisados += len(ids)
+                        if not ids:
+                            break
+                    if ids:
+                        puntajes = self.puntajes(ids, expansiones, lo, hi)
+                        coincidencias += len(ids)
+                        for id_libro in ids:
+                            entrada = (puntajes[id_libro], -id_libro)
+                            if len(mejores) < k:
+                                heapq.heappush(mejores, entrada)
+                            elif entrada > mejores[0]:
+                                heapq.heapreplace(mejores, entrada)
+                    lo = hi
+
+            mejores.sort(reverse=True)
+            inicio = (pagina - 1) * por_pagina
+            resultados = [
+                {
+                    'codigo': self.codigos[-negativo],
+                    'nombre': self.textos[-negativo][0],
+                    'autor': self.textos[-negativo][1],
+                    'puntaje': puntaje
+                }
+                for puntaje, negativo in mejores[inicio:inicio + por_pagina]
+            ]
+
+        # Un prefijo expandido a medias deja afuera libros que coincidían
+        exacto = lo >= fin and completas
+        # Sin recorrer todo el catálogo el total se extrapola de la parte revisada
+        total = coincidencias if lo >= fin else round(coincidencias * fin / lo)
+        return {
+            'estado': 'OK',
+            'consulta': consulta,
+            'terminos': terminos,
+            'total': total,
+            'total_exacto': exacto,
+            'pagina': pagina,
+            'por_pagina': por_pagina,
+            'resultados': resultados
+        }
+
+    def run(self):
+        conexion = None
+        en_falla = False
+        while not self.detenido.is_set():
+            try:
+                if conexion is None:
+                    conexion = self.conectar()
+                if not self.listo:
+                    self.cargar(conexion)
+                else:
+                    self.refrescar(conexion)
+                if en_falla:
+                    print(f"[Índice-Sede{self.sede}] ✓ Conexión a MySQL restablecida")
+                    en_falla = False
+                self.detenido.wait(self.intervalo_s)
+            except mysql.connector.Error as e:
+                if not en_falla:
+                    print(f"[Índice-Sede{self.sede}] ⚠ No se pudo leer el catálogo: {e} "
+                          f"(reintentos cada {ESPERA_REINTENTO_S}s)")
+                    en_falla = True
+                if conexion is not None:
+                    try:
+                        conexion.close()
+                    except mysql.connector.Error:
+                        pass
+                    conexion = None
+                self.detenido.wait(ESPERA_REINTENTO_S)
+        if conexion is not None:
+            conexion.close()
+
+    def detener(self):
+        self.detenido.set()
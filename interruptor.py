@@ -0,0 +1,116 @@
+"""
+Interruptor de circuito (circuit breaker)
+Protege al Actor de un GA o MySQL caídos: tras 'umbral' fallos consecutivos el
+circuito se abre y las solicitudes se rechazan de inmediato, sin esperar
+timeouts ni reintentos. Pasado el enfriamiento deja pasar una sola solicitud
+de prueba (semiabierto): si funciona se cierra, si falla vuelve a abrirse.
+
+    CERRADO --umbral fallos--> ABIERTO --enfriamiento--> SEMIABIERTO
+       ^                          ^                          |
+       +--------- éxito ----------+--------- fallo ----------+
+
+    interruptor = Interruptor("GA", umbral=5, enfriamiento_s=10)
+    if not interruptor.permitir():
+        return respuesta_rapida
+    ...
+    interruptor.registrar_exito()   # o registrar_fallo()
+"""
+import threading
+import time
+
+CERRADO = 'CERRADO'
+ABIERTO = 'ABIERTO'
+SEMIABIERTO = 'SEMIABIERTO'
+
+# Valor del gauge circuito_estado para cada estado
+VALORES_ESTADO = {CERRADO: 0, SEMIABIERTO: 1, ABIERTO: 2}
+
+UMBRAL_DEFECTO = 5
+ENFRIAMIENTO_DEFECTO_S = 10.0
+
+
+class Interruptor:
+    def __init__(self, nombre, umbral=UMBRAL_DEFECTO, enfriamiento_s=ENFRIAMIENTO_DEFECTO_S,
+                 metricas=None):
+        """
+        Args:
+            nombre: Nombre del destino protegido (logs y etiqueta de métricas)
+            umbral: Fallos consecutivos que abren el circuito
+            enfriamiento_s: Segundos que el circuito queda abierto antes de probar
+            metricas: Registro Metricas donde exportar estado y transiciones (opcional)
+        """
+        self.nombre = nombre
+        self.umbral = max(1, int(umbral))
+        self.enfriamiento_s = float(enfriamiento_s)
+        self.metricas = metricas
+
+        self.estado = CERRADO
+        self.fallos_consecutivos = 0
+        self.abierto_desde = 0.0
+        self.prueba_en_curso = False
+        self.rechazadas = 0
+        self.aperturas = 0
+        self.lock = threading.Lock()
+
+        if self.metricas:
+            self.metricas.fijar('circuito_estado', VALORES_ESTADO[self.estado], destino=self.nombre)
+
+    def cambiar(self, estado):
+        self.estado = estado
+        if estado == ABIERTO:
+            self.abierto_desde = time.monotonic()
+            self.aperturas += 1
+        print(f"[Circuito-{self.nombre}] → {estado}")
+        if self.metricas:
+            self.metricas.fijar('circuito_estado', VALORES_ESTADO[estado], destino=self.nombre)
+            self.metricas.incrementar('circuito_transiciones_total', destino=self.nombre, estado=estado)
+
+    def reintentar_en_s(self):
+        """Segundos que faltan para la próxima solicitud de prueba"""
+        return max(0.0, self.abierto_desde + self.enfriamiento_s - time.monotonic())
+
+    def permitir(self):
+        """True si la solicitud puede salir; False si debe rechazarse de inmediato"""
+        with self.lock:
+            if self.estado == ABIERTO and self.reintentar_en_s() <= 0:
+                self.cambiar(SEMIABIERTO)
+            if self.estado == CERRADO:
+                return True
+            if self.estado == SEMIABIERTO and not self.prueba_en_curso:
+                self.prueba_en_curso = True
+                return True
+            self.rechazadas += 1
+        if self.metricas:
+            self.metricas.incrementar('circuito_rechazadas_total', destino=self.nombre)
+        return False
+
+    def registrar_exito(self):
+        with self.lock:
+            self.fallos_consecutivos = 0
+            self.prueba_en_curso = False
+            if self.estado != CERRADO:
+                self.cambiar(CERRADO)
+
+    def registrar_fallo(self):
+        with self.lock:
+            self.fallos_consecutivos += 1
+            if self.estado == SEMIABIERTO:
+                self.prueba_en_curso = False
+                self.cambiar(ABIERTO)
+            elif self.estado == CERRADO and self.fallos_consecutivos >= self.umbral:
+                self.cambiar(ABIERTO)
+
+    def liberar(self):
+        """Termina una solicitud sin veredicto (p. ej. plazo vencido) sin cambiar de estado"""
+        with self.lock:
+            self.prueba_en_curso = False
+
+    def resumen(self):
+        """Estado actual para STATS y las estadísticas finales"""
+        return {
+            'circuito': self.estado,
+            'fallos_consecutivos': self.fallos_consecutivos,
+            'aperturas': self.aperturas,
+            'rechazadas': self.rechazadas,
+            'reintentar_en_s': round(self.reintentar_en_s(), 1) if self.estado == ABIERTO else 0.0
+        }
@@ -0,0 +1,206 @@
+"""
+Lanzador de una sede
+Arranca GA, Actores y GC de una sede a partir de un archivo de configuración
+JSON y espera a que cada componente responda LISTO en su socket de control
+(sockets enlazados, pool de BD calentado y destinos alcanzables), en lugar de
+esperas fijas con sleep. Todos los procesos arrancan en paralelo: el GC y los
+Actores pueden conectarse antes de que su destino exista (ZeroMQ reintenta la
+conexión), y la sonda LISTO solo se cumple cuando toda la cadena responde.
+
+    python lanzador.py config_sede1.json
+    python lanzador.py config_sede2.json --mysql-host 10.43.102.20 --no-esperar
+"""
+import subprocess
+import argparse
+import json
+import os
+import signal
+import sys
+import time
+
+from control import enviar_comando
+
+# Cada cuánto se consulta LISTO a los componentes que aún no están listos
+INTERVALO_SONDEO_S = 0.05
+# Espera máxima de cada consulta LISTO (el GC hace PING a cada Actor dentro de ella)
+TIMEOUT_LISTO_MS = 4000
+TIMEOUT_ARRANQUE_DEFECTO_S = 30
+# Segundos que se espera a que un componente termine tras SIGINT antes de matarlo
+ESPERA_CIERRE_S = 5
+
+# En el orden de los puertos posicionales del GC; CONSULTA es opcional en la configuración
+ACTORES = ('DEVOLUCION', 'RENOVACION', 'PRESTAMO', 'CONSULTA')
+
+
+class Lanzador:
+    def __init__(self, config, python=None, directorio_logs=None):
+        """
+        Args:
+            config: dict de configuración de la sede (ver config_sede1.json)
+            python: Intérprete con el que se lanzan los componentes; None usa el actual
+            directorio_logs: Carpeta de los logs <componente>.log; None usa la de config o '.'
+        """
+        self.config = config
+        self.sede = int(config['sede'])
+        self.python = python or config.get('python') or sys.executable
+        self.directorio_logs = directorio_logs or config.get('logs', '.')
+        self.host_control = config.get('host_control', 'localhost')
+        self.procesos = {}
+        self.logs = []
+
+    def comandos(self):
+        """Lista de (nombre, puerto de control, argv) de cada componente de la sede"""
+        sede = str(self.sede)
+        mysql = self.config.get('mysql', {})
+        ga = self.config['ga']
+        gc = self.config['gc']
+        actores = self.config['actores']
+
+        comandos = [(
+            'ga', ga['control'],
+            ['gestor_almacenamiento.py', sede, str(ga['puerto']),
+             mysql.get('host', 'localhost'), str(mysql.get('puerto', 3306))] + ga.get('args', [])
+        )]
+        tipos = [tipo for tipo in ACTORES if tipo in actores]
+        for tipo in tipos:
+            actor = actores[tipo]
+            comandos.append((
+                tipo.lower(), actor['control'],
+                ['actor.py', tipo, sede, str(actor['puerto']),
+                 ga.get('host', 'localhost'), str(ga['puerto'])] + actor.get('args', [])
+            ))
+        comandos.append((
+            'gc', gc['control'],
+            ['gestor_cargar.py', sede, str(gc['puerto'])]
+            + [str(actores[tipo]['puerto']) for tipo in tipos] + gc.get('args', [])
+        ))
+        return [(nombre, control, argv + ['--control', str(control)])
+                for nombre, control, argv in comandos]
+
+    def arrancar(self):
+        """Lanza todos los componentes en paralelo, con la salida en <componente>.log"""
+        os.makedirs(self.directorio_logs, exist_ok=True)
+        directorio = os.path.dirname(os.path.abspath(__file__))
+        for nombre, control, argv in self.comandos():
+            ruta_log = os.path.join(self.directorio_logs, f"{nombre}.log")
+            log = open(ruta_log, 'w')
+            self.logs.append(log)
+            proceso = subprocess.Popen(
+                [self.python, '-u', os.path.join(directorio, argv[0])] + argv[1:],
+                stdout=log, stderr=subprocess.STDOUT, stdin=subprocess.DEVNULL
+            )
+            self.procesos[nombre] = (proceso, control, ruta_log)
+            print(f"[Lanzador-Sede{self.sede}] → {nombre} (pid {proceso.pid}, control {control}, log {ruta_log})")
+
+    def esperar_listos(self, timeout_s):
+        """
+        Consulta LISTO a cada componente hasta que todos lo estén
+
+        Returns:
+            bool: True si todos quedaron listos antes del timeout
+        """
+        pendientes = dict(self.procesos)
+        t_inicio = time.perf_counter()
+        ultimo = {}
+        while pendientes:
+            for nombre, (proceso, control, ruta_log) in list(pendientes.items()):
+                if proceso.poll() is not None:
+                    print(f"[Lanzador-Sede{self.sede}] ✗ {nombre} terminó al arrancar "
+                          f"(código {proceso.returncode}), ver {ruta_log}")
+                    return False
+                respuesta = enviar_comando(f"{self.host_control}:{control}", {'comando': 'LISTO'},
+                                           TIMEOUT_LISTO_MS)
+                if respuesta.get('listo'):
+                    print(f"[Lanzador-Sede{self.sede}] ✓ {nombre} listo "
+                          f"({time.perf_counter() - t_inicio:.2f}s)")
+                    del pendientes[nombre]
+                else:
+                    ultimo[nombre] = respuesta.get('chequeos') or respuesta.get('mensaje')
+            if not pendientes:
+                break
+            if time.perf_counter() - t_inicio > timeout_s:
+                for nombre in pendientes:
+                    print(f"[Lanzador-Sede{self.sede}] ✗ {nombre} no quedó listo: {ultimo.get(nombre)}")
+                return False
+            time.sleep(INTERVALO_SONDEO_S)
+        return True
+
+    def ejecutar(self, esperar=True, timeout_s=TIMEOUT_ARRANQUE_DEFECTO_S):
+        """
+        Arranca la sede y espera que esté lista; con esperar=True queda a cargo
+        de los procesos hasta Ctrl+C
+
+        Returns:
+            int: Código de salida (0 si la sede quedó lista)
+        """
+        t_inicio = time.perf_counter()
+        self.arrancar()
+        if not self.esperar_listos(timeout_s):
+            self.cerrar()
+            return 1
+        print(f"\n[Lanzador-Sede{self.sede}] ✓ Sede {self.sede} lista en "
+              f"{time.perf_counter() - t_inicio:.2f}s")
+
+        if not esperar:
+            return 0
+        print(f"[Lanzador-Sede{self.sede}] Presiona Ctrl+C para detener todos los componentes")
+        try:
+            while True:
+                for nombre, (proceso, _, ruta_log) in self.procesos.items():
+                    if proceso.poll() is not None:
+                        print(f"[Lanzador-Sede{self.sede}] ⚠ {nombre} terminó "
+                              f"(código {proceso.returncode}), ver {ruta_log}")
+                        return 1
+                time.sleep(1)
+        except KeyboardInterrupt:
+            print(f"\n[Lanzador-Sede{self.sede}] Deteniendo componentes...")
+            return 0
+        finally:
+            self.cerrar()
+
+    def cerrar(self):
+        """Detiene los componentes en orden inverso (GC primero) con SIGINT y, si no terminan, los mata"""
+        for nombre, (proceso, _, _) in reversed(list(self.procesos.items())):
+            if proceso.poll() is None:
+                proceso.send_signal(signal.SIGINT)
+        for nombre, (proceso, _, _) in reversed(list(self.procesos.items())):
+            try:
+                proceso.wait(timeout=ESPERA_CIERRE_S)
+            except subprocess.TimeoutExpired:
+                print(f"[Lanzador-Sede{self.sede}] ⚠ {nombre} no terminó, forzando cierre")
+                proceso.kill()
+        for log in self.logs:
+            log.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Lanza GA, Actores y GC de una sede y espera a que estén listos",
+        epilog="Ejemplos:\n"
+               "  python lanzador.py config_sede1.json\n"
+               "  python lanzador.py config_sede2.json --mysql-host 10.43.102.20\n"
+               "  # Arrancar, esperar LISTO y dejar los componentes corriendo\n"
+               "  python lanzador.py config_sede1.json --no-esperar",
+        formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument("config", help="Archivo JSON de configuración de la sede")
+    parser.add_argument("--mysql-host", default=None, help="Host de MySQL (reemplaza el de la configuración)")
+    parser.add_argument("--python", default=None, help="Intérprete de Python para los componentes")
+    parser.add_argument("--logs", default=None, help="Carpeta de los logs de cada componente")
+    parser.add_argument("--timeout", type=float, default=TIMEOUT_ARRANQUE_DEFECTO_S,
+                        help="Segundos máximos para que la sede quede lista")
+    parser.add_argument("--no-esperar", action="store_true",
+                        help="Terminar en cuanto la sede esté lista, dejando los componentes corriendo")
+    args = parser.parse_args()
+
+    with open(args.config) as archivo:
+        config = json.load(archivo)
+    if args.mysql_host:
+        config.setdefault('mysql', {})['host'] = args.mysql_host
+
+    lanzador = Lanzador(config, python=args.python, directorio_logs=args.logs)
+    sys.exit(lanzador.ejecutar(esperar=not args.no_esperar, timeout_s=args.timeout))
+
+
+if __name__ == "__main__":
+    main()
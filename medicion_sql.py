@@ -0,0 +1,102 @@
+"""
+Tiempo en MySQL por solicitud
+El GA mide 'proceso_ms' alrededor de procesar_solicitud(), pero eso mezcla
+la espera de MySQL con el trabajo en Python (validaciones, diario, índices).
+Las conexiones que entrega conectar_bd() se envuelven para sumar, en el hilo
+que está midiendo, lo que tardan cursor.execute(), la lectura de filas y
+commit():
+
+    medidor = MedidorSQL()
+    conexion = medidor.envolver(conexion)   # en conectar_bd()
+    medidor.iniciar()
+    respuesta = procesar(...)
+    sql_ms = medidor.terminar()
+
+La suma es por hilo: los hilos de fondo (aplicador del diario, purga,
+barredor) usan las mismas conexiones sin contar en la solicitud en curso.
+"""
+import threading
+import time
+
+
+class MedidorSQL:
+    def __init__(self):
+        self.locales = threading.local()
+
+    def iniciar(self):
+        """Empieza a acumular el tiempo SQL del hilo actual"""
+        self.locales.segundos = 0.0
+
+    def terminar(self):
+        """Deja de acumular y devuelve los milisegundos sumados desde iniciar()"""
+        segundos = getattr(self.locales, 'segundos', None) or 0.0
+        self.locales.segundos = None
+        return segundos * 1000
+
+    def sumar(self, segundos):
+        if getattr(self.locales, 'segundos', None) is not None:
+            self.locales.segundos += segundos
+
+    def envolver(self, conexion):
+        """Conexión que cuenta sus execute() y commit() (None se devuelve tal cual)"""
+        if conexion is None:
+            return None
+        return ConexionMedida(conexion, self)
+
+
+class ConexionMedida:
+    """Delegado de una conexión de mysql.connector que mide commit() y sus cursores"""
+
+    def __init__(self, conexion, medidor):
+        self._conexion = conexion
+        self._medidor = medidor
+
+    def __getattr__(self, nombre):
+        return getattr(self._conexion, nombre)
+
+    def cursor(self, *args, **kwargs):
+        return CursorMedido(self._conexion.cursor(*args, **kwargs), self._medidor)
+
+    def commit(self):
+        t_inicio = time.perf_counter()
+        try:
+            return self._conexion.commit()
+        finally:
+            self._medidor.sumar(time.perf_counter() - t_inicio)
+
+
+class CursorMedido:
+    """Delegado de un cursor que mide execute() y la lectura de sus filas"""
+
+    def __init__(self, cursor, medidor):
+        self._cursor = cursor
+        self._medidor = medidor
+
+    def __getattr__(self, nombre):
+        return getattr(self._cursor, nombre)
+
+    def __iter__(self):
+        return iter(self._cursor)
+
+    def _medir(self, funcion, *args, **kwargs):
+        t_inicio = time.perf_counter()
+        try:
+            return funcion(*args, **kwargs)
+        finally:
+            self._medidor.sumar(time.perf_counter() - t_inicio)
+
+    def execute(self, *args, **kwargs):
+        return self._medir(self._cursor.execute, *args, **kwargs)
+
+    def executemany(self, *args, **kwargs):
+        return self._medir(self._cursor.executemany, *args, **kwargs)
+
+    # Con un cursor sin buffer las filas se leen del socket al pedirlas
+    def fetchone(self):
+        return self._medir(self._cursor.fetchone)
+
+    def fetchall(self):
+        return self._medir(self._cursor.fetchall)
+
+    def fetchmany(self, *args, **kwargs):
+        return self._medir(self._cursor.fetchmany, *args, **kwargs)
@@ -0,0 +1,211 @@
+"""
+Métricas en vivo de los componentes (GC, Actor, GA)
+Contadores, gauges e histogramas de latencia con etiquetas, expuestos en
+formato de texto de Prometheus por un endpoint HTTP en un hilo aparte:
+
+    metricas = Metricas('gc', sede=1)
+    metricas.incrementar('peticiones_total', operacion='PRESTAMO', estado='OK')
+    metricas.observar('latencia_segundos', 0.012, operacion='PRESTAMO')
+    ServidorMetricas(metricas, 9101).start()   # GET http://host:9101/metrics
+
+Todas las operaciones son seguras entre hilos; el costo por evento es un
+lock y una suma, así que se pueden registrar en el camino de cada petición.
+"""
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import threading
+import bisect
+
+# Límites (segundos) de los histogramas de latencia
+BUCKETS_LATENCIA = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05,
+                    0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+class Histograma:
+    def __init__(self, limites=BUCKETS_LATENCIA):
+        self.limites = limites
+        self.cuentas = [0] * (len(limites) + 1)
+        self.suma = 0.0
+        self.total = 0
+
+    def observar(self, valor):
+        self.cuentas[bisect.bisect_left(self.limites, valor)] += 1
+        self.suma += valor
+        self.total += 1
+
+
+class Metricas:
+    def __init__(self, componente, **etiquetas_base):
+        """
+        Inicializa el registro de métricas de un componente
+
+        Args:
+            componente: Nombre corto del componente ('gc', 'actor', 'ga')
+            **etiquetas_base: Etiquetas comunes a todas las series (p. ej. sede=1)
+        """
+        self.prefijo = f"biblioteca_{componente}_"
+        self.etiquetas_base = tuple(sorted((k, str(v)) for k, v in etiquetas_base.items()))
+        self.lock = threading.Lock()
+        self.contadores = {}
+        self.gauges = {}
+        self.histogramas = {}
+        self.callbacks = {}
+
+    def clave(self, nombre, etiquetas):
+        return (nombre, tuple(sorted((k, str(v)) for k, v in etiquetas.items())))
+
+    def incrementar(self, nombre, valor=1, **etiquetas):
+        """Suma valor a un contador"""
+        clave = self.clave(nombre, etiquetas)
+        with self.lock:
+            self.contadores[clave] = self.contadores.get(clave, 0) + valor
+
+    def fijar(self, nombre, valor, **etiquetas):
+        """Fija el valor de un gauge"""
+        clave = self.clave(nombre, etiquetas)
+        with self.lock:
+            self.gauges[clave] = valor
+
+    def sumar(self, nombre, delta, **etiquetas):
+        """Suma (o resta) delta a un gauge"""
+        clave = self.clave(nombre, etiquetas)
+        with self.lock:
+            self.gauges[clave] = self.gauges.get(clave, 0) + delta
+
+    def observar(self, nombre, valor, **etiquetas):
+        """Registra una observación (segundos) en un histograma"""
+        clave = self.clave(nombre, etiquetas)
+        with self.lock:
+            histograma = self.histogramas.get(clave)
+            if histograma is None:
+                histograma = self.histogramas[clave] = Histograma()
+            histograma.observar(valor)
+
+    def registrar_gauge(self, nombre, funcion, **etiquetas):
+        """Registra un gauge cuyo valor se calcula con funcion() en cada lectura"""
+        with self.lock:
+            self.callbacks[self.clave(nombre, etiquetas)] = funcion
+
+    def valor(self, nombre, **etiquetas):
+        """Valor actual de un contador o gauge (0 si no existe)"""
+        clave = self.clave(nombre, etiquetas)
+        with self.lock:
+            return self.contadores.get(clave, self.gauges.get(clave, 0))
+
+    def formatear_etiquetas(self, etiquetas, extra=()):
+        pares = self.etiquetas_base + etiquetas + tuple(extra)
+        if not pares:
+            return ""
+        return "{" + ",".join(f'{k}="{v}"' for k, v in pares) + "}"
+
+    def instantanea(self):
+        """
+        Copia de todas las series como dict (para depuración o el socket de control)
+
+        Returns:
+            dict: {'contadores': {...}, 'gauges': {...}, 'histogramas': {...}}
+        """
+        with self.lock:
+            contadores = dict(self.contadores)
+            gauges = dict(self.gauges)
+            callbacks = dict(self.callbacks)
+            histogramas = {clave: (h.total, h.suma) for clave, h in self.histogramas.items()}
+
+        for clave, funcion in callbacks.items():
+            gauges[clave] = funcion()
+
+        def nombre_serie(clave):
+            return self.prefijo + clave[0] + self.formatear_etiquetas(clave[1])
+
+        return {
+            'contadores': {nombre_serie(c): v for c, v in contadores.items()},
+            'gauges': {nombre_serie(c): v for c, v in gauges.items()},
+            'histogramas': {nombre_serie(c): {'total': t, 'suma': s}
+                            for c, (t, s) in histogramas.items()}
+        }
+
+    def exponer(self):
+        """Texto en formato de exposición de Prometheus (versión 0.0.4)"""
+        with self.lock:
+            contadores = sorted(self.contadores.items())
+            gauges = dict(self.gauges)
+            callbacks = dict(self.callbacks)
+            histogramas = sorted(
+                (clave, (list(h.limites), list(h.cuentas), h.suma, h.total))
+                for clave, h in self.histogramas.items()
+            )
+
+        for clave, funcion in callbacks.items():
+            try:
+                gauges[clave] = funcion()
+            except Exception:
+                continue
+
+        lineas = []
+        tipos_emitidos = set()
+
+        def tipo(nombre, clase):
+            if nombre not in tipos_emitidos:
+                tipos_emitidos.add(nombre)
+                lineas.append(f"# TYPE {self.prefijo}{nombre} {clase}")
+
+        for (nombre, etiquetas), valor in contadores:
+            tipo(nombre, "counter")
+            lineas.append(f"{self.prefijo}{nombre}{self.formatear_etiquetas(etiquetas)} {valor}")
+
+        for (nombre, etiquetas), valor in sorted(gauges.items()):
+            tipo(nombre, "gauge")
+            lineas.append(f"{self.prefijo}{nombre}{self.formatear_etiquetas(etiquetas)} {valor}")
+
+        for (nombre, etiquetas), (limites, cuentas, suma, total) in histogramas:
+            tipo(nombre, "histogram")
+            acumulado = 0
+            for limite, cuenta in zip(limites, cuentas):
+                acumulado += cuenta
+                le = self.formatear_etiquetas(etiquetas, [('le', repr(limite))])
+                lineas.append(f"{self.prefijo}{nombre}_bucket{le} {acumulado}")
+            le = self.formatear_etiquetas(etiquetas, [('le', '+Inf')])
+            lineas.append(f"{self.prefijo}{nombre}_bucket{le} {total}")
+            lineas.append(f"{self.prefijo}{nombre}_sum{self.formatear_etiquetas(etiquetas)} {suma}")
+            lineas.append(f"{self.prefijo}{nombre}_count{self.formatear_etiquetas(etiquetas)} {total}")
+
+        return "\n".join(lineas) + "\n"
+
+
+class ServidorMetricas(threading.Thread):
+    def __init__(self, metricas, puerto, host="0.0.0.0"):
+        """
+        Endpoint HTTP de métricas (GET /metrics) en un hilo daemon
+
+        Args:
+            metricas: Registro Metricas a exponer
+            puerto: Puerto HTTP
+            host: Interfaz donde escuchar
+        """
+        super().__init__(name=f"metricas-{puerto}", daemon=True)
+        registro = metricas
+
+        class Manejador(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.split('?')[0] not in ('/metrics', '/'):
+                    self.send_error(404)
+                    return
+                cuerpo = registro.exponer().encode('utf-8')
+                self.send_response(200)
+                self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+                self.send_header("Content-Length", str(len(cuerpo)))
+                self.end_headers()
+                self.wfile.write(cuerpo)
+
+            def log_message(self, formato, *args):
+                # Sin log por scrape: los componentes ya imprimen por petición
+                pass
+
+        self.servidor = ThreadingHTTPServer((host, puerto), Manejador)
+        self.puerto = puerto
+
+    def run(self):
+        self.servidor.serve_forever()
+
+    def detener(self):
+        self.servidor.shutdown()
+        self.servidor.server_close()
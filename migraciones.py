@@ -0,0 +1,503 @@
+"""
+Migraciones versionadas del esquema
+Cada sede registra en schema_migraciones las versiones aplicadas; 'migrar'
+aplica en orden las pendientes y 'revertir' deshace hasta una versión.
+Las operaciones sobre índices consultan information_schema antes de actuar,
+así una migración que falló a mitad (el DDL de MySQL hace commit implícito)
+se puede volver a ejecutar sin errores.
+
+Además incluye dos herramientas sobre las sentencias que ejecuta el GA:
+- explicar:  EXPLAIN de cada sentencia; falla si alguna recorre la tabla o un
+             índice completo, combina índices (index_merge) o usa filesort
+- benchmark: latencia p50/p95/p99 de cada sentencia con parámetros reales
+             tomados al azar (dentro de transacciones que se revierten)
+
+    python migraciones.py migrar
+    python migraciones.py explicar --sedes 1
+"""
+import mysql.connector
+from generar_datos_inic import GeneradorDatos
+import argparse
+import random
+import time
+import sys
+
+from trazas import percentil
+import archivador_historial
+
+# Cada migración: versión, nombre y operaciones para subir y bajar.
+# Operaciones: ('agregar_indice', tabla, nombre, columnas), ('eliminar_indice', tabla, nombre),
+# ('particionar_por_mes', tabla), ('quitar_particiones', tabla) y ('sql', sentencia) para lo demás
+MIGRACIONES = [
+    {
+        'version': 1,
+        'nombre': 'indices_compuestos_prestamos',
+        # Renovación: igualdad en libro, usuario y estado, rango en renovaciones.
+        # idx_codigo duplica el índice UNIQUE de libros.codigo y solo encarece las escrituras
+        'subir': [
+            ('agregar_indice', 'prestamos', 'idx_libro_usuario_estado',
+             'codigo_libro, usuario_id, estado, renovaciones'),
+            ('eliminar_indice', 'libros', 'idx_codigo'),
+        ],
+        'bajar': [
+            ('agregar_indice', 'libros', 'idx_codigo', 'codigo'),
+            ('eliminar_indice', 'prestamos', 'idx_libro_usuario_estado'),
+        ],
+    },
+    {
+        'version': 2,
+        'nombre': 'indice_devolucion_prestamos',
+        # Devolución: préstamo abierto más antiguo del par (libro, usuario) sin filesort
+        'subir': [
+            ('agregar_indice', 'prestamos', 'idx_libro_usuario_prestamo',
+             'codigo_libro, usuario_id, fecha_prestamo'),
+        ],
+        'bajar': [
+            ('eliminar_indice', 'prestamos', 'idx_libro_usuario_prestamo'),
+        ],
+    },
+    {
+        'version': 3,
+        'nombre': 'particiones_mensuales_historial',
+        # Inserciones e índices acotados al mes en curso; los meses viejos se archivan
+        # con archivador_historial.py. Copia la tabla completa una vez
+        'subir': [
+            ('particionar_por_mes', 'historial_operaciones'),
+        ],
+        'bajar': [
+            ('quitar_particiones', 'historial_operaciones'),
+        ],
+    },
+    {
+        'version': 4,
+        'nombre': 'diario_aplicado',
+        # Último lsn del diario del GA aplicado en MySQL (modo diario)
+        'subir': [
+            ('sql', """
+                CREATE TABLE IF NOT EXISTS diario_aplicado (
+                    sede    INT PRIMARY KEY,
+                    lsn     BIGINT NOT NULL,
+                    fecha   DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP
+                ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4
+            """),
+        ],
+        'bajar': [
+            ('sql', "DROP TABLE IF EXISTS diario_aplicado"),
+        ],
+    },
+    {
+        'version': 5,
+        'nombre': 'escrow_libros_calientes',
+        # Ejemplares de los libros calientes que el GA lleva en memoria (escrow.py)
+        'subir': [
+            ('sql', """
+                CREATE TABLE IF NOT EXISTS escrow_libros (
+                    codigo      VARCHAR(20) PRIMARY KEY,
+                    sede        INT NOT NULL,
+                    ejemplares  INT NOT NULL,
+                    desde       DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP
+                ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4
+            """),
+            ('sql', """
+                CREATE TABLE IF NOT EXISTS escrow_consumos (
+                    id            BIGINT AUTO_INCREMENT PRIMARY KEY,
+                    codigo_libro  VARCHAR(20) NOT NULL,
+                    delta         INT NOT NULL,
+                    fecha         DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP,
+                    INDEX idx_libro_id (codigo_libro, id)
+                ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4
+            """),
+        ],
+        'bajar': [
+            ('sql', "DROP TABLE IF EXISTS escrow_consumos"),
+            ('sql', "DROP TABLE IF EXISTS escrow_libros"),
+        ],
+    },
+    {
+        'version': 6,
+        'nombre': 'barrido_prestamos_vencidos',
+        # Barredor de vencidos: rango (estado = 'ACTIVO', fecha_entrega < NOW()) sin filesort.
+        # idx_estado es prefijo del índice nuevo y solo encarece las escrituras.
+        # VENCIMIENTO se agrega al final del ENUM (sin copiar la tabla)
+        'subir': [
+            ('agregar_indice', 'prestamos', 'idx_estado_entrega', 'estado, fecha_entrega'),
+            ('eliminar_indice', 'prestamos', 'idx_estado'),
+            ('sql', """
+                ALTER TABLE historial_operaciones
+                MODIFY operacion ENUM('PRESTAMO','DEVOLUCION','RENOVACION','VENCIMIENTO') NOT NULL
+            """),
+        ],
+        'bajar': [
+            ('sql', "DELETE FROM historial_operaciones WHERE operacion = 'VENCIMIENTO'"),
+            ('sql', """
+                ALTER TABLE historial_operaciones
+                MODIFY operacion ENUM('PRESTAMO','DEVOLUCION','RENOVACION') NOT NULL
+            """),
+            ('agregar_indice', 'prestamos', 'idx_estado', 'estado'),
+            ('eliminar_indice', 'prestamos', 'idx_estado_entrega'),
+        ],
+    },
+    {
+        'version': 7,
+        'nombre': 'indices_fecha_actualizacion',
+        # Refresco del índice de búsqueda y del catálogo compartido, y verificación
+        # incremental: rango sobre fecha_ultima_actualizacion en vez de recorrer la tabla.
+        # setup_database.sql ya los crea; esto cubre las bases anteriores
+        'subir': [
+            ('agregar_indice', 'libros', 'idx_actualizacion', 'fecha_ultima_actualizacion'),
+            ('agregar_indice', 'prestamos', 'idx_actualizacion', 'fecha_ultima_actualizacion'),
+        ],
+        'bajar': [
+            ('eliminar_indice', 'prestamos', 'idx_actualizacion'),
+            ('eliminar_indice', 'libros', 'idx_actualizacion'),
+        ],
+    },
+]
+
+# Sentencias del GA que deben resolverse con un índice (mismas condiciones que
+# en gestor_almacenamiento.py; las escrituras se revierten en el benchmark)
+CONSULTAS_GA = [
+    ('devolucion: actualizar libro', """
+        UPDATE libros
+        SET ejemplares_disponibles = ejemplares_disponibles + 1, fecha_ultima_actualizacion = NOW()
+        WHERE codigo = %(codigo_libro)s
+    """),
+    ('devolucion: préstamo más antiguo', """
+        SELECT id, estado FROM prestamos
+        WHERE codigo_libro = %(codigo_libro)s
+          AND usuario_id = %(usuario_id)s
+          AND estado IN ('ACTIVO', 'VENCIDO')
+        ORDER BY fecha_prestamo, id
+        LIMIT 1
+        FOR UPDATE
+    """),
+    ('devolucion: cerrar préstamo', """
+        UPDATE prestamos SET estado = 'DEVUELTO', fecha_devolucion_real = NOW() WHERE id = %(id_prestamo)s
+    """),
+    ('devolucion: leer libro', """
+        SELECT nombre, ejemplares_disponibles FROM libros WHERE codigo = %(codigo_libro)s
+    """),
+    ('renovacion: actualizar préstamo', """
+        UPDATE prestamos
+        SET fecha_entrega = NOW() + INTERVAL 7 DAY, renovaciones = renovaciones + 1,
+            fecha_ultima_actualizacion = NOW()
+        WHERE codigo_libro = %(codigo_libro)s
+          AND usuario_id = %(usuario_id)s
+          AND estado = 'ACTIVO'
+          AND renovaciones < 2
+    """),
+    ('disponibilidad: leer libro', """
+        SELECT codigo, nombre, autor, ejemplares_disponibles, ejemplares_totales
+        FROM libros WHERE codigo = %(codigo_libro)s
+    """),
+    ('prestamo: reservar ejemplar', """
+        UPDATE libros
+        SET ejemplares_disponibles = ejemplares_disponibles - 1, fecha_ultima_actualizacion = NOW()
+        WHERE codigo = %(codigo_libro)s AND ejemplares_disponibles > 0
+    """),
+    ('escrow: movimientos pendientes', """
+        SELECT COALESCE(SUM(delta), 0), MAX(id) FROM escrow_consumos WHERE codigo_libro = %(codigo_libro)s
+    """),
+    ('consulta usuario: préstamos abiertos', """
+        SELECT p.id, p.codigo_libro, l.nombre, p.fecha_prestamo, p.fecha_entrega, p.renovaciones, p.estado
+        FROM prestamos p JOIN libros l ON l.codigo = p.codigo_libro
+        WHERE p.usuario_id = %(usuario_id)s AND p.estado IN ('ACTIVO', 'VENCIDO')
+    """),
+    ('vencidos: lote vencido', """
+        SELECT id, codigo_libro, usuario_id, fecha_entrega FROM prestamos
+        WHERE estado = 'ACTIVO' AND fecha_entrega < NOW()
+        ORDER BY fecha_entrega, id
+        LIMIT 500
+        FOR UPDATE SKIP LOCKED
+    """),
+    ('vencidos: próximos vencimientos', """
+        SELECT fecha_entrega FROM prestamos
+        WHERE estado = 'ACTIVO' AND fecha_entrega >= NOW() AND fecha_entrega <= NOW() + INTERVAL 1 DAY
+        ORDER BY fecha_entrega
+        LIMIT 100000
+    """),
+    ('idempotencia: respuesta registrada', """
+        SELECT respuesta FROM peticiones_procesadas WHERE id_peticion = %(id_peticion)s
+    """),
+    ('idempotencia: purga', """
+        DELETE FROM peticiones_procesadas WHERE fecha_registro < NOW() - INTERVAL 7 DAY LIMIT 10000
+    """),
+]
+
+# Planes de acceso que no escalan con millones de filas
+TIPOS_PROHIBIDOS = ('ALL', 'index', 'index_merge')
+
+N_BENCHMARK_DEFECTO = 1000
+
+
+class GestorMigraciones:
+    def __init__(self, host="localhost", port=3306, sedes=(1, 2)):
+        """
+        Args:
+            host: Host de MySQL
+            port: Puerto de MySQL
+            sedes: Sedes sobre las que opera
+        """
+        self.host = host
+        self.port = port
+        self.sedes = list(sedes)
+        self.generador = GeneradorDatos(host, port)
+
+    def conectar(self, sede):
+        return self.generador.conectar(f"biblioteca_sede{sede}")
+
+    def preparar(self, cursor):
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS schema_migraciones (
+                version      INT PRIMARY KEY,
+                nombre       VARCHAR(100) NOT NULL,
+                aplicada     DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP,
+                duracion_ms  INT NOT NULL
+            ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4
+        """)
+
+    def version_actual(self, cursor):
+        cursor.execute("SELECT COALESCE(MAX(version), 0) FROM schema_migraciones")
+        return cursor.fetchone()[0]
+
+    def existe_indice(self, cursor, tabla, nombre):
+        cursor.execute("""
+            SELECT COUNT(*) FROM information_schema.STATISTICS
+            WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = %s AND INDEX_NAME = %s
+        """, (tabla, nombre))
+        return cursor.fetchone()[0] > 0
+
+    def aplicar_operacion(self, cursor, operacion):
+        """Ejecuta una operación de migración (sin efecto si ya está aplicada)"""
+        tipo = operacion[0]
+        if tipo == 'agregar_indice':
+            _, tabla, nombre, columnas = operacion
+            if self.existe_indice(cursor, tabla, nombre):
+                return f"{tabla}.{nombre} ya existe"
+            # Construcción en línea: la tabla sigue aceptando escrituras
+            cursor.execute(f"ALTER TABLE {tabla} ADD INDEX `{nombre}` ({columnas}), "
+                           f"ALGORITHM=INPLACE, LOCK=NONE")
+            return f"+ {tabla}.{nombre} ({columnas})"
+        if tipo == 'eliminar_indice':
+            _, tabla, nombre = operacion
+            if not self.existe_indice(cursor, tabla, nombre):
+                return f"{tabla}.{nombre} no existe"
+            cursor.execute(f"ALTER TABLE {tabla} DROP INDEX `{nombre}`, ALGORITHM=INPLACE, LOCK=NONE")
+            return f"- {tabla}.{nombre}"
+        if tipo == 'particionar_por_mes':
+            return archivador_historial.particionar(cursor, operacion[1])
+        if tipo == 'quitar_particiones':
+            return archivador_historial.quitar_particiones(cursor, operacion[1])
+        if tipo == 'sql':
+            cursor.execute(operacion[1])
+            return operacion[1].strip().splitlines()[0][:70]
+        raise ValueError(f"Operación de migración desconocida: {tipo}")
+
+    def estado(self):
+        """Versión aplicada y migraciones pendientes de cada sede"""
+        resultado = {}
+        for sede in self.sedes:
+            conexion = self.conectar(sede)
+            try:
+                cursor = conexion.cursor()
+                self.preparar(cursor)
+                actual = self.version_actual(cursor)
+                resultado[sede] = (actual, [m['version'] for m in MIGRACIONES if m['version'] > actual])
+            finally:
+                conexion.close()
+        return resultado
+
+    def migrar(self, hasta=None):
+        """Aplica en orden las migraciones pendientes (hasta la versión indicada)"""
+        for sede in self.sedes:
+            conexion = self.conectar(sede)
+            try:
+                cursor = conexion.cursor()
+                self.preparar(cursor)
+                actual = self.version_actual(cursor)
+                for migracion in MIGRACIONES:
+                    if migracion['version'] <= actual or (hasta is not None and migracion['version'] > hasta):
+                        continue
+                    t_inicio = time.perf_counter()
+                    print(f"[MIGRAR] Sede {sede}: v{migracion['version']} {migracion['nombre']}")
+                    for operacion in migracion['subir']:
+                        print(f"    {self.aplicar_operacion(cursor, operacion)}")
+                    duracion_ms = int((time.perf_counter() - t_inicio) * 1000)
+                    cursor.execute(
+                        "INSERT INTO schema_migraciones (version, nombre, duracion_ms) VALUES (%s, %s, %s)",
+                        (migracion['version'], migracion['nombre'], duracion_ms)
+                    )
+                    conexion.commit()
+                    print(f"[MIGRAR] Sede {sede}: ✓ v{migracion['version']} aplicada ({duracion_ms} ms)")
+                print(f"[MIGRAR] Sede {sede}: versión {self.version_actual(cursor)}")
+            finally:
+                conexion.close()
+
+    def revertir(self, hasta):
+        """Deshace en orden inverso las migraciones posteriores a la versión indicada"""
+        for sede in self.sedes:
+            conexion = self.conectar(sede)
+            try:
+                cursor = conexion.cursor()
+                self.preparar(cursor)
+                actual = self.version_actual(cursor)
+                for migracion in reversed(MIGRACIONES):
+                    if migracion['version'] > actual or migracion['version'] <= hasta:
+                        continue
+                    print(f"[REVERTIR] Sede {sede}: v{migracion['version']} {migracion['nombre']}")
+                    for operacion in migracion['bajar']:
+                        print(f"    {self.aplicar_operacion(cursor, operacion)}")
+                    cursor.execute("DELETE FROM schema_migraciones WHERE version = %s", (migracion['version'],))
+                    conexion.commit()
+                print(f"[REVERTIR] Sede {sede}: versión {self.version_actual(cursor)}")
+            finally:
+                conexion.close()
+
+    def muestras(self, cursor, cantidad):
+        """
+        Parámetros reales para las sentencias: pares (libro, usuario) de préstamos
+        tomados por id al azar, sin ORDER BY RAND() sobre millones de filas
+        """
+        cursor.execute("SELECT MIN(id), MAX(id) FROM prestamos")
+        minimo, maximo = cursor.fetchone()
+        filas = []
+        if minimo is not None:
+            ids = [random.randint(minimo, maximo) for _ in range(cantidad)]
+            for inicio in range(0, len(ids), 1000):
+                bloque = ids[inicio:inicio + 1000]
+                cursor.execute(
+                    f"SELECT id, codigo_libro, usuario_id FROM prestamos "
+                    f"WHERE id IN ({', '.join(['%s'] * len(bloque))})",
+                    bloque
+                )
+                filas.extend(cursor.fetchall())
+        if not filas:
+            cursor.execute("SELECT codigo FROM libros LIMIT 1")
+            fila = cursor.fetchone()
+            filas = [(0, fila[0] if fila else 'LIB00001', 'USR0000')]
+        return [
+            {'id_prestamo': id_prestamo, 'codigo_libro': codigo, 'usuario_id': usuario,
+             'id_peticion': f"{random.getrandbits(128):032x}"}
+            for id_prestamo, codigo, usuario in filas
+        ]
+
+    def explicar(self):
+        """
+        EXPLAIN de cada sentencia del GA en cada sede
+
+        Returns:
+            list: Problemas encontrados (sede, sentencia, tabla, tipo, extra); vacía si todo usa índices
+        """
+        problemas = []
+        for sede in self.sedes:
+            conexion = self.conectar(sede)
+            try:
+                cursor = conexion.cursor(dictionary=True)
+                cursor.execute("SELECT COUNT(*) AS filas FROM prestamos")
+                print(f"\n[EXPLAIN] Sede {sede} ({cursor.fetchone()['filas']} préstamos)")
+                parametros = self.muestras(conexion.cursor(), 1)[0]
+                for nombre, sentencia in CONSULTAS_GA:
+                    cursor.execute("EXPLAIN " + sentencia, parametros)
+                    for fila in cursor.fetchall():
+                        tipo = fila.get('type')
+                        extra = fila.get('Extra') or ''
+                        falla = tipo in TIPOS_PROHIBIDOS or 'Using filesort' in extra
+                        marca = '✗' if falla else '✓'
+                        print(f"  {marca} {nombre:<36} {fila.get('table') or '-':<22} type={tipo} "
+                              f"key={fila.get('key')} rows={fila.get('rows')} {extra}")
+                        if falla:
+                            problemas.append((sede, nombre, fila.get('table'), tipo, extra))
+            finally:
+                conexion.close()
+        return problemas
+
+    def benchmark(self, n=N_BENCHMARK_DEFECTO):
+        """
+        Latencia de cada sentencia del GA con parámetros al azar; cada ejecución
+        va en su propia transacción y se revierte, así la BD no cambia
+
+        Returns:
+            dict: {(sede, sentencia): {'p50': ms, 'p95': ms, 'p99': ms, 'max': ms}}
+        """
+        resultados = {}
+        for sede in self.sedes:
+            conexion = self.conectar(sede)
+            try:
+                cursor = conexion.cursor()
+                muestras = self.muestras(cursor, n)
+                print(f"\n[BENCHMARK] Sede {sede}: {len(muestras)} ejecuciones por sentencia")
+                for nombre, sentencia in CONSULTAS_GA:
+                    tiempos = []
+                    for parametros in muestras:
+                        t_inicio = time.perf_counter()
+                        cursor.execute(sentencia, parametros)
+                        if cursor.with_rows:
+                            cursor.fetchall()
+                        tiempos.append((time.perf_counter() - t_inicio) * 1000)
+                        conexion.rollback()
+                    tiempos.sort()
+                    resultado = {
+                        'p50': percentil(tiempos, 50),
+                        'p95': percentil(tiempos, 95),
+                        'p99': percentil(tiempos, 99),
+                        'max': tiempos[-1]
+                    }
+                    resultados[(sede, nombre)] = resultado
+                    print(f"  {nombre:<36} p50={resultado['p50']:7.3f}ms p95={resultado['p95']:7.3f}ms "
+                          f"p99={resultado['p99']:7.3f}ms max={resultado['max']:7.3f}ms")
+            finally:
+                conexion.close()
+        return resultados
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Migraciones versionadas del esquema y verificación de planes de consulta",
+        epilog="Ejemplos:\n"
+               "  python migraciones.py estado\n"
+               "  python migraciones.py migrar\n"
+               "  python migraciones.py revertir --hasta 0\n"
+               "  python migraciones.py explicar          # código de salida 1 si hay full scan o filesort\n"
+               "  python migraciones.py benchmark --n 5000 --sedes 1",
+        formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument("accion", choices=['estado', 'migrar', 'revertir', 'explicar', 'benchmark'])
+    parser.add_argument("--host", default="localhost", help="Host de MySQL")
+    parser.add_argument("--port", type=int, default=3306, help="Puerto de MySQL")
+    parser.add_argument("--sedes", type=int, nargs="+", default=[1, 2], help="Sedes (defecto: 1 2)")
+    parser.add_argument("--hasta", type=int, default=None,
+                        help="Versión objetivo (migrar: última por defecto; revertir: la anterior)")
+    parser.add_argument("--n", type=int, default=N_BENCHMARK_DEFECTO,
+                        help="Ejecuciones por sentencia en el benchmark")
+    args = parser.parse_args()
+
+    gestor = GestorMigraciones(args.host, args.port, args.sedes)
+
+    try:
+        if args.accion == 'estado':
+            for sede, (actual, pendientes) in gestor.estado().items():
+                print(f"[MIGRAR] Sede {sede}: versión {actual}, pendientes: "
+                      f"{', '.join(f'v{v}' for v in pendientes) or 'ninguna'}")
+        elif args.accion == 'migrar':
+            gestor.migrar(args.hasta)
+        elif args.accion == 'revertir':
+            if args.hasta is None:
+                actuales = [actual for actual, _ in gestor.estado().values()]
+                args.hasta = max(0, max(actuales) - 1)
+            gestor.revertir(args.hasta)
+        elif args.accion == 'explicar':
+            problemas = gestor.explicar()
+            if problemas:
+                print(f"\n[EXPLAIN] ✗ {len(problemas)} sentencias sin índice adecuado")
+                sys.exit(1)
+            print("\n[EXPLAIN] ✓ Todas las sentencias del GA usan índices")
+        elif args.accion == 'benchmark':
+            gestor.benchmark(args.n)
+
+    except (mysql.connector.Error, ValueError) as e:
+        print(f"\n[ERROR] {e}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
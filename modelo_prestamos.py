@@ -0,0 +1,194 @@
+"""
+Modelo de lectura de los préstamos abiertos de cada usuario (CONSULTA_USUARIO)
+El GA guarda en memoria, por usuario, los préstamos ACTIVO/VENCIDO con su fecha
+de entrega y sus renovaciones, y los mantiene al día con sus propias mutaciones:
+
+- préstamo confirmado: agrega el préstamo al usuario
+- devolución confirmada: quita el préstamo cerrado (el abierto más antiguo del libro)
+- renovación confirmada: nueva fecha de entrega y una renovación más
+
+Solo se actualizan los usuarios que ya están en memoria; el resto se lee de
+MySQL la primera vez que se consultan (idx_usuario). El nombre del libro de un
+préstamo nuevo lo da nombre_libro (sin MySQL); si no lo conoce, el usuario se
+relee en su próxima consulta. La memoria está acotada:
+como mucho CAPACIDAD_DEFECTO usuarios (se descartan los menos consultados) y
+cada entrada vence a los TTL_DEFECTO_S, así converge con los cambios que no
+pasan por el GA (reparar_prestamos.py, cambios manuales).
+
+    modelo = ModeloPrestamosUsuario(capacidad=20000, ttl_s=300, nombre_libro=catalogo_nombre)
+    modelo.obtener('USR3001')               # lista de préstamos, o None (ir a la BD)
+    modelo.cargar('USR3001', desde_filas(filas))   # filas de CONSULTA_PRESTAMOS
+    modelo.aplicar(solicitud, respuesta)    # después de cada mutación del GA
+"""
+import collections
+import threading
+import time
+from datetime import datetime
+
+CAPACIDAD_DEFECTO = 20000       # usuarios en memoria
+TTL_DEFECTO_S = 300
+MAX_PRESTAMOS_USUARIO = 50      # usuarios con más préstamos abiertos se leen siempre de la BD
+MAX_RENOVACIONES = 2
+# Mutaciones del GA que cambian los préstamos abiertos de un usuario
+OPERACIONES = ('TRANSACCION_PRESTAMO', 'UPDATE_DEVOLUCION', 'UPDATE_RENOVACION')
+
+# Préstamos abiertos del usuario (idx_usuario); se ordenan en Python para no pagar un filesort
+CONSULTA_PRESTAMOS = """
+    SELECT p.id, p.codigo_libro, l.nombre, p.fecha_prestamo, p.fecha_entrega, p.renovaciones, p.estado
+    FROM prestamos p
+    JOIN libros l ON l.codigo = p.codigo_libro
+    WHERE p.usuario_id = %s
+      AND p.estado IN ('ACTIVO', 'VENCIDO')
+"""
+
+
+def a_fecha(valor):
+    """datetime de MySQL o texto ISO del Actor (sin microsegundos, como DATETIME)"""
+    if isinstance(valor, str):
+        valor = datetime.fromisoformat(valor)
+    return valor.replace(microsecond=0)
+
+
+def orden(prestamo):
+    # Mismo orden que la devolución (fecha_prestamo, id); sin id (modo diario) va al final
+    return (prestamo['fecha_prestamo'], prestamo['prestamo_id'] is None, prestamo['prestamo_id'] or 0)
+
+
+def desde_filas(filas):
+    """Préstamos ordenados a partir de las filas de CONSULTA_PRESTAMOS"""
+    return sorted(({
+        'prestamo_id': fila[0],
+        'codigo_libro': fila[1],
+        'libro': fila[2],
+        'fecha_prestamo': a_fecha(fila[3]),
+        'fecha_entrega': a_fecha(fila[4]),
+        'renovaciones': fila[5],
+        'estado': fila[6]
+    } for fila in filas), key=orden)
+
+
+def respuesta(usuario_id, prestamos, origen):
+    """Respuesta de CONSULTA_USUARIO (fechas en texto y vencimiento al momento)"""
+    ahora = datetime.now()
+    return {
+        'estado': 'OK',
+        'usuario_id': usuario_id,
+        'origen': origen,
+        'total': len(prestamos),
+        'prestamos': [{
+            'prestamo_id': p['prestamo_id'],
+            'codigo_libro': p['codigo_libro'],
+            'libro': p['libro'],
+            'fecha_prestamo': p['fecha_prestamo'].isoformat(sep=' '),
+            'fecha_entrega': p['fecha_entrega'].isoformat(sep=' '),
+            'renovaciones': p['renovaciones'],
+            'renovaciones_restantes': max(0, MAX_RENOVACIONES - p['renovaciones']),
+            'estado': p['estado'],
+            'vencido': p['estado'] == 'VENCIDO' or p['fecha_entrega'] < ahora
+        } for p in prestamos]
+    }
+
+
+class ModeloPrestamosUsuario:
+    def __init__(self, capacidad=CAPACIDAD_DEFECTO, ttl_s=TTL_DEFECTO_S, metricas=None, nombre_libro=None):
+        """
+        Args:
+            capacidad: Máximo de usuarios en memoria (se descartan los menos consultados)
+            ttl_s: Segundos que una entrada sigue siendo válida sin releerla de la BD
+            metricas: Registro Metricas (opcional)
+            nombre_libro: Función codigo_libro -> nombre, o None si no lo conoce (opcional)
+        """
+        self.capacidad = capacidad
+        self.ttl_s = ttl_s
+        self.nombre_libro = nombre_libro
+        self.metricas = metricas
+        # usuario_id -> (vence, [préstamos ordenados])
+        self.entradas = collections.OrderedDict()
+        self.lock = threading.Lock()
+        if self.metricas:
+            self.metricas.registrar_gauge('modelo_usuarios', lambda: len(self.entradas))
+
+    def obtener(self, usuario_id):
+        """Copia de los préstamos abiertos del usuario, o None si hay que leerlos de la BD"""
+        with self.lock:
+            entrada = self.entradas.get(usuario_id)
+            if entrada is not None and entrada[0] <= time.monotonic():
+                del self.entradas[usuario_id]
+                entrada = None
+            # Un préstamo registrado sin el nombre del libro (nombre_libro no lo conocía)
+            if entrada is None or any(p['libro'] is None for p in entrada[1]):
+                resultado = 'fallo'
+                prestamos = None
+            else:
+                self.entradas.move_to_end(usuario_id)
+                resultado = 'acierto'
+                prestamos = [dict(p) for p in entrada[1]]
+        if self.metricas:
+            self.metricas.incrementar('modelo_usuarios_consultas_total', resultado=resultado)
+        return prestamos
+
+    def cargar(self, usuario_id, prestamos):
+        """Guarda los préstamos leídos de la BD (ver desde_filas)"""
+        if len(prestamos) > MAX_PRESTAMOS_USUARIO:
+            return
+        with self.lock:
+            self.entradas[usuario_id] = (time.monotonic() + self.ttl_s, [dict(p) for p in prestamos])
+            self.entradas.move_to_end(usuario_id)
+            while len(self.entradas) > self.capacidad:
+                self.entradas.popitem(last=False)
+
+    def invalidar(self, usuario_id):
+        with self.lock:
+            self.entradas.pop(usuario_id, None)
+
+    def aplicar(self, solicitud, respuesta):
+        """
+        Lleva al modelo una mutación confirmada por el GA (llamar después del
+        commit o del registro en el diario; los duplicados ya se aplicaron)
+        """
+        operacion = solicitud.get('operacion')
+        if (operacion not in OPERACIONES or respuesta.get('estado') != 'OK'
+                or respuesta.get('duplicada')):
+            return
+        usuario_id = solicitud.get('usuario_id')
+        codigo_libro = solicitud['codigo_libro']
+        nombre = None
+        if operacion == 'TRANSACCION_PRESTAMO' and self.nombre_libro and usuario_id in self.entradas:
+            nombre = self.nombre_libro(codigo_libro)
+        with self.lock:
+            entrada = self.entradas.get(usuario_id)
+            if entrada is None:
+                return
+            prestamos = entrada[1]
+            if operacion == 'TRANSACCION_PRESTAMO':
+                prestamos.append({
+                    'prestamo_id': respuesta.get('prestamo_id'),
+                    'codigo_libro': codigo_libro,
+                    'libro': nombre,
+                    'fecha_prestamo': a_fecha(solicitud['fecha_prestamo']),
+                    'fecha_entrega': a_fecha(solicitud['fecha_entrega']),
+                    'renovaciones': 0,
+                    'estado': 'ACTIVO'
+                })
+                prestamos.sort(key=orden)
+                if len(prestamos) > MAX_PRESTAMOS_USUARIO:
+                    del self.entradas[usuario_id]
+            elif operacion == 'UPDATE_DEVOLUCION':
+                # La devolución cierra el préstamo abierto más antiguo del libro
+                # (en modo diario la respuesta no trae prestamo_id)
+                prestamo_id = respuesta.get('prestamo_id')
+                abiertos = [p for p in prestamos if p['codigo_libro'] == codigo_libro
+                            and (prestamo_id is None or p['prestamo_id'] == prestamo_id)]
+                cerrado = abiertos[0] if abiertos else None
+                if cerrado is None:
+                    # El modelo no conocía el préstamo: se relee en la próxima consulta
+                    del self.entradas[usuario_id]
+                else:
+                    prestamos.remove(cerrado)
+            elif operacion == 'UPDATE_RENOVACION':
+                nueva_fecha = a_fecha(solicitud['nueva_fecha'])
+                for prestamo in prestamos:
+                    if (prestamo['codigo_libro'] == codigo_libro and prestamo['estado'] == 'ACTIVO'
+                            and prestamo['renovaciones'] < MAX_RENOVACIONES):
+                        prestamo['fecha_entrega'] = nueva_fecha
+                        prestamo['renovaciones'] += 1
@@ -0,0 +1,215 @@
+"""
+Perfilador bajo demanda
+Sesiones de perfilado de N segundos que se inician y detienen en caliente
+(desde el socket de control) sin reiniciar el componente:
+
+- muestreo: un hilo toma la pila de todos los hilos cada intervalo_ms con
+  sys._current_frames(); no toca el hilo que atiende peticiones. Se guarda
+  en formato "collapsed stacks" (compatible con flamegraph.pl / speedscope).
+- cprofile: cProfile determinista sobre el hilo principal del componente.
+  cProfile solo se puede activar desde el propio hilo, así que el loop
+  principal llama a punto_de_control() en cada vuelta (también sin tráfico,
+  gracias al poll con timeout).
+
+Al terminar la sesión se escribe el archivo de resultados y quedan
+disponibles las funciones más calientes.
+"""
+import threading
+import cProfile
+import pstats
+import time
+import sys
+import io
+import os
+
+INTERVALO_MUESTREO_MS = 5
+MODOS = ('muestreo', 'cprofile')
+
+
+class Perfilador:
+    def __init__(self, nombre, directorio="."):
+        """
+        Args:
+            nombre: Nombre del componente (se usa en el nombre de los archivos)
+            directorio: Directorio donde se escriben los resultados
+        """
+        self.nombre = nombre
+        self.directorio = directorio
+        self.lock = threading.Lock()
+        self.sesion = None
+        self.ultimo_resultado = None
+        self.hilo_principal = None
+        self.perfil_cprofile = None
+
+    def registrar_hilo(self):
+        """Registra el hilo del loop principal (el que ejecutará cProfile)"""
+        self.hilo_principal = threading.get_ident()
+
+    def iniciar(self, modo='muestreo', segundos=10, archivo=None, intervalo_ms=INTERVALO_MUESTREO_MS):
+        """
+        Inicia una sesión de perfilado
+
+        Returns:
+            dict: Estado de la sesión o error si ya hay una activa
+        """
+        if modo not in MODOS:
+            return {'estado': 'ERROR', 'mensaje': f'Modo desconocido: {modo} (usar {", ".join(MODOS)})'}
+
+        with self.lock:
+            if self.sesion is not None:
+                return {'estado': 'ERROR', 'mensaje': 'Ya hay una sesión de perfilado activa'}
+
+            extension = 'prof' if modo == 'cprofile' else 'collapsed'
+            archivo = archivo or os.path.join(
+                self.directorio,
+                f"perfil_{self.nombre}_{time.strftime('%Y%m%d_%H%M%S')}.{extension}"
+            )
+            self.sesion = {
+                'modo': modo,
+                'inicio': time.time(),
+                'fin': time.time() + float(segundos),
+                'archivo': archivo,
+                'intervalo_ms': intervalo_ms,
+                'detener': threading.Event()
+            }
+            sesion = self.sesion
+
+        if modo == 'muestreo':
+            threading.Thread(target=self.muestrear, args=(sesion,),
+                             name=f"perfilador-{self.nombre}", daemon=True).start()
+
+        return {'estado': 'OK', 'mensaje': f'Perfilado {modo} iniciado por {segundos}s',
+                'archivo': archivo}
+
+    def detener(self):
+        """Adelanta el fin de la sesión activa"""
+        with self.lock:
+            if self.sesion is None:
+                return {'estado': 'ERROR', 'mensaje': 'No hay sesión de perfilado activa'}
+            self.sesion['fin'] = time.time()
+            self.sesion['detener'].set()
+        return {'estado': 'OK', 'mensaje': 'Sesión de perfilado detenida'}
+
+    def estado(self):
+        """Estado de la sesión activa y resumen de la última terminada"""
+        with self.lock:
+            sesion = self.sesion
+            resultado = self.ultimo_resultado
+        respuesta = {'estado': 'OK', 'activo': sesion is not None, 'ultimo_resultado': resultado}
+        if sesion is not None:
+            respuesta['modo'] = sesion['modo']
+            respuesta['restante_s'] = round(max(0.0, sesion['fin'] - time.time()), 1)
+        return respuesta
+
+    def top(self, n=20):
+        """Funciones más calientes de la última sesión"""
+        with self.lock:
+            resultado = self.ultimo_resultado
+        if resultado is None:
+            return {'estado': 'ERROR', 'mensaje': 'Aún no hay resultados de perfilado'}
+        return {'estado': 'OK', 'modo': resultado['modo'], 'archivo': resultado['archivo'],
+                'funciones': resultado['funciones'][:n]}
+
+    def punto_de_control(self):
+        """
+        Llamado por el loop principal en cada vuelta: activa y desactiva
+        cProfile en este hilo según la sesión en curso
+        """
+        sesion = self.sesion
+        if sesion is None or sesion['modo'] != 'cprofile':
+            return
+
+        if self.perfil_cprofile is None and time.time() < sesion['fin']:
+            self.perfil_cprofile = cProfile.Profile()
+            self.perfil_cprofile.enable()
+        elif self.perfil_cprofile is not None and time.time() >= sesion['fin']:
+            perfil = self.perfil_cprofile
+            perfil.disable()
+            self.perfil_cprofile = None
+            self.terminar_cprofile(sesion, perfil)
+        elif self.perfil_cprofile is None:
+            # Detenida (o de 0 s) antes de llegar a activar cProfile: no hay nada que escribir
+            sesion['archivo'] = None
+            self.finalizar(sesion, [])
+
+    def terminar_cprofile(self, sesion, perfil):
+        """Escribe el .prof y resume las funciones con más tiempo propio"""
+        perfil.dump_stats(sesion['archivo'])
+
+        estadisticas = pstats.Stats(perfil, stream=io.StringIO())
+        filas = []
+        for (archivo, linea, funcion), (_, llamadas, propio, acumulado, _) in estadisticas.stats.items():
+            filas.append({
+                'funcion': f"{funcion} ({os.path.basename(archivo)}:{linea})",
+                'llamadas': llamadas,
+                'propio_s': round(propio, 6),
+                'acumulado_s': round(acumulado, 6)
+            })
+        filas.sort(key=lambda f: f['propio_s'], reverse=True)
+
+        self.finalizar(sesion, filas)
+
+    def muestrear(self, sesion):
+        """Hilo de muestreo: toma las pilas de los demás hilos hasta el fin de la sesión"""
+        propio = threading.get_ident()
+        nombres = {}
+        pilas = {}
+        propias = {}
+        inclusivas = {}
+        muestras = 0
+        intervalo = sesion['intervalo_ms'] / 1000.0
+
+        while time.time() < sesion['fin'] and not sesion['detener'].is_set():
+            for hilo in threading.enumerate():
+                nombres[hilo.ident] = hilo.name
+
+            for id_hilo, frame in sys._current_frames().items():
+                if id_hilo == propio:
+                    continue
+
+                marcos = []
+                while frame is not None:
+                    codigo = frame.f_code
+                    marcos.append(f"{codigo.co_name} ({os.path.basename(codigo.co_filename)}:{codigo.co_firstlineno})")
+                    frame = frame.f_back
+                if not marcos:
+                    continue
+
+                muestras += 1
+                propias[marcos[0]] = propias.get(marcos[0], 0) + 1
+                for marco in set(marcos):
+                    inclusivas[marco] = inclusivas.get(marco, 0) + 1
+
+                pila = ";".join([nombres.get(id_hilo, str(id_hilo))] + marcos[::-1])
+                pilas[pila] = pilas.get(pila, 0) + 1
+
+            time.sleep(intervalo)
+
+        with open(sesion['archivo'], 'w', encoding='utf-8') as f:
+            for pila, cuenta in sorted(pilas.items()):
+                f.write(f"{pila} {cuenta}\n")
+
+        filas = [{
+            'funcion': marco,
+            'muestras_propias': cuenta,
+            'muestras_inclusivas': inclusivas.get(marco, 0),
+            'porcentaje_propio': round(100.0 * cuenta / muestras, 2) if muestras else 0.0
+        } for marco, cuenta in propias.items()]
+        filas.sort(key=lambda f: f['muestras_propias'], reverse=True)
+
+        self.finalizar(sesion, filas, muestras=muestras)
+
+    def finalizar(self, sesion, funciones, **extra):
+        """Publica el resultado y libera la sesión"""
+        with self.lock:
+            self.ultimo_resultado = {
+                'modo': sesion['modo'],
+                'archivo': sesion['archivo'],
+                'duracion_s': round(time.time() - sesion['inicio'], 2),
+                'funciones': funciones[:50],
+                **extra
+            }
+            if self.sesion is sesion:
+                self.sesion = None
+        print(f"[Perfilador-{self.nombre}] ✓ Sesión {sesion['modo']} terminada → "
+              f"{sesion['archivo'] or 'sin resultados'}")
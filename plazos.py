@@ -0,0 +1,76 @@
+"""
+Plazos (deadlines) de extremo a extremo
+Cada petición lleva un plazo absoluto ('deadline', segundos epoch) fijado por
+el PS o, si no trae, por el GC con su plazo por defecto. Cada salto lo propaga
+al siguiente y revisa el presupuesto restante antes de trabajar: si ya venció,
+responde EXPIRADO de inmediato en lugar de tocar MySQL para un cliente que ya
+se rindió.
+
+    plazos.fijar(peticion, 2000)          # PS: 2 s desde ahora
+    if plazos.expirado(mensaje):
+        return plazos.respuesta_expirada('GA', mensaje)
+
+Cada salto que espera a otro le pasa el plazo recortado en MARGEN_SALTO_MS:
+el salto interno agota sus reintentos y responde antes de que el externo deje
+de esperarlo, en lugar de seguir reintentando para un llamador que ya reenvió.
+
+Igual que las trazas, el plazo usa time.time(): entre hosts depende de la
+sincronización de relojes (NTP).
+"""
+import time
+from datetime import datetime
+
+CAMPO = 'deadline'
+
+# Plazo que fija el GC a las peticiones que llegan sin uno
+PLAZO_DEFECTO_MS = 5000
+
+# Recorte del plazo en cada salto: tiempo para responder al salto anterior
+MARGEN_SALTO_MS = 200
+
+
+class PlazoVencido(Exception):
+    """El plazo de la petición venció antes de terminar el trabajo"""
+
+
+def fijar(mensaje, plazo_ms):
+    """Fija el plazo absoluto del mensaje a plazo_ms desde ahora (None o 0 no fija)"""
+    if plazo_ms:
+        mensaje[CAMPO] = time.time() + plazo_ms / 1000.0
+    return mensaje.get(CAMPO)
+
+
+def asegurar(mensaje, plazo_defecto_ms):
+    """Fija el plazo por defecto solo si el mensaje no trae uno"""
+    if mensaje.get(CAMPO) is None:
+        fijar(mensaje, plazo_defecto_ms)
+    return mensaje.get(CAMPO)
+
+
+def propagar(origen, destino, margen_ms=0):
+    """Copia el plazo del mensaje recibido al que se envía al siguiente salto, margen_ms antes"""
+    if origen.get(CAMPO) is not None:
+        destino[CAMPO] = origen[CAMPO] - margen_ms / 1000.0
+
+
+def restante_ms(mensaje):
+    """Milisegundos que le quedan al plazo (negativo si venció); None si no tiene plazo"""
+    plazo = mensaje.get(CAMPO)
+    if plazo is None:
+        return None
+    return (plazo - time.time()) * 1000.0
+
+
+def expirado(mensaje, margen_ms=0):
+    """True si el plazo vence antes de margen_ms desde ahora"""
+    restante = restante_ms(mensaje)
+    return restante is not None and restante <= margen_ms
+
+
+def respuesta_expirada(componente, mensaje):
+    """Respuesta rápida para una petición descartada por plazo vencido"""
+    return {
+        'estado': 'EXPIRADO',
+        'mensaje': f'Plazo vencido hace {-restante_ms(mensaje):.0f}ms, descartada en {componente}',
+        'timestamp': datetime.now().isoformat()
+    }
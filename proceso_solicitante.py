@@ -5,40 +5,116 @@ import sys
 import multiprocessing
 import os
 import statistics
+import argparse
+import random
 from datetime import datetime
 
+import trazas
+import plazos
+import idempotencia
+from cliente_confiable import ClienteConfiable, SinRespuesta, TIMEOUT_DEFECTO_MS, REINTENTOS_DEFECTO
+
+# Operaciones que pueden pasar a un GC de respaldo (otra sede) tras un timeout;
+# las mutaciones cambian de sede solo por la redirección del propio GC
+OPERACIONES_LECTURA = ('BUSQUEDA', 'CONSULTA_USUARIO', 'RESUMEN')
+
 class ProcesoSolicitante:
-    def __init__(self, process_id, gestor_host="localhost", gestor_port=5555):
+    def __init__(self, process_id, gestor_host="localhost", gestor_port=5555,
+                 context=None, endpoint=None, archivo_trazas=None, muestreo_trazas=1.0,
+                 plazo_ms=None, timeout_ms=TIMEOUT_DEFECTO_MS, reintentos=REINTENTOS_DEFECTO,
+                 respaldos=None):
         self.gestor_host = gestor_host
         self.gestor_port = gestor_port
         self.process_id = process_id
+        # Contexto compartido y endpoint explícito (modo embebido, inproc://)
+        self.contexto_externo = context
+        self.endpoint = endpoint or f"tcp://{gestor_host}:{gestor_port}"
         self.context = None
-        self.socket = None
+        # Cliente Lazy Pirate: timeout por intento, reintentos y failover de lecturas a GCs de respaldo
+        self.endpoints = [self.endpoint] + [
+            destino if "://" in destino else f"tcp://{destino}" for destino in (respaldos or [])
+        ]
+        self.timeout_ms = timeout_ms
+        self.reintentos = reintentos
+        self.cliente = None
+        # Registro muestreado de trazas (una línea JSON por petición)
+        self.archivo_trazas = archivo_trazas
+        self.muestreo_trazas = muestreo_trazas
+        self.registro_trazas = None
+        # Plazo por petición: pasado este tiempo el PS se rinde y el resto del
+        # pipeline descarta la petición (None usa el plazo por defecto, 0 no fija)
+        self.plazo_ms = plazos.PLAZO_DEFECTO_MS if plazo_ms is None else plazo_ms
+        # Rechazos por admisión del GC (OCUPADO) y pausa sugerida antes de la siguiente
+        self.rechazos_ocupado = 0
+        self.pausa_ocupado = 0.0
+        self.ultima_respuesta = None
 
     def conectar(self):
         """Establece la conexión ZMQ dentro del proceso"""
-        self.context = zmq.Context()
-        self.socket = self.context.socket(zmq.REQ)
-        self.socket.connect(f"tcp://{self.gestor_host}:{self.gestor_port}")
+        self.context = self.contexto_externo or zmq.Context()
+        self.cliente = ClienteConfiable(self.context, self.endpoints, f"GC-Proc{self.process_id}",
+                                        self.timeout_ms, self.reintentos, lecturas=OPERACIONES_LECTURA,
+                                        esperar_plazo=True)
+        if self.archivo_trazas:
+            self.registro_trazas = open(self.archivo_trazas, 'a', encoding='utf-8')
+
+    def registrar_traza(self, peticion, respuesta, t_envio, t_recibido):
+        """Agrega el salto del PS y escribe la traza completa si cae en la muestra"""
+        if not self.registro_trazas or random.random() >= self.muestreo_trazas:
+            return
+
+        traza = respuesta.get('traza') or {}
+        saltos = traza.get('saltos', []) + [{
+            'componente': 'PS',
+            'encolado': t_envio,
+            'inicio': t_envio,
+            'fin': t_recibido
+        }]
+        registro = {
+            'id': traza.get('id', peticion['traza']['id']),
+            'operacion': peticion['operacion'],
+            'estado': respuesta.get('estado'),
+            'saltos': saltos
+        }
+        # Una sola escritura por línea: varios procesos pueden compartir el archivo
+        self.registro_trazas.write(json.dumps(registro) + "\n")
+        self.registro_trazas.flush()
 
     def enviar_peticion(self, peticion):
         """Envía una petición, mide el tiempo de respuesta y retorna la duración."""
         try:
+            # Respetar la pista de reintento del último OCUPADO antes de volver a enviar
+            if self.pausa_ocupado:
+                time.sleep(self.pausa_ocupado)
+                self.pausa_ocupado = 0.0
+            
             peticion_envio = peticion.copy()
             peticion_envio['timestamp'] = datetime.now().isoformat()
-            mensaje = json.dumps(peticion_envio)
+            trazas.iniciar(peticion_envio)
+            # Mismo id en cada reintento de la petición: GC y GA no repiten el trabajo
+            peticion_envio.setdefault(idempotencia.CAMPO, idempotencia.nuevo_id())
+            plazos.fijar(peticion_envio, self.plazo_ms)
             
             # --- INICIO MEDICIÓN DE TIEMPO ---
             t_inicio = time.perf_counter()
             
-            self.socket.send_string(mensaje)
-            respuesta_str = self.socket.recv_string()
+            try:
+                respuesta = self.cliente.solicitar(peticion_envio)
+            except (SinRespuesta, plazos.PlazoVencido) as e:
+                # Ningún intento respondió a tiempo: la petición se abandona
+                print(f"[Proc-{self.process_id}] {peticion['operacion']} | ✗ {e}, petición abandonada")
+                return None
             
             t_fin = time.perf_counter()
             # --- FIN MEDICIÓN DE TIEMPO ---
             
             duracion = t_fin - t_inicio
-            respuesta = json.loads(respuesta_str)
+            self.ultima_respuesta = respuesta
+            if respuesta['estado'] == 'OCUPADO':
+                self.rechazos_ocupado += 1
+                self.pausa_ocupado = respuesta.get('reintentar_en_ms', 0) / 1000.0
+            self.registrar_traza(peticion_envio, respuesta,
+                                 peticion_envio['traza']['t_envio'], trazas.ahora())
             
             # LOG DETALLADO
             estado_icon = "✓" if respuesta['estado'] == 'OK' else "✗"
@@ -57,14 +133,22 @@ class ProcesoSolicitante:
         for peticion in lista_peticiones:
             duracion = self.enviar_peticion(peticion)
             if duracion is not None:
-                tiempos_cola.put(duracion) # Guardar el tiempo en la cola compartida
+                # Guardar el tiempo y el estado en la cola compartida
+                tiempos_cola.put((duracion, self.ultima_respuesta['estado']))
         self.cerrar()
 
     def cerrar(self):
         """Cierra la conexión ZMQ (socket y contexto)."""
-        if self.socket: 
-            self.socket.close()
-        if self.context: 
+        if self.registro_trazas:
+            self.registro_trazas.close()
+        if self.cliente:
+            contadores = self.cliente.contadores
+            if any(contadores.values()):
+                print(f"[Proc-{self.process_id}] Timeouts: {contadores['timeouts']} | "
+                      f"Reintentos: {contadores['reintentos']} | Failovers: {contadores['failovers']} | "
+                      f"Sin respuesta: {contadores['fallos']}")
+            self.cliente.cerrar()
+        if self.context and self.contexto_externo is None: 
             self.context.term()
 
 # --- Funciones Auxiliares ---
@@ -77,7 +161,23 @@ def leer_archivo_peticiones(archivo_path):
                 linea = linea.strip()
                 if linea and not linea.startswith('#'):
                     partes = linea.split('|')
-                    if len(partes) >= 3:
+                    if partes[0].upper() == 'BUSQUEDA' and len(partes) >= 2:
+                        # BUSQUEDA|texto a buscar[|pagina]
+                        peticiones.append({
+                            'operacion': 'BUSQUEDA',
+                            'consulta': partes[1],
+                            'pagina': int(partes[2]) if len(partes) >= 3 and partes[2].strip() else 1
+                        })
+                    elif partes[0].upper() == 'CONSULTA_USUARIO' and len(partes) >= 2:
+                        # CONSULTA_USUARIO|USUARIO_ID
+                        peticiones.append({
+                            'operacion': 'CONSULTA_USUARIO',
+                            'usuario_id': partes[1]
+                        })
+                    elif partes[0].upper() == 'RESUMEN':
+                        # RESUMEN (agregados de la sede)
+                        peticiones.append({'operacion': 'RESUMEN'})
+                    elif len(partes) >= 3:
                         peticiones.append({
                             'operacion': partes[0].upper(),
                             'codigo_libro': partes[1],
@@ -88,23 +188,51 @@ def leer_archivo_peticiones(archivo_path):
         print(f"Archivo no encontrado: {archivo_path}")
         sys.exit(1)
 
-def proceso_trabajador(process_id, lista_completa, host, port, tiempos_cola):
+def proceso_trabajador(process_id, lista_completa, host, port, tiempos_cola,
+                       archivo_trazas=None, muestreo_trazas=1.0, plazo_ms=None,
+                       timeout_ms=TIMEOUT_DEFECTO_MS, reintentos=REINTENTOS_DEFECTO, respaldos=None):
     """Función wrapper para el proceso que recibe la cola para los tiempos."""
-    cliente = ProcesoSolicitante(process_id, host, port)
+    cliente = ProcesoSolicitante(process_id, host, port,
+                                 archivo_trazas=archivo_trazas, muestreo_trazas=muestreo_trazas,
+                                 plazo_ms=plazo_ms, timeout_ms=timeout_ms, reintentos=reintentos,
+                                 respaldos=respaldos)
     try:
         cliente.procesar_lista(lista_completa, tiempos_cola)
     except KeyboardInterrupt:
         pass
 
 def main():
-    if len(sys.argv) < 2:
-        print("Uso: python ps.py <archivo> [host] [port] [n_procesos]")
-        sys.exit(1)
+    parser = argparse.ArgumentParser(
+        description="Proceso Solicitante: envía peticiones al GC y mide latencias",
+        epilog="Ejemplos:\n"
+               "  python proceso_solicitante.py peticiones.txt localhost 5555 4\n"
+               "  python proceso_solicitante.py peticiones.txt localhost 5555 4 --trazas trazas.jsonl --muestreo 0.1\n"
+               "  python proceso_solicitante.py peticiones.txt localhost 5555 8 --plazo-ms 500\n"
+               "  python proceso_solicitante.py peticiones.txt localhost 5555 4 --timeout-ms 1000 --respaldo 10.43.102.12:5555",
+        formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument("archivo", help="Archivo de peticiones")
+    parser.add_argument("host", nargs="?", default="localhost", help="Host del GC")
+    parser.add_argument("port", nargs="?", type=int, default=5555, help="Puerto del GC")
+    parser.add_argument("n_procesos", nargs="?", type=int, default=1, help="Procesos simultáneos")
+    parser.add_argument("--trazas", default=None, help="Archivo JSONL donde registrar las trazas")
+    parser.add_argument("--muestreo", type=float, default=1.0,
+                        help="Fracción de peticiones cuya traza se registra (0-1)")
+    parser.add_argument("--plazo-ms", type=int, default=plazos.PLAZO_DEFECTO_MS,
+                        help="Plazo por petición; vencido, el PS la abandona (0: sin plazo)")
+    parser.add_argument("--timeout-ms", type=int, default=TIMEOUT_DEFECTO_MS,
+                        help="Espera máxima por intento si la petición no lleva plazo")
+    parser.add_argument("--reintentos", type=int, default=REINTENTOS_DEFECTO,
+                        help="Reenvíos de una petición sin respuesta (mismo id_peticion)")
+    parser.add_argument("--respaldo", nargs="*", default=[], metavar="HOST:PUERTO",
+                        help="GCs alternativos para las consultas (BUSQUEDA, CONSULTA_USUARIO, "
+                             "RESUMEN), en orden; las mutaciones solo se reintentan en el GC principal")
+    args = parser.parse_args()
     
-    archivo = sys.argv[1]
-    host = sys.argv[2] if len(sys.argv) > 2 else "localhost"
-    port = int(sys.argv[3]) if len(sys.argv) > 3 else 5555
-    num_procesos = int(sys.argv[4]) if len(sys.argv) > 4 else 1
+    archivo = args.archivo
+    host = args.host
+    port = args.port
+    num_procesos = args.n_procesos
     
     todas_peticiones = leer_archivo_peticiones(archivo)
     if not todas_peticiones: return
@@ -125,7 +253,9 @@ def main():
     for i in range(num_procesos):
         p = multiprocessing.Process(
             target=proceso_trabajador,
-            args=(i, todas_peticiones, host, port, tiempos_cola)
+            args=(i, todas_peticiones, host, port, tiempos_cola,
+                  args.trazas, args.muestreo, args.plazo_ms,
+                  args.timeout_ms, args.reintentos, args.respaldo)
         )
         procesos.append(p)
         p.start()
@@ -137,8 +267,14 @@ def main():
     total_duration = end_time_global - start_time_global
     
     tiempos_completos = []
+    rechazos_ocupado = 0
     while not tiempos_cola.empty():
-        tiempos_completos.append(tiempos_cola.get())
+        duracion, estado = tiempos_cola.get()
+        # Los rechazos por admisión son respuestas inmediatas: no se mezclan con la latencia
+        if estado == 'OCUPADO':
+            rechazos_ocupado += 1
+        else:
+            tiempos_completos.append(duracion)
         
     num_mediciones = len(tiempos_completos)
 
@@ -153,6 +289,7 @@ def main():
         requests_in_2_min = requests_per_second * 120
 
         print(f" Total de Mediciones Válidas: {num_mediciones}")
+        print(f" Rechazadas por el GC (OCUPADO): {rechazos_ocupado}")
         print(f" Tiempo Total de Ejecución:   {total_duration:.4f} segundos")
         print("--- Métricas de Respuesta ---")
         print(f" ⏱️ Tiempo Promedio de Respuesta: {average_time:.4f} segundos")
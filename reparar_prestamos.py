@@ -0,0 +1,176 @@
+"""
+Reparación de préstamos no cerrados
+Hasta que la devolución empezó a cerrar el préstamo, UPDATE_DEVOLUCION solo
+incrementaba ejemplares_disponibles: los préstamos devueltos quedaron en
+ACTIVO para siempre. Este script los cierra a partir del historial:
+
+- por cada par (libro, usuario) cuenta las DEVOLUCION registradas en
+  historial_operaciones y los préstamos ya DEVUELTO
+- la diferencia son devoluciones sin cerrar: se cierran esos préstamos
+  abiertos, los más antiguos primero, con la fecha de la devolución del historial
+
+Al trabajar por diferencia se puede ejecutar varias veces (y con el sistema
+en marcha) sin cerrar un préstamo de más. Las devoluciones que no tienen un
+préstamo abierto se reportan: esos ejemplares ya se sumaron al inventario y
+verificar_consistencia.py los mostrará como descuadre.
+
+    python reparar_prestamos.py localhost 3306 --simular
+    python reparar_prestamos.py localhost 3306 --lote 2000
+"""
+import mysql.connector
+from generar_datos_inic import GeneradorDatos
+from collections import defaultdict
+import argparse
+import time
+import sys
+
+LOTE_DEFECTO = 1000
+
+
+class ReparadorPrestamos:
+    def __init__(self, host="localhost", port=3306, sedes=(1, 2), lote=LOTE_DEFECTO, simular=False):
+        """
+        Args:
+            host: Host de MySQL
+            port: Puerto de MySQL
+            sedes: Sedes a reparar
+            lote: Filas del historial por lectura y pares por transacción
+            simular: Solo contar, sin modificar préstamos
+        """
+        self.host = host
+        self.port = port
+        self.sedes = list(sedes)
+        self.lote = max(1, int(lote))
+        self.simular = simular
+        self.generador = GeneradorDatos(host, port)
+
+    def devoluciones_por_par(self, cursor):
+        """
+        Fechas de las devoluciones del historial agrupadas por (libro, usuario),
+        leídas por páginas de la clave primaria
+
+        Returns:
+            dict: {(codigo_libro, usuario_id): [fecha, ...]} en orden cronológico
+        """
+        devoluciones = defaultdict(list)
+        ultimo_id = 0
+        while True:
+            cursor.execute("""
+                SELECT id, codigo_libro, usuario_id, fecha FROM historial_operaciones
+                WHERE id > %s AND operacion = 'DEVOLUCION'
+                ORDER BY id
+                LIMIT %s
+            """, (ultimo_id, self.lote))
+            filas = cursor.fetchall()
+            if not filas:
+                break
+            for id_historial, codigo_libro, usuario_id, fecha in filas:
+                devoluciones[(codigo_libro, usuario_id)].append(fecha)
+            ultimo_id = filas[-1][0]
+        for fechas in devoluciones.values():
+            fechas.sort()
+        return devoluciones
+
+    def reparar_par(self, cursor, codigo_libro, usuario_id, fechas):
+        """
+        Cierra los préstamos abiertos del par que corresponden a devoluciones sin cerrar
+
+        Returns:
+            tuple: (préstamos cerrados, devoluciones sin préstamo abierto)
+        """
+        cursor.execute("""
+            SELECT COUNT(*) FROM prestamos
+            WHERE codigo_libro = %s AND usuario_id = %s AND estado = 'DEVUELTO'
+        """, (codigo_libro, usuario_id))
+        cerrados = cursor.fetchone()[0]
+        pendientes = fechas[cerrados:]
+        if not pendientes:
+            return 0, 0
+
+        cursor.execute("""
+            SELECT id FROM prestamos
+            WHERE codigo_libro = %s
+              AND usuario_id = %s
+              AND estado IN ('ACTIVO', 'VENCIDO')
+            ORDER BY fecha_prestamo, id
+            LIMIT %s
+            FOR UPDATE
+        """, (codigo_libro, usuario_id, len(pendientes)))
+        abiertos = [fila[0] for fila in cursor.fetchall()]
+        if abiertos and not self.simular:
+            cursor.executemany("""
+                UPDATE prestamos
+                SET estado = 'DEVUELTO', fecha_devolucion_real = %s
+                WHERE id = %s
+            """, list(zip(pendientes, abiertos)))
+        return len(abiertos), len(pendientes) - len(abiertos)
+
+    def reparar_sede(self, sede):
+        """
+        Returns:
+            dict: Totales de la sede (pares revisados, préstamos cerrados, devoluciones sin préstamo)
+        """
+        t_inicio = time.perf_counter()
+        conexion = self.generador.conectar(f"biblioteca_sede{sede}")
+        try:
+            cursor = conexion.cursor()
+            devoluciones = self.devoluciones_por_par(cursor)
+            conexion.commit()
+            print(f"[Reparar] Sede {sede}: {sum(len(f) for f in devoluciones.values())} devoluciones "
+                  f"en el historial, {len(devoluciones)} pares (libro, usuario)")
+
+            totales = {'pares': len(devoluciones), 'cerrados': 0, 'sin_prestamo': 0}
+            pares = list(devoluciones.items())
+            for inicio in range(0, len(pares), self.lote):
+                for (codigo_libro, usuario_id), fechas in pares[inicio:inicio + self.lote]:
+                    cerrados, sin_prestamo = self.reparar_par(cursor, codigo_libro, usuario_id, fechas)
+                    totales['cerrados'] += cerrados
+                    totales['sin_prestamo'] += sin_prestamo
+                # Una transacción por lote: los bloqueos duran poco con el sistema en marcha
+                if self.simular:
+                    conexion.rollback()
+                else:
+                    conexion.commit()
+                print(f"[Reparar] Sede {sede}: {min(inicio + self.lote, len(pares))}/{len(pares)} pares, "
+                      f"{totales['cerrados']} préstamos cerrados")
+            cursor.close()
+        except mysql.connector.Error:
+            conexion.rollback()
+            raise
+        finally:
+            conexion.close()
+
+        accion = "se cerrarían" if self.simular else "cerrados"
+        print(f"[Reparar] Sede {sede}: ✓ {totales['cerrados']} préstamos {accion}, "
+              f"{totales['sin_prestamo']} devoluciones sin préstamo abierto "
+              f"({time.perf_counter() - t_inicio:.1f}s)")
+        return totales
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Cierra los préstamos devueltos que quedaron en ACTIVO",
+        epilog="Ejemplos:\n"
+               "  python reparar_prestamos.py localhost 3306 --simular\n"
+               "  python reparar_prestamos.py localhost 3306 --sedes 1 --lote 5000",
+        formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument("host", nargs="?", default="localhost", help="Host de MySQL")
+    parser.add_argument("port", nargs="?", type=int, default=3306, help="Puerto de MySQL")
+    parser.add_argument("--sedes", type=int, nargs="+", default=[1, 2], help="Sedes (defecto: 1 2)")
+    parser.add_argument("--lote", type=int, default=LOTE_DEFECTO,
+                        help="Filas del historial por lectura y pares por transacción")
+    parser.add_argument("--simular", action="store_true", help="Solo contar, sin modificar préstamos")
+    args = parser.parse_args()
+
+    reparador = ReparadorPrestamos(args.host, args.port, args.sedes, args.lote, args.simular)
+    try:
+        for sede in args.sedes:
+            reparador.reparar_sede(sede)
+    except mysql.connector.Error as e:
+        print(f"\n[ERROR] {e}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
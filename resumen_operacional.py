@@ -0,0 +1,313 @@
+"""
+Resumen operacional de la sede (operación RESUMEN)
+El GA lleva en memoria los agregados que antes salían de recorrer las tablas
+(COUNT/SUM/GROUP BY sobre libros, prestamos e historial_operaciones):
+
+- libros y ejemplares totales
+- ejemplares disponibles (los de libros más los del escrow)
+- préstamos por estado (ACTIVO, VENCIDO, DEVUELTO)
+- operaciones por tipo y por hora (últimas HORAS_RESUMEN horas)
+
+Cada mutación confirmada por el GA los ajusta en O(1), así RESUMEN nunca
+toca MySQL. La base se calcula al arrancar, y luego cada
+INTERVALO_RECALCULO_S, sobre una foto consistente de MySQL
+(START TRANSACTION WITH CONSISTENT SNAPSHOT). El hilo del GA fija la foto
+entre dos solicitudes: cada mutación queda en la foto o en los deltas que se
+acumulan mientras se calcula la base, nunca en las dos. En modo diario se
+suman además los registros del diario todavía no aplicados en MySQL.
+
+Los vencimientos del barredor (barredor_vencidos.py) se cuentan con vencer.
+
+El recálculo corrige lo que no pasa por el GA (reparar_prestamos.py,
+cambios manuales del catálogo, conflictos del diario).
+"""
+import mysql.connector
+import threading
+import time
+from datetime import datetime, timedelta
+
+HORAS_RESUMEN = 48
+INTERVALO_RECALCULO_S = 6 * 3600.0
+ESPERA_REINTENTO_S = 5.0
+ESPERA_FOTO_S = 0.5
+ESTADOS_PRESTAMO = ('ACTIVO', 'VENCIDO', 'DEVUELTO')
+
+
+def hora(fecha):
+    """Hora del agregado ('2025-05-20 14:00')"""
+    return fecha.strftime('%Y-%m-%d %H:00')
+
+
+def contadores_vacios():
+    return {
+        'libros': 0,
+        'ejemplares_totales': 0,
+        'ejemplares_disponibles': 0,
+        'prestamos': dict.fromkeys(ESTADOS_PRESTAMO, 0),
+        # hora -> {operación: cantidad}
+        'operaciones': {}
+    }
+
+
+def aplicar_efecto(contadores, operacion, dato, fecha):
+    """
+    Ajusta los contadores con una mutación: 'TRANSACCION_PRESTAMO',
+    'UPDATE_DEVOLUCION' (dato: estado del préstamo cerrado),
+    'INSERT_HISTORIAL' (dato: operación registrada) o 'VENCIMIENTO'
+    (dato: préstamos que pasaron a VENCIDO)
+    """
+    if operacion == 'VENCIMIENTO':
+        contadores['prestamos']['ACTIVO'] -= dato
+        contadores['prestamos']['VENCIDO'] += dato
+        por_hora = contadores['operaciones'].setdefault(hora(fecha), {})
+        por_hora['VENCIMIENTO'] = por_hora.get('VENCIMIENTO', 0) + dato
+        return
+    if operacion == 'TRANSACCION_PRESTAMO':
+        contadores['ejemplares_disponibles'] -= 1
+        contadores['prestamos']['ACTIVO'] += 1
+        dato = 'PRESTAMO'
+    elif operacion == 'UPDATE_DEVOLUCION':
+        contadores['ejemplares_disponibles'] += 1
+        contadores['prestamos'][dato] -= 1
+        contadores['prestamos']['DEVUELTO'] += 1
+        return
+    por_hora = contadores['operaciones'].setdefault(hora(fecha), {})
+    por_hora[dato] = por_hora.get(dato, 0) + 1
+
+
+def sumar(destino, origen):
+    for campo in ('libros', 'ejemplares_totales', 'ejemplares_disponibles'):
+        destino[campo] += origen[campo]
+    for estado, cantidad in origen['prestamos'].items():
+        destino['prestamos'][estado] += cantidad
+    for clave_hora, operaciones in origen['operaciones'].items():
+        por_hora = destino['operaciones'].setdefault(clave_hora, {})
+        for operacion, cantidad in operaciones.items():
+            por_hora[operacion] = por_hora.get(operacion, 0) + cantidad
+
+
+class ResumenOperacional(threading.Thread):
+    def __init__(self, sede, conectar, intervalo_s=INTERVALO_RECALCULO_S, metricas=None):
+        """
+        Args:
+            sede: Sede del GA
+            conectar: Función sin argumentos que devuelve una conexión a la BD de la sede
+            intervalo_s: Segundos entre recálculos de la base; 0 solo la calcula al arrancar
+            metricas: Registro Metricas (opcional)
+        """
+        super().__init__(name=f"resumen-sede{sede}", daemon=True)
+        self.sede = sede
+        self.conectar = conectar
+        self.intervalo_s = intervalo_s
+        self.metricas = metricas
+        self.contadores = contadores_vacios()
+        # Mutaciones posteriores a la foto mientras se calcula la base
+        self.deltas = None
+        self.lock = threading.Lock()
+        self.detenido = threading.Event()
+        self.listo = False
+        self.calculado = None
+        # Traspaso con el hilo del GA: conexión abierta -> foto fijada entre dos solicitudes
+        self.conexion = None
+        self.pedido_foto = threading.Event()
+        self.foto = threading.Event()
+        self.error_foto = None
+        self.pendientes = []
+        if self.metricas:
+            for estado in ESTADOS_PRESTAMO:
+                self.metricas.registrar_gauge('resumen_prestamos',
+                                              lambda e=estado: self.contadores['prestamos'][e], estado=estado)
+            self.metricas.registrar_gauge('resumen_ejemplares_disponibles',
+                                          lambda: self.contadores['ejemplares_disponibles'])
+
+    def aplicar(self, solicitud, respuesta):
+        """Ajusta los contadores con una mutación confirmada por el GA (no los duplicados)"""
+        if respuesta.get('estado') != 'OK' or respuesta.get('duplicada'):
+            return
+        operacion = solicitud.get('operacion')
+        if operacion == 'UPDATE_DEVOLUCION':
+            # En modo diario no se conoce el estado del préstamo cerrado: el recálculo lo corrige
+            dato = respuesta.get('estado_prestamo') or 'ACTIVO'
+        elif operacion == 'INSERT_HISTORIAL':
+            dato = solicitud['tipo_operacion']
+        elif operacion == 'TRANSACCION_PRESTAMO':
+            dato = None
+        else:
+            return
+        ahora = datetime.now()
+        with self.lock:
+            for contadores in (self.contadores, self.deltas):
+                if contadores is not None:
+                    aplicar_efecto(contadores, operacion, dato, ahora)
+
+    def vencer(self, confirmar):
+        """
+        Préstamos que el barredor pasa de ACTIVO a VENCIDO desde su propio hilo
+
+        Args:
+            confirmar: Función que hace el commit y devuelve cuántos préstamos vencieron;
+                se llama con el lock tomado, igual que la foto
+        """
+        with self.lock:
+            vencidos = confirmar()
+            if not vencidos:
+                return
+            ahora = datetime.now()
+            for contadores in (self.contadores, self.deltas):
+                if contadores is not None:
+                    aplicar_efecto(contadores, 'VENCIMIENTO', vencidos, ahora)
+
+    def fijar_foto(self, pendientes=list):
+        """
+        Hilo del GA, entre dos solicitudes: si el recálculo lo pidió, abre la
+        foto consistente y empieza a acumular deltas
+
+        Args:
+            pendientes: Función que devuelve los registros del diario aún no
+                aplicados en MySQL (se filtran con el lsn aplicado de la foto)
+        """
+        if not self.pedido_foto.is_set():
+            return
+        self.pedido_foto.clear()
+        try:
+            self.pendientes = pendientes()
+            # Bajo el lock: un vencimiento confirmado por otro hilo (vencer) queda antes o después de la foto
+            with self.lock:
+                self.conexion.start_transaction(consistent_snapshot=True, isolation_level='REPEATABLE READ',
+                                                readonly=True)
+                self.deltas = contadores_vacios()
+        except mysql.connector.Error as e:
+            self.error_foto = e
+        self.foto.set()
+
+    def calcular(self, conexion):
+        """Base de los contadores sobre la foto ya fijada"""
+        base = contadores_vacios()
+        cursor = conexion.cursor()
+        cursor.execute("""
+            SELECT COUNT(*), COALESCE(SUM(ejemplares_totales), 0), COALESCE(SUM(ejemplares_disponibles), 0)
+            FROM libros
+        """)
+        libros, totales, disponibles = cursor.fetchone()
+        base['libros'] = int(libros)
+        base['ejemplares_totales'] = int(totales)
+        base['ejemplares_disponibles'] = int(disponibles)
+
+        cursor.execute("""
+            SELECT COUNT(*) FROM information_schema.tables
+            WHERE table_schema = DATABASE() AND table_name IN ('escrow_libros', 'escrow_consumos')
+        """)
+        if cursor.fetchone()[0] == 2:
+            # Los ejemplares de los libros calientes están en el escrow, no en libros
+            cursor.execute("""
+                SELECT (SELECT COALESCE(SUM(ejemplares), 0) FROM escrow_libros)
+                     + (SELECT COALESCE(SUM(delta), 0) FROM escrow_consumos)
+            """)
+            base['ejemplares_disponibles'] += int(cursor.fetchone()[0])
+
+        cursor.execute("SELECT estado, COUNT(*) FROM prestamos GROUP BY estado")
+        for estado, cantidad in cursor.fetchall():
+            base['prestamos'][estado] = int(cantidad)
+
+        desde = datetime.now().replace(minute=0, second=0, microsecond=0) - timedelta(hours=HORAS_RESUMEN - 1)
+        cursor.execute("""
+            SELECT operacion, DATE_FORMAT(fecha, '%%Y-%%m-%%d %%H:00'), COUNT(*)
+            FROM historial_operaciones
+            WHERE fecha >= %s
+            GROUP BY operacion, DATE_FORMAT(fecha, '%%Y-%%m-%%d %%H:00')
+        """, (desde,))
+        for operacion, clave_hora, cantidad in cursor.fetchall():
+            base['operaciones'].setdefault(clave_hora, {})[operacion] = int(cantidad)
+
+        if self.pendientes:
+            cursor.execute("SELECT lsn FROM diario_aplicado WHERE sede = %s", (self.sede,))
+            fila = cursor.fetchone()
+            aplicado = fila[0] if fila else 0
+            for registro in self.pendientes:
+                if registro['lsn'] > aplicado:
+                    dato = registro.get('tipo_operacion') if registro['operacion'] == 'INSERT_HISTORIAL' else 'ACTIVO'
+                    aplicar_efecto(base, registro['operacion'], dato,
+                                   datetime.strptime(registro['fecha'], '%Y-%m-%d %H:%M:%S'))
+        cursor.close()
+        conexion.rollback()
+        return base
+
+    def recalcular(self):
+        """Pide la foto al hilo del GA, calcula la base y le suma los deltas acumulados"""
+        t_inicio = time.perf_counter()
+        self.error_foto = None
+        self.conexion = self.conectar()
+        try:
+            self.pedido_foto.set()
+            while not self.foto.wait(ESPERA_FOTO_S):
+                if self.detenido.is_set():
+                    return
+            self.foto.clear()
+            if self.error_foto:
+                raise self.error_foto
+            base = self.calcular(self.conexion)
+            with self.lock:
+                sumar(base, self.deltas)
+                self.contadores = base
+                self.deltas = None
+        finally:
+            self.pedido_foto.clear()
+            with self.lock:
+                self.deltas = None
+            self.conexion.close()
+            self.conexion = None
+        self.calculado = datetime.now()
+        self.listo = True
+        print(f"[Resumen-Sede{self.sede}] ✓ Base recalculada ({time.perf_counter() - t_inicio:.1f}s)")
+
+    def respuesta(self):
+        """Respuesta de RESUMEN (sin tocar MySQL)"""
+        if not self.listo:
+            return {
+                'estado': 'ERROR',
+                'mensaje': 'El resumen de la sede todavía se está calculando'
+            }
+        desde = hora(datetime.now() - timedelta(hours=HORAS_RESUMEN - 1))
+        with self.lock:
+            contadores = self.contadores
+            # Las horas que salieron de la ventana se descartan al leer
+            for clave_hora in [h for h in contadores['operaciones'] if h < desde]:
+                del contadores['operaciones'][clave_hora]
+            operaciones = [{'hora': clave_hora, **dict(por_tipo)}
+                           for clave_hora, por_tipo in sorted(contadores['operaciones'].items())]
+            prestamos = dict(contadores['prestamos'])
+            libros = {
+                'total': contadores['libros'],
+                'ejemplares_totales': contadores['ejemplares_totales'],
+                'ejemplares_disponibles': contadores['ejemplares_disponibles'],
+                'ejemplares_prestados': contadores['ejemplares_totales'] - contadores['ejemplares_disponibles']
+            }
+        return {
+            'estado': 'OK',
+            'sede': self.sede,
+            'calculado': self.calculado.isoformat(timespec='seconds'),
+            'libros': libros,
+            'prestamos': prestamos,
+            'operaciones_por_hora': operaciones
+        }
+
+    def run(self):
+        en_falla = False
+        while not self.detenido.is_set():
+            try:
+                self.recalcular()
+                if en_falla:
+                    print(f"[Resumen-Sede{self.sede}] ✓ Conexión a MySQL restablecida")
+                    en_falla = False
+                if not self.intervalo_s:
+                    return
+                self.detenido.wait(self.intervalo_s)
+            except mysql.connector.Error as e:
+                if not en_falla:
+                    print(f"[Resumen-Sede{self.sede}] ⚠ No se pudo calcular el resumen: {e} "
+                          f"(reintentos cada {ESPERA_REINTENTO_S}s)")
+                    en_falla = True
+                self.detenido.wait(ESPERA_REINTENTO_S)
+
+    def detener(self):
+        self.detenido.set()
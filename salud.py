@@ -0,0 +1,145 @@
+"""
+Salud de destinos y failover entre sedes
+El GC lleva, por cada Actor local y por el GC de la sede par, un registro de
+salud alimentado de dos formas:
+
+- pasiva: resultado y latencia de cada solicitud real (fallos consecutivos y
+  latencia promedio móvil)
+- activa: un PING periódico (VigiaSalud). A un Actor (REP de un solo hilo)
+  solo se le hace PING cuando ya no está sano, para detectar su recuperación:
+  mientras atiende una solicitud larga no puede responder, y un PING sin
+  respuesta no dice nada de un Actor ocupado. El GC par (ROUTER) se sondea siempre
+
+Cuando el Actor local de una operación autorizada no está sano (o acaba de
+fallar por infraestructura), el GC reenvía la petición al GC par con el campo
+'redirigida' (la sede de origen), y ese GC nunca la vuelve a redirigir.
+
+    salud = SaludDestino("Actor-PRESTAMO", umbral_fallos=3, latencia_maxima_s=0.5)
+    salud.registrar_exito(0.012)
+    salud.sano()
+"""
+import threading
+import time
+
+import zmq
+
+from cliente_confiable import ClienteConfiable, SinRespuesta
+
+CAMPO = 'redirigida'
+
+UMBRAL_FALLOS_DEFECTO = 3
+INTERVALO_DEFECTO_S = 2.0
+TIMEOUT_PING_MS = 500
+
+# Operaciones que pueden atenderse en la otra sede. Préstamo solo necesita el
+# catálogo (los códigos de libro son los mismos); devolución y renovación
+# dependen de un préstamo registrado en la BD de la sede de origen
+OPERACIONES_FAILOVER_DEFECTO = ('PRESTAMO',)
+
+# Peso de la última medición en la latencia promedio
+ALFA_LATENCIA = 0.2
+
+
+class SaludDestino:
+    def __init__(self, nombre, umbral_fallos=UMBRAL_FALLOS_DEFECTO, latencia_maxima_s=None):
+        """
+        Args:
+            nombre: Nombre del destino (logs y etiqueta de métricas)
+            umbral_fallos: Fallos consecutivos a partir de los cuales no está sano
+            latencia_maxima_s: Latencia promedio a partir de la cual no está sano; None sin límite
+        """
+        self.nombre = nombre
+        self.umbral_fallos = max(1, int(umbral_fallos))
+        self.latencia_maxima_s = latencia_maxima_s
+        self.fallos_consecutivos = 0
+        self.latencia = None
+        self.caido = False
+        self.lock = threading.Lock()
+
+    def registrar_exito(self, duracion):
+        with self.lock:
+            self.fallos_consecutivos = 0
+            self.caido = False
+            if self.latencia is None:
+                self.latencia = duracion
+            else:
+                self.latencia += ALFA_LATENCIA * (duracion - self.latencia)
+
+    def registrar_fallo(self):
+        with self.lock:
+            self.fallos_consecutivos += 1
+
+    def marcar_caido(self):
+        """El destino responde pero se declara no disponible (p. ej. circuito hacia el GA abierto)"""
+        with self.lock:
+            self.caido = True
+
+    def sano(self):
+        with self.lock:
+            if self.caido or self.fallos_consecutivos >= self.umbral_fallos:
+                return False
+            return (self.latencia_maxima_s is None or self.latencia is None
+                    or self.latencia <= self.latencia_maxima_s)
+
+    def resumen(self):
+        return {
+            'sano': self.sano(),
+            'fallos_consecutivos': self.fallos_consecutivos,
+            'latencia_ms': round(self.latencia * 1000, 2) if self.latencia is not None else None
+        }
+
+
+class VigiaSalud(threading.Thread):
+    def __init__(self, nombre, context, destinos, intervalo_s=INTERVALO_DEFECTO_S,
+                 timeout_ms=TIMEOUT_PING_MS):
+        """
+        Hilo que hace PING periódico a cada destino y actualiza su salud
+
+        Args:
+            nombre: Nombre del componente (hilo y logs)
+            context: Contexto ZeroMQ del componente
+            destinos: Lista de (SaludDestino, endpoint, evaluar, solo_recuperacion) donde
+                evaluar(respuesta) devuelve False si el destino respondió pero no está
+                disponible; con solo_recuperacion el destino se sondea únicamente cuando
+                no está sano y un PING sin respuesta no cuenta como fallo
+            intervalo_s: Segundos entre rondas de PING
+            timeout_ms: Espera máxima por cada PING
+        """
+        super().__init__(name=f"salud-{nombre}", daemon=True)
+        self.context = context
+        self.destinos = destinos
+        self.intervalo_s = intervalo_s
+        self.timeout_ms = timeout_ms
+        self.detenido = threading.Event()
+
+    def run(self):
+        clientes = [
+            (salud, ClienteConfiable(self.context, endpoint, f"PING-{salud.nombre}",
+                                     self.timeout_ms, reintentos=0), evaluar, solo_recuperacion)
+            for salud, endpoint, evaluar, solo_recuperacion in self.destinos
+        ]
+        try:
+            while not self.detenido.wait(self.intervalo_s):
+                for salud, cliente, evaluar, solo_recuperacion in clientes:
+                    if solo_recuperacion and salud.sano():
+                        # Sano: lo juzgan las solicitudes reales
+                        continue
+                    t_inicio = time.perf_counter()
+                    try:
+                        respuesta = cliente.solicitar({'operacion': 'PING'})
+                    except SinRespuesta:
+                        if not solo_recuperacion:
+                            salud.registrar_fallo()
+                        continue
+                    if evaluar(respuesta):
+                        salud.registrar_exito(time.perf_counter() - t_inicio)
+                    else:
+                        salud.marcar_caido()
+        except zmq.ContextTerminated:
+            pass
+        finally:
+            for _, cliente, _, _ in clientes:
+                cliente.cerrar()
+
+    def detener(self):
+        self.detenido.set()
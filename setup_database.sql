@@ -40,7 +40,8 @@ CREATE TABLE IF NOT EXISTS libros (
     fecha_registro            DATETIME DEFAULT CURRENT_TIMESTAMP,
     fecha_ultima_actualizacion DATETIME DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
     INDEX idx_codigo (codigo),
-    INDEX idx_nombre (nombre)
+    INDEX idx_nombre (nombre),
+    INDEX idx_actualizacion (fecha_ultima_actualizacion)
 ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4;
 
 -- Tabla de préstamos
@@ -59,7 +60,8 @@ CREATE TABLE IF NOT EXISTS prestamos (
         FOREIGN KEY (codigo_libro) REFERENCES libros(codigo)
         ON UPDATE CASCADE,
     INDEX idx_usuario (usuario_id),
-    INDEX idx_estado (estado)
+    INDEX idx_estado (estado),
+    INDEX idx_actualizacion (fecha_ultima_actualizacion)
 ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4;
 
 -- Tabla de historial de operaciones
@@ -75,6 +77,15 @@ CREATE TABLE IF NOT EXISTS historial_operaciones (
     INDEX idx_operacion (operacion)
 ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4;
 
+-- Mutaciones ya aplicadas por id de petición (reintentos idempotentes)
+CREATE TABLE IF NOT EXISTS peticiones_procesadas (
+    id_peticion     VARCHAR(64) PRIMARY KEY,
+    operacion       VARCHAR(30) NOT NULL,
+    respuesta       TEXT NOT NULL,
+    fecha_registro  DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    INDEX idx_registro (fecha_registro)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4;
+
 -- ============================================================================
 -- ESQUEMA SEDE 2 (idéntico al de la sede 1)
 -- ============================================================================
@@ -93,7 +104,8 @@ CREATE TABLE IF NOT EXISTS libros (
     fecha_registro            DATETIME DEFAULT CURRENT_TIMESTAMP,
     fecha_ultima_actualizacion DATETIME DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
     INDEX idx_codigo (codigo),
-    INDEX idx_nombre (nombre)
+    INDEX idx_nombre (nombre),
+    INDEX idx_actualizacion (fecha_ultima_actualizacion)
 ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4;
 
 -- Tabla de préstamos
@@ -112,7 +124,8 @@ CREATE TABLE IF NOT EXISTS prestamos (
         FOREIGN KEY (codigo_libro) REFERENCES libros(codigo)
         ON UPDATE CASCADE,
     INDEX idx_usuario (usuario_id),
-    INDEX idx_estado (estado)
+    INDEX idx_estado (estado),
+    INDEX idx_actualizacion (fecha_ultima_actualizacion)
 ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4;
 
 -- Tabla de historial de operaciones
@@ -128,4 +141,13 @@ CREATE TABLE IF NOT EXISTS historial_operaciones (
     INDEX idx_operacion (operacion)
 ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4;
 
+-- Mutaciones ya aplicadas por id de petición (reintentos idempotentes)
+CREATE TABLE IF NOT EXISTS peticiones_procesadas (
+    id_peticion     VARCHAR(64) PRIMARY KEY,
+    operacion       VARCHAR(30) NOT NULL,
+    respuesta       TEXT NOT NULL,
+    fecha_registro  DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    INDEX idx_registro (fecha_registro)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4;
+
 -- Fin del script
\ No newline at end of file
@@ -0,0 +1,175 @@
+"""
+Sistema Embebido (un solo proceso)
+Ejecuta GA, los cuatro Actores y el GC de una sede como hilos de un mismo proceso,
+comunicados por sockets inproc:// sobre un contexto ZeroMQ compartido.
+
+Sirve para medir el costo de software de cada salto sin TCP de loopback y para
+arrancar una sede completa en milisegundos en pruebas de integración:
+
+    with SistemaEmbebido(1, "localhost", 3306) as sistema:
+        cliente = sistema.cliente()
+        cliente.enviar_peticion({'operacion': 'PRESTAMO', 'codigo_libro': 'LIB00001',
+                                 'usuario_id': 'USR1001'})
+        cliente.cerrar()
+
+Los caminos TCP de cada componente no cambian: solo se les pasan endpoints
+y el contexto compartido.
+"""
+import zmq
+import threading
+import contextlib
+import statistics
+import argparse
+import time
+import sys
+import os
+
+from gestor_almacenamiento import GestorAlmacenamiento
+from actor import Actor
+from gestor_cargar import GestorCarga, OPERACIONES_CONSULTA
+from proceso_solicitante import ProcesoSolicitante, leer_archivo_peticiones
+
+TIPOS_ACTOR = ['DEVOLUCION', 'RENOVACION', 'PRESTAMO', 'CONSULTA']
+
+class SistemaEmbebido:
+    def __init__(self, sede=1, db_host="localhost", db_port=3306):
+        """
+        Inicializa los componentes de una sede sobre inproc://
+
+        Args:
+            sede: Identificador de la sede (1 o 2)
+            db_host: Host de MySQL (el GA sigue usando la BD real)
+            db_port: Puerto de MySQL
+        """
+        self.sede = sede
+        self.context = zmq.Context()
+        # Al detener, los mensajes pendientes se descartan en lugar de bloquear term()
+        self.context.linger = 0
+
+        prefijo = f"inproc://sede{sede}"
+        self.endpoint_ga = f"{prefijo}-ga"
+        self.endpoints_actores = {tipo: f"{prefijo}-actor-{tipo.lower()}" for tipo in TIPOS_ACTOR}
+        self.endpoint_gc = f"{prefijo}-gc"
+
+        # Orden de creación: quien hace bind antes de quien hace connect
+        self.ga = GestorAlmacenamiento(
+            sede, db_host=db_host, db_port=db_port,
+            context=self.context, endpoint=self.endpoint_ga
+        )
+        self.actores = [
+            Actor(tipo, sede, None, context=self.context,
+                  endpoint=self.endpoints_actores[tipo], ga_endpoint=self.endpoint_ga)
+            for tipo in TIPOS_ACTOR
+        ]
+        # El GC direcciona por operación: las consultas van al Actor de Consulta
+        endpoints_gc = {tipo: endpoint for tipo, endpoint in self.endpoints_actores.items() if tipo != 'CONSULTA'}
+        endpoints_gc.update({operacion: self.endpoints_actores['CONSULTA'] for operacion in OPERACIONES_CONSULTA})
+        self.gc = GestorCarga(
+            sede, context=self.context, ps_endpoint=self.endpoint_gc,
+            actor_endpoints=endpoints_gc
+        )
+
+        self.hilos = []
+
+    def iniciar(self):
+        """Arranca cada componente en su propio hilo"""
+        componentes = [('GA', self.ga)] + \
+                      [(f"Actor-{a.tipo}", a) for a in self.actores] + \
+                      [('GC', self.gc)]
+
+        for nombre, componente in componentes:
+            hilo = threading.Thread(target=componente.ejecutar,
+                                    name=f"Sede{self.sede}-{nombre}", daemon=True)
+            hilo.start()
+            self.hilos.append(hilo)
+
+        return self
+
+    def cliente(self, process_id=0, archivo_trazas=None, muestreo_trazas=1.0, plazo_ms=None):
+        """Crea un Proceso Solicitante conectado al GC por inproc://"""
+        cliente = ProcesoSolicitante(process_id, context=self.context, endpoint=self.endpoint_gc,
+                                     archivo_trazas=archivo_trazas, muestreo_trazas=muestreo_trazas,
+                                     plazo_ms=plazo_ms)
+        cliente.conectar()
+        return cliente
+
+    def detener(self):
+        """
+        Termina el contexto compartido: cada hilo sale de su recv con
+        ContextTerminated, cierra sus sockets y term() retorna.
+        Los clientes creados con cliente() deben cerrarse antes.
+        """
+        self.context.term()
+        for hilo in self.hilos:
+            hilo.join(timeout=5)
+
+    def __enter__(self):
+        return self.iniciar()
+
+    def __exit__(self, *excepcion):
+        self.detener()
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Ejecuta una sede completa en un solo proceso (inproc://)",
+        epilog="Ejemplo:\n"
+               "  python sistema_embebido.py peticiones.txt --sede 1 --repeticiones 20 --silencioso",
+        formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument("archivo", help="Archivo de peticiones (OPERACION|CODIGO_LIBRO|USUARIO_ID, BUSQUEDA|texto[|pagina], CONSULTA_USUARIO|USUARIO_ID o RESUMEN)")
+    parser.add_argument("--sede", type=int, default=1, help="Sede (defecto 1)")
+    parser.add_argument("--db-host", default="localhost", help="Host de MySQL")
+    parser.add_argument("--db-port", type=int, default=3306, help="Puerto de MySQL")
+    parser.add_argument("--repeticiones", type=int, default=1, help="Veces que se envía el archivo")
+    parser.add_argument("--trazas", default=None,
+                        help="Archivo JSONL de trazas (analizar con analizar_trazas.py)")
+    parser.add_argument("--muestreo", type=float, default=1.0, help="Fracción de trazas registradas")
+    parser.add_argument("--silencioso", action="store_true",
+                        help="Suprimir los logs de los componentes (no miden costo de impresión)")
+    args = parser.parse_args()
+
+    peticiones = leer_archivo_peticiones(args.archivo)
+    if not peticiones:
+        return
+
+    salida = open(os.devnull, 'w') if args.silencioso else sys.stdout
+    tiempos = []
+
+    t_arranque = time.perf_counter()
+    with contextlib.redirect_stdout(salida):
+        sistema = SistemaEmbebido(args.sede, args.db_host, args.db_port).iniciar()
+    t_listo = time.perf_counter()
+
+    try:
+        with contextlib.redirect_stdout(salida):
+            cliente = sistema.cliente(archivo_trazas=args.trazas, muestreo_trazas=args.muestreo)
+            t_inicio = time.perf_counter()
+            for _ in range(args.repeticiones):
+                for peticion in peticiones:
+                    duracion = cliente.enviar_peticion(peticion)
+                    if duracion is not None:
+                        tiempos.append(duracion)
+            t_fin = time.perf_counter()
+            cliente.cerrar()
+    finally:
+        with contextlib.redirect_stdout(salida):
+            sistema.detener()
+        if salida is not sys.stdout:
+            salida.close()
+
+    print("=" * 70)
+    print(f"[EMBEBIDO] Sede {args.sede} - RESUMEN (inproc://)")
+    print(f" Arranque de la sede:   {(t_listo - t_arranque) * 1000:.1f} ms")
+    if tiempos:
+        print(f" Peticiones medidas:    {len(tiempos)}")
+        print(f" Latencia promedio:     {statistics.mean(tiempos) * 1000:.3f} ms")
+        print(f" Latencia mediana:      {statistics.median(tiempos) * 1000:.3f} ms")
+        print(f" Rendimiento:           {len(tiempos) / (t_fin - t_inicio):.1f} peticiones/segundo")
+    else:
+        print(" ⚠️ No se recibieron mediciones de tiempo válidas.")
+    print("=" * 70)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,246 @@
+"""
+Snapshots de la Base de Datos para benchmarks
+Toma una copia con nombre de las tablas de datos de cada sede y la restaura
+en segundos, sin volver a ejecutar setup_database.sql ni generar_datos_inic.py.
+
+Las copias se guardan como tablas clon dentro de la misma base de datos
+(snap_<nombre>__<tabla>), así no se necesitan permisos adicionales.
+
+Uso desde el harness de benchmarks:
+    from snapshot_bd import GestorSnapshots
+    GestorSnapshots("localhost", 3306).restaurar("base")
+"""
+import mysql.connector
+from generar_datos_inic import GeneradorDatos
+import threading
+import argparse
+import time
+import re
+import sys
+
+# Tablas que forman parte del estado de un benchmark (las del escrow y el lsn
+# aplicado del diario describen el mismo inventario que libros y prestamos)
+TABLAS_SNAPSHOT = ['libros', 'prestamos', 'historial_operaciones', 'peticiones_procesadas',
+                   'escrow_libros', 'escrow_consumos', 'diario_aplicado']
+
+PREFIJO = "snap_"
+SEPARADOR = "__"
+
+class GestorSnapshots:
+    def __init__(self, host="localhost", port=3306, sedes=(1, 2)):
+        """
+        Inicializa el gestor de snapshots
+
+        Args:
+            host: Host de MySQL
+            port: Puerto de MySQL
+            sedes: Sedes sobre las que opera (cada una en su propio hilo)
+        """
+        self.host = host
+        self.port = port
+        self.sedes = list(sedes)
+        # Reutiliza la conexión y el manejo de índices diferidos del cargador masivo
+        self.generador = GeneradorDatos(host, port)
+
+    def validar_nombre(self, nombre):
+        """Valida el nombre del snapshot (se usa como parte de nombres de tabla)"""
+        if not re.fullmatch(r"[a-z0-9_]{1,30}", nombre):
+            raise ValueError(f"Nombre de snapshot inválido: '{nombre}' (usar a-z, 0-9 y _, máx. 30)")
+
+    def tabla_snapshot(self, nombre, tabla):
+        """Nombre de la tabla clon de un snapshot"""
+        return f"{PREFIJO}{nombre}{SEPARADOR}{tabla}"
+
+    def tablas_existentes(self, cursor):
+        """Tablas de TABLAS_SNAPSHOT presentes en el esquema actual"""
+        cursor.execute("SHOW TABLES")
+        existentes = {fila[0] for fila in cursor.fetchall()}
+        return [tabla for tabla in TABLAS_SNAPSHOT if tabla in existentes]
+
+    def en_paralelo(self, funcion, *args):
+        """Ejecuta funcion(sede, *args) para todas las sedes en paralelo y propaga errores"""
+        errores = {}
+
+        def trabajador(sede):
+            try:
+                funcion(sede, *args)
+            except Exception as e:
+                errores[sede] = e
+
+        hilos = [threading.Thread(target=trabajador, args=(sede,)) for sede in self.sedes]
+        for hilo in hilos:
+            hilo.start()
+        for hilo in hilos:
+            hilo.join()
+
+        if errores:
+            detalle = "; ".join(f"sede {sede}: {error}" for sede, error in errores.items())
+            raise RuntimeError(f"Falló la operación de snapshot ({detalle})")
+
+    def tomar_sede(self, sede, nombre):
+        """Clona las tablas de una sede en las tablas del snapshot"""
+        conexion = self.generador.conectar(f"biblioteca_sede{sede}")
+        cursor = conexion.cursor()
+        t_inicio = time.perf_counter()
+
+        try:
+            for tabla in self.tablas_existentes(cursor):
+                destino = self.tabla_snapshot(nombre, tabla)
+                cursor.execute(f"DROP TABLE IF EXISTS `{destino}`")
+                cursor.execute(f"CREATE TABLE `{destino}` LIKE `{tabla}`")
+                cursor.execute(f"INSERT INTO `{destino}` SELECT * FROM `{tabla}`")
+                conexion.commit()
+
+            print(f"[SNAP] ✓ Sede {sede}: snapshot '{nombre}' tomado "
+                  f"({time.perf_counter() - t_inicio:.2f}s)")
+        finally:
+            cursor.close()
+            conexion.close()
+
+    def restaurar_sede(self, sede, nombre):
+        """
+        Restaura las tablas de una sede desde el snapshot
+
+        TRUNCATE + INSERT ... SELECT conserva el esquema vivo (FKs incluidas)
+        y deja AUTO_INCREMENT igual que al tomar el snapshot. Los índices
+        secundarios se reconstruyen una sola vez al final de la copia.
+        """
+        database = f"biblioteca_sede{sede}"
+        conexion = self.generador.conectar(database)
+        cursor = conexion.cursor()
+        t_inicio = time.perf_counter()
+
+        try:
+            self.generador.preparar_sesion(cursor)
+
+            existentes = self.tablas_existentes(cursor)
+            tablas = [tabla for tabla in existentes
+                      if self.existe_tabla(cursor, self.tabla_snapshot(nombre, tabla))]
+            if not tablas:
+                raise ValueError(f"No existe el snapshot '{nombre}' en {database}")
+
+            # Tablas creadas por una migración posterior al snapshot: estaban vacías
+            for tabla in existentes:
+                if tabla not in tablas:
+                    cursor.execute(f"TRUNCATE TABLE `{tabla}`")
+
+            indices = self.generador.eliminar_indices_secundarios(cursor, database, tablas)
+
+            try:
+                for tabla in tablas:
+                    cursor.execute(f"TRUNCATE TABLE `{tabla}`")
+                    cursor.execute(
+                        f"INSERT INTO `{tabla}` SELECT * FROM `{self.tabla_snapshot(nombre, tabla)}`"
+                    )
+                    conexion.commit()
+            finally:
+                # También si la copia falla: la sede no queda sin sus índices secundarios
+                self.generador.reconstruir_indices(cursor, indices)
+
+            print(f"[SNAP] ✓ Sede {sede}: snapshot '{nombre}' restaurado "
+                  f"({time.perf_counter() - t_inicio:.2f}s)")
+        finally:
+            cursor.close()
+            conexion.close()
+
+    def eliminar_sede(self, sede, nombre):
+        """Elimina las tablas de un snapshot en una sede"""
+        conexion = self.generador.conectar(f"biblioteca_sede{sede}")
+        cursor = conexion.cursor()
+
+        try:
+            for tabla in TABLAS_SNAPSHOT:
+                cursor.execute(f"DROP TABLE IF EXISTS `{self.tabla_snapshot(nombre, tabla)}`")
+            print(f"[SNAP] ✓ Sede {sede}: snapshot '{nombre}' eliminado")
+        finally:
+            cursor.close()
+            conexion.close()
+
+    def existe_tabla(self, cursor, tabla):
+        """Indica si una tabla existe en la base de datos actual"""
+        cursor.execute("SHOW TABLES LIKE %s", (tabla,))
+        return cursor.fetchone() is not None
+
+    def tomar(self, nombre):
+        """Toma el snapshot 'nombre' de todas las sedes"""
+        self.validar_nombre(nombre)
+        self.en_paralelo(self.tomar_sede, nombre)
+
+    def restaurar(self, nombre):
+        """Restaura el snapshot 'nombre' en todas las sedes"""
+        self.validar_nombre(nombre)
+        self.en_paralelo(self.restaurar_sede, nombre)
+
+    def eliminar(self, nombre):
+        """Elimina el snapshot 'nombre' de todas las sedes"""
+        self.validar_nombre(nombre)
+        self.en_paralelo(self.eliminar_sede, nombre)
+
+    def listar(self):
+        """
+        Lista los snapshots existentes
+
+        Returns:
+            dict: {nombre: [sedes donde existe]}
+        """
+        snapshots = {}
+
+        for sede in self.sedes:
+            conexion = self.generador.conectar(f"biblioteca_sede{sede}")
+            cursor = conexion.cursor()
+            try:
+                cursor.execute("SHOW TABLES")
+                for (tabla,) in cursor.fetchall():
+                    if tabla.startswith(PREFIJO) and SEPARADOR in tabla:
+                        nombre = tabla[len(PREFIJO):].split(SEPARADOR)[0]
+                        sedes = snapshots.setdefault(nombre, [])
+                        if sede not in sedes:
+                            sedes.append(sede)
+            finally:
+                cursor.close()
+                conexion.close()
+
+        return snapshots
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Snapshots rápidos del estado de la BD para benchmarks",
+        epilog="Ejemplos:\n"
+               "  python snapshot_bd.py tomar base\n"
+               "  python snapshot_bd.py restaurar base --host 10.0.0.5\n"
+               "  python snapshot_bd.py listar",
+        formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument("accion", choices=['tomar', 'restaurar', 'eliminar', 'listar'])
+    parser.add_argument("nombre", nargs="?", help="Nombre del snapshot")
+    parser.add_argument("--host", default="localhost", help="Host de MySQL")
+    parser.add_argument("--port", type=int, default=3306, help="Puerto de MySQL")
+    parser.add_argument("--sedes", type=int, nargs="+", default=[1, 2], help="Sedes (defecto: 1 2)")
+    args = parser.parse_args()
+
+    gestor = GestorSnapshots(args.host, args.port, args.sedes)
+
+    try:
+        if args.accion == 'listar':
+            snapshots = gestor.listar()
+            if not snapshots:
+                print("[SNAP] No hay snapshots")
+            for nombre, sedes in sorted(snapshots.items()):
+                print(f"  - {nombre} (sedes: {', '.join(map(str, sedes))})")
+            return
+
+        if not args.nombre:
+            parser.error(f"La acción '{args.accion}' requiere el nombre del snapshot")
+
+        t_inicio = time.perf_counter()
+        getattr(gestor, args.accion)(args.nombre)
+        print(f"[SNAP] Completado en {time.perf_counter() - t_inicio:.2f}s")
+
+    except (mysql.connector.Error, ValueError, RuntimeError) as e:
+        print(f"\n[ERROR] {e}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,110 @@
+"""
+Pruebas del control de admisión del GC: carriles y planificador (sin MySQL)
+
+    python -m unittest test_admision
+"""
+import unittest
+
+import admision
+from admision import Carril, Planificador
+
+
+def llenar(carril, cantidad):
+    for i in range(cantidad):
+        carril.admitir(f"{carril.operacion}-{i}")
+
+
+class TestCarril(unittest.TestCase):
+    def test_rechaza_por_cola_llena(self):
+        carril = Carril('PRESTAMO', concurrencia=1, profundidad=2)
+        # Un lugar de concurrencia libre más dos en cola
+        for i in range(3):
+            self.assertIsNone(carril.admitir(i))
+        motivo, reintentar_en_ms = carril.admitir(3)
+        self.assertEqual(motivo, 'cola')
+        self.assertGreaterEqual(reintentar_en_ms, 1)
+
+    def test_lugar_liberado_admite_de_nuevo(self):
+        carril = Carril('PRESTAMO', concurrencia=1, profundidad=0)
+        self.assertIsNone(carril.admitir('a'))
+        self.assertIsNotNone(carril.admitir('b'))
+        self.assertEqual(carril.tomar(), 'a')
+        carril.terminar(0.01)
+        self.assertIsNone(carril.admitir('b'))
+
+    def test_rechaza_por_tasa(self):
+        carril = Carril('DEVOLUCION', concurrencia=10, profundidad=10, tasa=2)
+        self.assertIsNone(carril.admitir('a'))
+        self.assertIsNone(carril.admitir('b'))
+        motivo, reintentar_en_ms = carril.admitir('c')
+        self.assertEqual(motivo, 'tasa')
+        # Falta casi una ficha completa a 2 por segundo
+        self.assertTrue(1 <= reintentar_en_ms <= 500)
+
+    def test_cubeta_se_recarga(self):
+        carril = Carril('DEVOLUCION', concurrencia=10, profundidad=10, tasa=2)
+        llenar(carril, 2)
+        carril.ultima_recarga -= 1.0
+        self.assertIsNone(carril.admitir('c'))
+
+    def test_peso_invalido(self):
+        with self.assertRaises(ValueError):
+            Carril('PRESTAMO', peso=0)
+
+
+class TestPlanificador(unittest.TestCase):
+    def test_reparto_ponderado(self):
+        pesado = Carril('DEVOLUCION', concurrencia=1, profundidad=100, peso=3)
+        liviano = Carril('PRESTAMO', concurrencia=1, profundidad=100, peso=1)
+        planificador = Planificador({'DEVOLUCION': pesado, 'PRESTAMO': liviano}, capacidad=1)
+        llenar(pesado, 50)
+        llenar(liviano, 50)
+
+        despachos = {'DEVOLUCION': 0, 'PRESTAMO': 0}
+        for _ in range(40):
+            carril = planificador.siguiente()
+            planificador.tomar(carril)
+            carril.terminar(admision.SERVICIO_INICIAL)
+            despachos[carril.operacion] += 1
+        self.assertEqual(despachos, {'DEVOLUCION': 30, 'PRESTAMO': 10})
+
+    def test_reserva_minima_no_la_ocupan_otros(self):
+        reservado = Carril('DEVOLUCION', concurrencia=2, profundidad=10, minimo=0.5)
+        otro = Carril('PRESTAMO', concurrencia=2, profundidad=10)
+        planificador = Planificador({'DEVOLUCION': reservado, 'PRESTAMO': otro}, capacidad=2)
+        self.assertEqual(reservado.reservado, 1)
+        llenar(otro, 3)
+
+        self.assertIs(planificador.siguiente(), otro)
+        planificador.tomar(otro)
+        # El único lugar libre está reservado: PRESTAMO espera aunque tenga cola
+        self.assertIsNone(planificador.siguiente())
+
+        reservado.admitir('devolucion')
+        self.assertIs(planificador.siguiente(), reservado)
+
+    def test_sin_capacidad_no_despacha(self):
+        carril = Carril('PRESTAMO', concurrencia=2, profundidad=10)
+        planificador = Planificador({'PRESTAMO': carril}, capacidad=1)
+        llenar(carril, 2)
+        planificador.tomar(planificador.siguiente())
+        self.assertIsNone(planificador.siguiente())
+
+    def test_reservas_mayores_que_la_capacidad(self):
+        carriles = {operacion: Carril(operacion, concurrencia=2, minimo=0.6)
+                    for operacion in ('DEVOLUCION', 'PRESTAMO')}
+        with self.assertRaises(ValueError):
+            Planificador(carriles, capacidad=2)
+
+
+class TestParsearPorOperacion(unittest.TestCase):
+    def test_valores_por_operacion_y_general(self):
+        valores = admision.parsear_por_operacion(["prestamo=4", "2"])
+        self.assertEqual(valores, {'PRESTAMO': 4, '*': 2})
+        self.assertEqual(admision.valor_para(valores, 'PRESTAMO', 1), 4)
+        self.assertEqual(admision.valor_para(valores, 'DEVOLUCION', 1), 2)
+        self.assertEqual(admision.valor_para({}, 'DEVOLUCION', 1), 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
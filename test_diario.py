@@ -0,0 +1,97 @@
+"""
+Pruebas del diario de operaciones del GA: relectura y colas a medias (sin MySQL)
+
+    python -m unittest test_diario
+"""
+import os
+import tempfile
+import unittest
+
+import diario
+from diario import Diario, DiarioCorrupto
+
+
+def registro(numero):
+    return {'operacion': 'INSERT_HISTORIAL', 'numero': numero}
+
+
+class TestDiario(unittest.TestCase):
+    def setUp(self):
+        self.temporal = tempfile.TemporaryDirectory()
+        self.directorio = os.path.join(self.temporal.name, 'sede1')
+
+    def tearDown(self):
+        self.temporal.cleanup()
+
+    def escribir(self, cantidad, tam_segmento=diario.TAM_SEGMENTO_DEFECTO):
+        registro_diario = Diario(self.directorio, tam_segmento)
+        registro_diario.abrir()
+        for numero in range(1, cantidad + 1):
+            registro_diario.agregar(registro(numero))
+        registro_diario.cerrar()
+        return registro_diario
+
+    def reabrir(self):
+        registro_diario = Diario(self.directorio)
+        registros = registro_diario.abrir()
+        self.addCleanup(registro_diario.cerrar)
+        return registro_diario, registros
+
+    def test_relee_los_registros_en_orden(self):
+        self.escribir(3)
+        registro_diario, registros = self.reabrir()
+        self.assertEqual([r['lsn'] for r in registros], [1, 2, 3])
+        self.assertEqual([r['numero'] for r in registros], [1, 2, 3])
+        self.assertEqual(registro_diario.agregar(registro(4)), 4)
+
+    def test_descarta_una_cola_escrita_a_medias(self):
+        ruta = self.escribir(3).segmentos[-1][1]
+        tam_valido = os.path.getsize(ruta)
+        # Caída a mitad del cuarto registro: cabecera completa y contenido truncado
+        contenido = b'{"operacion": "INSERT_HISTORIAL", "numero": 4}'
+        cabecera = diario.CABECERA.pack(len(contenido), 0, 4)
+        with open(ruta, 'ab') as archivo:
+            archivo.write(cabecera + contenido[:10])
+
+        registro_diario, registros = self.reabrir()
+        self.assertEqual(len(registros), 3)
+        self.assertEqual(os.path.getsize(ruta), tam_valido)
+        # El lsn de la cola descartada se reutiliza y el diario sigue legible
+        self.assertEqual(registro_diario.agregar(registro(4)), 4)
+        registro_diario.cerrar()
+        _, registros = self.reabrir()
+        self.assertEqual([r['numero'] for r in registros], [1, 2, 3, 4])
+
+    def test_descarta_un_registro_final_con_crc_invalido(self):
+        ruta = self.escribir(3).segmentos[-1][1]
+        with open(ruta, 'r+b') as archivo:
+            archivo.seek(-2, os.SEEK_END)
+            archivo.write(b'XX')
+
+        registro_diario, registros = self.reabrir()
+        self.assertEqual([r['numero'] for r in registros], [1, 2])
+        self.assertEqual(registro_diario.agregar(registro(3)), 3)
+
+    def test_corrupcion_en_un_segmento_intermedio(self):
+        # Un segmento por registro
+        segmentos = self.escribir(3, tam_segmento=1).segmentos
+        self.assertEqual(len(segmentos), 3)
+        with open(segmentos[0][1], 'r+b') as archivo:
+            archivo.seek(-2, os.SEEK_END)
+            archivo.write(b'XX')
+
+        with self.assertRaises(DiarioCorrupto):
+            Diario(self.directorio).abrir()
+
+    def test_liberar_borra_segmentos_aplicados(self):
+        registro_diario = Diario(self.directorio, tam_segmento=1)
+        registro_diario.abrir()
+        self.addCleanup(registro_diario.cerrar)
+        for numero in range(1, 4):
+            registro_diario.agregar(registro(numero))
+        registro_diario.liberar_hasta(2)
+        self.assertEqual([primer_lsn for primer_lsn, _ in registro_diario.segmentos], [3])
+
+
+if __name__ == "__main__":
+    unittest.main()
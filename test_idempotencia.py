@@ -0,0 +1,58 @@
+"""
+Pruebas de la caché de respuestas por id_peticion (sin MySQL)
+
+    python -m unittest test_idempotencia
+"""
+import unittest
+
+import idempotencia
+from idempotencia import CacheRespuestas
+
+
+class TestCacheRespuestas(unittest.TestCase):
+    def test_duplicado_recibe_la_respuesta_guardada(self):
+        cache = CacheRespuestas()
+        respuesta = {'estado': 'OK', 'mensaje': 'Préstamo registrado'}
+        cache.guardar('a1', respuesta)
+
+        duplicada = cache.obtener('a1')
+        self.assertEqual(duplicada['mensaje'], 'Préstamo registrado')
+        self.assertTrue(duplicada['duplicada'])
+        # La guardada no queda marcada
+        self.assertNotIn('duplicada', respuesta)
+        self.assertIsNot(cache.obtener('a1'), duplicada)
+
+    def test_id_desconocido(self):
+        self.assertIsNone(CacheRespuestas().obtener('nuevo'))
+
+    def test_solo_guarda_resultados_definitivos(self):
+        cache = CacheRespuestas()
+        cache.guardar('rechazo', {'estado': 'RECHAZADO'})
+        for estado in ('ERROR', 'EXPIRADO', 'OCUPADO'):
+            cache.guardar(estado, {'estado': estado})
+            self.assertIsNone(cache.obtener(estado))
+        self.assertIsNotNone(cache.obtener('rechazo'))
+        self.assertEqual(len(cache), 1)
+
+    def test_vencida(self):
+        cache = CacheRespuestas(ttl_s=-1)
+        cache.guardar('a1', {'estado': 'OK'})
+        self.assertIsNone(cache.obtener('a1'))
+        self.assertEqual(len(cache), 0)
+
+    def test_descarta_la_menos_usada(self):
+        cache = CacheRespuestas(capacidad=2)
+        cache.guardar('a', {'estado': 'OK'})
+        cache.guardar('b', {'estado': 'OK'})
+        cache.obtener('a')
+        cache.guardar('c', {'estado': 'OK'})
+        self.assertIsNone(cache.obtener('b'))
+        self.assertIsNotNone(cache.obtener('a'))
+        self.assertIsNotNone(cache.obtener('c'))
+
+    def test_ids_unicos(self):
+        self.assertNotEqual(idempotencia.nuevo_id(), idempotencia.nuevo_id())
+
+
+if __name__ == "__main__":
+    unittest.main()
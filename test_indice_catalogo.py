@@ -0,0 +1,69 @@
+"""
+Pruebas del índice invertido del catálogo (sin MySQL)
+
+    python -m unittest test_indice_catalogo
+"""
+import unittest
+
+import indice_catalogo
+from indice_catalogo import IndiceCatalogo
+
+
+def indice_con(libros):
+    """Índice listo con [(codigo, nombre, autor)] (ids 1..n en orden)"""
+    indice = IndiceCatalogo(1, conectar=None)
+    for id_libro, (codigo, nombre, autor) in enumerate(libros, start=1):
+        indice.agregar_documento(id_libro, codigo, nombre, autor)
+    indice.listo = True
+    return indice
+
+
+class TestBusquedaPrefijos(unittest.TestCase):
+    def setUp(self):
+        self.indice = indice_con([(f"LIB{i:03d}", f"historia{i:02d} tomo", "Autor") for i in range(1, 41)])
+
+    def test_prefijo_cuenta_todos_los_tokens(self):
+        respuesta = self.indice.buscar('historia')
+        self.assertEqual(respuesta['total'], 40)
+        self.assertTrue(respuesta['total_exacto'])
+
+    def test_prefijo_con_otro_termino(self):
+        respuesta = self.indice.buscar('historia tomo', por_pagina=50)
+        self.assertEqual(respuesta['total'], 40)
+        self.assertTrue(respuesta['total_exacto'])
+        self.assertEqual(len(respuesta['resultados']), 40)
+
+    def test_expansion_truncada_no_es_exacta(self):
+        anterior = indice_catalogo.MAX_EXPANSIONES
+        indice_catalogo.MAX_EXPANSIONES = 16
+        try:
+            respuesta = self.indice.buscar('historia')
+        finally:
+            indice_catalogo.MAX_EXPANSIONES = anterior
+        self.assertFalse(respuesta['total_exacto'])
+
+    def test_termino_sin_coincidencias(self):
+        respuesta = self.indice.buscar('historia zzz')
+        self.assertEqual(respuesta['total'], 0)
+        self.assertTrue(respuesta['total_exacto'])
+
+
+class TestRanking(unittest.TestCase):
+    def test_mejor_puntaje_aunque_tenga_id_alto(self):
+        # Muchos libros con el término en el autor (1) y uno al final con el título exacto (3)
+        libros = [(f"LIB{i:04d}", f"Obra {i}", "Borges") for i in range(1, 500)]
+        libros.append(("LIB0500", "Borges", "Otro"))
+        respuesta = indice_con(libros).buscar('borges', por_pagina=1)
+        self.assertEqual(respuesta['resultados'][0]['codigo'], "LIB0500")
+        self.assertEqual(respuesta['total'], 500)
+
+    def test_paginas_sin_repetidos(self):
+        indice = indice_con([(f"LIB{i:03d}", f"Cuento {i}", "Autor") for i in range(1, 31)])
+        codigos = [r['codigo'] for pagina in (1, 2, 3)
+                   for r in indice.buscar('cuento', pagina=pagina)['resultados']]
+        self.assertEqual(len(codigos), 30)
+        self.assertEqual(len(set(codigos)), 30)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,83 @@
+"""
+Pruebas del interruptor de circuito Actor → GA (sin MySQL)
+
+    python -m unittest test_interruptor
+"""
+import unittest
+
+from interruptor import Interruptor, CERRADO, ABIERTO, SEMIABIERTO
+
+
+def abierto(umbral=3, enfriamiento_s=60):
+    interruptor = Interruptor("GA", umbral, enfriamiento_s)
+    for _ in range(umbral):
+        interruptor.registrar_fallo()
+    return interruptor
+
+
+def enfriar(interruptor):
+    """Simula que pasó el enfriamiento sin esperarlo"""
+    interruptor.abierto_desde -= interruptor.enfriamiento_s
+
+
+class TestInterruptor(unittest.TestCase):
+    def test_se_abre_al_llegar_al_umbral(self):
+        interruptor = Interruptor("GA", umbral=3, enfriamiento_s=60)
+        interruptor.registrar_fallo()
+        interruptor.registrar_fallo()
+        self.assertEqual(interruptor.estado, CERRADO)
+        self.assertTrue(interruptor.permitir())
+        interruptor.registrar_fallo()
+        self.assertEqual(interruptor.estado, ABIERTO)
+        self.assertEqual(interruptor.aperturas, 1)
+
+    def test_exito_reinicia_los_fallos_consecutivos(self):
+        interruptor = Interruptor("GA", umbral=2, enfriamiento_s=60)
+        interruptor.registrar_fallo()
+        interruptor.registrar_exito()
+        interruptor.registrar_fallo()
+        self.assertEqual(interruptor.estado, CERRADO)
+
+    def test_abierto_rechaza_de_inmediato(self):
+        interruptor = abierto()
+        self.assertFalse(interruptor.permitir())
+        self.assertFalse(interruptor.permitir())
+        self.assertEqual(interruptor.rechazadas, 2)
+        self.assertGreater(interruptor.resumen()['reintentar_en_s'], 0)
+
+    def test_semiabierto_deja_pasar_una_sola_prueba(self):
+        interruptor = abierto()
+        enfriar(interruptor)
+        self.assertTrue(interruptor.permitir())
+        self.assertEqual(interruptor.estado, SEMIABIERTO)
+        self.assertFalse(interruptor.permitir())
+
+    def test_prueba_exitosa_cierra(self):
+        interruptor = abierto()
+        enfriar(interruptor)
+        interruptor.permitir()
+        interruptor.registrar_exito()
+        self.assertEqual(interruptor.estado, CERRADO)
+        self.assertTrue(interruptor.permitir())
+
+    def test_prueba_fallida_reabre(self):
+        interruptor = abierto()
+        enfriar(interruptor)
+        interruptor.permitir()
+        interruptor.registrar_fallo()
+        self.assertEqual(interruptor.estado, ABIERTO)
+        self.assertEqual(interruptor.aperturas, 2)
+        # El enfriamiento vuelve a empezar
+        self.assertFalse(interruptor.permitir())
+
+    def test_liberar_permite_otra_prueba(self):
+        interruptor = abierto()
+        enfriar(interruptor)
+        interruptor.permitir()
+        interruptor.liberar()
+        self.assertEqual(interruptor.estado, SEMIABIERTO)
+        self.assertTrue(interruptor.permitir())
+
+
+if __name__ == "__main__":
+    unittest.main()
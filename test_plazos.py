@@ -0,0 +1,142 @@
+"""
+Pruebas de plazos por petición y del cliente Lazy Pirate (sin MySQL; ZeroMQ inproc://)
+
+    python -m unittest test_plazos
+"""
+import threading
+import time
+import unittest
+
+import zmq
+
+import plazos
+from cliente_confiable import ClienteConfiable, SinRespuesta
+
+
+class TestPlazos(unittest.TestCase):
+    def test_fijar_y_restante(self):
+        mensaje = {}
+        plazos.fijar(mensaje, 1000)
+        self.assertTrue(900 < plazos.restante_ms(mensaje) <= 1000)
+        self.assertFalse(plazos.expirado(mensaje))
+        self.assertTrue(plazos.expirado(mensaje, margen_ms=1000))
+
+    def test_sin_plazo(self):
+        mensaje = {}
+        plazos.fijar(mensaje, 0)
+        self.assertIsNone(plazos.restante_ms(mensaje))
+        self.assertFalse(plazos.expirado(mensaje))
+
+    def test_asegurar_respeta_el_plazo_del_ps(self):
+        mensaje = {}
+        plazo = plazos.fijar(mensaje, 500)
+        self.assertEqual(plazos.asegurar(mensaje, plazos.PLAZO_DEFECTO_MS), plazo)
+
+    def test_propagar_recorta_el_margen(self):
+        origen, destino = {}, {}
+        plazos.fijar(origen, 1000)
+        plazos.propagar(origen, destino, plazos.MARGEN_SALTO_MS)
+        self.assertAlmostEqual(origen[plazos.CAMPO] - destino[plazos.CAMPO],
+                               plazos.MARGEN_SALTO_MS / 1000.0)
+        sin_plazo = {}
+        plazos.propagar({}, sin_plazo, plazos.MARGEN_SALTO_MS)
+        self.assertNotIn(plazos.CAMPO, sin_plazo)
+
+    def test_respuesta_expirada(self):
+        mensaje = {plazos.CAMPO: time.time() - 1}
+        self.assertEqual(plazos.respuesta_expirada('GA', mensaje)['estado'], 'EXPIRADO')
+
+
+class ServidorPrueba(threading.Thread):
+    """REP en inproc:// que responde tras 'demora_s' (o nunca, con None)"""
+
+    def __init__(self, context, endpoint, demora_s=0.0):
+        super().__init__(daemon=True)
+        self.socket = context.socket(zmq.REP)
+        self.socket.bind(endpoint)
+        self.demora_s = demora_s
+        self.recibidos = []
+        self.corriendo = True
+
+    def run(self):
+        while self.corriendo:
+            if not self.socket.poll(20):
+                continue
+            mensaje = self.socket.recv_json()
+            self.recibidos.append(mensaje['operacion'])
+            if self.demora_s is None:
+                # REP bloqueado sin responder: el cliente verá un timeout
+                continue
+            time.sleep(self.demora_s)
+            self.socket.send_json({'estado': 'OK', 'operacion': mensaje['operacion']})
+
+    def detener(self):
+        self.corriendo = False
+        self.join()
+        self.socket.close(linger=0)
+
+
+class TestClienteConfiable(unittest.TestCase):
+    def setUp(self):
+        self.context = zmq.Context()
+        # Las limpiezas corren en orden inverso: el contexto se cierra al final
+        self.addCleanup(self.context.term)
+
+    def servidor(self, endpoint, demora_s=0.0):
+        servidor = ServidorPrueba(self.context, endpoint, demora_s)
+        servidor.start()
+        self.addCleanup(servidor.detener)
+        return servidor
+
+    def cliente(self, endpoints, **opciones):
+        cliente = ClienteConfiable(self.context, endpoints, "Prueba", backoff_ms=1, **opciones)
+        self.addCleanup(cliente.cerrar)
+        return cliente
+
+    def test_lectura_pasa_al_respaldo(self):
+        principal = self.servidor("inproc://principal", demora_s=None)
+        respaldo = self.servidor("inproc://respaldo")
+        cliente = self.cliente(["inproc://principal", "inproc://respaldo"], timeout_ms=50,
+                               reintentos=1, lecturas=('BUSQUEDA',))
+
+        self.assertEqual(cliente.solicitar({'operacion': 'BUSQUEDA'})['estado'], 'OK')
+        self.assertEqual(principal.recibidos, ['BUSQUEDA'])
+        self.assertEqual(respaldo.recibidos, ['BUSQUEDA'])
+
+    def test_mutacion_no_sale_del_principal(self):
+        self.servidor("inproc://principal", demora_s=None)
+        respaldo = self.servidor("inproc://respaldo")
+        cliente = self.cliente(["inproc://principal", "inproc://respaldo"], timeout_ms=50,
+                               reintentos=2, lecturas=('BUSQUEDA',))
+
+        with self.assertRaises(SinRespuesta):
+            cliente.solicitar({'operacion': 'PRESTAMO'})
+        self.assertEqual(respaldo.recibidos, [])
+        self.assertEqual(cliente.contadores['failovers'], 0)
+
+    def test_el_plazo_acota_los_reintentos(self):
+        self.servidor("inproc://principal", demora_s=None)
+        cliente = self.cliente("inproc://principal", timeout_ms=1000, reintentos=5)
+        mensaje = {'operacion': 'PRESTAMO'}
+        plazos.fijar(mensaje, 100)
+
+        t_inicio = time.perf_counter()
+        with self.assertRaises(plazos.PlazoVencido):
+            cliente.solicitar(mensaje)
+        self.assertLess(time.perf_counter() - t_inicio, 0.5)
+
+    def test_esperar_plazo_no_reenvia_antes_del_plazo(self):
+        # El destino tarda más que timeout_ms pero responde dentro del plazo
+        servidor = self.servidor("inproc://principal", demora_s=0.15)
+        cliente = self.cliente("inproc://principal", timeout_ms=50, reintentos=3,
+                               esperar_plazo=True)
+        mensaje = {'operacion': 'PRESTAMO'}
+        plazos.fijar(mensaje, 1000)
+
+        self.assertEqual(cliente.solicitar(mensaje)['estado'], 'OK')
+        self.assertEqual(servidor.recibidos, ['PRESTAMO'])
+        self.assertEqual(cliente.contadores['timeouts'], 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,78 @@
+"""
+Trazas de extremo a extremo
+El PS crea un id de traza por petición y cada salto (GC, Actor, GA) lo propaga
+al siguiente junto con la hora de envío. Al responder, cada salto agrega su
+registro y devuelve la lista completa de saltos, así la respuesta que llega al
+PS trae el desglose completo:
+
+    {'componente': 'GA', 'encolado': ..., 'inicio': ..., 'fin': ..., 'proceso_ms': ..., 'sql_ms': ...}
+
+- encolado: hora en que el salto anterior envió el mensaje (red + cola ZeroMQ)
+- inicio:   hora en que el componente recibió el mensaje
+- fin:      hora en que el componente envió la respuesta
+
+Las horas son time.time() (segundos epoch): comparables entre procesos del
+mismo host; entre hosts dependen de la sincronización de relojes (NTP).
+"""
+import uuid
+import math
+import time
+
+
+def ahora():
+    """Hora actual para las marcas de la traza"""
+    return time.time()
+
+
+def iniciar(peticion):
+    """Crea la traza de una petición nueva (lo hace el PS)"""
+    peticion['traza'] = {'id': uuid.uuid4().hex, 't_envio': ahora()}
+    return peticion['traza']['id']
+
+
+def propagar(origen, destino):
+    """Copia el id de traza del mensaje recibido al mensaje que se envía al siguiente salto"""
+    traza = origen.get('traza')
+    if traza:
+        destino['traza'] = {'id': traza['id'], 't_envio': ahora()}
+
+
+def acumular(origen, respuesta):
+    """Agrega a la traza del mensaje recibido los saltos devueltos por el siguiente salto"""
+    traza = origen.get('traza')
+    saltos = (respuesta.get('traza') or {}).get('saltos')
+    if traza and saltos:
+        traza.setdefault('saltos', []).extend(saltos)
+
+
+def cerrar_salto(origen, respuesta, componente, inicio, **extra):
+    """
+    Registra el salto de este componente y adjunta la traza a su respuesta
+
+    Args:
+        origen: Mensaje recibido (con 'traza' si la petición viene trazada)
+        respuesta: dict que se va a enviar de vuelta
+        componente: Nombre del salto ('GC', 'Actor-PRESTAMO', 'GA', ...)
+        inicio: Hora de recepción del mensaje (ahora() al recibir)
+        **extra: Datos adicionales del salto (p. ej. operacion, proceso_ms, sql_ms)
+    """
+    traza = origen.get('traza')
+    if not traza:
+        return
+
+    salto = {
+        'componente': componente,
+        'encolado': traza.get('t_envio', inicio),
+        'inicio': inicio,
+        'fin': ahora(),
+        **extra
+    }
+    respuesta['traza'] = {'id': traza['id'], 'saltos': traza.get('saltos', []) + [salto]}
+
+
+def percentil(valores_ordenados, p):
+    """Percentil por rango más cercano sobre una lista ya ordenada"""
+    if not valores_ordenados:
+        return 0.0
+    rango = math.ceil(p / 100.0 * len(valores_ordenados))
+    return valores_ordenados[min(max(rango, 1), len(valores_ordenados)) - 1]
@@ -0,0 +1,421 @@
+"""
+Verificador de consistencia del inventario
+Comprueba, con consultas por conjuntos (una pasada por tabla), los invariantes
+por libro de cada sede y la coherencia del catálogo entre sedes:
+
+- prestados_vs_activos:   ejemplares_totales - ejemplares_disponibles - en_escrow = préstamos no devueltos
+- disponibles_fuera_rango: 0 <= ejemplares_disponibles + en_escrow <= ejemplares_totales
+- prestamo_sin_libro:      todo préstamo referencia un libro existente
+- catalogo_entre_sedes:    mismo código y mismos ejemplares_totales en ambas sedes
+
+El modo incremental solo revisa los libros modificados (libros o préstamos)
+desde la marca de agua guardada en la ejecución anterior.
+
+en_escrow son los ejemplares de un libro caliente que el GA lleva en memoria
+(escrow.py): escrow_libros.ejemplares más los movimientos aún no volcados de
+escrow_consumos. Es 0 si la sede no tiene las tablas del escrow.
+"""
+import mysql.connector
+import argparse
+import json
+import time
+import sys
+import os
+
+ARCHIVO_ESTADO = ".consistencia_estado.json"
+
+# Préstamos que todavía ocupan un ejemplar
+ESTADOS_NO_DEVUELTOS = "('ACTIVO', 'VENCIDO')"
+# La marca de agua se retrasa para no perder filas fechadas antes de NOW() pero
+# confirmadas después (fecha_ultima_actualizacion se fija al ejecutar la sentencia)
+MARGEN_MARCA_S = 60
+
+class VerificadorConsistencia:
+    def __init__(self, host="localhost", port=3306, sedes=(1, 2), muestra=10,
+                 archivo_estado=ARCHIVO_ESTADO):
+        """
+        Inicializa el verificador
+
+        Args:
+            host: Host de MySQL
+            port: Puerto de MySQL
+            sedes: Sedes a verificar
+            muestra: Máximo de ejemplos a reportar por tipo de violación
+            archivo_estado: Archivo con las marcas de agua del modo incremental
+        """
+        self.host = host
+        self.port = port
+        self.sedes = list(sedes)
+        self.muestra = muestra
+        self.archivo_estado = archivo_estado
+
+    def conectar(self, sede):
+        """Conecta a la base de datos de una sede"""
+        return mysql.connector.connect(
+            host=self.host,
+            port=self.port,
+            user="biblioteca_user",
+            password="biblioteca_pass",
+            database=f"biblioteca_sede{sede}"
+        )
+
+    def cargar_estado(self):
+        """Lee las marcas de agua de la ejecución anterior"""
+        if not os.path.exists(self.archivo_estado):
+            return {}
+        with open(self.archivo_estado, 'r', encoding='utf-8') as f:
+            return json.load(f)
+
+    def guardar_estado(self, estado):
+        """Guarda las marcas de agua de forma atómica"""
+        temporal = f"{self.archivo_estado}.tmp"
+        with open(temporal, 'w', encoding='utf-8') as f:
+            json.dump(estado, f, indent=2)
+        os.replace(temporal, self.archivo_estado)
+
+    def tiene_escrow(self, cursor):
+        """Si la sede tiene las tablas del escrow de libros calientes (migración v5)"""
+        cursor.execute("""
+            SELECT COUNT(*) FROM information_schema.tables
+            WHERE table_schema = DATABASE() AND table_name IN ('escrow_libros', 'escrow_consumos')
+        """)
+        return cursor.fetchone()[0] == 2
+
+    def preparar_alcance(self, cursor, desde, escrow=False):
+        """
+        Crea la tabla temporal alcance(codigo) con los libros a revisar
+
+        Con desde=None no se crea nada y se revisa la sede completa.
+
+        Returns:
+            tuple: (join_alcance, cantidad) para restringir las consultas
+        """
+        if desde is None:
+            return "", None
+
+        cursor.execute("DROP TEMPORARY TABLE IF EXISTS alcance")
+        cursor.execute("CREATE TEMPORARY TABLE alcance (codigo VARCHAR(20) PRIMARY KEY)")
+        cursor.execute("""
+            INSERT IGNORE INTO alcance (codigo)
+            SELECT codigo FROM libros WHERE fecha_ultima_actualizacion >= %s
+        """, (desde,))
+        cursor.execute("""
+            INSERT IGNORE INTO alcance (codigo)
+            SELECT DISTINCT codigo_libro FROM prestamos WHERE fecha_ultima_actualizacion >= %s
+        """, (desde,))
+        if escrow:
+            # Los volcados del escrow no tocan libros ni prestamos
+            cursor.execute("INSERT IGNORE INTO alcance (codigo) SELECT codigo FROM escrow_libros")
+        cursor.execute("SELECT COUNT(*) FROM alcance")
+        cantidad = cursor.fetchone()[0]
+
+        return "JOIN alcance a ON a.codigo = l.codigo", cantidad
+
+    def verificar_sede(self, sede, desde=None):
+        """
+        Verifica los invariantes por libro de una sede
+
+        Args:
+            sede: Sede a verificar
+            desde: Marca de agua (DATETIME) del modo incremental, o None
+
+        Returns:
+            dict: Conteos y ejemplos por tipo de violación
+        """
+        conexion = self.conectar(sede)
+        cursor = conexion.cursor()
+        t_inicio = time.perf_counter()
+
+        try:
+            cursor.execute("SELECT NOW() - INTERVAL %s SECOND", (MARGEN_MARCA_S,))
+            marca = cursor.fetchone()[0]
+
+            escrow = self.tiene_escrow(cursor)
+            join_alcance, revisados = self.preparar_alcance(cursor, desde, escrow)
+
+            if desde is None:
+                # Conteo de préstamos no devueltos por libro (una pasada sobre prestamos)
+                join_activos = f"""
+                    LEFT JOIN (
+                        SELECT codigo_libro, COUNT(*) AS activos
+                        FROM prestamos
+                        WHERE estado IN {ESTADOS_NO_DEVUELTOS}
+                        GROUP BY codigo_libro
+                    ) p ON p.codigo_libro = l.codigo
+                """
+                activos = "COALESCE(p.activos, 0)"
+            else:
+                # Solo los libros del alcance, por el índice de codigo_libro (una tabla
+                # temporal no puede aparecer dos veces en la misma consulta)
+                join_activos = ""
+                activos = f"""(
+                    SELECT COUNT(*) FROM prestamos pr
+                    WHERE pr.codigo_libro = l.codigo AND pr.estado IN {ESTADOS_NO_DEVUELTOS}
+                )"""
+
+            # Ejemplares en escrow por libro (saldo volcado + movimientos pendientes)
+            if escrow:
+                join_escrow = """
+                    LEFT JOIN (
+                        SELECT e.codigo, e.ejemplares + COALESCE(SUM(c.delta), 0) AS ejemplares
+                        FROM escrow_libros e
+                        LEFT JOIN escrow_consumos c ON c.codigo_libro = e.codigo
+                        GROUP BY e.codigo, e.ejemplares
+                    ) e ON e.codigo = l.codigo
+                """
+                en_escrow = "COALESCE(e.ejemplares, 0)"
+            else:
+                join_escrow = ""
+                en_escrow = "0"
+            descuadre = f"l.ejemplares_totales - l.ejemplares_disponibles - {en_escrow} <> {activos}"
+            fuera = (f"l.ejemplares_disponibles < 0 OR {en_escrow} < 0 "
+                     f"OR l.ejemplares_disponibles + {en_escrow} > l.ejemplares_totales")
+
+            # Conteo de violaciones por tipo en una sola pasada sobre libros
+            cursor.execute(f"""
+                SELECT
+                    COUNT(*),
+                    COALESCE(SUM({descuadre}), 0),
+                    COALESCE(SUM({fuera}), 0)
+                FROM libros l
+                {join_alcance}
+                {join_activos}
+                {join_escrow}
+            """)
+            libros, prestados_vs_activos, fuera_rango = cursor.fetchone()
+
+            violaciones = {
+                'prestados_vs_activos': {'total': int(prestados_vs_activos), 'ejemplos': []},
+                'disponibles_fuera_rango': {'total': int(fuera_rango), 'ejemplos': []},
+                'prestamo_sin_libro': {'total': 0, 'ejemplos': []}
+            }
+
+            if prestados_vs_activos:
+                cursor.execute(f"""
+                    SELECT l.codigo, l.ejemplares_totales, l.ejemplares_disponibles,
+                           {en_escrow}, {activos}
+                    FROM libros l
+                    {join_alcance}
+                    {join_activos}
+                    {join_escrow}
+                    WHERE {descuadre}
+                    LIMIT %s
+                """, (self.muestra,))
+                violaciones['prestados_vs_activos']['ejemplos'] = [
+                    {'codigo': c, 'totales': t, 'disponibles': d, 'en_escrow': int(e), 'prestamos_activos': a}
+                    for c, t, d, e, a in cursor.fetchall()
+                ]
+
+            if fuera_rango:
+                cursor.execute(f"""
+                    SELECT l.codigo, l.ejemplares_totales, l.ejemplares_disponibles, {en_escrow}
+                    FROM libros l
+                    {join_alcance}
+                    {join_escrow}
+                    WHERE {fuera}
+                    LIMIT %s
+                """, (self.muestra,))
+                violaciones['disponibles_fuera_rango']['ejemplos'] = [
+                    {'codigo': c, 'totales': t, 'disponibles': d, 'en_escrow': int(e)}
+                    for c, t, d, e in cursor.fetchall()
+                ]
+
+            # Anti-join: préstamos cuyo libro no existe (posible con cargas sin FK)
+            filtro_sin_libro = ("AND p.fecha_ultima_actualizacion >= %s" if desde is not None else "")
+            parametros = (desde,) if desde is not None else ()
+            cursor.execute(f"""
+                SELECT COUNT(*)
+                FROM prestamos p
+                LEFT JOIN libros l ON l.codigo = p.codigo_libro
+                WHERE l.codigo IS NULL {filtro_sin_libro}
+            """, parametros)
+            sin_libro = cursor.fetchone()[0]
+            violaciones['prestamo_sin_libro']['total'] = int(sin_libro)
+
+            if sin_libro:
+                cursor.execute(f"""
+                    SELECT p.id, p.codigo_libro, p.usuario_id
+                    FROM prestamos p
+                    LEFT JOIN libros l ON l.codigo = p.codigo_libro
+                    WHERE l.codigo IS NULL {filtro_sin_libro}
+                    LIMIT %s
+                """, parametros + (self.muestra,))
+                violaciones['prestamo_sin_libro']['ejemplos'] = [
+                    {'prestamo_id': i, 'codigo': c, 'usuario_id': u}
+                    for i, c, u in cursor.fetchall()
+                ]
+
+            return {
+                'sede': sede,
+                'libros_revisados': int(libros) if revisados is None else revisados,
+                'incremental': desde is not None,
+                'marca': str(marca),
+                'segundos': round(time.perf_counter() - t_inicio, 3),
+                'violaciones': violaciones
+            }
+        finally:
+            cursor.close()
+            conexion.close()
+
+    def verificar_entre_sedes(self, sede_a=1, sede_b=2):
+        """
+        Compara el catálogo de dos sedes con un merge en streaming ordenado por código
+
+        Las filas se leen de a una (cursor sin buffer), así que la memoria del
+        verificador es constante aunque los catálogos tengan millones de libros.
+        El merge compara con el orden de Python (puntos de código), que no es el
+        de la colación utf8mb4_0900_ai_ci de la columna (mayúsculas, acentos,
+        guiones): ambas consultas ordenan con COLLATE utf8mb4_bin, cuyo orden de
+        bytes UTF-8 coincide con el de Python. MySQL ordena en disco (filesort)
+        en lugar de recorrer el índice de codigo.
+
+        Returns:
+            dict: Conteo y ejemplos de diferencias
+        """
+        t_inicio = time.perf_counter()
+        conexiones = [self.conectar(sede_a), self.conectar(sede_b)]
+        cursores = [c.cursor(buffered=False) for c in conexiones]
+        diferencias = 0
+        ejemplos = []
+
+        def anotar(codigo, detalle):
+            nonlocal diferencias
+            diferencias += 1
+            if len(ejemplos) < self.muestra:
+                ejemplos.append({'codigo': codigo, 'detalle': detalle})
+
+        try:
+            for cursor in cursores:
+                cursor.execute("SELECT codigo, ejemplares_totales FROM libros "
+                               "ORDER BY codigo COLLATE utf8mb4_bin")
+
+            fila_a = cursores[0].fetchone()
+            fila_b = cursores[1].fetchone()
+
+            while fila_a is not None or fila_b is not None:
+                if fila_b is None or (fila_a is not None and fila_a[0] < fila_b[0]):
+                    anotar(fila_a[0], f"solo existe en sede {sede_a}")
+                    fila_a = cursores[0].fetchone()
+                elif fila_a is None or fila_b[0] < fila_a[0]:
+                    anotar(fila_b[0], f"solo existe en sede {sede_b}")
+                    fila_b = cursores[1].fetchone()
+                else:
+                    if fila_a[1] != fila_b[1]:
+                        anotar(fila_a[0], f"ejemplares_totales {fila_a[1]} (sede {sede_a}) "
+                                          f"vs {fila_b[1]} (sede {sede_b})")
+                    fila_a = cursores[0].fetchone()
+                    fila_b = cursores[1].fetchone()
+
+            return {
+                'segundos': round(time.perf_counter() - t_inicio, 3),
+                'catalogo_entre_sedes': {'total': diferencias, 'ejemplos': ejemplos}
+            }
+        finally:
+            for cursor in cursores:
+                cursor.close()
+            for conexion in conexiones:
+                conexion.close()
+
+    def ejecutar(self, incremental=False, entre_sedes=True):
+        """
+        Ejecuta la verificación completa
+
+        Args:
+            incremental: Revisar solo lo modificado desde la última ejecución
+            entre_sedes: Comparar también el catálogo entre sedes
+
+        Returns:
+            dict: Reporte con los resultados por sede y el total de violaciones
+        """
+        estado = self.cargar_estado()
+        reporte = {'sedes': [], 'total_violaciones': 0}
+
+        for sede in self.sedes:
+            desde = estado.get(str(sede)) if incremental else None
+            resultado = self.verificar_sede(sede, desde)
+            reporte['sedes'].append(resultado)
+            reporte['total_violaciones'] += sum(
+                v['total'] for v in resultado['violaciones'].values()
+            )
+            estado[str(sede)] = resultado['marca']
+
+        # El catálogo no cambia en operación normal: solo en verificaciones completas
+        if entre_sedes and not incremental and len(self.sedes) >= 2:
+            resultado = self.verificar_entre_sedes(self.sedes[0], self.sedes[1])
+            reporte['entre_sedes'] = resultado
+            reporte['total_violaciones'] += resultado['catalogo_entre_sedes']['total']
+
+        self.guardar_estado(estado)
+        return reporte
+
+
+def imprimir_reporte(reporte):
+    """Muestra el reporte en formato legible"""
+    print("="*60)
+    print("VERIFICACIÓN DE CONSISTENCIA DEL INVENTARIO")
+    print("="*60)
+
+    for resultado in reporte['sedes']:
+        modo = "incremental" if resultado['incremental'] else "completa"
+        print(f"\n📍 SEDE {resultado['sede']} ({modo}, {resultado['libros_revisados']} libros, "
+              f"{resultado['segundos']}s)")
+        for tipo, violacion in resultado['violaciones'].items():
+            icono = "✓" if violacion['total'] == 0 else "✗"
+            print(f"  {icono} {tipo}: {violacion['total']}")
+            for ejemplo in violacion['ejemplos']:
+                print(f"      → {ejemplo}")
+
+    if 'entre_sedes' in reporte:
+        violacion = reporte['entre_sedes']['catalogo_entre_sedes']
+        icono = "✓" if violacion['total'] == 0 else "✗"
+        print(f"\n🔀 ENTRE SEDES ({reporte['entre_sedes']['segundos']}s)")
+        print(f"  {icono} catalogo_entre_sedes: {violacion['total']}")
+        for ejemplo in violacion['ejemplos']:
+            print(f"      → {ejemplo}")
+
+    print("\n" + "="*60)
+    if reporte['total_violaciones'] == 0:
+        print("✅ SIN VIOLACIONES")
+    else:
+        print(f"❌ {reporte['total_violaciones']} VIOLACIONES")
+    print("="*60)
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Verifica los invariantes de inventario de ambas sedes",
+        epilog="Ejemplos:\n"
+               "  python verificar_consistencia.py localhost 3306\n"
+               "  python verificar_consistencia.py localhost 3306 --incremental --muestra 5",
+        formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument("host", nargs="?", default="localhost", help="Host de MySQL")
+    parser.add_argument("port", nargs="?", type=int, default=3306, help="Puerto de MySQL")
+    parser.add_argument("--sedes", type=int, nargs="+", default=[1, 2], help="Sedes (defecto: 1 2)")
+    parser.add_argument("--muestra", type=int, default=10, help="Ejemplos por tipo de violación")
+    parser.add_argument("--incremental", action="store_true",
+                        help="Revisar solo lo modificado desde la última ejecución")
+    parser.add_argument("--sin-entre-sedes", action="store_true",
+                        help="No comparar el catálogo entre sedes")
+    parser.add_argument("--estado", default=ARCHIVO_ESTADO, help="Archivo de marcas de agua")
+    parser.add_argument("--json", action="store_true", help="Imprimir el reporte en JSON")
+    args = parser.parse_args()
+
+    verificador = VerificadorConsistencia(args.host, args.port, args.sedes, args.muestra, args.estado)
+
+    try:
+        reporte = verificador.ejecutar(args.incremental, not args.sin_entre_sedes)
+    except mysql.connector.Error as e:
+        print(f"\n[ERROR] Error de base de datos: {e}")
+        sys.exit(2)
+
+    if args.json:
+        print(json.dumps(reporte, indent=2, default=str))
+    else:
+        imprimir_reporte(reporte)
+
+    sys.exit(0 if reporte['total_violaciones'] == 0 else 1)
+
+
+if __name__ == "__main__":
+    main()